@@ -0,0 +1,231 @@
+"""Concurrent invocation of REST-ful converters with bounded
+concurrency.
+
+A REST-ful converter spends most of each conversion waiting on a round
+trip to the service. The converters in this module issue many
+conversions at once, up to a configured ``concurrency``, so one
+harness process can keep a remote, or local, service busy.
+
+Each conversion runs the converter's blocking
+:meth:`prov_interop.converter.Converter.convert` in a thread pool of
+``concurrency`` threads, sharing the converter's pooled HTTP session
+(see :class:`prov_interop.component.RestComponent`). The size of the
+pool bounds the conversions in progress. This avoids a dependency on
+an asynchronous HTTP client while giving the same concurrency for the
+small numbers of connections used.
+
+The converters override
+:meth:`prov_interop.converter.Converter.convert_batch`, so
+:mod:`prov_interop.run` issues each batch of up to ``batch-size``
+conversions at once. To use them, give the class in the converter's
+configuration e.g. in ``localconfig/provtranslator.yaml``::
+
+    ProvTranslator:
+      class: prov_interop.aio.AsyncProvTranslatorConverter
+      url: https://provenance.ecs.soton.ac.uk/validator/provapi/documents/
+      input-formats: [provn, ttl, trig, provx, json]
+      output-formats: [provn, ttl, trig, provx, json]
+      concurrency: 16
+      batch-size: 64
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from concurrent.futures import ThreadPoolExecutor
+
+from prov_interop.component import ConfigError
+from prov_interop.provstore.converter import ProvStoreConverter
+from prov_interop.provtranslator.converter import ProvTranslatorConverter
+
+CONCURRENCY = "concurrency"
+"""str or unicode: configuration key for maximum number of conversions
+in progress at once"""
+
+BATCH_SIZE = "batch-size"
+"""str or unicode: configuration key for maximum number of conversions
+issued together by :mod:`prov_interop.run`"""
+
+DEFAULT_CONCURRENCY = 8
+"""int: default maximum number of conversions in progress at once"""
+
+DEFAULT_BATCH_SIZE = 32
+"""int: default maximum number of conversions issued together"""
+
+
+class AsyncConverter(object):
+  """Mixin which adds concurrent conversions to a REST-ful
+  converter. It must precede the converter class in the base classes
+  of a sub-class.
+  """
+
+  def __init__(self):
+    """Create converter.
+    """
+    super(AsyncConverter, self).__init__()
+    self._concurrency = DEFAULT_CONCURRENCY
+    self._async_batch_size = DEFAULT_BATCH_SIZE
+    self._executor = None
+
+  @property
+  def concurrency(self):
+    """Get maximum number of conversions in progress at once.
+
+    :return: concurrency
+    :rtype: int
+    """
+    return self._concurrency
+
+  @property
+  def batch_size(self):
+    """Get maximum number of conversions issued together by
+    :meth:`convert_batch`.
+
+    :return: batch size
+    :rtype: int
+    """
+    return self._async_batch_size
+
+  def configure(self, config):
+    """Configure converter. The configuration must hold the
+    converter's configuration, and may also hold:
+
+    - ``concurrency``: maximum number of conversions in progress at
+      once (optional, default 8). The HTTP connection pool is enlarged
+      to at least this size.
+    - ``batch-size``: maximum number of conversions issued together by
+      :mod:`prov_interop.run` (optional, default 32).
+
+    :param config: Configuration
+    :type config: dict
+    :raises ConfigError: if `config` does not hold the above entries
+    """
+    super(AsyncConverter, self).configure(config)
+    values = {}
+    for (key, default) in [(CONCURRENCY, DEFAULT_CONCURRENCY),
+                           (BATCH_SIZE, DEFAULT_BATCH_SIZE)]:
+      value = config.get(key, default)
+      if type(value) is not int or value < 1:
+        raise ConfigError(key + " must be a positive integer")
+      values[key] = value
+    if self._executor is not None and \
+          self._concurrency != values[CONCURRENCY]:
+      self._executor.shutdown(wait=True)
+      self._executor = None
+    self._concurrency = values[CONCURRENCY]
+    self._async_batch_size = values[BATCH_SIZE]
+    self._pool_size = max(self._pool_size, self._concurrency)
+
+  @property
+  def executor(self):
+    """Get the thread pool in which blocking conversions run, creating
+    it if necessary.
+
+    :return: thread pool
+    :rtype: :class:`concurrent.futures.ThreadPoolExecutor`
+    """
+    if self._executor is None:
+      self._executor = ThreadPoolExecutor(max_workers=self._concurrency)
+    return self._executor
+
+  def convert_result(self, in_file, out_file):
+    """Convert input file into output file, as for
+    :meth:`prov_interop.converter.Converter.convert`, returning,
+    rather than raising, any exception.
+
+    :param in_file: Input file
+    :type in_file: str or unicode
+    :param out_file: Output file
+    :type out_file: str or unicode
+    :return: ``None`` if the conversion succeeded or the exception
+      raised if it failed
+    :rtype: ``None`` or :class:`Exception`
+    """
+    try:
+      self.convert(in_file, out_file)
+    except Exception as e:
+      return e
+    return None
+
+  def convert_batch(self, files):
+    """Convert many input files into output files at once, in the
+    thread pool, with at most ``concurrency`` conversions in progress.
+
+    :param files: Input and output file pairs
+    :type files: list of tuple of (str or unicode, str or unicode)
+    :return: for each pair, ``None`` if the conversion succeeded or
+      the exception raised if it failed
+    :rtype: list of ``None`` or :class:`Exception`
+    """
+    # The session is created here, not by the threads that share it.
+    self.session
+    return list(self.executor.map(self.convert_result,
+                                  [in_file for (in_file, _) in files],
+                                  [out_file for (_, out_file) in files]))
+
+  def close(self):
+    """Shut down the thread pool, then close the converter.
+    """
+    if self._executor is not None:
+      self._executor.shutdown(wait=True)
+      self._executor = None
+    super(AsyncConverter, self).close()
+
+
+class AsyncProvTranslatorConverter(AsyncConverter, ProvTranslatorConverter):
+  """ProvTranslator converter which issues many conversions at once.
+  """
+
+  RUNTIME_KEYS = ProvTranslatorConverter.RUNTIME_KEYS + [CONCURRENCY,
+                                                         BATCH_SIZE]
+  """list of str or unicode: configuration keys excluded from
+  :meth:`fingerprint`"""
+
+
+class AsyncProvStoreConverter(AsyncConverter, ProvStoreConverter):
+  """ProvStore converter which issues many conversions at once.
+  """
+
+  RUNTIME_KEYS = ProvStoreConverter.RUNTIME_KEYS + [CONCURRENCY,
+                                                    BATCH_SIZE]
+  """list of str or unicode: configuration keys excluded from
+  :meth:`fingerprint`"""
+
+  def convert_batch(self, files):
+    """Convert many input files into output files at once. If
+    ``upload-once`` is set then each input document is stored once and
+    fetched in every requested output format, as for
+    :meth:`prov_interop.provstore.converter.ProvStoreConverter.convert_batch`,
+    in the thread pool. Otherwise, conversions are done as for
+    :meth:`AsyncConverter.convert_batch`.
+
+    :param files: Input and output file pairs
+    :type files: list of tuple of (str or unicode, str or unicode)
+    :return: for each pair, ``None`` if the conversion succeeded or
+      the exception raised if it failed
+    :rtype: list of ``None`` or :class:`Exception`
+    """
+    if not self.upload_once:
+      return super(AsyncProvStoreConverter, self).convert_batch(files)
+    return ProvStoreConverter.convert_batch(self, files, self.executor)
@@ -0,0 +1,191 @@
+"""Benchmarks of per-call overheads of invoking command-line components.
+
+Times repeated invocations of a Python script, by starting a new
+interpreter for each invocation, as is done by default, and by using a
+forkserver (see :mod:`prov_interop.forkserver`). The forkserver's
+start-up, and the loading of the script, are not included in its
+times. Output from the script is written to standard error.
+
+Usage::
+
+    usage: benchmark.py [-h] [-n N] [-m MODULE] executable [argument ...]
+
+    Benchmark per-call overheads of invoking a Python script.
+
+    positional arguments:
+      executable   Python script, or interpreter and script separated
+                   by a space
+      argument     Arguments for each invocation
+
+    optional arguments:
+      -h, --help   show this help message and exit
+      -n N         Number of invocations (default 20)
+      -m MODULE    Module for the forkserver to import when it loads
+                   the script. May be repeated
+
+For example::
+
+    $ python -m prov_interop.benchmark -n 50 "python /home/user/ProvPy/scripts/prov-convert" -- --help
+    spawn            312.41 ms/call
+    forkserver         9.87 ms/call
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import subprocess
+import sys
+import time
+
+from prov_interop import forkserver
+from prov_interop.worker import WorkerProcess
+
+DEFAULT_COUNT = 20
+"""int: default number of invocations"""
+
+
+def time_calls(call, arguments, count):
+  """Time repeated calls.
+
+  :param call: Function to invoke, with `arguments`
+  :type call: function
+  :param arguments: Arguments
+  :type arguments: list of str or unicode
+  :param count: Number of calls
+  :type count: int
+  :return: mean time per call, in seconds
+  :rtype: float
+  """
+  start = time.time()
+  for _ in range(count):
+    call(arguments)
+  return (time.time() - start) / count
+
+
+def benchmark_spawn(executable, arguments, count):
+  """Time invocations which each start a new process.
+
+  :param executable: Executable and any arguments
+  :type executable: list of str or unicode
+  :param arguments: Arguments
+  :type arguments: list of str or unicode
+  :param count: Number of calls
+  :type count: int
+  :return: mean time per call, in seconds
+  :rtype: float
+  """
+  def call(arguments):
+    return subprocess.call(executable + arguments, stdout=sys.stderr)
+  return time_calls(call, arguments, count)
+
+
+def benchmark_forkserver(executable, arguments, count, modules=None):
+  """Time invocations via a forkserver. The forkserver is started,
+  and the script loaded, before timing begins.
+
+  :param executable: Python script, or interpreter and script
+  :type executable: list of str or unicode
+  :param arguments: Arguments
+  :type arguments: list of str or unicode
+  :param count: Number of calls
+  :type count: int
+  :param modules: Modules for the forkserver to import
+  :type modules: list of str or unicode
+  :return: mean time per call, in seconds
+  :rtype: float
+  :raises OSError: if the script cannot be found, or the forkserver
+    fails
+  """
+  worker = WorkerProcess(forkserver.command_line(executable, modules),
+                         forkserver.environment())
+  try:
+    worker.call(arguments)
+    return time_calls(worker.call, arguments, count)
+  finally:
+    worker.stop()
+
+
+def benchmark(executable, arguments, count=DEFAULT_COUNT, modules=None):
+  """Time invocations of a Python script using each invocation
+  mechanism.
+
+  :param executable: Python script, or interpreter and script
+  :type executable: list of str or unicode
+  :param arguments: Arguments
+  :type arguments: list of str or unicode
+  :param count: Number of calls
+  :type count: int
+  :param modules: Modules for the forkserver to import
+  :type modules: list of str or unicode
+  :return: list of (mechanism, mean time per call in seconds)
+  :rtype: list of (str or unicode, float)
+  """
+  if len(executable) == 1:
+    spawn_executable = [sys.executable,
+                        forkserver.find_script(executable[0])]
+  else:
+    spawn_executable = executable
+  return [("spawn", benchmark_spawn(spawn_executable, arguments, count)),
+          ("forkserver",
+           benchmark_forkserver(executable, arguments, count, modules))]
+
+
+def print_timings(timings):
+  """Print timings in milliseconds per call.
+
+  :param timings: list of (mechanism, mean time per call in seconds)
+  :type timings: list of (str or unicode, float)
+  """
+  for (name, seconds) in timings:
+    print("%-12s %10.2f ms/call" % (name, seconds * 1000))
+
+
+def main(argv=None):
+  """Parse command-line arguments and run benchmarks.
+
+  :param argv: Command-line arguments (default ``sys.argv[1:]``)
+  :type argv: list of str or unicode
+  """
+  parser = argparse.ArgumentParser(
+    description="Benchmark per-call overheads of invoking a Python script.")
+  parser.add_argument("-n", metavar="N", type=int, default=DEFAULT_COUNT,
+                      help="Number of invocations (default " +
+                      str(DEFAULT_COUNT) + ")")
+  parser.add_argument("-m", metavar="MODULE", dest="modules",
+                      action="append", default=[],
+                      help="Module for the forkserver to import when " +
+                      "it loads the script. May be repeated")
+  parser.add_argument("executable",
+                      help="Python script, or interpreter and script " +
+                      "separated by a space")
+  parser.add_argument("arguments", metavar="argument", nargs="*",
+                      help="Arguments for each invocation")
+  args = parser.parse_args(argv)
+  print_timings(benchmark(args.executable.split(), args.arguments, args.n,
+                          args.modules))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,567 @@
+"""Caches used by components to avoid repeating work.
+
+On-disk caches, such as those configured via ``conversion-cache`` and
+``comparison-cache`` in the harness configuration, can be managed from
+the command-line. Usage::
+
+    usage: cache.py [-h] [-s MAX_SIZE] {purge,trim,size} directory
+
+    Manage an on-disk cache.
+
+    positional arguments:
+      {purge,trim,size}  purge: remove all entries, if the directory
+                         holds nothing but the cache; trim: evict
+                         least-recently-used entries until the cache is
+                         within MAX_SIZE; size: print number and total
+                         size of entries
+      directory          Cache directory
+
+    optional arguments:
+      -h, --help         show this help message and exit
+      -s MAX_SIZE        Maximum size in bytes, for trim (default 256MB)
+
+For example::
+
+    $ python -m prov_interop.cache trim -s 1048576 /home/user/cache/comparisons
+    Evicted 1234 entries
+    2048 entries, 1048000 bytes
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from collections import OrderedDict
+
+DIRECTORY = "directory"
+"""str or unicode: configuration key for a disk cache's directory"""
+
+MAX_SIZE = "max-size"
+"""str or unicode: configuration key for a disk cache's maximum size,
+in bytes"""
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+"""int: default maximum disk cache size, in bytes"""
+
+ENTRY_NAME = re.compile("^[0-9a-f]+$")
+"""Regular expression matching the file names of disk cache entries,
+and of the sub-directories holding them"""
+
+TRIM_RATIO = 0.9
+"""float: fraction of a disk cache's maximum size to which it is
+trimmed when it exceeds its maximum size, so that it has room for
+more entries before it must be trimmed again"""
+
+
+def digest(*parts):
+  """Get SHA-256 digest of values. Values are serialized as JSON, so
+  must be JSON-serializable.
+
+  :param parts: Values
+  :type parts: list
+  :return: hexadecimal digest
+  :rtype: str or unicode
+  """
+  data = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+  return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def file_digest(file_name):
+  """Get SHA-256 digest of a file's contents.
+
+  :param file_name: File name
+  :type file_name: str or unicode
+  :return: hexadecimal digest
+  :rtype: str or unicode
+  :raises IOError: if the file cannot be read
+  """
+  sha = hashlib.sha256()
+  with open(file_name, "rb") as f:
+    for block in iter(lambda: f.read(65536), b""):
+      sha.update(block)
+  return sha.hexdigest()
+
+
+class LRUCache(object):
+  """Bounded in-memory cache which evicts the least-recently-used
+  entry when full. It counts hits and misses."""
+
+  def __init__(self, max_size):
+    """Create cache.
+
+    :param max_size: Maximum number of entries
+    :type max_size: int
+    :raises ValueError: if `max_size` is less than 1
+    """
+    if max_size < 1:
+      raise ValueError("Cache size must be at least 1")
+    self._max_size = max_size
+    self._entries = OrderedDict()
+    self._hits = 0
+    self._misses = 0
+
+  @property
+  def max_size(self):
+    """Get maximum number of entries.
+
+    :return: maximum number of entries
+    :rtype: int
+    """
+    return self._max_size
+
+  @property
+  def hits(self):
+    """Get number of calls to :meth:`get` which found an entry.
+
+    :return: hits
+    :rtype: int
+    """
+    return self._hits
+
+  @property
+  def misses(self):
+    """Get number of calls to :meth:`get` which found no entry.
+
+    :return: misses
+    :rtype: int
+    """
+    return self._misses
+
+  def __len__(self):
+    return len(self._entries)
+
+  def __contains__(self, key):
+    return key in self._entries
+
+  def get(self, key, default=None):
+    """Get an entry and mark it as most recently used.
+
+    :param key: Key
+    :type key: hashable
+    :param default: Value to return if there is no entry
+    :type default: object
+    :return: value or `default`
+    :rtype: object
+    """
+    if key not in self._entries:
+      self._misses += 1
+      return default
+    self._hits += 1
+    value = self._entries.pop(key)
+    self._entries[key] = value
+    return value
+
+  def put(self, key, value):
+    """Add or replace an entry, evicting the least-recently-used
+    entry if the cache is full.
+
+    :param key: Key
+    :type key: hashable
+    :param value: Value
+    :type value: object
+    """
+    if key in self._entries:
+      del self._entries[key]
+    elif len(self._entries) >= self._max_size:
+      self._entries.popitem(last=False)
+    self._entries[key] = value
+
+  def statistics(self):
+    """Get cache counters.
+
+    :return: ``hits``, ``misses`` and ``entries``
+    :rtype: dict from str or unicode to int
+    """
+    return {"hits": self._hits,
+            "misses": self._misses,
+            "entries": len(self._entries)}
+
+  def clear(self):
+    """Remove all entries. Hit and miss counts are kept.
+    """
+    self._entries.clear()
+
+
+class DiskCache(object):
+  """Content-addressed cache of byte strings held in files within a
+  directory. Each entry is held in a file named after its key, in a
+  sub-directory named after the key's first two characters. Files
+  which do not follow this layout are ignored, and never removed. When
+  the total size of the entries exceeds a bound, least-recently-used
+  entries, determined by file modification times, are evicted. Entries
+  are written atomically, so a cache directory can be shared by
+  many processes.
+  """
+
+  def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+    """Create cache. The directory is created if it does not exist.
+
+    :param directory: Directory
+    :type directory: str or unicode
+    :param max_size: Maximum total size of entries, in bytes
+    :type max_size: int
+    :raises ValueError: if `max_size` is less than 1
+    """
+    if max_size < 1:
+      raise ValueError("Cache size must be at least 1")
+    self._directory = directory
+    self._max_size = max_size
+    self._size = None
+    self._hits = 0
+    self._misses = 0
+    if not os.path.isdir(directory):
+      os.makedirs(directory)
+
+  @classmethod
+  def from_config(cls, config):
+    """Create cache from a configuration. The configuration must hold:
+
+    - ``directory``: cache directory.
+
+    It may also hold:
+
+    - ``max-size``: maximum total size of entries, in bytes (optional,
+      default 256MB).
+
+    :param config: Configuration
+    :type config: dict
+    :return: cache
+    :rtype: :class:`DiskCache`
+    :raises ValueError: if `config` does not hold the above entries
+    """
+    if not isinstance(config, dict) or DIRECTORY not in config:
+      raise ValueError("Missing " + DIRECTORY)
+    max_size = config.get(MAX_SIZE, DEFAULT_MAX_SIZE)
+    if type(max_size) is not int:
+      raise ValueError(MAX_SIZE + " must be an integer")
+    return cls(config[DIRECTORY], max_size)
+
+  @property
+  def directory(self):
+    """Get cache directory.
+
+    :return: directory
+    :rtype: str or unicode
+    """
+    return self._directory
+
+  @property
+  def max_size(self):
+    """Get maximum total size of entries, in bytes.
+
+    :return: maximum size
+    :rtype: int
+    """
+    return self._max_size
+
+  @property
+  def hits(self):
+    """Get number of calls to :meth:`get` which found an entry.
+
+    :return: hits
+    :rtype: int
+    """
+    return self._hits
+
+  @property
+  def misses(self):
+    """Get number of calls to :meth:`get` which found no entry.
+
+    :return: misses
+    :rtype: int
+    """
+    return self._misses
+
+  def path(self, key):
+    """Get the file name for an entry.
+
+    :param key: Key, a hexadecimal digest
+    :type key: str or unicode
+    :return: file name
+    :rtype: str or unicode
+    """
+    return os.path.join(self._directory, key[:2], key)
+
+  def entry_directories(self):
+    """Get the sub-directories of the cache directory which hold
+    entries. These are named after the first two characters of the
+    entries' keys.
+
+    :return: directory names
+    :rtype: list of str or unicode
+    """
+    directories = []
+    for name in os.listdir(self._directory):
+      path = os.path.join(self._directory, name)
+      if len(name) == 2 and ENTRY_NAME.match(name) and os.path.isdir(path):
+        directories.append(path)
+    return directories
+
+  def other_files(self):
+    """Get the names of the files and directories in the cache
+    directory which are not sub-directories holding entries.
+
+    :return: names
+    :rtype: list of str or unicode
+    """
+    directories = self.entry_directories()
+    return sorted([name for name in os.listdir(self._directory)
+                   if os.path.join(self._directory, name)
+                   not in directories])
+
+  def entries(self):
+    """Get the entries in the cache.
+
+    :return: file name, size and modification time of each entry
+    :rtype: list of tuple of (str or unicode, int, float)
+    """
+    entries = []
+    for directory in self.entry_directories():
+      prefix = os.path.basename(directory)
+      for name in os.listdir(directory):
+        if not (name.startswith(prefix) and ENTRY_NAME.match(name)):
+          continue
+        file_name = os.path.join(directory, name)
+        try:
+          stat = os.stat(file_name)
+        except OSError:
+          continue
+        if os.path.isfile(file_name):
+          entries.append((file_name, stat.st_size, stat.st_mtime))
+    return entries
+
+  def size(self):
+    """Get the total size of the entries in the cache.
+
+    :return: size in bytes
+    :rtype: int
+    """
+    return sum([size for (_, size, _) in self.entries()])
+
+  def get(self, key):
+    """Get an entry and mark it as most recently used.
+
+    :param key: Key, a hexadecimal digest
+    :type key: str or unicode
+    :return: value or ``None`` if there is no entry
+    :rtype: bytes
+    """
+    file_name = self.path(key)
+    try:
+      with open(file_name, "rb") as f:
+        data = f.read()
+      os.utime(file_name, None)
+    except (IOError, OSError):
+      self._misses += 1
+      return None
+    self._hits += 1
+    return data
+
+  def get_file(self, key, out_file):
+    """Copy an entry to a file and mark it as most recently used. The
+    entry is copied a block at a time, so it is not held in memory.
+
+    :param key: Key, a hexadecimal digest
+    :type key: str or unicode
+    :param out_file: File name
+    :type out_file: str or unicode
+    :return: ``True`` if there is an entry, else ``False``
+    :rtype: bool
+    """
+    file_name = self.path(key)
+    try:
+      shutil.copyfile(file_name, out_file)
+      os.utime(file_name, None)
+    except (IOError, OSError):
+      self._misses += 1
+      return False
+    self._hits += 1
+    return True
+
+  def put(self, key, data):
+    """Add or replace an entry. If the cache then exceeds its maximum
+    size, evict least-recently-used entries until it is within
+    :data:`TRIM_RATIO` of its maximum size.
+
+    :param key: Key, a hexadecimal digest
+    :type key: str or unicode
+    :param data: Value
+    :type data: bytes
+    """
+    self._add(key, lambda f: f.write(data))
+
+  def put_file(self, key, file_name):
+    """Add or replace an entry with the contents of a file, as for
+    :meth:`put`. The file is copied a block at a time, so it is not
+    held in memory.
+
+    :param key: Key, a hexadecimal digest
+    :type key: str or unicode
+    :param file_name: File name
+    :type file_name: str or unicode
+    :raises IOError: if the file cannot be read
+    """
+    def write(f):
+      with open(file_name, "rb") as source:
+        shutil.copyfileobj(source, f)
+    self._add(key, write)
+
+  def _add(self, key, write):
+    file_name = self.path(key)
+    directory = os.path.dirname(file_name)
+    if not os.path.isdir(directory):
+      try:
+        os.makedirs(directory)
+      except OSError:
+        if not os.path.isdir(directory):
+          raise
+    (handle, tmp_file_name) = tempfile.mkstemp(prefix=".", dir=directory)
+    try:
+      with os.fdopen(handle, "wb") as f:
+        write(f)
+      size = os.path.getsize(tmp_file_name)
+      try:
+        # Size of the entry being replaced, if any.
+        size -= os.path.getsize(file_name)
+      except OSError:
+        pass
+      os.rename(tmp_file_name, file_name)
+    except Exception:
+      os.remove(tmp_file_name)
+      raise
+    if self._size is None:
+      self._size = self.size()
+    else:
+      self._size += size
+    if self._size > self._max_size:
+      self.trim(int(self._max_size * TRIM_RATIO))
+
+  def trim(self, max_size=None):
+    """Evict least-recently-used entries until the total size of the
+    entries is within a bound.
+
+    :param max_size: Bound in bytes (default the cache's maximum size)
+    :type max_size: int
+    :return: number of entries evicted
+    :rtype: int
+    """
+    if max_size is None:
+      max_size = self._max_size
+    entries = sorted(self.entries(), key=lambda entry: entry[2])
+    size = sum([size for (_, size, _) in entries])
+    evicted = 0
+    for (file_name, entry_size, _) in entries:
+      if size <= max_size:
+        break
+      try:
+        os.remove(file_name)
+        evicted += 1
+      except OSError:
+        pass
+      size -= entry_size
+    self._size = size
+    return evicted
+
+  def purge(self):
+    """Remove all entries, and any files left by interrupted writes.
+    Sub-directories holding entries are removed if they are then
+    empty. Other files and directories are left alone. Hit and miss
+    counts are kept.
+    """
+    for (file_name, _, _) in self.entries():
+      try:
+        os.remove(file_name)
+      except OSError:
+        pass
+    for directory in self.entry_directories():
+      # Temporary files are named with a "." prefix by _add.
+      for name in os.listdir(directory):
+        file_name = os.path.join(directory, name)
+        if name.startswith(".") and os.path.isfile(file_name):
+          try:
+            os.remove(file_name)
+          except OSError:
+            pass
+      try:
+        os.rmdir(directory)
+      except OSError:
+        pass
+    self._size = 0
+
+  def statistics(self):
+    """Get cache counters.
+
+    :return: ``hits`` and ``misses``
+    :rtype: dict from str or unicode to int
+    """
+    return {"hits": self._hits, "misses": self._misses}
+
+
+def main(argv=None):
+  """Parse command-line arguments and purge, trim or report the size
+  of an on-disk cache.
+
+  :param argv: Command-line arguments (default ``sys.argv[1:]``)
+  :type argv: list of str or unicode
+  """
+  parser = argparse.ArgumentParser(description="Manage an on-disk cache.")
+  parser.add_argument("-s", metavar="MAX_SIZE", dest="max_size", type=int,
+                      default=DEFAULT_MAX_SIZE,
+                      help="Maximum size in bytes, for trim (default " +
+                      "256MB)")
+  parser.add_argument("command", choices=["purge", "trim", "size"],
+                      help="purge: remove all entries, if the " +
+                      "directory holds nothing but the cache; trim: evict " +
+                      "least-recently-used entries until the cache is " +
+                      "within MAX_SIZE; size: print number and total " +
+                      "size of entries")
+  parser.add_argument("directory", help="Cache directory")
+  args = parser.parse_args(argv)
+  if not os.path.isdir(args.directory):
+    parser.error("No such directory: " + args.directory)
+  if args.max_size < 1:
+    parser.error("MAX_SIZE must be at least 1")
+  cache = DiskCache(args.directory, args.max_size)
+  if args.command == "purge":
+    # Guard against purging a directory which is not a cache.
+    other_files = cache.other_files()
+    if other_files:
+      parser.error(args.directory + " is not a cache directory, as it " +
+                   "holds " + ", ".join(other_files))
+    cache.purge()
+  elif args.command == "trim":
+    print("Evicted " + str(cache.trim()) + " entries")
+  entries = cache.entries()
+  print(str(len(entries)) + " entries, " +
+        str(sum([size for (_, size, _) in entries])) + " bytes")
+
+
+if __name__ == "__main__":
+  main()
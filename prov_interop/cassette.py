@@ -0,0 +1,348 @@
+"""Recording and replaying of HTTP requests and responses.
+
+A cassette holds the responses to the requests made by REST-ful
+components, keyed by each request's method, URL, content negotiation
+headers and body. In ``record`` mode, requests are made to the service
+and every response is recorded. In ``replay`` mode, requests are
+answered from the cassette, with no network access, and a request
+which was not recorded fails with a :class:`CassetteError`. Replaying
+allows the harness's own throughput to be measured and tuned without
+the latency of, or dependency upon, remote services.
+
+Responses are held in a :class:`prov_interop.cache.DiskCache`, so a
+cassette directory can be shared by concurrent processes. Each
+response is held as two entries: its decompressed body and its status
+and headers. Replayed bodies are streamed from the entries' files.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import hashlib
+import json
+import os
+import requests
+import tempfile
+import threading
+
+from prov_interop import http
+from prov_interop.cache import DiskCache
+from prov_interop.cache import digest
+from prov_interop.unixsocket import UnixAdapter
+
+MODE = "mode"
+"""str or unicode: configuration key for cassette mode"""
+
+RECORD = "record"
+"""str or unicode: mode in which responses are recorded"""
+
+REPLAY = "replay"
+"""str or unicode: mode in which recorded responses are replayed"""
+
+MODES = [RECORD, REPLAY]
+"""list of str or unicode: cassette modes"""
+
+KEY_HEADERS = [http.CONTENT_TYPE, http.ACCEPT, http.CONTENT_ENCODING,
+               http.IF_NONE_MATCH]
+"""list of str or unicode: request headers which distinguish requests
+with the same method, URL and body"""
+
+CHUNK_SIZE = 64 * 1024
+"""int: number of bytes of a response body read at a time when it is
+recorded"""
+
+UNRECORDED_HEADERS = ["Content-Encoding", "Content-Length",
+                      "Transfer-Encoding"]
+"""list of str or unicode: response headers which are not recorded, as
+bodies are recorded decompressed"""
+
+
+class CassetteError(requests.exceptions.RequestException):
+  """Error raised when replaying a request which was not recorded."""
+
+
+def body_digest(body):
+  """Get SHA-256 digest of a request body. A body which is an open
+  file is read, then returned to its original position. A body which
+  is an iterable of chunks must allow iteration more than once.
+
+  :param body: Request body, as bytes, text, an open file or an
+    iterable of chunks, or ``None``
+  :type body: bytes or str or unicode or file or iterable
+  :return: hexadecimal digest
+  :rtype: str or unicode
+  :raises IOError: if the body cannot be read
+  """
+  sha = hashlib.sha256()
+  if body is None:
+    chunks = []
+  elif isinstance(body, (bytes, type(""))):
+    chunks = [body]
+  elif hasattr(body, "read"):
+    position = body.tell()
+    chunks = list(iter(lambda: body.read(65536), body.read(0)))
+    body.seek(position)
+  else:
+    chunks = body
+  for chunk in chunks:
+    sha.update(chunk.encode("utf-8") if isinstance(chunk, type(""))
+               else chunk)
+  return sha.hexdigest()
+
+
+class Cassette(object):
+  """Store of recorded HTTP responses. It counts responses recorded
+  and replayed, and requests which were not recorded (missing).
+  """
+
+  def __init__(self, cache, mode):
+    """Create cassette.
+
+    :param cache: Cache holding responses
+    :type cache: :class:`prov_interop.cache.DiskCache`
+    :param mode: ``record`` or ``replay``
+    :type mode: str or unicode
+    :raises ValueError: if `mode` is not ``record`` or ``replay``
+    """
+    if mode not in MODES:
+      raise ValueError(MODE + " must be one of " + ", ".join(MODES))
+    self._cache = cache
+    self._mode = mode
+    # Cassettes are shared by threads, so counters are updated under
+    # a lock.
+    self._lock = threading.Lock()
+    self._counters = dict([(name, 0) for name in
+                           ["recorded", "replayed", "missing"]])
+
+  @classmethod
+  def from_config(cls, config):
+    """Create cassette from a configuration. The configuration must
+    hold the configuration of a :class:`prov_interop.cache.DiskCache`,
+    whose ``max-size`` should exceed the total size of the responses
+    recorded, and:
+
+    - ``mode``: ``record`` or ``replay``.
+
+    :param config: Configuration
+    :type config: dict
+    :return: cassette
+    :rtype: :class:`Cassette`
+    :raises ValueError: if `config` does not hold the above entries
+    """
+    cache = DiskCache.from_config(config)
+    return cls(cache, config.get(MODE))
+
+  @property
+  def cache(self):
+    """Get the cache holding responses.
+
+    :return: cache
+    :rtype: :class:`prov_interop.cache.DiskCache`
+    """
+    return self._cache
+
+  @property
+  def mode(self):
+    """Get the cassette mode.
+
+    :return: ``record`` or ``replay``
+    :rtype: str or unicode
+    """
+    return self._mode
+
+  def key(self, request):
+    """Get the key of a request.
+
+    :param request: Request
+    :type request: :class:`requests.PreparedRequest`
+    :return: hexadecimal digest
+    :rtype: str or unicode
+    :raises IOError: if the request body cannot be read
+    """
+    return digest(request.method, request.url,
+                  [request.headers.get(name) for name in KEY_HEADERS],
+                  body_digest(request.body))
+
+  def record(self, key, response):
+    """Record a response. The response body is streamed, ``CHUNK_SIZE``
+    bytes at a time, to a temporary file, so it is recorded
+    decompressed, and is not held in memory, then the file is added to
+    the cassette. The body of `response` is consumed, so the response
+    is then closed and its recording should be used instead, see
+    :meth:`response`.
+
+    :param key: Key of the request, as returned by :meth:`key`
+    :type key: str or unicode
+    :param response: Response
+    :type response: :class:`requests.Response`
+    :raises requests.exceptions.RequestException: if there are
+      problems reading the response
+    :raises IOError: if the temporary file cannot be written
+    """
+    (handle, tmp_file_name) = tempfile.mkstemp()
+    try:
+      with os.fdopen(handle, "wb") as f:
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+          f.write(chunk)
+      self._cache.put_file(key, tmp_file_name)
+    finally:
+      response.close()
+      os.remove(tmp_file_name)
+    headers = dict([(name, value) for (name, value)
+                    in response.headers.items()
+                    if name.title() not in UNRECORDED_HEADERS])
+    metadata = {"status": response.status_code,
+                "reason": response.reason,
+                "headers": headers}
+    self._cache.put(digest(key, "response"),
+                    json.dumps(metadata).encode("utf-8"))
+    with self._lock:
+      self._counters["recorded"] += 1
+
+  def response(self, key, request, adapter):
+    """Get the recorded response to a request. Its body is streamed
+    from the cassette.
+
+    :param key: Key of the request, as returned by :meth:`key`
+    :type key: str or unicode
+    :param request: Request
+    :type request: :class:`requests.PreparedRequest`
+    :param adapter: Transport adapter recording or replaying the
+      request
+    :type adapter: :class:`CassetteAdapter`
+    :return: response
+    :rtype: :class:`requests.Response`
+    :raises IOError: if the request was not recorded
+    """
+    data = self._cache.get(digest(key, "response"))
+    if data is None:
+      raise IOError("No recorded response")
+    raw = open(self._cache.path(key), "rb")
+    metadata = json.loads(data.decode("utf-8"))
+    response = requests.Response()
+    response.status_code = metadata["status"]
+    response.reason = metadata["reason"]
+    response.headers = requests.structures.CaseInsensitiveDict(
+      metadata["headers"])
+    response.encoding = requests.utils.get_encoding_from_headers(
+      response.headers)
+    response.raw = raw
+    response.url = request.url
+    response.request = request
+    response.connection = adapter
+    return response
+
+  def replay(self, key, request, adapter):
+    """Get the recorded response to a request, as for
+    :meth:`response`.
+
+    :param key: Key of the request, as returned by :meth:`key`
+    :type key: str or unicode
+    :param request: Request
+    :type request: :class:`requests.PreparedRequest`
+    :param adapter: Transport adapter replaying the request
+    :type adapter: :class:`CassetteAdapter`
+    :return: response
+    :rtype: :class:`requests.Response`
+    :raises CassetteError: if the request was not recorded
+    """
+    try:
+      response = self.response(key, request, adapter)
+    except IOError:
+      with self._lock:
+        self._counters["missing"] += 1
+      raise CassetteError("No recorded response to " + request.method +
+                          " " + request.url, request=request)
+    with self._lock:
+      self._counters["replayed"] += 1
+    return response
+
+  def statistics(self):
+    """Get counters of responses recorded and replayed, and of
+    requests which were not recorded.
+
+    :return: ``recorded``, ``replayed`` and ``missing``
+    :rtype: dict from str or unicode to int
+    """
+    with self._lock:
+      return dict(self._counters)
+
+
+class CassetteAdapter(requests.adapters.HTTPAdapter):
+  """Transport adapter which records responses to, or replays
+  responses from, a cassette.
+  """
+
+  def __init__(self, cassette, **kwargs):
+    """Create adapter.
+
+    :param cassette: Cassette
+    :type cassette: :class:`Cassette`
+    :param kwargs: Arguments for :class:`requests.adapters.HTTPAdapter`
+      e.g. ``pool_maxsize``
+    :type kwargs: dict
+    """
+    super(CassetteAdapter, self).__init__(**kwargs)
+    self._cassette = cassette
+
+  def send(self, request, **kwargs):
+    """Send a request, and record its response, or replay its recorded
+    response, depending on the cassette's mode.
+
+    :param request: Request
+    :type request: :class:`requests.PreparedRequest`
+    :param kwargs: Arguments for
+      :meth:`requests.adapters.HTTPAdapter.send`
+    :type kwargs: dict
+    :return: response
+    :rtype: :class:`requests.Response`
+    :raises CassetteError: if replaying a request which was not
+      recorded, or if a response, once recorded, was evicted from the
+      cassette
+    :raises requests.exceptions.RequestException: if there are
+      problems executing the request
+    """
+    # The key is computed first, as sending reads a file body.
+    key = self._cassette.key(request)
+    if self._cassette.mode == REPLAY:
+      return self._cassette.replay(key, request, self)
+    response = super(CassetteAdapter, self).send(request, **kwargs)
+    self._cassette.record(key, response)
+    # The body was consumed by recording it, so it is streamed from
+    # the cassette.
+    try:
+      recorded = self._cassette.response(key, request, self)
+    except IOError:
+      raise CassetteError("Recorded response to " + request.method + " " +
+                          request.url + " was evicted from the cassette",
+                          request=request)
+    recorded.elapsed = response.elapsed
+    return recorded
+
+
+class UnixCassetteAdapter(CassetteAdapter, UnixAdapter):
+  """Transport adapter which records responses to, or replays
+  responses from, a cassette, for ``http+unix`` URLs (see
+  :mod:`prov_interop.unixsocket`).
+  """
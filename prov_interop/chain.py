@@ -0,0 +1,382 @@
+"""Comparator which runs cheap checks before invoking another
+comparator.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import hashlib
+import json
+import mmap
+import os
+import re
+from xml.etree import ElementTree
+
+from prov_interop import factory
+from prov_interop import standards
+from prov_interop.cache import digest
+from prov_interop.comparator import Comparator
+from prov_interop.comparator import ComparisonError
+from prov_interop.component import ConfigError
+from prov_interop.component import ConfigurableComponent
+
+BLOCK_SIZE = 1024 * 1024
+"""int: number of bytes compared at a time when comparing files"""
+
+
+def same_bytes(file1, file2):
+  """Check whether two files have the same contents. The files are
+  memory-mapped, so they are not copied into memory.
+
+  :param file1: File
+  :type file1: str or unicode
+  :param file2: File
+  :type file2: str or unicode
+  :return: ``True`` if the files have the same contents
+  :rtype: bool
+  :raises IOError: if either file cannot be read
+  """
+  size = os.path.getsize(file1)
+  if size != os.path.getsize(file2):
+    return False
+  if size == 0:
+    return True
+  with open(file1, "rb") as f1, open(file2, "rb") as f2:
+    map1 = mmap.mmap(f1.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+      map2 = mmap.mmap(f2.fileno(), 0, access=mmap.ACCESS_READ)
+      try:
+        for offset in range(0, size, BLOCK_SIZE):
+          if map1[offset:offset + BLOCK_SIZE] != \
+              map2[offset:offset + BLOCK_SIZE]:
+            return False
+        return True
+      finally:
+        map2.close()
+    finally:
+      map1.close()
+
+
+def canonical_json(file_name):
+  """Get a canonical form of a PROV-JSON document, being the document
+  serialized with sorted keys and no insignificant whitespace.
+
+  :param file_name: File name
+  :type file_name: str or unicode
+  :return: canonical form
+  :rtype: str or unicode
+  :raises ValueError: if the document is not valid JSON
+  """
+  with open(file_name, "rb") as f:
+    document = json.loads(f.read().decode("utf-8"))
+  if not isinstance(document, dict):
+    raise ValueError("Document is not a JSON object")
+  return json.dumps(document, sort_keys=True, separators=(",", ":"))
+
+
+def canonical_xml(file_name):
+  """Get a canonical form of a PROV-XML document, being its
+  `Canonical XML 2.0 <https://www.w3.org/TR/xml-c14n2/>`_ form if
+  :func:`xml.etree.ElementTree.canonicalize` is available (Python
+  3.8+). Otherwise, the document is only checked to be well-formed.
+
+  :param file_name: File name
+  :type file_name: str or unicode
+  :return: canonical form or ``None`` if not available
+  :rtype: str or unicode
+  :raises ValueError: if the document is not well-formed XML
+  """
+  try:
+    if hasattr(ElementTree, "canonicalize"):
+      return ElementTree.canonicalize(from_file=file_name)
+    ElementTree.parse(file_name)
+  except ElementTree.ParseError as e:
+    raise ValueError(str(e))
+  return None
+
+
+def canonical_provn(file_name):
+  """Get a canonical form of a PROV-N document, being its lines with
+  leading and trailing whitespace removed and blank lines omitted.
+
+  :param file_name: File name
+  :type file_name: str or unicode
+  :return: canonical form
+  :rtype: str or unicode
+  :raises ValueError: if the document is not valid UTF-8 or is not
+    delimited by ``document`` and ``endDocument``
+  """
+  with open(file_name, "rb") as f:
+    text = f.read().decode("utf-8")
+  lines = [line.strip() for line in text.splitlines() if line.strip()]
+  if not lines or not re.match(r"document\b", lines[0]) or \
+      not re.match(r"endDocument\b", lines[-1]):
+    raise ValueError("Document is not delimited by document and " +
+                     "endDocument")
+  return "\n".join(lines)
+
+
+CANONICAL_FORMS = {
+  standards.JSON: canonical_json,
+  standards.PROVX: canonical_xml,
+  standards.PROVN: canonical_provn
+}
+"""dict: functions to get canonical forms of documents, keyed by
+format. Formats without an entry are neither checked nor
+canonicalized."""
+
+
+def canonical_hash(file_name):
+  """Get SHA-256 digest of the canonical form of a document, see
+  :data:`CANONICAL_FORMS`.
+
+  :param file_name: File name, whose extension is its format
+  :type file_name: str or unicode
+  :return: hexadecimal digest, or ``None`` if there is no canonical
+    form for the document's format
+  :rtype: str or unicode
+  :raises ValueError: if the document is malformed
+  """
+  format = os.path.splitext(file_name)[1][1:]
+  if format not in CANONICAL_FORMS:
+    return None
+  canonical = CANONICAL_FORMS[format](file_name)
+  if canonical is None:
+    return None
+  return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ComparatorChain(Comparator):
+  """Comparator which runs cheap checks before invoking another
+  comparator, e.g. :class:`prov_interop.provpy.comparator.ProvPyComparator`
+  or :class:`prov_interop.provtoolbox.comparator.ProvToolboxComparator`.
+  For each pair of files:
+
+  - If the files are of the same format and have the same bytes, they
+    are equivalent.
+  - If the second file, the converted document, is malformed then
+    :class:`prov_interop.comparator.ComparisonError` is raised, as it
+    would be by a comparator that cannot parse it.
+  - If the files are of the same format and have the same canonical
+    form (see :data:`CANONICAL_FORMS`), they are equivalent.
+
+  Otherwise the other comparator is invoked. Identity conversions
+  (e.g. ``json`` to ``json``) often give identical bytes, so these
+  avoid invoking the other comparator at all.
+  """
+
+  COMPARATOR = "comparator"
+  """str or unicode: configuration key for the other comparator"""
+  CLASS = "class"
+  """str or unicode: configuration key for the other comparator's
+  class name"""
+
+  def __init__(self):
+    """Create comparator.
+    """
+    super(ComparatorChain, self).__init__()
+    self._comparator = None
+    self._counters = {}
+
+  @property
+  def comparator(self):
+    """Get the comparator invoked if the cheap checks do not decide a
+    comparison.
+
+    :return: comparator
+    :rtype: :class:`prov_interop.comparator.Comparator`
+    """
+    return self._comparator
+
+  def configure(self, config):
+    """Configure comparator. The configuration must hold:
+
+    - ``comparator``: configuration of the other comparator, which
+      must hold ``class``, the name of its class, and the
+      configuration values required by that class.
+
+    The comparator's formats are those of the other comparator.
+
+    A valid configuration is::
+
+      {
+        "comparator":
+        {
+          "class": "prov_interop.provpy.comparator.ProvPyComparator",
+          "executable": "prov-compare",
+          "arguments": "-f FORMAT1 -F FORMAT2 FILE1 FILE2",
+          "formats": ["provx", "json"]
+        }
+      }
+
+    :param config: Configuration
+    :type config: dict
+    :raises ConfigError: if `config` does not hold the above entries,
+      or the other comparator cannot be created or configured
+    """
+    ConfigurableComponent.configure(self, config)
+    self.check_configuration([ComparatorChain.COMPARATOR])
+    comparator_config = config[ComparatorChain.COMPARATOR]
+    if not isinstance(comparator_config, dict) or \
+        ComparatorChain.CLASS not in comparator_config:
+      raise ConfigError("Missing " + ComparatorChain.CLASS + " for " +
+                        ComparatorChain.COMPARATOR)
+    if self._comparator is not None:
+      self._comparator.close()
+    try:
+      comparator = factory.get_instance(
+        comparator_config[ComparatorChain.CLASS])
+    except (ValueError, ImportError, AttributeError, TypeError) as e:
+      raise ConfigError(ComparatorChain.COMPARATOR + ": " + str(e))
+    comparator.configure(comparator_config)
+    self._comparator = comparator
+    self._formats = comparator.formats
+    self._counters = dict([(name, 0) for name in
+                           ["byte-equal", "canonical-equal",
+                            "malformed", "delegated"]])
+
+  def close(self):
+    """Close the other comparator.
+    """
+    if self._comparator is not None:
+      self._comparator.close()
+
+  def fingerprint(self):
+    """Get a fingerprint identifying the comparator, its configuration
+    and the other comparator's fingerprint.
+
+    :return: hexadecimal digest
+    :rtype: str or unicode
+    """
+    return digest(super(ComparatorChain, self).fingerprint(),
+                  self._comparator.fingerprint())
+
+  def statistics(self):
+    """Get counters of the comparisons decided by each check and
+    of those delegated to the other comparator, together with the
+    other comparator's counters.
+
+    :return: counter values keyed by counter name
+    :rtype: dict from str or unicode to int
+    """
+    statistics = dict(self._counters)
+    if self._comparator is not None:
+      statistics.update(self._comparator.statistics())
+    return statistics
+
+  def pop_invocations(self):
+    """Get the processes run by the other comparator since this was
+    last called, and forget them.
+
+    :return: invocation results, in the order the processes were run
+    :rtype: list of :class:`prov_interop.launcher.InvocationResult`
+    """
+    if self._comparator is None:
+      return []
+    return self._comparator.pop_invocations()
+
+  def check(self, file1, file2):
+    """Run the cheap checks on a pair of files.
+
+    :param file1: File
+    :type file1: str or unicode
+    :param file2: File
+    :type file2: str or unicode
+    :return: ``True`` if the files are equivalent, or ``None`` if the
+      checks cannot decide
+    :rtype: bool
+    :raises ComparisonError: if either of the files cannot be found,
+      their formats are not supported, or `file2` is malformed
+    """
+    super(ComparatorChain, self).compare(file1, file2)
+    format1 = os.path.splitext(file1)[1][1:]
+    format2 = os.path.splitext(file2)[1][1:]
+    self.check_format(format1)
+    self.check_format(format2)
+    if format1 == format2 and same_bytes(file1, file2):
+      self._counters["byte-equal"] += 1
+      return True
+    try:
+      hash2 = canonical_hash(file2)
+    except ValueError as e:
+      self._counters["malformed"] += 1
+      raise ComparisonError("Malformed " + format2 + " document " +
+                            file2 + ": " + str(e))
+    if format1 != format2 or hash2 is None:
+      return None
+    try:
+      hash1 = canonical_hash(file1)
+    except ValueError:
+      # Leave the other comparator to report on file1.
+      return None
+    if hash1 == hash2:
+      self._counters["canonical-equal"] += 1
+      return True
+    return None
+
+  def compare(self, file1, file2):
+    """Compare files, running the cheap checks then, if they cannot
+    decide, invoking the other comparator.
+
+    :param file1: File
+    :type file1: str or unicode
+    :param file2: File
+    :type file2: str or unicode
+    :return: ``True`` or ``False``
+    :rtype: bool
+    :raises ComparisonError: if either of the files cannot be found,
+      their formats are not supported, `file2` is malformed, or the
+      other comparator raises it
+    """
+    if self.check(file1, file2):
+      return True
+    self._counters["delegated"] += 1
+    return self._comparator.compare(file1, file2)
+
+  def compare_batch(self, files):
+    """Compare many pairs of files, running the cheap checks on each
+    pair then invoking :meth:`Comparator.compare_batch` of the other
+    comparator on the pairs that the checks cannot decide.
+
+    :param files: File pairs
+    :type files: list of tuple of (str or unicode, str or unicode)
+    :return: for each pair, ``True`` or ``False`` or the exception
+      raised if the comparison failed
+    :rtype: list of bool or :class:`Exception`
+    """
+    results = [None] * len(files)
+    pending = []
+    for (index, (file1, file2)) in enumerate(files):
+      try:
+        results[index] = self.check(file1, file2)
+      except Exception as e:
+        results[index] = e
+      if results[index] is None:
+        pending.append(index)
+    self._counters["delegated"] += len(pending)
+    comparisons = self._comparator.compare_batch(
+      [files[index] for index in pending])
+    for (index, result) in zip(pending, comparisons):
+      results[index] = result
+    return results
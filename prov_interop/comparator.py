@@ -28,6 +28,8 @@ from __future__ import (absolute_import, division, print_function,
 import os
 
 from prov_interop import standards
+from prov_interop.cache import digest
+from prov_interop.cache import file_digest
 from prov_interop.component import ConfigError
 from prov_interop.component import ConfigurableComponent
 
@@ -110,6 +112,27 @@ class Comparator(ConfigurableComponent):
       if not os.path.isfile(f):
         raise ComparisonError("File not found: " + f)
 
+  def compare_batch(self, files):
+    """Compare many pairs of files. Each comparison is done as for
+    :meth:`compare` and the outcome of each is returned, rather than
+    raised. This implementation calls :meth:`compare` for each pair of
+    files in turn. Sub-classes may override it to compare many files
+    at once.
+
+    :param files: File pairs
+    :type files: list of tuple of (str or unicode, str or unicode)
+    :return: for each pair, ``True`` or ``False`` or the exception
+      raised if the comparison failed
+    :rtype: list of bool or :class:`Exception`
+    """
+    results = []
+    for (file1, file2) in files:
+      try:
+        results.append(self.compare(file1, file2))
+      except Exception as e:
+        results.append(e)
+    return results
+
 
 class ComparisonError(Exception):
   """Comparison error."""
@@ -129,3 +152,126 @@ class ComparisonError(Exception):
     :rtype: str or unicode
     """
     return repr(self._value)
+
+
+class ComparisonCache(object):
+  """Cache of comparison results, held in a
+  :class:`prov_interop.cache.DiskCache`. The key for a comparison is a
+  digest of the comparator's fingerprint (see
+  :meth:`prov_interop.component.ConfigurableComponent.fingerprint`)
+  and the formats and SHA-256 digests of both files. Many converters
+  give byte-identical outputs, so each distinct pair of documents is
+  compared only once. Only ``True`` and ``False`` results are cached,
+  not comparison errors.
+  """
+
+  EQUIVALENT = b"1"
+  """bytes: cached value for equivalent documents"""
+  NOT_EQUIVALENT = b"0"
+  """bytes: cached value for non-equivalent documents"""
+
+  def __init__(self, cache):
+    """Create comparison cache.
+
+    :param cache: Cache for comparison results
+    :type cache: :class:`prov_interop.cache.DiskCache`
+    """
+    self._cache = cache
+
+  @property
+  def cache(self):
+    """Get cache of comparison results.
+
+    :return: cache
+    :rtype: :class:`prov_interop.cache.DiskCache`
+    """
+    return self._cache
+
+  def key(self, comparator, file1, file2):
+    """Get cache key for a comparison.
+
+    :param comparator: Comparator
+    :type comparator: :class:`Comparator`
+    :param file1: File
+    :type file1: str or unicode
+    :param file2: File
+    :type file2: str or unicode
+    :return: hexadecimal digest
+    :rtype: str or unicode
+    :raises IOError: if either file cannot be read
+    """
+    return digest(comparator.fingerprint(),
+                  os.path.splitext(file1)[1][1:], file_digest(file1),
+                  os.path.splitext(file2)[1][1:], file_digest(file2))
+
+  def compare(self, comparator, file1, file2):
+    """Compare files, using a cached result if there is one, else
+    invoking :meth:`Comparator.compare` and caching its result.
+
+    :param comparator: Comparator
+    :type comparator: :class:`Comparator`
+    :param file1: File
+    :type file1: str or unicode
+    :param file2: File
+    :type file2: str or unicode
+    :return: ``True`` or ``False``
+    :rtype: bool
+    :raises ComparisonError: as for :meth:`Comparator.compare`
+    """
+    result = self.compare_batch(comparator, [(file1, file2)])[0]
+    if isinstance(result, Exception):
+      raise result
+    return result
+
+  def compare_batch(self, comparator, files):
+    """Compare many pairs of files, using cached results where there
+    are any, else invoking :meth:`Comparator.compare_batch` and
+    caching its ``True`` and ``False`` results.
+
+    :param comparator: Comparator
+    :type comparator: :class:`Comparator`
+    :param files: File pairs
+    :type files: list of tuple of (str or unicode, str or unicode)
+    :return: for each pair, ``True`` or ``False`` or the exception
+      raised if the comparison failed
+    :rtype: list of bool or :class:`Exception`
+    """
+    results = [None] * len(files)
+    pending = []
+    for (index, (file1, file2)) in enumerate(files):
+      # Checks are done before the cache is consulted, so a cached
+      # result is not returned for an unsupported format.
+      try:
+        Comparator.compare(comparator, file1, file2)
+        for file_name in [file1, file2]:
+          comparator.check_format(os.path.splitext(file_name)[1][1:])
+        key = self.key(comparator, file1, file2)
+      except Exception as e:
+        results[index] = e
+        continue
+      data = self._cache.get(key)
+      if data is None:
+        pending.append((index, key))
+      else:
+        results[index] = (data == ComparisonCache.EQUIVALENT)
+    comparisons = comparator.compare_batch(
+      [files[index] for (index, _) in pending])
+    for ((index, key), result) in zip(pending, comparisons):
+      results[index] = result
+      if isinstance(result, Exception):
+        continue
+      data = ComparisonCache.EQUIVALENT if result else \
+          ComparisonCache.NOT_EQUIVALENT
+      try:
+        self._cache.put(key, data)
+      except (IOError, OSError):
+        pass
+    return results
+
+  def statistics(self):
+    """Get cache counters.
+
+    :return: counter values keyed by counter name
+    :rtype: dict from str or unicode to int
+    """
+    return self._cache.statistics()
@@ -25,11 +25,58 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import io
 import os
+import subprocess
+import tempfile
+import time
+import zlib
+import requests
+
+from prov_interop import forkserver
+from prov_interop import http
+from prov_interop import http2
+from prov_interop import launcher
+from prov_interop import unixsocket
+from prov_interop.cache import digest
+from prov_interop.cache import file_digest
+from prov_interop.cassette import Cassette
+from prov_interop.cassette import CassetteAdapter
+from prov_interop.cassette import UnixCassetteAdapter
+from prov_interop.http2 import Http2Adapter
+from prov_interop.launcher import InvocationResult
+from prov_interop.throttle import Throttle
+from prov_interop.unixsocket import UnixAdapter
+from prov_interop.worker import WorkerProcess
+
+def find_executable(name):
+  """Find an executable file, looking on the system path if `name` is
+  not a file.
+
+  :param name: Executable name
+  :type name: str or unicode
+  :return: file name, or ``None`` if not found
+  :rtype: str or unicode
+  """
+  if os.path.isfile(name):
+    return name
+  if os.path.dirname(name):
+    return None
+  for directory in os.environ.get("PATH", "").split(os.pathsep):
+    file_name = os.path.join(directory, name)
+    if os.path.isfile(file_name):
+      return file_name
+  return None
+
 
 class ConfigurableComponent(object):
   """Base class for configurable components."""
 
+  RUNTIME_KEYS = ["skip-tests"]
+  """list of str or unicode: configuration keys which affect how a
+  component is run, but not the results it gives, so are excluded from
+  its :meth:`fingerprint`"""
+
   def __init__(self):
     """Create component.
     """
@@ -44,6 +91,16 @@ class ConfigurableComponent(object):
     """
     return self._config
 
+  @property
+  def batch_size(self):
+    """Get the maximum number of items that the component can handle in
+    a single invocation.
+
+    :return: batch size
+    :rtype: int
+    """
+    return 1
+
   def check_configuration(self, keys):
     """Check configuration contains keys.
 
@@ -68,6 +125,47 @@ class ConfigurableComponent(object):
       raise ConfigError("config must be a dictionary")
     self._config = config
 
+  def close(self):
+    """Release any resources held by the component e.g. processes or
+    connections. The component can still be used after it has been
+    closed, in which case the resources are reacquired.
+    """
+    pass
+
+  def fingerprint(self):
+    """Get a fingerprint identifying the component and the
+    configuration which can affect its results. Components with the
+    same fingerprint are expected to give the same results for the
+    same inputs. The fingerprint is a digest of the component's class
+    name and configuration, excluding the keys in ``RUNTIME_KEYS``.
+
+    :return: hexadecimal digest
+    :rtype: str or unicode
+    """
+    config = dict([(key, value) for (key, value) in self._config.items()
+                   if key not in self.RUNTIME_KEYS])
+    return digest(self.__class__.__module__ + "." + self.__class__.__name__,
+                  config)
+
+  def statistics(self):
+    """Get counters describing the work done by the component e.g.
+    cache hits and misses. Counters are summed across processes by
+    :mod:`prov_interop.run`.
+
+    :return: counter values keyed by counter name
+    :rtype: dict from str or unicode to int
+    """
+    return {}
+
+  def pop_invocations(self):
+    """Get the processes run by the component since this was last
+    called, with their exit codes and resource usage, and forget them.
+
+    :return: invocation results, in the order the processes were run
+    :rtype: list of :class:`prov_interop.launcher.InvocationResult`
+    """
+    return []
+
 
 class ConfigError(Exception):
   """Configuration error."""
@@ -96,6 +194,32 @@ class CommandLineComponent(ConfigurableComponent):
   """str or unicode: configuration key for executable"""
   ARGUMENTS = "arguments"
   """str or unicode: configuration key for arguments"""
+  WORKER = "worker"
+  """str or unicode: configuration key for persistent worker command-line"""
+  FORKSERVER = "forkserver"
+  """str or unicode: configuration key for using a forkserver worker"""
+  FORKSERVER_MODULES = "forkserver-modules"
+  """str or unicode: configuration key for modules a forkserver imports"""
+  BATCH_ARGUMENTS = "batch-arguments"
+  """str or unicode: configuration key for batch invocation arguments"""
+  BATCH_ITEM = "batch-item"
+  """str or unicode: configuration key for per-item batch arguments"""
+  BATCH_SIZE = "batch-size"
+  """str or unicode: configuration key for maximum items per batch"""
+  ITEMS = "ITEMS"
+  """str or unicode: token for per-item arguments in batch-arguments"""
+  MANIFEST = "MANIFEST"
+  """str or unicode: token for manifest file in batch-arguments"""
+  DEFAULT_BATCH_SIZE = 20
+  """int: default maximum items per batch"""
+  VERSION_ARGUMENTS = "version-arguments"
+  """str or unicode: configuration key for arguments which make the
+  executable print its version"""
+  RUNTIME_KEYS = ConfigurableComponent.RUNTIME_KEYS + [
+    WORKER, FORKSERVER, FORKSERVER_MODULES,
+    BATCH_ARGUMENTS, BATCH_ITEM, BATCH_SIZE]
+  """list of str or unicode: configuration keys excluded from
+  :meth:`fingerprint`"""
 
   def __init__(self):
     """Create component.
@@ -103,6 +227,14 @@ class CommandLineComponent(ConfigurableComponent):
     super(CommandLineComponent, self).__init__()
     self._executable = ""
     self._arguments = []
+    self._worker = None
+    self._batch_arguments = []
+    self._batch_item = []
+    self._batch_size = 1
+    self._fingerprint = None
+    self._invocations = []
+    self._counters = {"processes-spawned": 0, "process-cpu-ms": 0,
+                      "worker-calls": 0}
 
   @property
   def executable(self):
@@ -125,6 +257,47 @@ class CommandLineComponent(ConfigurableComponent):
     """
     return self._arguments
 
+  @property
+  def worker(self):
+    """Get the persistent worker, if one has been configured.
+
+    :return: worker or ``None``
+    :rtype: :class:`prov_interop.worker.WorkerProcess`
+    """
+    return self._worker
+
+  @property
+  def batch_arguments(self):
+    """Get the batch invocation arguments as a list. The
+    ``batch-arguments`` value provided during configuration is split
+    upon spaces and returned.
+
+    :return: arguments, or ``[]`` if batch invocation is not configured
+    :rtype: list of str or unicode
+    """
+    return self._batch_arguments
+
+  @property
+  def batch_item(self):
+    """Get the per-item batch arguments as a list. The ``batch-item``
+    value provided during configuration is split upon spaces and
+    returned.
+
+    :return: arguments, or ``[]`` if batch invocation is not configured
+    :rtype: list of str or unicode
+    """
+    return self._batch_item
+
+  @property
+  def batch_size(self):
+    """Get the maximum number of items handled by a single batch
+    invocation.
+
+    :return: batch size, 1 if batch invocation is not configured
+    :rtype: int
+    """
+    return self._batch_size
+
   def configure(self, config):
     """Configure component. The configuration must hold:
 
@@ -154,28 +327,437 @@ class CommandLineComponent(ConfigurableComponent):
     example, `INPUT` and `OUTPUT` would be replaced with input and
     output file names. 
 
+    The configuration may also hold:
+
+    - ``worker``: command-line to start a persistent worker (see
+      :mod:`prov_interop.worker`). If provided, invocations are sent
+      to the worker, as the arguments that would have followed the
+      executable, instead of starting the executable for each one.
+      For a Python script, this is ``python -m prov_interop.worker``
+      followed by the script. No worker is provided for other
+      executables (e.g. ProvToolbox ``provconvert``), so a worker for
+      these must itself speak the JSON-line protocol of
+      :mod:`prov_interop.worker`.
+
+    For example::
+
+      {
+        "executable": "python /home/user/ProvPy/scripts/prov-convert",
+        "arguments": "-f FORMAT INPUT OUTPUT",
+        "worker": "python -m prov_interop.worker /home/user/ProvPy/scripts/prov-convert"
+      }
+
+    - ``forkserver``: if ``true``, and ``executable`` is a Python
+      script, then a forkserver (see :mod:`prov_interop.forkserver`)
+      is used as the persistent worker. This loads the script, and
+      its imports, once and forks a child to run the script for each
+      invocation. This cannot be used with ``worker``.
+    - ``forkserver-modules``: modules for the forkserver to import
+      when it loads the script (optional). This is useful for modules
+      that the script imports lazily.
+
+    For example::
+
+      {
+        "executable": "python /home/user/ProvPy/scripts/prov-convert",
+        "arguments": "-f FORMAT INPUT OUTPUT",
+        "forkserver": true,
+        "forkserver-modules": ["prov.serializers.provrdf"]
+      }
+
+    Components which can process many items in one invocation may
+    also be configured for batch invocation:
+
+    - ``batch-arguments``: arguments for a batch invocation. These must
+      include either the token ``ITEMS``, which is replaced by
+      ``batch-item`` repeated for each item, or the token
+      ``MANIFEST``, which is replaced by the name of a file holding
+      one line per item, each line being ``batch-item`` with its
+      arguments separated by tabs.
+    - ``batch-item``: arguments for each item.
+    - ``batch-size``: maximum number of items per batch invocation
+      (optional, default 20).
+
+    For example::
+
+      {
+        "executable": "provconvert",
+        "arguments": "-infile INPUT -outfile OUTPUT",
+        "batch-arguments": "ITEMS",
+        "batch-item": "-infile INPUT -outfile OUTPUT",
+        "batch-size": 50
+      }
+      {
+        "executable": "prov-convert",
+        "arguments": "-f FORMAT INPUT OUTPUT",
+        "batch-arguments": "-f FORMAT --manifest MANIFEST",
+        "batch-item": "INPUT OUTPUT"
+      }
+
+    Tokens in ``batch-arguments`` outside of the per-item arguments
+    are replaced using the values for the first item, so items in a
+    batch are expected to share these values.
+
+    The configuration may also hold:
+
+    - ``version-arguments``: arguments which make the executable
+      print its version e.g. ``--version``. If provided, the output is
+      included in the component's :meth:`fingerprint`. This is useful
+      where ``executable`` is a wrapper script whose contents do not
+      change when the program it runs is upgraded.
+
     :param config: Configuration
     :type config: dict
-    :raises ConfigError: if `config` does not hold the above entries
+    :raises ConfigError: if `config` does not hold the above entries,
+      or both ``worker`` and ``forkserver`` are given, or a forkserver
+      cannot be used
     """
     super(CommandLineComponent, self).configure(config)
     self.check_configuration([CommandLineComponent.EXECUTABLE, 
                               CommandLineComponent.ARGUMENTS])
     self._executable = config[CommandLineComponent.EXECUTABLE].split()
     self._arguments = config[CommandLineComponent.ARGUMENTS].split()
+    self._fingerprint = None
+    self.close()
+    self._worker = None
+    if CommandLineComponent.WORKER in config:
+      if config.get(CommandLineComponent.FORKSERVER, False):
+        raise ConfigError("Only one of " + CommandLineComponent.WORKER +
+                          " and " + CommandLineComponent.FORKSERVER +
+                          " can be given")
+      self._worker = WorkerProcess(
+        config[CommandLineComponent.WORKER].split())
+    elif config.get(CommandLineComponent.FORKSERVER, False):
+      if not forkserver.is_available():
+        raise ConfigError(CommandLineComponent.FORKSERVER +
+                          " is not supported on this platform")
+      if not self._executable:
+        raise ConfigError(CommandLineComponent.FORKSERVER +
+                          " requires an executable")
+      try:
+        command_line = forkserver.command_line(
+          self._executable,
+          config.get(CommandLineComponent.FORKSERVER_MODULES, []))
+      except OSError as e:
+        raise ConfigError(str(e))
+      self._worker = WorkerProcess(command_line, forkserver.environment())
+    self._batch_arguments = []
+    self._batch_item = []
+    self._batch_size = 1
+    if CommandLineComponent.BATCH_ARGUMENTS in config:
+      self.check_configuration([CommandLineComponent.BATCH_ITEM])
+      self._batch_arguments = \
+          config[CommandLineComponent.BATCH_ARGUMENTS].split()
+      self._batch_item = config[CommandLineComponent.BATCH_ITEM].split()
+      if CommandLineComponent.ITEMS not in self._batch_arguments and \
+            CommandLineComponent.MANIFEST not in self._batch_arguments:
+        raise ConfigError("Missing token " + CommandLineComponent.ITEMS +
+                          " or " + CommandLineComponent.MANIFEST)
+      self._batch_size = config.get(CommandLineComponent.BATCH_SIZE,
+                                    CommandLineComponent.DEFAULT_BATCH_SIZE)
+      if type(self._batch_size) is not int or self._batch_size < 1:
+        raise ConfigError(CommandLineComponent.BATCH_SIZE +
+                          " must be a positive integer")
+
+  def fingerprint(self):
+    """Get a fingerprint identifying the component, its configuration
+    and its executable. In addition to the configuration, the digest
+    includes the contents of each part of ``executable`` that is a
+    file, or is found on the system path, so a change to a script or
+    program changes the fingerprint, and the output of
+    :meth:`version`.
+
+    :return: hexadecimal digest
+    :rtype: str or unicode
+    """
+    if self._fingerprint is None:
+      digests = []
+      for part in self._executable:
+        file_name = find_executable(part)
+        if file_name is not None:
+          digests.append(file_digest(file_name))
+      self._fingerprint = digest(
+        super(CommandLineComponent, self).fingerprint(), digests,
+        self.version())
+    return self._fingerprint
+
+  def version(self):
+    """Get the version printed by the executable when invoked with
+    ``version-arguments``.
+
+    :return: output, or ``None`` if ``version-arguments`` is not
+      configured. If the executable cannot be run, or exits with a
+      non-zero exit code, then this is a description of the failure
+    :rtype: str or unicode
+    """
+    if CommandLineComponent.VERSION_ARGUMENTS not in self._config:
+      return None
+    command_line = self._executable + \
+        self._config[CommandLineComponent.VERSION_ARGUMENTS].split()
+    try:
+      output = subprocess.check_output(command_line,
+                                       stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError) as e:
+      return " ".join(command_line) + " failed: " + str(e)
+    return output.decode("utf-8", "replace").strip()
+
+  def tokens(self, *files):
+    """Get values for the tokens in ``arguments`` for an invocation
+    upon the given files. Sub-classes override this.
+
+    :param files: Files
+    :type files: list of str or unicode
+    :return: token values keyed by token
+    :rtype: dict
+    """
+    return {}
+
+  def command_line(self, tokens):
+    """Get the command-line for a single invocation, with tokens in
+    ``arguments`` replaced with their values.
+
+    :param tokens: token values keyed by token
+    :type tokens: dict
+    :return: executable and arguments
+    :rtype: list of str or unicode
+    """
+    return self._executable + [tokens.get(x, x) for x in self._arguments]
+
+  def batch_command_line(self, items, manifest=None):
+    """Get the command-line for a batch invocation. 
+
+    :param items: token values for each item
+    :type items: list of dict
+    :param manifest: Manifest file name, required if ``batch-arguments``
+      has a ``MANIFEST`` token
+    :type manifest: str or unicode
+    :return: executable and arguments
+    :rtype: list of str or unicode
+    """
+    item_arguments = [[tokens.get(x, x) for x in self._batch_item]
+                      for tokens in items]
+    command_line = list(self._executable)
+    for x in self._batch_arguments:
+      if x == CommandLineComponent.ITEMS:
+        for arguments in item_arguments:
+          command_line.extend(arguments)
+      elif x == CommandLineComponent.MANIFEST:
+        command_line.append(manifest)
+      else:
+        command_line.append(items[0].get(x, x))
+    return command_line
+
+  def invoke_batch(self, items, invoke, complete):
+    """Invoke the component upon many items, using as few batch
+    invocations as ``batch-size`` allows.
+
+    - :meth:`tokens` is called for each item. If it raises an
+      exception then that is the item's result.
+    - The remaining items are split into batches of up to
+      ``batch-size`` and each batch is invoked once.
+    - If a batch invocation's exit code is 0 then each item's result
+      is the value returned by `complete`, or the exception it raised.
+    - Otherwise, or if the batch invocation raises an exception,
+      each item of that batch is invoked individually via
+      `invoke`, so that each item gets its own result, that being the
+      value returned by `invoke`, or the exception it raised.
+
+    If batch invocation is not configured then each item is invoked
+    individually via `invoke`.
+
+    :param items: Items, each a tuple of files
+    :type items: list of tuple of str or unicode
+    :param invoke: Function to invoke the component on one item
+    :type invoke: function
+    :param complete: Function to get an item's result after a
+      successful batch invocation
+    :type complete: function
+    :return: results, in the same order as `items`
+    :rtype: list
+    """
+    results = [None] * len(items)
+    pending = []
+    for (index, item) in enumerate(items):
+      try:
+        pending.append((index, self.tokens(*item)))
+      except Exception as e:
+        results[index] = e
+    if self._batch_size <= 1:
+      batches = [[item] for item in pending]
+    else:
+      batches = [pending[i:i + self._batch_size]
+                 for i in range(0, len(pending), self._batch_size)]
+    for batch in batches:
+      if len(batch) == 1:
+        return_code = None
+      else:
+        try:
+          return_code = self.call_batch([tokens for (_, tokens) in batch])
+        except Exception:
+          return_code = None
+      for (index, _) in batch:
+        try:
+          if return_code == 0:
+            results[index] = complete(*items[index])
+          else:
+            results[index] = invoke(*items[index])
+        except Exception as e:
+          results[index] = e
+    return results
+
+  def call_batch(self, items):
+    """Invoke the component once for many items.
+
+    :param items: token values for each item
+    :type items: list of dict
+    :return: exit code
+    :rtype: int
+    :raises OSError: if there are problems invoking the component
+      e.g. the executable is not found
+    """
+    manifest = None
+    if CommandLineComponent.MANIFEST in self._batch_arguments:
+      (handle, manifest) = tempfile.mkstemp(suffix=".manifest")
+      with os.fdopen(handle, "w") as f:
+        for tokens in items:
+          f.write("\t".join([tokens.get(x, x) for x in self._batch_item]))
+          f.write("\n")
+    try:
+      command_line = self.batch_command_line(items, manifest)
+      return self.call(command_line)
+    finally:
+      if manifest is not None:
+        os.remove(manifest)
+
+  def call(self, command_line):
+    """Invoke the component, see :meth:`invoke`.
+
+    :param command_line: Executable and arguments
+    :type command_line: list of str or unicode
+    :return: exit code
+    :rtype: int
+    :raises OSError: if there are problems invoking the component
+      e.g. the executable is not found
+    """
+    return self.invoke(command_line).return_code
+
+  def invoke(self, command_line):
+    """Invoke the component and record the invocation, to be
+    returned by :meth:`pop_invocations`. If a persistent worker has
+    been configured then the arguments, `command_line` without the
+    executable, are sent to the worker, and only the wall time is
+    recorded, as no process is started. Otherwise `command_line` is
+    run as a new process via :func:`prov_interop.launcher.launch`.
+
+    :param command_line: Executable and arguments
+    :type command_line: list of str or unicode
+    :return: invocation result
+    :rtype: :class:`prov_interop.launcher.InvocationResult`
+    :raises OSError: if there are problems invoking the component
+      e.g. the executable is not found
+    """
+    if self._worker is None:
+      result = launcher.launch(command_line)
+      self._counters["processes-spawned"] += 1
+      if result.user_time is not None:
+        self._counters["process-cpu-ms"] += int(round(
+          (result.user_time + result.system_time) * 1000))
+    else:
+      start = time.time()
+      return_code = self._worker.call(command_line[len(self._executable):])
+      result = InvocationResult(command_line, return_code,
+                                time.time() - start)
+      self._counters["worker-calls"] += 1
+    self._invocations.append(result)
+    return result
+
+  def statistics(self):
+    """Get counters of the processes spawned, the CPU time they used,
+    in milliseconds, and the invocations sent to a persistent worker.
+
+    :return: ``processes-spawned``, ``process-cpu-ms`` and
+      ``worker-calls``
+    :rtype: dict from str or unicode to int
+    """
+    return dict(self._counters)
+
+  def pop_invocations(self):
+    """Get the invocations since this was last called, and forget
+    them.
+
+    :return: invocation results, in the order they were invoked
+    :rtype: list of :class:`prov_interop.launcher.InvocationResult`
+    """
+    (invocations, self._invocations) = (self._invocations, [])
+    return invocations
+
+  def close(self):
+    """Stop the persistent worker, if one is running.
+    """
+    if self._worker is not None:
+      self._worker.stop()
 
 
 class RestComponent(ConfigurableComponent):
-  """Base class for REST-ful components."""
+  """Base class for REST-ful components. Requests are made via a
+  :class:`requests.Session`, created upon the first request, which
+  keeps connections alive and pools them, so successive requests to
+  the same host reuse a connection rather than opening a new TCP
+  connection, and doing a new TLS handshake, each time. A component is
+  configured once per worker process, so its session lasts for the
+  life of the worker.
+  """
 
   URL = "url"
   """str or unicode: configuration key for REST endpoint URL"""
+  POOL_SIZE = "pool-size"
+  """str or unicode: configuration key for maximum number of pooled
+  connections per host"""
+  TIMEOUT = "timeout"
+  """str or unicode: configuration key for request timeouts"""
+  THROTTLE = "throttle"
+  """str or unicode: configuration key for concurrency control, rate
+  limiting and retries"""
+  COMPRESSION = "compression"
+  """str or unicode: configuration key for request body compression"""
+  CASSETTE = "cassette"
+  """str or unicode: configuration key for recording or replaying of
+  requests and responses"""
+  HTTP2 = "http2"
+  """str or unicode: configuration key for making requests over
+  HTTP/2"""
+  COMPRESSIONS = [http.GZIP, http.DEFLATE]
+  """list of str or unicode: supported request body compressions"""
+  DEFAULT_POOL_SIZE = 10
+  """int: default maximum number of pooled connections per host"""
+  CHUNK_SIZE = 64 * 1024
+  """int: number of bytes of a request or response body held in memory
+  at a time"""
+  SPOOL_SIZE = 1024 * 1024
+  """int: number of bytes of a compressed request body held in memory,
+  beyond which it is held in a temporary file"""
+  RUNTIME_KEYS = ConfigurableComponent.RUNTIME_KEYS + [POOL_SIZE, TIMEOUT,
+                                                      THROTTLE, COMPRESSION,
+                                                      CASSETTE, HTTP2]
+  """list of str or unicode: configuration keys excluded from
+  :meth:`fingerprint`"""
 
   def __init__(self):
     """Create component.
     """
     super(RestComponent, self).__init__()
     self._url = ""
+    self._pool_size = RestComponent.DEFAULT_POOL_SIZE
+    self._timeout = None
+    self._throttle = None
+    self._compression = None
+    self._cassette = None
+    self._http2 = False
+    self._session = None
+    self._session_pid = None
+    self._bytes = dict([(name, 0) for name in
+                        ["bytes-sent", "bytes-sent-uncompressed",
+                         "bytes-received", "bytes-received-uncompressed"]])
 
   @property
   def url(self):
@@ -186,10 +768,99 @@ class RestComponent(ConfigurableComponent):
     """
     return self._url
 
+  @property
+  def pool_size(self):
+    """Get maximum number of pooled connections per host.
+
+    :return: pool size
+    :rtype: int
+    """
+    return self._pool_size
+
+  @property
+  def timeout(self):
+    """Get request timeout.
+
+    :return: timeout in seconds, or connect and read timeouts in
+      seconds, or ``None`` if requests do not time out
+    :rtype: float or tuple of (float, float)
+    """
+    return self._timeout
+
+  @property
+  def throttle(self):
+    """Get concurrency control, rate limiting and retries for
+    requests.
+
+    :return: throttle, or ``None`` if requests are not throttled
+    :rtype: :class:`prov_interop.throttle.Throttle`
+    """
+    return self._throttle
+
+  @property
+  def compression(self):
+    """Get request body compression.
+
+    :return: ``gzip`` or ``deflate``, or ``None`` if request bodies
+      are not compressed
+    :rtype: str or unicode
+    """
+    return self._compression
+
+  @property
+  def cassette(self):
+    """Get the cassette in which requests and responses are recorded,
+    or from which they are replayed.
+
+    :return: cassette, or ``None`` if requests are made as usual
+    :rtype: :class:`prov_interop.cassette.Cassette`
+    """
+    return self._cassette
+
+  @property
+  def http2(self):
+    """Get whether requests are made over HTTP/2.
+
+    :return: ``True`` if requests are made over HTTP/2
+    :rtype: bool
+    """
+    return self._http2
+
+  @property
+  def session(self):
+    """Get the HTTP session, creating it if it has not been created,
+    or was created by another process (e.g. before a fork), in which
+    case its connections cannot be shared.
+
+    :return: session
+    :rtype: :class:`requests.Session`
+    """
+    if self._session is None or self._session_pid != os.getpid():
+      session = requests.Session()
+      pool_args = {"pool_connections": RestComponent.DEFAULT_POOL_SIZE,
+                   "pool_maxsize": self._pool_size}
+      if self._http2:
+        adapter = Http2Adapter(self._pool_size)
+        unix_adapter = UnixAdapter(**pool_args)
+      elif self._cassette is None:
+        adapter = requests.adapters.HTTPAdapter(**pool_args)
+        unix_adapter = UnixAdapter(**pool_args)
+      else:
+        adapter = CassetteAdapter(self._cassette, **pool_args)
+        unix_adapter = UnixCassetteAdapter(self._cassette, **pool_args)
+      session.mount("http://", adapter)
+      session.mount("https://", adapter)
+      session.mount(unixsocket.SCHEME + "://", unix_adapter)
+      self._session = session
+      self._session_pid = os.getpid()
+    return self._session
+
   def configure(self, config):
     """Configure component. The configuration must hold:
 
-    - ``url``: REST endpoint for POST requests.
+    - ``url``: REST endpoint for POST requests. This may be an
+      ``http+unix`` URL naming a Unix domain socket, as described in
+      :mod:`prov_interop.unixsocket`.
 
     A valid configuration is::
 
@@ -197,6 +868,44 @@ class RestComponent(ConfigurableComponent):
         "url": "https://provenance.ecs.soton.ac.uk/validator/provapi/documents/"
       }
 
+    The configuration may also hold:
+
+    - ``pool-size``: maximum number of pooled connections per host
+      (optional, default 10). This need only exceed the number of
+      requests a component makes at once.
+    - ``timeout``: request timeout in seconds, or a list of a connect
+      timeout and a read timeout, in seconds (optional, default no
+      timeout).
+    - ``throttle``: concurrency control, rate limiting and retries,
+      shared by all processes making requests to ``url``, as described
+      in :meth:`prov_interop.throttle.Throttle.from_config` (optional,
+      default requests are not throttled).
+    - ``compression``: compression of request bodies, ``gzip`` or
+      ``deflate``, which the service must accept (optional, default
+      request bodies are not compressed). Compressed responses are
+      always accepted.
+    - ``cassette``: recording of requests and responses, or replaying
+      of recorded responses with no network access, as described in
+      :meth:`prov_interop.cassette.Cassette.from_config` (optional,
+      default requests are made as usual).
+    - ``http2``: if ``true``, requests are made over HTTP/2, which
+      the service must support, so concurrent requests share one
+      connection, as described in :mod:`prov_interop.http2`
+      (optional, default ``false``). This needs the ``httpx`` and
+      ``h2`` packages and cannot be used with ``cassette``.
+      ``http+unix`` URLs are always requested over HTTP/1.1.
+
+    For example::
+
+      {
+        "url": "https://provenance.ecs.soton.ac.uk/validator/provapi/documents/",
+        "pool-size": 4,
+        "timeout": [5, 60],
+        "throttle": {"rate": 20, "max-concurrency": 16},
+        "compression": "gzip",
+        "cassette": {"directory": "/tmp/cassette", "mode": "record"}
+      }
+
     :param config: Configuration
     :type config: dict
     :raises ConfigError: if `config` does not hold the above entries
@@ -204,3 +913,260 @@ class RestComponent(ConfigurableComponent):
     super(RestComponent, self).configure(config)
     self.check_configuration([RestComponent.URL])
     self._url = config[RestComponent.URL]
+    pool_size = config.get(RestComponent.POOL_SIZE,
+                           RestComponent.DEFAULT_POOL_SIZE)
+    if type(pool_size) is not int or pool_size < 1:
+      raise ConfigError(RestComponent.POOL_SIZE +
+                        " must be a positive integer")
+    timeout = config.get(RestComponent.TIMEOUT, None)
+    if isinstance(timeout, list):
+      timeout = tuple(timeout)
+    if not RestComponent.is_timeout(timeout):
+      raise ConfigError(RestComponent.TIMEOUT +
+                        " must be a positive number or a list of two " +
+                        "positive numbers")
+    compression = config.get(RestComponent.COMPRESSION, None)
+    if compression is not None and \
+        compression not in RestComponent.COMPRESSIONS:
+      raise ConfigError(RestComponent.COMPRESSION + " must be one of " +
+                        ", ".join(RestComponent.COMPRESSIONS))
+    throttle = None
+    if config.get(RestComponent.THROTTLE) is not None:
+      try:
+        throttle = Throttle.from_config(config[RestComponent.THROTTLE],
+                                        self._url)
+      except ValueError as e:
+        raise ConfigError(RestComponent.THROTTLE + ": " + str(e))
+    cassette = None
+    if config.get(RestComponent.CASSETTE) is not None:
+      try:
+        cassette = Cassette.from_config(config[RestComponent.CASSETTE])
+      except ValueError as e:
+        raise ConfigError(RestComponent.CASSETTE + ": " + str(e))
+    use_http2 = config.get(RestComponent.HTTP2, False)
+    if not isinstance(use_http2, bool):
+      raise ConfigError(RestComponent.HTTP2 + " must be true or false")
+    if use_http2 and not http2.is_available():
+      raise ConfigError(RestComponent.HTTP2 +
+                        " requires the httpx and h2 packages")
+    if use_http2 and cassette is not None:
+      raise ConfigError(RestComponent.HTTP2 + " cannot be used with " +
+                        RestComponent.CASSETTE)
+    self.close()
+    self._pool_size = pool_size
+    self._timeout = timeout
+    self._throttle = throttle
+    self._compression = compression
+    self._cassette = cassette
+    self._http2 = use_http2
+
+  @staticmethod
+  def is_timeout(timeout):
+    """Check whether a value is a valid timeout.
+
+    :param timeout: Value
+    :type timeout: object
+    :return: ``True`` if `timeout` is ``None``, a positive number or
+      a tuple of two positive numbers
+    :rtype: bool
+    """
+    if timeout is None:
+      return True
+    values = timeout if isinstance(timeout, tuple) else (timeout,)
+    if isinstance(timeout, tuple) and len(values) != 2:
+      return False
+    for value in values:
+      if isinstance(value, bool) or \
+          not isinstance(value, (int, float)) or value <= 0:
+        return False
+    return True
+
+  def request(self, method, url, **kwargs):
+    """Make an HTTP request via the session, using the configured
+    timeout. If ``throttle`` is configured, the request waits for the
+    throttle's limits and is retried as described in
+    :meth:`prov_interop.throttle.Throttle.request`.
+
+    :param method: HTTP method e.g. ``POST``
+    :type method: str or unicode
+    :param url: URL
+    :type url: str or unicode
+    :param kwargs: Further arguments for
+      :meth:`requests.Session.request` e.g. ``headers``, ``data``,
+      which may be an open file, or ``stream``
+    :type kwargs: dict
+    :return: response
+    :rtype: :class:`requests.Response`
+    :raises requests.exceptions.RequestException: if there are
+      problems executing the request e.g. the URL cannot be found, or
+      the request times out
+    """
+    kwargs.setdefault("timeout", self._timeout)
+    data = kwargs.get("data")
+    compressed = None
+    if data is not None:
+      size = requests.utils.super_len(data)
+      if self._compression is not None:
+        compressed = self.compress(data)
+        data = compressed
+        kwargs["data"] = compressed
+        headers = dict(kwargs.get("headers") or {})
+        headers[http.CONTENT_ENCODING] = self._compression
+        kwargs["headers"] = headers
+      self._bytes["bytes-sent-uncompressed"] += size
+      self._bytes["bytes-sent"] += requests.utils.super_len(data)
+    try:
+      if self._throttle is None:
+        return self.session.request(method, url, **kwargs)
+      # A file body is rewound before each retry.
+      position = data.tell() if hasattr(data, "seek") else None
+
+      def send():
+        if position is not None:
+          data.seek(position)
+        return self.session.request(method, url, **kwargs)
+
+      return self._throttle.request(send)
+    finally:
+      if compressed is not None:
+        compressed.close()
+
+  def compress(self, data):
+    """Compress a request body, ``CHUNK_SIZE`` bytes at a time, using
+    the configured compression. The compressed body is held in memory
+    up to ``SPOOL_SIZE`` bytes, and in a temporary file beyond that.
+
+    :param data: Request body, as bytes, text, an open file or an
+      iterable of chunks
+    :type data: bytes or str or unicode or file or iterable
+    :return: compressed body, positioned at its start
+    :rtype: :class:`io.BytesIO` or file
+    :raises IOError: if the body cannot be read
+    """
+    if self._compression == http.GZIP:
+      compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    else:
+      compressor = zlib.compressobj(6)
+    # tempfile.SpooledTemporaryFile is not used as requests calls
+    # fileno() to get the body's length, which moves it to disk.
+    compressed = io.BytesIO()
+    for chunk in RestComponent.chunks(data):
+      compressed = RestComponent._spool(compressed,
+                                        compressor.compress(chunk))
+    compressed = RestComponent._spool(compressed, compressor.flush())
+    compressed.seek(0)
+    return compressed
+
+  @staticmethod
+  def _spool(compressed, data):
+    compressed.write(data)
+    if isinstance(compressed, io.BytesIO) and \
+        compressed.tell() > RestComponent.SPOOL_SIZE:
+      spooled = tempfile.TemporaryFile()
+      spooled.write(compressed.getvalue())
+      return spooled
+    return compressed
+
+  @staticmethod
+  def chunks(data):
+    """Get a request body as chunks of bytes.
+
+    :param data: Request body, as bytes, text, an open file or an
+      iterable of chunks
+    :type data: bytes or str or unicode or file or iterable
+    :return: chunks
+    :rtype: generator of bytes
+    :raises IOError: if the body cannot be read
+    """
+    if isinstance(data, (bytes, type(""))):
+      chunks = [data]
+    elif hasattr(data, "read"):
+      chunks = iter(lambda: data.read(RestComponent.CHUNK_SIZE), data.read(0))
+    else:
+      chunks = data
+    for chunk in chunks:
+      yield chunk.encode("utf-8") if isinstance(chunk, type("")) else chunk
+
+  def download(self, response, out_file):
+    """Save the body of a response to a file, ``CHUNK_SIZE`` bytes at a
+    time, so that the body is not held in memory. The response should
+    have been requested with ``stream=True``. The response is closed.
+
+    :param response: Response
+    :type response: :class:`requests.Response`
+    :param out_file: Output file
+    :type out_file: str or unicode
+    :raises requests.exceptions.RequestException: if there are
+      problems reading the response
+    :raises IOError: if the file cannot be written
+    """
+    size = 0
+    try:
+      with open(out_file, "wb") as f:
+        for chunk in response.iter_content(
+            chunk_size=RestComponent.CHUNK_SIZE):
+          size += len(chunk)
+          f.write(chunk)
+      self._bytes["bytes-received-uncompressed"] += size
+      try:
+        # Bytes read from the connection, before decompression.
+        size = response.raw.tell()
+      except (AttributeError, IOError, ValueError):
+        pass
+      self._bytes["bytes-received"] += size
+    finally:
+      response.close()
+
+  def close(self):
+    """Close the session, and its pooled connections, if there is
+    one.
+    """
+    if self._session is not None:
+      if self._session_pid == os.getpid():
+        self._session.close()
+      self._session = None
+      self._session_pid = None
+
+  def statistics(self):
+    """Get counters of the requests made and the connections opened
+    by the session. Requests not needing a new connection reused a
+    pooled one or, over HTTP/2, shared an open one.
+
+    :return: ``http-requests``, ``http-connections`` and
+      ``http-connections-reused``, or no counters if no session has
+      been created, together with the counters of the throttle, if
+      any, and ``bytes-sent``, ``bytes-sent-uncompressed``,
+      ``bytes-received`` and ``bytes-received-uncompressed``, counting
+      request bodies and downloaded response bodies, if any, and the
+      counters of the cassette, if any, prefixed by ``cassette-``
+    :rtype: dict from str or unicode to int
+    """
+    statistics = super(RestComponent, self).statistics()
+    if self._bytes["bytes-sent"] or self._bytes["bytes-received"]:
+      statistics.update(self._bytes)
+    if self._throttle is not None:
+      statistics.update(self._throttle.statistics())
+    if self._cassette is not None:
+      statistics.update([("cassette-" + name, value) for (name, value)
+                         in self._cassette.statistics().items()])
+    if self._session is None or self._session_pid != os.getpid():
+      return statistics
+    requests_made = 0
+    connections = 0
+    for adapter in set(self._session.adapters.values()):
+      if isinstance(adapter, Http2Adapter):
+        counters = adapter.statistics()
+        requests_made += counters["requests"]
+        connections += counters["connections"]
+        continue
+      pools = adapter.poolmanager.pools
+      for key in pools.keys():
+        pool = pools.get(key)
+        if pool is not None:
+          requests_made += pool.num_requests
+          connections += pool.num_connections
+    statistics.update({"http-requests": requests_made,
+                       "http-connections": connections,
+                       "http-connections-reused":
+                         max(0, requests_made - connections)})
+    return statistics
@@ -28,6 +28,8 @@ from __future__ import (absolute_import, division, print_function,
 import os
 
 from prov_interop import standards
+from prov_interop.cache import digest
+from prov_interop.cache import file_digest
 from prov_interop.component import ConfigError
 from prov_interop.component import ConfigurableComponent
 
@@ -71,6 +73,19 @@ class Converter(ConfigurableComponent):
     """
     return self._output_formats
 
+  @property
+  def group_by_input(self):
+    """Get whether test case tuples with the same input file, but
+    different output formats, should be given to :meth:`convert_batch`
+    together, e.g. because the converter converts an input file into
+    many output formats at once.
+
+    :return: ``True`` if tuples are grouped by input file, ``False``
+      if they are grouped by input and output format
+    :rtype: bool
+    """
+    return False
+
   def configure(self, config):
     """Configure converter. The configuration must hold:
 
@@ -132,6 +147,39 @@ class Converter(ConfigurableComponent):
     if not os.path.isfile(in_file):
       raise ConversionError("Input file not found: " + in_file)
 
+  def check_output(self, in_file, out_file):
+    """Check that a conversion created its output file.
+
+    :param in_file: Input file
+    :type in_file: str or unicode
+    :param out_file: Output file
+    :type out_file: str or unicode
+    :raises ConversionError: if the output file cannot be found
+    """
+    if not os.path.isfile(out_file):
+      raise ConversionError("Output file not found: " + out_file)
+
+  def convert_batch(self, files):
+    """Convert many input files into output files. Each conversion is
+    done as for :meth:`convert` and the outcome of each is returned,
+    rather than raised. This implementation calls :meth:`convert` for
+    each pair of files in turn. Sub-classes may override it to convert
+    many files at once.
+
+    :param files: Input and output file pairs
+    :type files: list of tuple of (str or unicode, str or unicode)
+    :return: for each pair, ``None`` if the conversion succeeded or
+      the exception raised if it failed
+    :rtype: list of ``None`` or :class:`Exception`
+    """
+    results = []
+    for (in_file, out_file) in files:
+      try:
+        results.append(self.convert(in_file, out_file))
+      except Exception as e:
+        results.append(e)
+    return results
+
 
 class ConversionError(Exception):
   """Conversion error."""
@@ -151,3 +199,115 @@ class ConversionError(Exception):
     :rtype: str or unicode
     """
     return repr(self._value)
+
+
+class ConversionCache(object):
+  """Cache of conversion outputs, held in a
+  :class:`prov_interop.cache.DiskCache`. The key for a conversion is a
+  digest of the converter's fingerprint (see
+  :meth:`prov_interop.component.ConfigurableComponent.fingerprint`),
+  the SHA-256 digest of the input file and the output format. So, a
+  conversion is reused only if the same input is converted to the same
+  format by a converter with the same class, configuration and
+  executable.
+  """
+
+  def __init__(self, cache):
+    """Create conversion cache.
+
+    :param cache: Cache for conversion outputs
+    :type cache: :class:`prov_interop.cache.DiskCache`
+    """
+    self._cache = cache
+
+  @property
+  def cache(self):
+    """Get cache of conversion outputs.
+
+    :return: cache
+    :rtype: :class:`prov_interop.cache.DiskCache`
+    """
+    return self._cache
+
+  def key(self, converter, in_file, out_file):
+    """Get cache key for a conversion.
+
+    :param converter: Converter
+    :type converter: :class:`Converter`
+    :param in_file: Input file
+    :type in_file: str or unicode
+    :param out_file: Output file
+    :type out_file: str or unicode
+    :return: hexadecimal digest
+    :rtype: str or unicode
+    :raises IOError: if the input file cannot be read
+    """
+    out_format = os.path.splitext(out_file)[1][1:]
+    return digest(converter.fingerprint(), file_digest(in_file), out_format)
+
+  def convert(self, converter, in_file, out_file):
+    """Convert input file into output file, using a cached output if
+    there is one, else invoking :meth:`Converter.convert` and caching
+    its output.
+
+    :param converter: Converter
+    :type converter: :class:`Converter`
+    :param in_file: Input file
+    :type in_file: str or unicode
+    :param out_file: Output file
+    :type out_file: str or unicode
+    :raises ConversionError: as for :meth:`Converter.convert`
+    """
+    error = self.convert_batch(converter, [(in_file, out_file)])[0]
+    if error is not None:
+      raise error
+
+  def convert_batch(self, converter, files):
+    """Convert many input files into output files, using cached
+    outputs where there are any, else invoking
+    :meth:`Converter.convert_batch` and caching the outputs of
+    successful conversions.
+
+    :param converter: Converter
+    :type converter: :class:`Converter`
+    :param files: Input and output file pairs
+    :type files: list of tuple of (str or unicode, str or unicode)
+    :return: for each pair, ``None`` if the conversion succeeded or
+      the exception raised if it failed
+    :rtype: list of ``None`` or :class:`Exception`
+    """
+    results = [None] * len(files)
+    pending = []
+    for (index, (in_file, out_file)) in enumerate(files):
+      # Checks are done before the cache is consulted, so a cached
+      # output is not returned for an unsupported format.
+      try:
+        Converter.convert(converter, in_file, out_file)
+        converter.check_formats(os.path.splitext(in_file)[1][1:],
+                                os.path.splitext(out_file)[1][1:])
+        key = self.key(converter, in_file, out_file)
+      except Exception as e:
+        results[index] = e
+        continue
+      # Outputs are copied to and from the cache a block at a time, so
+      # they are not held in memory.
+      if not self._cache.get_file(key, out_file):
+        pending.append((index, key))
+    conversions = converter.convert_batch(
+      [files[index] for (index, _) in pending])
+    for ((index, key), error) in zip(pending, conversions):
+      results[index] = error
+      if error is None:
+        try:
+          self._cache.put_file(key, files[index][1])
+        except (IOError, OSError):
+          pass
+    return results
+
+  def statistics(self):
+    """Get cache counters.
+
+    :return: counter values keyed by counter name
+    :rtype: dict from str or unicode to int
+    """
+    return self._cache.statistics()
@@ -0,0 +1,220 @@
+"""Streams of test progress events, as newline-delimited JSON.
+
+An :class:`EventStream` records one event for each phase of each
+test case tuple (e.g. ``convert`` or ``compare``), holding the tuple's
+test ID, converter and formats, the phase, its start time and
+duration, and its outcome. Each event is a JSON object on a line of
+its own (NDJSON), appended to an events file as the phase completes,
+so that dashboards, and coordinators sharding tests across machines,
+can follow a run as it progresses, e.g. with ``tail -f``, without
+parsing nose's output. Many processes can append to the same file.
+The file can also be a FIFO (named pipe), in which case opening it
+blocks until it has a reader.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import contextlib
+import json
+import os
+import stat
+import threading
+import time
+
+OK = "ok"
+"""str or unicode: phase completed without deciding the outcome of
+the test"""
+PASS = "pass"
+"""str or unicode: comparator found the documents equivalent"""
+FAIL = "fail"
+"""str or unicode: comparator found the documents not equivalent"""
+ERROR = "error"
+"""str or unicode: phase raised an error"""
+SKIP = "skip"
+"""str or unicode: test was skipped"""
+
+
+def start(file_name):
+  """Start a new stream, removing any existing events file, so that
+  it is created afresh by the first event recorded. A FIFO is not
+  removed, as its reader may already be waiting on it.
+
+  :param file_name: Events file name
+  :type file_name: str or unicode
+  :raises OSError: if the file exists but cannot be removed
+  """
+  if os.path.exists(file_name) and \
+        not stat.S_ISFIFO(os.stat(file_name).st_mode):
+    os.remove(file_name)
+
+
+def read_events(file_name):
+  """Read the events in an events file.
+
+  :param file_name: Events file name
+  :type file_name: str or unicode
+  :return: events
+  :rtype: list of dict
+  :raises IOError: if the file cannot be read
+  :raises ValueError: if a line is not a JSON object
+  """
+  with open(file_name, "r") as f:
+    return [json.loads(line) for line in f if line.strip()]
+
+
+def format_event(event):
+  """Format an event as a one-line summary, of form ``TEST: PHASE
+  OUTCOME in DURATION[: MESSAGE]`` e.g.::
+
+    ...ProvPyTestCase.test_case_1_json_provx: convert ok in 0.412s
+
+  :param event: Event
+  :type event: dict
+  :return: summary
+  :rtype: str or unicode
+  """
+  text = (event.get("test", "") + ": " + event["phase"] + " " +
+          event["outcome"] + " in " + "%.3fs" % event["duration"])
+  if event.get("message"):
+    text += ": " + event["message"]
+  return text
+
+
+class EventStream(object):
+  """Records test progress events, appending them to an events file.
+  A stream without a file records nothing, so code can record events
+  whether or not they are wanted.
+  """
+
+  def __init__(self, file_name=None):
+    """Create stream. The file is opened when the first event is
+    recorded.
+
+    :param file_name: Events file name, or ``None`` to record nothing
+    :type file_name: str or unicode
+    """
+    self._file_name = file_name
+    self._fd = None
+    self._lock = threading.Lock()
+
+  @property
+  def file_name(self):
+    """Get events file name.
+
+    :return: file name, or ``None`` if nothing is recorded
+    :rtype: str or unicode
+    """
+    return self._file_name
+
+  @property
+  def enabled(self):
+    """Check whether events are recorded.
+
+    :return: ``True`` if there is an events file
+    :rtype: bool
+    """
+    return self._file_name is not None
+
+  def emit(self, phase, start, end, fields=None, outcome=OK, message=None):
+    """Record an event for a phase. Each event is appended by a single
+    write, so events from concurrent processes are not interleaved.
+
+    :param phase: Phase name e.g. ``convert``
+    :type phase: str or unicode
+    :param start: Start time, in seconds since the epoch
+    :type start: float
+    :param end: End time, in seconds since the epoch
+    :type end: float
+    :param fields: Information about the test e.g. ``test``,
+      ``index``, ``converter``, ``ext-in`` and ``ext-out`` (optional)
+    :type fields: dict
+    :param outcome: :data:`OK`, :data:`PASS`, :data:`FAIL`,
+      :data:`ERROR` or :data:`SKIP`
+    :type outcome: str or unicode
+    :param message: Reason for the outcome e.g. an error message
+      (optional)
+    :type message: str or unicode
+    :return: event
+    :rtype: dict
+    :raises OSError: if the event cannot be written
+    """
+    event = dict(fields or {})
+    event.update({"phase": phase,
+                  "start": start,
+                  "duration": end - start,
+                  "outcome": outcome,
+                  "pid": os.getpid()})
+    if message:
+      event["message"] = message
+    if not self.enabled:
+      return event
+    line = (json.dumps(event, sort_keys=True) + "\n").encode("utf-8")
+    with self._lock:
+      if self._fd is None:
+        self._fd = os.open(self._file_name,
+                           os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+      os.write(self._fd, line)
+    return event
+
+  @contextlib.contextmanager
+  def phase(self, name, fields=None):
+    """Record an event for the execution of a ``with`` block. The
+    block is given a dictionary, in which it can set the ``outcome``
+    and ``message``. If the block raises an exception, and has not set
+    an outcome, then the outcome is :data:`ERROR`. Once the event is
+    recorded, the dictionary is updated to hold it e.g.::
+
+      with events.phase("compare", fields) as event:
+        if not comparator.compare(expected_file, out_file):
+          event["outcome"] = FAIL
+
+    :param name: Phase name
+    :type name: str or unicode
+    :param fields: Information about the test (optional)
+    :type fields: dict
+    :return: context manager
+    :rtype: context manager
+    """
+    start_time = time.time()
+    event = {"outcome": OK, "message": None}
+    try:
+      yield event
+    except BaseException as e:
+      if event["outcome"] == OK:
+        event["outcome"] = ERROR
+        event["message"] = event["message"] or str(e)
+      raise
+    finally:
+      event.update(self.emit(name, start_time, time.time(), fields,
+                             event["outcome"], event["message"]))
+
+  def close(self):
+    """Close the events file, if it is open. Events recorded after
+    this reopen it.
+    """
+    with self._lock:
+      if self._fd is not None:
+        os.close(self._fd)
+        self._fd = None
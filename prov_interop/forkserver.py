@@ -0,0 +1,210 @@
+"""Pre-forking worker server for Python command-line components.
+
+Starting a Python script such as ProvPy ``prov-convert`` costs an
+interpreter start-up plus the script's imports (e.g. ``prov`` and
+``rdflib``) on every invocation. A forkserver loads the script once,
+so its imports are done once, then, for each request, forks a
+copy-on-write child which runs the script as ``__main__`` with
+``sys.argv`` set to the request's arguments. The child's exit code is
+the response.
+
+The forkserver implements the worker protocol of
+:mod:`prov_interop.worker` so it is managed by
+:class:`prov_interop.worker.WorkerProcess`. Usage::
+
+    usage: python -m prov_interop.forkserver script [module ...]
+
+For example::
+
+    python -m prov_interop.forkserver /home/user/ProvPy/scripts/prov-convert prov.serializers.provrdf
+
+The script is loaded with ``__name__`` set to ``__forkserver__`` so
+code guarded by ``if __name__ == "__main__"`` is not run at load time.
+Any modules given are also imported at load time. This is useful for
+modules that the script imports lazily, for example ``prov`` imports
+its serializers, and so ``rdflib``, upon first use.
+
+The forkserver requires :func:`os.fork` so is not available on
+Windows.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import importlib
+import os
+import runpy
+import sys
+import traceback
+
+from prov_interop import worker
+
+PRELOAD_NAME = "__forkserver__"
+"""str or unicode: module name used when loading the script"""
+
+
+def is_available():
+  """Check whether forkservers are supported on this platform.
+
+  :return: ``True`` if :func:`os.fork` is available
+  :rtype: bool
+  """
+  return hasattr(os, "fork")
+
+
+def command_line(executable, modules=None):
+  """Get command-line to start a forkserver for a Python executable.
+  If `executable` has more than one part, its first part is taken to
+  be the Python interpreter and its second part the script e.g.
+  ``python /home/user/ProvPy/scripts/prov-convert``. Otherwise
+  `executable` is taken to be a Python script, which is looked for on
+  the system path, and is run using the current interpreter.
+
+  :param executable: Executable and any arguments
+  :type executable: list of str or unicode
+  :param modules: Modules to import at load time
+  :type modules: list of str or unicode
+  :return: command-line
+  :rtype: list of str or unicode
+  :raises OSError: if the script cannot be found
+  """
+  if len(executable) > 1:
+    (interpreter, script) = (executable[0], executable[1])
+  else:
+    (interpreter, script) = (sys.executable, find_script(executable[0]))
+  return [interpreter, "-m", "prov_interop.forkserver", script] + \
+      list(modules or [])
+
+
+def find_script(script):
+  """Find a script, looking on the system path if it is not a file.
+
+  :param script: Script name
+  :type script: str or unicode
+  :return: Script file name
+  :rtype: str or unicode
+  :raises OSError: if the script cannot be found
+  """
+  if os.path.isfile(script):
+    return script
+  for directory in os.environ.get("PATH", "").split(os.pathsep):
+    candidate = os.path.join(directory, script)
+    if os.path.isfile(candidate):
+      return candidate
+  raise OSError("Script not found: " + script)
+
+
+def environment():
+  """Get environment for a forkserver, being the current environment
+  with the directory holding :mod:`prov_interop` on ``PYTHONPATH``, so
+  that the forkserver can be run by any interpreter.
+
+  :return: environment
+  :rtype: dict
+  """
+  env = dict(os.environ)
+  package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+  paths = [package_dir]
+  if env.get("PYTHONPATH"):
+    paths.append(env["PYTHONPATH"])
+  env["PYTHONPATH"] = os.pathsep.join(paths)
+  return env
+
+
+def preload(script, modules=None):
+  """Load a script, without running its ``__main__`` code, and import
+  modules, so imports are done before any children are forked. Modules
+  which cannot be imported are reported on standard error and
+  otherwise ignored, leaving the script to handle their absence.
+
+  :param script: Script file name
+  :type script: str or unicode
+  :param modules: Modules to import
+  :type modules: list of str or unicode
+  """
+  for module in modules or []:
+    try:
+      importlib.import_module(module)
+    except ImportError as e:
+      print("Cannot import " + module + ": " + str(e), file=sys.stderr)
+  argv = sys.argv
+  sys.argv = [script]
+  try:
+    runpy.run_path(script, run_name=PRELOAD_NAME)
+  finally:
+    sys.argv = argv
+
+
+def fork_script(script, arguments):
+  """Fork a child which runs a script as ``__main__`` with the given
+  arguments, and wait for it to exit.
+
+  :param script: Script file name
+  :type script: str or unicode
+  :param arguments: Arguments
+  :type arguments: list of str or unicode
+  :return: exit code, or the negated signal number if the child was
+    killed by a signal
+  :rtype: int
+  """
+  sys.stdout.flush()
+  sys.stderr.flush()
+  pid = os.fork()
+  if pid == 0:
+    return_code = 1
+    try:
+      return_code = worker.run_script(script, arguments)
+    except SystemExit as e:
+      return_code = worker.exit_code(e.code)
+    except BaseException:
+      traceback.print_exc()
+    finally:
+      sys.stdout.flush()
+      sys.stderr.flush()
+      os._exit(return_code)
+  (_, status) = os.waitpid(pid, 0)
+  if os.WIFSIGNALED(status):
+    return -os.WTERMSIG(status)
+  return os.WEXITSTATUS(status)
+
+
+def serve(script, modules=None):
+  """Load a script then serve requests until standard input is closed,
+  running the script in a forked child for each request.
+
+  :param script: Script file name
+  :type script: str or unicode
+  :param modules: Modules to import at load time
+  :type modules: list of str or unicode
+  """
+  worker.serve(lambda arguments: fork_script(script, arguments),
+               initializer=lambda: preload(script, modules))
+
+
+if __name__ == "__main__":
+  if len(sys.argv) < 2:
+    print("usage: python -m prov_interop.forkserver script [module ...]",
+          file=sys.stderr)
+    sys.exit(2)
+  serve(sys.argv[1], sys.argv[2:])
@@ -31,9 +31,14 @@ import yaml
 
 from prov_interop import factory
 from prov_interop import standards
+from prov_interop.cache import DiskCache
 from prov_interop.comparator import Comparator
+from prov_interop.comparator import ComparisonCache
 from prov_interop.component import ConfigError
 from prov_interop.component import ConfigurableComponent
+from prov_interop.converter import ConversionCache
+from prov_interop.events import EventStream
+from prov_interop.trace import Tracer
 
 class HarnessResources(ConfigurableComponent):
   """Manages test harness configuration including the test cases."""
@@ -47,6 +52,18 @@ class HarnessResources(ConfigurableComponent):
   CLASS = "class"
   """str or unicode: configuration key for comparator class names"""
 
+  CONVERSION_CACHE = "conversion-cache"
+  """str or unicode: configuration key for conversion cache"""
+
+  COMPARISON_CACHE = "comparison-cache"
+  """str or unicode: configuration key for comparison cache"""
+
+  TRACE = "trace"
+  """str or unicode: configuration key for trace file"""
+
+  EVENTS = "events"
+  """str or unicode: configuration key for events file"""
+
   TEST_CASE_PREFIX="test-"
   """str or unicode: assumed prefix for individual test case
   directories and files
@@ -59,6 +76,10 @@ class HarnessResources(ConfigurableComponent):
     self._test_cases_dir = ""
     self._comparators = {}
     self._format_comparators = {}
+    self._conversion_cache = None
+    self._comparison_cache = None
+    self._tracer = Tracer()
+    self._events = EventStream()
 
   @property
   def test_cases_dir(self):
@@ -91,6 +112,44 @@ class HarnessResources(ConfigurableComponent):
     """
     return self._format_comparators
 
+  @property
+  def conversion_cache(self):
+    """Get conversion cache, if one has been configured.
+
+    :return: conversion cache or ``None``
+    :rtype: :class:`prov_interop.converter.ConversionCache`
+    """
+    return self._conversion_cache
+
+  @property
+  def comparison_cache(self):
+    """Get comparison cache, if one has been configured.
+
+    :return: comparison cache or ``None``
+    :rtype: :class:`prov_interop.comparator.ComparisonCache`
+    """
+    return self._comparison_cache
+
+  @property
+  def tracer(self):
+    """Get tracer, which records nothing if no ``trace`` file has
+    been configured.
+
+    :return: tracer
+    :rtype: :class:`prov_interop.trace.Tracer`
+    """
+    return self._tracer
+
+  @property
+  def events(self):
+    """Get event stream, which records nothing if no ``events`` file
+    has been configured.
+
+    :return: event stream
+    :rtype: :class:`prov_interop.events.EventStream`
+    """
+    return self._events
+
   def register_comparators(self, comparators):
     """Populate a dictionary of comparators, keyed by comparator name,
     and a dictionary of comparators, keyed by format. `comparators`
@@ -261,6 +320,44 @@ class HarnessResources(ConfigurableComponent):
     This method invokes :func:`register_comparators` to
     create the comparators.
 
+    The configuration may also hold:
+
+    - ``conversion-cache``: configuration of an on-disk cache of
+      conversion outputs (see
+      :class:`prov_interop.converter.ConversionCache`), which holds:
+
+      - ``directory``: cache directory.
+      - ``max-size``: maximum size of the cache, in bytes (optional,
+        default 256MB). Least-recently-used outputs are evicted when
+        the cache exceeds this size.
+
+    - ``comparison-cache``: configuration of an on-disk cache of
+      comparison results (see
+      :class:`prov_interop.comparator.ComparisonCache`), which holds
+      the same entries as ``conversion-cache``.
+    - ``trace``: file to which timed spans of the phases of each test
+      are appended, as Chrome trace events (see
+      :class:`prov_interop.trace.Tracer`).
+    - ``events``: file or FIFO to which an event for each phase of each
+      test is appended, as a line of JSON (see
+      :class:`prov_interop.events.EventStream`).
+
+    For example::
+
+      {
+        "conversion-cache":
+        {
+          "directory": "/home/user/cache/conversions",
+          "max-size": 1073741824
+        },
+        "comparison-cache":
+        {
+          "directory": "/home/user/cache/comparisons"
+        },
+        "trace": "/home/user/trace.json",
+        "events": "/home/user/events.ndjson"
+      }
+
     :param config: Configuration
     :type config: dict
     :raises ConfigError: if `config` does not hold the above
@@ -272,3 +369,41 @@ class HarnessResources(ConfigurableComponent):
       [HarnessResources.TEST_CASES_DIR, HarnessResources.COMPARATORS])
     self._test_cases_dir = config[HarnessResources.TEST_CASES_DIR]
     self.register_comparators(config[HarnessResources.COMPARATORS])  
+    self._conversion_cache = None
+    self._comparison_cache = None
+    cache = self.create_cache(HarnessResources.CONVERSION_CACHE)
+    if cache is not None:
+      self._conversion_cache = ConversionCache(cache)
+    cache = self.create_cache(HarnessResources.COMPARISON_CACHE)
+    if cache is not None:
+      self._comparison_cache = ComparisonCache(cache)
+    trace_file = config.get(HarnessResources.TRACE, None)
+    if trace_file is not None and \
+          not isinstance(trace_file, (bytes, type(""))):
+      raise ConfigError(HarnessResources.TRACE + " must be a file name")
+    self._tracer.close()
+    self._tracer = Tracer(trace_file)
+    events_file = config.get(HarnessResources.EVENTS, None)
+    if events_file is not None and \
+          not isinstance(events_file, (bytes, type(""))):
+      raise ConfigError(HarnessResources.EVENTS + " must be a file name")
+    self._events.close()
+    self._events = EventStream(events_file)
+
+  def create_cache(self, key):
+    """Create a :class:`prov_interop.cache.DiskCache` from the
+    configuration under a key.
+
+    :param key: Configuration key
+    :type key: str or unicode
+    :return: cache, or ``None`` if the configuration has no such key
+    :rtype: :class:`prov_interop.cache.DiskCache`
+    :raises ConfigError: if the cache configuration is invalid or the
+      cache directory cannot be created
+    """
+    if key not in self._config:
+      return None
+    try:
+      return DiskCache.from_config(self._config[key])
+    except (ValueError, OSError) as e:
+      raise ConfigError(key + ": " + str(e))
@@ -31,3 +31,17 @@ ACCEPT = "Accept"
 """str or unicode: HTML header field - Accept"""
 AUTHORIZATION = "Authorization"
 """str or unicode: HTML header field - Authorization"""
+ACCEPT_ENCODING = "Accept-Encoding"
+"""str or unicode: HTTP header field - Accept-Encoding"""
+CONTENT_ENCODING = "Content-Encoding"
+"""str or unicode: HTTP header field - Content-Encoding"""
+GZIP = "gzip"
+"""str or unicode: HTTP content coding - gzip"""
+DEFLATE = "deflate"
+"""str or unicode: HTTP content coding - deflate"""
+CACHE_CONTROL = "Cache-Control"
+"""str or unicode: HTTP header field - Cache-Control"""
+ETAG = "ETag"
+"""str or unicode: HTTP header field - ETag"""
+IF_NONE_MATCH = "If-None-Match"
+"""str or unicode: HTTP header field - If-None-Match"""
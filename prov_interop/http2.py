@@ -0,0 +1,325 @@
+"""HTTP/2 requests.
+
+:class:`Http2Adapter` is a transport adapter for :mod:`requests`
+which makes requests over HTTP/2, via the ``httpx`` and ``h2``
+packages. Concurrent requests to a host share a single connection,
+each request being a stream multiplexed over it, rather than each
+needing a pooled connection of its own as with HTTP/1.1. ``https``
+URLs negotiate HTTP/2 when the TLS connection is set up, and ``http``
+URLs use HTTP/2 from the outset (HTTP/2 with prior knowledge), so the
+service must support HTTP/2.
+
+``httpx`` and ``h2`` are optional, and are only needed if HTTP/2 is
+used.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import threading
+
+import requests
+
+try:
+  import h2
+  import httpx
+except ImportError:
+  h2 = None
+  httpx = None
+
+HOP_BY_HOP_HEADERS = ["connection", "keep-alive", "proxy-connection",
+                      "transfer-encoding", "upgrade"]
+"""list of str or unicode: headers specific to an HTTP/1.1
+connection, which HTTP/2 forbids"""
+
+CONNECT_EVENTS = ["connection.connect_tcp.complete",
+                  "connection.connect_unix_socket.complete"]
+"""list of str or unicode: ``httpcore`` trace events for connections
+opened"""
+
+HEADERS_SENT_EVENTS = ["http2.send_request_headers.complete",
+                       "http2.send_request_headers.failed"]
+"""list of str or unicode: ``httpcore`` trace events for a request's
+headers having been sent, or having failed to be sent"""
+
+
+def is_available():
+  """Check whether HTTP/2 requests can be made.
+
+  :return: ``True`` if ``httpx`` and ``h2`` are installed
+  :rtype: bool
+  """
+  return httpx is not None and h2 is not None
+
+
+def translate_error(error, request):
+  """Get the :mod:`requests` exception corresponding to an ``httpx``
+  exception.
+
+  :param error: ``httpx`` exception
+  :type error: :class:`httpx.HTTPError`
+  :param request: Request
+  :type request: :class:`requests.PreparedRequest`
+  :return: exception
+  :rtype: :class:`requests.exceptions.RequestException`
+  """
+  if isinstance(error, httpx.ConnectTimeout):
+    cls = requests.exceptions.ConnectTimeout
+  elif isinstance(error, httpx.ReadTimeout):
+    cls = requests.exceptions.ReadTimeout
+  elif isinstance(error, httpx.TimeoutException):
+    cls = requests.exceptions.Timeout
+  elif isinstance(error, httpx.DecodingError):
+    cls = requests.exceptions.ContentDecodingError
+  elif isinstance(error, httpx.TransportError):
+    cls = requests.exceptions.ConnectionError
+  else:
+    cls = requests.exceptions.RequestException
+  return cls(error, request=request)
+
+
+class Http2Body(object):
+  """Body of an HTTP/2 response, used as the ``raw`` body of a
+  :class:`requests.Response`. The body is read as it arrives, and
+  is decompressed if it has a ``Content-Encoding``.
+  """
+
+  def __init__(self, response, request):
+    """Create body.
+
+    :param response: Streamed response
+    :type response: :class:`httpx.Response`
+    :param request: Request
+    :type request: :class:`requests.PreparedRequest`
+    """
+    self._response = response
+    self._request = request
+    self._chunks = None
+    self._buffer = b""
+
+  def read(self, size=-1):
+    """Read bytes of the body.
+
+    :param size: Maximum number of bytes to read, or -1 for all
+    :type size: int
+    :return: bytes, or no bytes at the end of the body
+    :rtype: bytes
+    :raises requests.exceptions.RequestException: if the body cannot
+      be read
+    """
+    if self._chunks is None:
+      self._chunks = self._response.iter_bytes()
+    try:
+      while size < 0 or len(self._buffer) < size:
+        chunk = next(self._chunks, None)
+        if chunk is None:
+          break
+        self._buffer += chunk
+    except httpx.HTTPError as e:
+      raise translate_error(e, self._request)
+    if size < 0:
+      size = len(self._buffer)
+    (data, self._buffer) = (self._buffer[:size], self._buffer[size:])
+    return data
+
+  def tell(self):
+    """Get the number of bytes read from the connection, before
+    decompression.
+
+    :return: number of bytes
+    :rtype: int
+    """
+    return self._response.num_bytes_downloaded
+
+  def close(self):
+    """Close the response, ending its stream.
+    """
+    self._response.close()
+
+
+class Http2Adapter(requests.adapters.BaseAdapter):
+  """Transport adapter making requests over HTTP/2. Requests are made
+  by an :class:`httpx.Client`, created upon the first request, which
+  is shared by concurrent requests. Proxies and client certificates
+  are not used. It counts the requests made and the connections
+  opened.
+  """
+
+  def __init__(self, pool_maxsize=10):
+    """Create adapter.
+
+    :param pool_maxsize: Maximum number of connections per host. One
+      connection is normally enough, as requests are multiplexed over
+      it.
+    :type pool_maxsize: int
+    :raises ImportError: if ``httpx`` or ``h2`` are not installed
+    """
+    if not is_available():
+      raise ImportError("HTTP/2 requires the httpx and h2 packages")
+    super(Http2Adapter, self).__init__()
+    self._pool_maxsize = pool_maxsize
+    self._client = None
+    self._lock = threading.Lock()
+    self._open_lock = threading.Lock()
+    self._counters = {"requests": 0, "connections": 0}
+
+  @property
+  def client(self):
+    """Get the HTTP/2 client, creating it if it has not been created.
+
+    :return: client
+    :rtype: :class:`httpx.Client`
+    """
+    with self._lock:
+      if self._client is None:
+        self._client = httpx.Client(
+          http1=False, http2=True,
+          limits=httpx.Limits(max_connections=self._pool_maxsize,
+                              max_keepalive_connections=self._pool_maxsize))
+      return self._client
+
+  @staticmethod
+  def get_timeout(timeout):
+    """Get an ``httpx`` timeout from a :mod:`requests` timeout.
+
+    :param timeout: Timeout in seconds, or connect and read timeouts
+      in seconds, or ``None`` for no timeout
+    :type timeout: float or tuple of (float, float)
+    :return: timeout
+    :rtype: :class:`httpx.Timeout`
+    """
+    if isinstance(timeout, tuple):
+      (connect, read) = timeout
+      return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
+  def count_connections(self, event, info):
+    """Count connections opened, from ``httpcore`` trace events.
+
+    :param event: Event name e.g. ``connection.connect_tcp.complete``
+    :type event: str or unicode
+    :param info: Event information
+    :type info: dict
+    """
+    if event in CONNECT_EVENTS:
+      with self._lock:
+        self._counters["connections"] += 1
+
+  def open_stream(self, client, http2_request):
+    """Send a request, opening its stream. ``httpcore`` chooses a
+    request's stream ID, then sends its headers, without holding a
+    lock across both, so concurrent requests could send their headers
+    out of stream ID order, which HTTP/2 forbids. Requests therefore
+    hold a lock until their headers have been sent, after which they
+    proceed concurrently.
+
+    :param client: Client
+    :type client: :class:`httpx.Client`
+    :param http2_request: Request
+    :type http2_request: :class:`httpx.Request`
+    :return: streamed response
+    :rtype: :class:`httpx.Response`
+    :raises httpx.HTTPError: if there are problems executing the
+      request
+    """
+    held = [True]
+
+    def release():
+      if held[0]:
+        held[0] = False
+        self._open_lock.release()
+
+    def trace(event, info):
+      self.count_connections(event, info)
+      if event in HEADERS_SENT_EVENTS:
+        release()
+
+    http2_request.extensions["trace"] = trace
+    self._open_lock.acquire()
+    try:
+      return client.send(http2_request, stream=True)
+    finally:
+      release()
+
+  def send(self, request, stream=False, timeout=None, verify=True,
+           cert=None, proxies=None):
+    """Send a request.
+
+    :param request: Request
+    :type request: :class:`requests.PreparedRequest`
+    :param stream: Ignored, as the response body is always read as it
+      arrives
+    :type stream: bool
+    :param timeout: Timeout in seconds, or connect and read timeouts
+      in seconds, or ``None`` for no timeout
+    :type timeout: float or tuple of (float, float)
+    :return: response
+    :rtype: :class:`requests.Response`
+    :raises requests.exceptions.RequestException: if there are
+      problems executing the request
+    """
+    headers = [(name, value) for (name, value) in request.headers.items()
+               if name.lower() not in HOP_BY_HOP_HEADERS]
+    body = request.body
+    if isinstance(body, type("")):
+      body = body.encode("utf-8")
+    client = self.client
+    with self._lock:
+      self._counters["requests"] += 1
+    try:
+      http2_request = client.build_request(
+        request.method, request.url, headers=headers, content=body,
+        timeout=self.get_timeout(timeout))
+      http2_response = self.open_stream(client, http2_request)
+    except httpx.HTTPError as e:
+      raise translate_error(e, request)
+    response = requests.models.Response()
+    response.status_code = http2_response.status_code
+    response.reason = http2_response.reason_phrase
+    response.headers = requests.structures.CaseInsensitiveDict(
+      http2_response.headers.items())
+    response.encoding = requests.utils.get_encoding_from_headers(
+      response.headers)
+    response.raw = Http2Body(http2_response, request)
+    response.url = request.url
+    response.request = request
+    response.connection = self
+    return response
+
+  def close(self):
+    """Close the client, and its connections, if there is one.
+    """
+    with self._lock:
+      if self._client is not None:
+        self._client.close()
+        self._client = None
+
+  def statistics(self):
+    """Get counters of the requests made and the connections opened.
+
+    :return: ``requests`` and ``connections``
+    :rtype: dict from str or unicode to int
+    """
+    with self._lock:
+      return dict(self._counters)
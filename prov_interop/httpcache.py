@@ -0,0 +1,267 @@
+"""On-disk cache of HTTP responses from services whose responses
+depend only on the request, such as translation services.
+
+Responses are cached for a time-to-live (TTL) unless the response's
+``Cache-Control`` header gives a ``max-age``, or forbids caching
+(``no-store``) or requires revalidation before reuse (``no-cache``).
+A stale response which has an ``ETag`` can be revalidated with an
+``If-None-Match`` request header, and reused if the service responds
+``304 Not Modified``.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import json
+import time
+
+from prov_interop import http
+from prov_interop.cache import DiskCache
+from prov_interop.cache import digest
+from prov_interop.cache import file_digest
+
+TTL = "ttl"
+"""str or unicode: configuration key for time-to-live of responses, in
+seconds"""
+
+DEFAULT_TTL = 24 * 60 * 60
+"""int: default time-to-live of responses, in seconds"""
+
+
+def lifetime(headers, ttl):
+  """Get the time for which a response may be reused without
+  revalidation, from its ``Cache-Control`` header.
+
+  :param headers: Response headers
+  :type headers: dict
+  :param ttl: Time-to-live, in seconds, if the header gives no
+    ``max-age``
+  :type ttl: int or float
+  :return: lifetime in seconds, or ``None`` if the response must not
+    be stored
+  :rtype: int or float
+  """
+  directives = [directive.strip().lower() for directive in
+                headers.get(http.CACHE_CONTROL, "").split(",")]
+  if "no-store" in directives:
+    return None
+  if "no-cache" in directives:
+    return 0
+  for directive in directives:
+    if directive.startswith("max-age="):
+      try:
+        return max(0, int(directive[len("max-age="):].strip('"')))
+      except ValueError:
+        pass
+  return ttl
+
+
+class ResponseCache(object):
+  """Cache of HTTP response bodies held in a
+  :class:`prov_interop.cache.DiskCache`, whose size bounds the cache.
+  Each response is held as two entries: the response body and metadata
+  recording when it was stored, its lifetime and its ``ETag``.
+  """
+
+  def __init__(self, cache, ttl=DEFAULT_TTL):
+    """Create response cache.
+
+    :param cache: Cache holding responses
+    :type cache: :class:`prov_interop.cache.DiskCache`
+    :param ttl: Time-to-live of responses, in seconds
+    :type ttl: int or float
+    """
+    self._cache = cache
+    self._ttl = ttl
+    self._counters = dict([(name, 0) for name in
+                           ["hits", "misses", "revalidated", "stored"]])
+
+  @classmethod
+  def from_config(cls, config):
+    """Create response cache from a configuration. The configuration
+    must hold the configuration of a
+    :class:`prov_interop.cache.DiskCache` and may also hold:
+
+    - ``ttl``: time-to-live of responses, in seconds (optional, default
+      1 day).
+
+    :param config: Configuration
+    :type config: dict
+    :return: response cache
+    :rtype: :class:`ResponseCache`
+    :raises ValueError: if `config` does not hold the above entries
+    """
+    cache = DiskCache.from_config(config)
+    ttl = config.get(TTL, DEFAULT_TTL)
+    if isinstance(ttl, bool) or not isinstance(ttl, (int, float)) or \
+        ttl < 0:
+      raise ValueError(TTL + " must be a non-negative number")
+    return cls(cache, ttl)
+
+  @property
+  def cache(self):
+    """Get the cache holding responses.
+
+    :return: cache
+    :rtype: :class:`prov_interop.cache.DiskCache`
+    """
+    return self._cache
+
+  @property
+  def ttl(self):
+    """Get time-to-live of responses.
+
+    :return: time-to-live in seconds
+    :rtype: int or float
+    """
+    return self._ttl
+
+  def key(self, url, in_file, content_type, accept):
+    """Get cache key for the response to a request whose body is the
+    contents of a file.
+
+    :param url: URL
+    :type url: str or unicode
+    :param in_file: File holding the request body
+    :type in_file: str or unicode
+    :param content_type: ``Content-type`` header value
+    :type content_type: str or unicode
+    :param accept: ``Accept`` header value
+    :type accept: str or unicode
+    :return: hexadecimal digest
+    :rtype: str or unicode
+    :raises IOError: if the file cannot be read
+    """
+    return digest(url, file_digest(in_file), content_type, accept)
+
+  def lookup(self, key):
+    """Get the metadata of a cached response.
+
+    :param key: Key
+    :type key: str or unicode
+    :return: metadata, with ``stored``, ``lifetime`` and ``etag``
+      entries, or ``None`` if there is no cached response
+    :rtype: dict
+    """
+    data = self._cache.get(digest(key, "metadata"))
+    if data is None:
+      return None
+    try:
+      metadata = json.loads(data.decode("utf-8"))
+    except ValueError:
+      return None
+    if not isinstance(metadata, dict) or \
+        not isinstance(metadata.get("stored"), (int, float)) or \
+        not isinstance(metadata.get("lifetime"), (int, float)):
+      return None
+    return metadata
+
+  def is_fresh(self, metadata):
+    """Check whether a cached response may be reused without
+    revalidation.
+
+    :param metadata: Metadata, as returned by :meth:`lookup`
+    :type metadata: dict
+    :return: ``True`` if the response is within its lifetime
+    :rtype: bool
+    """
+    return time.time() < metadata["stored"] + metadata["lifetime"]
+
+  def get(self, key, out_file, metadata):
+    """Copy a cached response body to a file. If `metadata` is not
+    fresh, the response must have been revalidated.
+
+    :param key: Key
+    :type key: str or unicode
+    :param out_file: File name
+    :type out_file: str or unicode
+    :param metadata: Metadata, as returned by :meth:`lookup`
+    :type metadata: dict
+    :return: ``True`` if the body was copied, ``False`` if it has been
+      evicted
+    :rtype: bool
+    """
+    if not self._cache.get_file(key, out_file):
+      return False
+    if self.is_fresh(metadata):
+      self._counters["hits"] += 1
+    else:
+      self._counters["revalidated"] += 1
+    return True
+
+  def put(self, key, headers, out_file):
+    """Cache a response fetched from the service, unless its
+    ``Cache-Control`` header forbids this. The response is counted as
+    a miss.
+
+    :param key: Key
+    :type key: str or unicode
+    :param headers: Response headers
+    :type headers: dict
+    :param out_file: File holding the response body
+    :type out_file: str or unicode
+    :return: ``True`` if the response was cached
+    :rtype: bool
+    :raises IOError: if the file cannot be read
+    """
+    self._counters["misses"] += 1
+    response_lifetime = lifetime(headers, self._ttl)
+    if response_lifetime is None:
+      return False
+    self._cache.put_file(key, out_file)
+    self._put_metadata(key, headers.get(http.ETAG), response_lifetime)
+    self._counters["stored"] += 1
+    return True
+
+  def refresh(self, key, headers, metadata):
+    """Record that a cached response was revalidated, from the headers
+    of a ``304 Not Modified`` response.
+
+    :param key: Key
+    :type key: str or unicode
+    :param headers: Response headers
+    :type headers: dict
+    :param metadata: Metadata, as returned by :meth:`lookup`
+    :type metadata: dict
+    """
+    response_lifetime = lifetime(headers, self._ttl)
+    self._put_metadata(key, headers.get(http.ETAG, metadata.get("etag")),
+                       0 if response_lifetime is None else response_lifetime)
+
+  def _put_metadata(self, key, etag, response_lifetime):
+    metadata = {"stored": time.time(),
+                "lifetime": response_lifetime,
+                "etag": etag}
+    self._cache.put(digest(key, "metadata"),
+                    json.dumps(metadata).encode("utf-8"))
+
+  def statistics(self):
+    """Get counters of responses reused without revalidation (hits),
+    reused after revalidation, not cached or evicted (misses), and
+    stored.
+
+    :return: ``hits``, ``misses``, ``revalidated`` and ``stored``
+    :rtype: dict from str or unicode to int
+    """
+    return dict(self._counters)
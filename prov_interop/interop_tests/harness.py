@@ -26,6 +26,7 @@ from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
 import os
+import time
 
 from prov_interop.harness import HarnessResources
 from prov_interop import component
@@ -63,6 +64,10 @@ def initialise_harness_from_file(file_name = None):
     been defined. 
   - Else, ``localconfig/harness.yaml``.
 
+  The time taken is recorded as a ``harness initialisation`` span
+  by the harness's tracer (see :mod:`prov_interop.trace`), if a
+  ``trace`` file is configured.
+
   The function will not reinitialise the
   :class:`prov_interop.harness.HarnessResources` instance once it has 
   been created and initialised. 
@@ -92,6 +97,7 @@ def initialise_harness_from_file(file_name = None):
   global CONFIGURATION_FILE_ENV
   global DEFAULT_CONFIGURATION_FILE
   if harness_resources is None:
+    start = time.time()
     harness_resources = HarnessResources()
     config = load_yaml(CONFIGURATION_FILE_ENV,
                        DEFAULT_CONFIGURATION_FILE, 
@@ -109,3 +115,6 @@ def initialise_harness_from_file(file_name = None):
       num_test_cases += 1
       print((str(index) + ":" + format1 + "->" + format2))
     print("Total: " + str(num_test_cases))
+    harness_resources.tracer.add("harness initialisation", start,
+                                 time.time(),
+                                 {"test-cases": num_test_cases})
@@ -33,6 +33,7 @@ dynamically creates the test methods (see
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import contextlib
 import inspect
 import os
 import re
@@ -45,9 +46,11 @@ from nose.plugins.skip import SkipTest
 from nose.tools import istest
 from nose.tools import nottest
 
+from prov_interop import events
 from prov_interop import standards
 from prov_interop.component import ConfigError
 from prov_interop.converter import Converter
+from prov_interop.events import format_event
 from prov_interop.files import load_yaml
 from prov_interop.harness import HarnessResources
 from prov_interop.interop_tests import harness
@@ -102,12 +105,53 @@ class ConverterTestCase(unittest.TestCase):
     self.converter = None
     self.skip_tests = []
     self.converter_ext_out = None
+    self.trace_args = {}
 
   def tearDown(self):
     super(ConverterTestCase, self).tearDown()
-    if self.converter_ext_out != None and \
-          os.path.isfile(self.converter_ext_out):
-      os.remove(self.converter_ext_out)
+    with self.phase("cleanup"):
+      if self.converter != None:
+        self.converter.close()
+      if self.converter_ext_out != None and \
+            os.path.isfile(self.converter_ext_out):
+        os.remove(self.converter_ext_out)
+
+  def span(self, name):
+    """Record a span for a phase of the test, via the harness's
+    tracer (see :mod:`prov_interop.trace`), with the test case
+    index, formats and converter, if known, as its information.
+
+    :param name: Phase name
+    :type name: str or unicode
+    :return: context manager
+    :rtype: context manager
+    """
+    return harness.harness_resources.tracer.span(name, self.trace_args)
+
+  @contextlib.contextmanager
+  def phase(self, name):
+    """Record a phase of the test as a span (see :meth:`span`) and as
+    an event, via the harness's event stream (see
+    :mod:`prov_interop.events`), with the test ID, test case index,
+    formats and converter, if known, as its information. The event is
+    also printed, so it appears in the test's output. The ``with``
+    block is given a dictionary in which it can set the event's
+    ``outcome`` and ``message``.
+
+    :param name: Phase name
+    :type name: str or unicode
+    :return: context manager
+    :rtype: context manager
+    """
+    event = None
+    try:
+      with self.span(name):
+        with harness.harness_resources.events.phase(
+            name, dict(self.trace_args, test=self.id())) as event:
+          yield event
+    finally:
+      if event is not None:
+        print(format_event(event))
 
   def shortDescription(self):
     """Suppress use of docstring by nose when printing tests being run"""
@@ -199,7 +243,6 @@ class ConverterTestCase(unittest.TestCase):
     :type index: int
     :raises nose.plugins.skip.SkipTest: always
     """
-    print(("Skipping as " + str(index) + " in skip-tests"))
     raise SkipTest(("Test case " + str(index) +
                     " in " + self.converter.__class__.__name__ + 
                     " skip-tests"))
@@ -219,12 +262,21 @@ class ConverterTestCase(unittest.TestCase):
     :type format_type: str or unicode
     :raises nose.plugins.skip.SkipTest: always
     """
-    print(("Skipping as " + str(index) + " in skip-tests"))
-    print(("Skipping as " + format + " not in converter's " + format_type))
     raise SkipTest(("Format " + format +
                     " not in " + self.converter.__class__.__name__ + 
                     " " + format_type))
 
+  def print_invocations(self, component):
+    """Print the exit code and resource usage of each process run by
+    a converter or comparator since they were last printed.
+
+    :param component: Converter or comparator
+    :type component:
+      :class:`prov_interop.component.ConfigurableComponent`
+    """
+    for invocation in component.pop_invocations():
+      print(("Invocation: " + str(invocation)))
+
   @nottest
   def initialise_test_harness():
     """Initialises the test harness and provide the test cases as a
@@ -269,12 +321,26 @@ class ConverterTestCase(unittest.TestCase):
       ``output-formats`` for the converter then the test is skipped,
       again by raising :class:`nose.plugins.skip.SkipTest`. 
     - The converter translates ``testcaseNNNN/file_ext_in`` to 
-      ``out.ext_out``.
+      ``out.ext_out``. If a ``conversion-cache`` is configured in
+      :class:`prov_interop.harness.HarnessResources` then a cached
+      output is used, if there is one.
     - The comparator for `ext_out` registered with
       :class:`prov_interop.harness.HarnessResources` is retrieved. 
     - The comparator compares ``testcaseNNNN/file.ext_out`` to 
       ``out.ext_out`` for equivalence, which results in either success
-      or failure. 
+      or failure. If a ``comparison-cache`` is configured then a
+      cached result is used, if there is one.
+    - The exit code and resource usage of each process run by the
+      converter and the comparator are printed (see
+      :meth:`print_invocations`), so they appear in the test's
+      output.
+
+    Each phase (``skip evaluation``, ``convert``, ``comparator
+    lookup``, ``compare`` and, in :meth:`tearDown`, ``cleanup``) is
+    printed, with its outcome and the time taken, and is recorded as
+    an event, if an ``events`` file is configured in
+    :class:`prov_interop.harness.HarnessResources`, and as a span, if
+    a ``trace`` file is configured (see :meth:`phase`).
 
     :mod:`nose_parameterized`, in conjunction with the test case
     tuples provided via the generator,
@@ -310,20 +376,55 @@ class ConverterTestCase(unittest.TestCase):
       skipped, or the input format or output format are not supported
       by the converter
     """
-    print(("Test case: " + str(index) + 
-          " from " + ext_in + 
-          " to " + ext_out + " Process: " + str(os.getpid())))
-    if index in self.skip_tests:
-      self.skip_member_of_skip_set(index)
-    if (not ext_in in self.converter.input_formats):
-      self.skip_unsupported_format(index, ext_in, Converter.INPUT_FORMATS)
-    if (not ext_out in self.converter.output_formats):
-      self.skip_unsupported_format(index, ext_out, Converter.OUTPUT_FORMATS)
+    self.trace_args = {"index": index,
+                       "ext-in": ext_in,
+                       "ext-out": ext_out,
+                       "converter": self.converter.__class__.__name__}
+    with self.phase("skip evaluation") as event:
+      try:
+        if index in self.skip_tests:
+          self.skip_member_of_skip_set(index)
+        if (not ext_in in self.converter.input_formats):
+          self.skip_unsupported_format(index, ext_in,
+                                       Converter.INPUT_FORMATS)
+        if (not ext_out in self.converter.output_formats):
+          self.skip_unsupported_format(index, ext_out,
+                                       Converter.OUTPUT_FORMATS)
+      except SkipTest as e:
+        event["outcome"] = events.SKIP
+        event["message"] = str(e)
+        raise
     self.converter_ext_out = "out." + str(os.getpid()) + "." + ext_out
-    self.converter.convert(file_ext_in, self.converter_ext_out)
-    comparator = harness.harness_resources.format_comparators[ext_out]
-    are_equivalent = comparator.compare(file_ext_out, self.converter_ext_out)
-    self.assertTrue(are_equivalent, \
-      msg="Test failed: " + file_ext_out + 
-          " does not match " + self.converter_ext_out + 
-	  " converted from " + file_ext_in)
+    conversion_cache = harness.harness_resources.conversion_cache
+    try:
+      with self.phase("convert"):
+        if conversion_cache is None:
+          self.converter.convert(file_ext_in, self.converter_ext_out)
+        else:
+          conversion_cache.convert(self.converter, file_ext_in,
+                                   self.converter_ext_out)
+    finally:
+      self.print_invocations(self.converter)
+    with self.phase("comparator lookup"):
+      comparator = harness.harness_resources.format_comparators[ext_out]
+    comparison_cache = harness.harness_resources.comparison_cache
+    message = ("Test failed: " + file_ext_out +
+               " does not match " + self.converter_ext_out +
+               " converted from " + file_ext_in)
+    try:
+      with self.phase("compare") as event:
+        if comparison_cache is None:
+          are_equivalent = comparator.compare(file_ext_out,
+                                              self.converter_ext_out)
+        else:
+          are_equivalent = comparison_cache.compare(comparator,
+                                                    file_ext_out,
+                                                    self.converter_ext_out)
+        if are_equivalent:
+          event["outcome"] = events.PASS
+        else:
+          event["outcome"] = events.FAIL
+          event["message"] = message
+    finally:
+      self.print_invocations(comparator)
+    self.assertTrue(are_equivalent, msg=message)
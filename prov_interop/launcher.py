@@ -0,0 +1,211 @@
+"""Launching of command-line processes with resource accounting.
+
+:func:`launch` runs a command-line as a child process, as
+:func:`subprocess.call` does, and records, in an
+:class:`InvocationResult`:
+
+- The exit code.
+- The wall time.
+- The user and system CPU time, and peak resident set size, of the
+  child and any children it waited for (e.g. a Java virtual machine
+  started by a wrapper script), via ``wait4``.
+- The child's I/O counters, from ``/proc/<pid>/io``, which are read
+  once the child has exited but before it is reaped, so that they
+  are final.
+
+CPU times and peak resident set size are only available where
+``os.wait4`` is, and I/O counters are only available on Linux. Those
+that are unavailable are ``None``.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+import subprocess
+import sys
+import time
+
+IO_COUNTERS = ["rchar", "wchar", "syscr", "syscw", "read_bytes",
+               "write_bytes", "cancelled_write_bytes"]
+"""list of str or unicode: counters in ``/proc/<pid>/io``"""
+
+
+class InvocationResult(object):
+  """Exit code and resource usage of a command-line invocation."""
+
+  def __init__(self, command_line, return_code, wall_time,
+               user_time=None, system_time=None, max_rss=None, io=None):
+    """Create invocation result.
+
+    :param command_line: Executable and arguments
+    :type command_line: list of str or unicode
+    :param return_code: Exit code, or the negated signal number if
+      the process was killed by a signal
+    :type return_code: int
+    :param wall_time: Wall time, in seconds
+    :type wall_time: float
+    :param user_time: User CPU time, in seconds
+    :type user_time: float
+    :param system_time: System CPU time, in seconds
+    :type system_time: float
+    :param max_rss: Peak resident set size, in bytes
+    :type max_rss: int
+    :param io: I/O counters keyed by the names in
+      :data:`IO_COUNTERS` e.g. ``rchar``, the bytes read by
+      ``read`` and similar system calls
+    :type io: dict from str or unicode to int
+    """
+    self.command_line = list(command_line)
+    self.return_code = return_code
+    self.wall_time = wall_time
+    self.user_time = user_time
+    self.system_time = system_time
+    self.max_rss = max_rss
+    self.io = io
+
+  def to_dict(self):
+    """Get the invocation result as a dictionary.
+
+    :return: ``command-line``, ``return-code``, ``wall-time``,
+      ``user-time``, ``system-time``, ``max-rss`` and ``io``
+    :rtype: dict
+    """
+    return {"command-line": self.command_line,
+            "return-code": self.return_code,
+            "wall-time": self.wall_time,
+            "user-time": self.user_time,
+            "system-time": self.system_time,
+            "max-rss": self.max_rss,
+            "io": self.io}
+
+  def __str__(self):
+    """Get the invocation result as a one-line summary e.g.::
+
+      prov-convert -f xml in.json out.provx: exit 0, 0.412s wall,
+      0.351s user, 0.042s sys, 45324288 bytes peak RSS, 10240 bytes
+      read, 2048 bytes written
+
+    :return: summary
+    :rtype: str or unicode
+    """
+    parts = ["exit " + str(self.return_code),
+             "%.3fs wall" % self.wall_time]
+    if self.user_time is not None:
+      parts.append("%.3fs user" % self.user_time)
+    if self.system_time is not None:
+      parts.append("%.3fs sys" % self.system_time)
+    if self.max_rss is not None:
+      parts.append(str(self.max_rss) + " bytes peak RSS")
+    if self.io is not None:
+      parts.append(str(self.io.get("rchar")) + " bytes read")
+      parts.append(str(self.io.get("wchar")) + " bytes written")
+    return " ".join(self.command_line) + ": " + ", ".join(parts)
+
+
+def read_io(pid):
+  """Read a process's I/O counters from ``/proc/<pid>/io``.
+
+  :param pid: Process ID
+  :type pid: int
+  :return: counter values keyed by the names in :data:`IO_COUNTERS`,
+    or ``None`` if they cannot be read e.g. if not on Linux
+  :rtype: dict from str or unicode to int
+  """
+  try:
+    with open("/proc/" + str(pid) + "/io", "r") as f:
+      lines = f.readlines()
+  except (IOError, OSError):
+    return None
+  counters = {}
+  for line in lines:
+    (name, _, value) = line.partition(":")
+    if name.strip() in IO_COUNTERS:
+      counters[name.strip()] = int(value)
+  return counters
+
+
+def exit_code(status):
+  """Get the exit code from a wait status, as
+  :attr:`subprocess.Popen.returncode` gives it.
+
+  :param status: Wait status, as returned by ``os.wait4``
+  :type status: int
+  :return: exit code, or the negated signal number if the process was
+    killed by a signal
+  :rtype: int
+  """
+  if os.WIFSIGNALED(status):
+    return -os.WTERMSIG(status)
+  return os.WEXITSTATUS(status)
+
+
+def max_rss(usage):
+  """Get the peak resident set size from resource usage, which is in
+  kilobytes on Linux and bytes on macOS.
+
+  :param usage: Resource usage, as returned by ``os.wait4``
+  :type usage: :class:`resource.struct_rusage`
+  :return: peak resident set size, in bytes
+  :rtype: int
+  """
+  if sys.platform == "darwin":
+    return usage.ru_maxrss
+  return usage.ru_maxrss * 1024
+
+
+def launch(command_line):
+  """Run a command-line as a child process and wait for it to exit.
+  The child inherits the standard input, output and error of this
+  process. If waiting is interrupted, e.g. by
+  :class:`KeyboardInterrupt`, then the child is killed.
+
+  :param command_line: Executable and arguments
+  :type command_line: list of str or unicode
+  :return: invocation result
+  :rtype: :class:`InvocationResult`
+  :raises OSError: if the process cannot be started e.g. the
+    executable is not found
+  """
+  start = time.time()
+  process = subprocess.Popen(command_line)
+  if not hasattr(os, "wait4"):
+    return_code = process.wait()
+    return InvocationResult(command_line, return_code, time.time() - start)
+  io = None
+  try:
+    if hasattr(os, "waitid"):
+      # Wait for the child to exit without reaping it, so its I/O
+      # counters can still be read.
+      os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+      io = read_io(process.pid)
+    (_, status, usage) = os.wait4(process.pid, 0)
+  except BaseException:
+    process.kill()
+    process.wait()
+    raise
+  wall_time = time.time() - start
+  process.returncode = exit_code(status)
+  return InvocationResult(command_line, process.returncode, wall_time,
+                          usage.ru_utime, usage.ru_stime, max_rss(usage), io)
@@ -0,0 +1,330 @@
+"""Metrics in the Prometheus text exposition format.
+
+:class:`Metrics` holds counters, gauges and histograms, each
+identified by a metric name and a set of labels, and renders them in
+the Prometheus text exposition format. :meth:`Metrics.start` writes
+them to a file at intervals, in the manner of the node_exporter
+textfile collector, each write replacing the file atomically so that
+a collector never reads a partially written file.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import math
+import os
+import re
+import sys
+import tempfile
+import threading
+
+COUNTER = "counter"
+"""str or unicode: counter metric type"""
+GAUGE = "gauge"
+"""str or unicode: gauge metric type"""
+HISTOGRAM = "histogram"
+"""str or unicode: histogram metric type"""
+
+PREFIX = "prov_interop_"
+"""str or unicode: prefix of metric names"""
+
+DEFAULT_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5,
+                   10, 30, 60]
+"""list of float: default histogram bucket upper bounds, in seconds"""
+
+DEFAULT_INTERVAL = 15
+"""int or float: default interval between writes, in seconds"""
+
+
+def metric_name(name):
+  """Get a metric name, prefixed with :data:`PREFIX`, from a name
+  which may include characters not allowed in metric names e.g.
+  ``http-requests``.
+
+  :param name: Name
+  :type name: str or unicode
+  :return: metric name e.g. ``prov_interop_http_requests``
+  :rtype: str or unicode
+  """
+  return PREFIX + re.sub("[^a-zA-Z0-9_]", "_", name)
+
+
+def format_value(value):
+  """Format a sample value.
+
+  :param value: Value
+  :type value: int or float
+  :return: formatted value e.g. ``3``, ``0.25`` or ``+Inf``
+  :rtype: str or unicode
+  """
+  if isinstance(value, float):
+    if math.isinf(value):
+      return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+      return str(int(value))
+    return repr(value)
+  return str(value)
+
+
+def format_labels(labels):
+  """Format labels, escaping backslashes, double quotes and new lines
+  in their values.
+
+  :param labels: Label values keyed by label name
+  :type labels: list of tuple of (str or unicode, str or unicode)
+  :return: formatted labels e.g. ``{converter="ProvPy",ext_in="json"}``
+    or an empty string if there are none
+  :rtype: str or unicode
+  """
+  if not labels:
+    return ""
+  return "{" + ",".join([
+    name + "=\"" + str(value).replace("\\", "\\\\").replace(
+      "\"", "\\\"").replace("\n", "\\n") + "\""
+    for (name, value) in labels]) + "}"
+
+
+class Histogram(object):
+  """Counts of observed values falling into buckets, with their sum."""
+
+  def __init__(self, buckets):
+    """Create histogram.
+
+    :param buckets: Bucket upper bounds, in increasing order
+    :type buckets: list of float
+    """
+    self.buckets = list(buckets)
+    self.counts = [0] * len(self.buckets)
+    self.count = 0
+    self.sum = 0.0
+
+  def observe(self, value):
+    """Record an observed value.
+
+    :param value: Value
+    :type value: int or float
+    """
+    for (index, bound) in enumerate(self.buckets):
+      if value <= bound:
+        self.counts[index] += 1
+    self.count += 1
+    self.sum += value
+
+
+class Metrics(object):
+  """Counters, gauges and histograms, rendered in the Prometheus text
+  exposition format. Metrics can be updated by many threads.
+  """
+
+  def __init__(self, buckets=None):
+    """Create metrics.
+
+    :param buckets: Histogram bucket upper bounds, in increasing order
+      (default :data:`DEFAULT_BUCKETS`)
+    :type buckets: list of float
+    """
+    self._buckets = DEFAULT_BUCKETS if buckets is None else buckets
+    self._families = {}
+    self._lock = threading.Lock()
+    self._file_name = None
+    self._thread = None
+    self._stopped = threading.Event()
+
+  def _samples(self, name, metric_type, help_text):
+    """Get the samples of a metric, keyed by labels, creating the
+    metric if it does not exist. The lock must be held.
+
+    :param name: Metric name
+    :type name: str or unicode
+    :param metric_type: Metric type
+    :type metric_type: str or unicode
+    :param help_text: Description of the metric
+    :type help_text: str or unicode
+    :return: samples
+    :rtype: dict
+    :raises ValueError: if the metric exists with a different type
+    """
+    if name not in self._families:
+      self._families[name] = (metric_type, help_text, {})
+    (existing_type, _, samples) = self._families[name]
+    if existing_type != metric_type:
+      raise ValueError(name + " is a " + existing_type)
+    return samples
+
+  @staticmethod
+  def _key(labels):
+    """Get labels as a sorted tuple, for use as a key.
+
+    :param labels: Label values keyed by label name
+    :type labels: dict
+    :return: labels
+    :rtype: tuple of tuple of (str or unicode, str or unicode)
+    """
+    return tuple(sorted((labels or {}).items()))
+
+  def inc(self, name, labels=None, value=1, help_text=""):
+    """Increment a counter.
+
+    :param name: Metric name
+    :type name: str or unicode
+    :param labels: Label values keyed by label name (optional)
+    :type labels: dict
+    :param value: Increment
+    :type value: int or float
+    :param help_text: Description of the metric
+    :type help_text: str or unicode
+    :raises ValueError: if the metric exists and is not a counter
+    """
+    with self._lock:
+      samples = self._samples(name, COUNTER, help_text)
+      key = self._key(labels)
+      samples[key] = samples.get(key, 0) + value
+
+  def set(self, name, labels=None, value=0, metric_type=GAUGE,
+          help_text=""):
+    """Set a gauge, or a counter whose total is known e.g. from
+    another process's counters.
+
+    :param name: Metric name
+    :type name: str or unicode
+    :param labels: Label values keyed by label name (optional)
+    :type labels: dict
+    :param value: Value
+    :type value: int or float
+    :param metric_type: :data:`GAUGE` or :data:`COUNTER`
+    :type metric_type: str or unicode
+    :param help_text: Description of the metric
+    :type help_text: str or unicode
+    :raises ValueError: if the metric exists with a different type
+    """
+    with self._lock:
+      self._samples(name, metric_type, help_text)[self._key(labels)] = value
+
+  def observe(self, name, labels=None, value=0, help_text=""):
+    """Record a value in a histogram.
+
+    :param name: Metric name
+    :type name: str or unicode
+    :param labels: Label values keyed by label name (optional)
+    :type labels: dict
+    :param value: Value
+    :type value: int or float
+    :param help_text: Description of the metric
+    :type help_text: str or unicode
+    :raises ValueError: if the metric exists and is not a histogram
+    """
+    with self._lock:
+      samples = self._samples(name, HISTOGRAM, help_text)
+      key = self._key(labels)
+      if key not in samples:
+        samples[key] = Histogram(self._buckets)
+      samples[key].observe(value)
+
+  def render(self):
+    """Render the metrics in the Prometheus text exposition format.
+
+    :return: metrics
+    :rtype: str or unicode
+    """
+    lines = []
+    with self._lock:
+      for name in sorted(self._families):
+        (metric_type, help_text, samples) = self._families[name]
+        if help_text:
+          lines.append("# HELP " + name + " " +
+                       help_text.replace("\\", "\\\\").replace("\n", "\\n"))
+        lines.append("# TYPE " + name + " " + metric_type)
+        for key in sorted(samples):
+          if metric_type != HISTOGRAM:
+            lines.append(name + format_labels(key) + " " +
+                         format_value(samples[key]))
+            continue
+          histogram = samples[key]
+          for (bound, count) in zip(histogram.buckets + [float("inf")],
+                                    histogram.counts + [histogram.count]):
+            lines.append(name + "_bucket" +
+                         format_labels(key + (("le", format_value(
+                           float(bound))),)) + " " + str(count))
+          lines.append(name + "_sum" + format_labels(key) + " " +
+                       format_value(histogram.sum))
+          lines.append(name + "_count" + format_labels(key) + " " +
+                       str(histogram.count))
+    return "".join([line + "\n" for line in lines])
+
+  def write(self, file_name):
+    """Write the metrics to a file, replacing it atomically.
+
+    :param file_name: File name e.g. ``prov_interop.prom``
+    :type file_name: str or unicode
+    :raises OSError: if the file cannot be written
+    """
+    directory = os.path.dirname(os.path.abspath(file_name))
+    (handle, temp_file) = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+      with os.fdopen(handle, "wb") as f:
+        f.write(self.render().encode("utf-8"))
+      os.chmod(temp_file, 0o644)
+      os.rename(temp_file, file_name)
+    except BaseException:
+      os.remove(temp_file)
+      raise
+
+  def start(self, file_name, interval=DEFAULT_INTERVAL):
+    """Write the metrics to a file every `interval` seconds, from a
+    background thread, until :meth:`stop` is called. If a write fails
+    then a warning is printed, and the next write is tried after the
+    interval.
+
+    :param file_name: File name
+    :type file_name: str or unicode
+    :param interval: Interval between writes, in seconds
+    :type interval: int or float
+    """
+    self._stopped.clear()
+
+    def write_periodically():
+      while not self._stopped.wait(interval):
+        try:
+          self.write(file_name)
+        except (IOError, OSError) as e:
+          print("Failed to write metrics to " + file_name + ": " + str(e),
+                file=sys.stderr)
+
+    self._file_name = file_name
+    self._thread = threading.Thread(target=write_periodically)
+    self._thread.daemon = True
+    self._thread.start()
+
+  def stop(self):
+    """Stop writing the metrics at intervals, then write them a final
+    time.
+
+    :raises OSError: if the file cannot be written
+    """
+    if self._thread is None:
+      return
+    self._stopped.set()
+    self._thread.join()
+    self._thread = None
+    self.write(self._file_name)
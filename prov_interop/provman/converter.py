@@ -26,7 +26,6 @@ from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
 import os.path
-import subprocess
 
 from prov_interop.component import CommandLineComponent
 from prov_interop.component import ConfigError
@@ -105,23 +104,45 @@ class ProvManConverter(Converter, CommandLineComponent):
           e.g. the script is not found
         """
         super(ProvManConverter, self).convert(in_file, out_file)
-        in_format = os.path.splitext(in_file)[1][1:]
-        out_format = os.path.splitext(out_file)[1][1:]
-        super(ProvManConverter, self).check_formats(in_format, out_format)
-        command_line = list(self._executable)
-        command_line.extend(self._arguments)
-        command_line = [in_file if x == ProvManConverter.INPUT else x
-                        for x in command_line]
-        command_line = [out_file if x == ProvManConverter.OUTPUT else x
-                        for x in command_line]
-        command_line = [in_format if x == ProvManConverter.INFORMAT else x
-                        for x in command_line]
-        command_line = [out_format if x == ProvManConverter.OUTFORMAT else x
-                        for x in command_line]
-        print((" ".join(command_line)))
-        return_code = subprocess.call(command_line)
+        command_line = self.command_line(self.tokens(in_file, out_file))
+        return_code = self.call(command_line)
         if return_code != 0:
             raise ConversionError(" ".join(command_line) +
                                   " returned " + str(return_code))
-        if not os.path.isfile(out_file):
-            raise ConversionError("Output file not found: " + out_file)
+        self.check_output(in_file, out_file)
+
+    def tokens(self, in_file, out_file):
+        """Get values for ``INPUT``, ``OUTPUT``, ``INFORMAT`` and
+        ``OUTFORMAT`` tokens.
+
+        :param in_file: Input file
+        :type in_file: str or unicode
+        :param out_file: Output file
+        :type out_file: str or unicode
+        :return: token values keyed by token
+        :rtype: dict
+        :raises ConversionError: if the input or output format is not
+          supported
+        """
+        in_format = os.path.splitext(in_file)[1][1:]
+        out_format = os.path.splitext(out_file)[1][1:]
+        super(ProvManConverter, self).check_formats(in_format, out_format)
+        return {ProvManConverter.INPUT: in_file,
+                ProvManConverter.OUTPUT: out_file,
+                ProvManConverter.INFORMAT: in_format,
+                ProvManConverter.OUTFORMAT: out_format}
+
+    def convert_batch(self, files):
+        """Convert many input files into output files. If batch
+        invocation is configured (see
+        :class:`prov_interop.component.CommandLineComponent`) then files
+        are converted in batches, otherwise :meth:`convert` is called
+        for each pair of files in turn.
+
+        :param files: Input and output file pairs
+        :type files: list of tuple of (str or unicode, str or unicode)
+        :return: for each pair, ``None`` if the conversion succeeded or
+          the exception raised if it failed
+        :rtype: list of ``None`` or :class:`Exception`
+        """
+        return self.invoke_batch(files, self.convert, self.check_output)
@@ -26,7 +26,6 @@ from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
 import os.path
-import subprocess
 
 from prov_interop import standards
 from prov_interop.component import CommandLineComponent
@@ -118,24 +117,48 @@ class ProvPyConverter(Converter, CommandLineComponent):
       e.g. the script is not found
     """
     super(ProvPyConverter, self).convert(in_file, out_file)
+    command_line = self.command_line(self.tokens(in_file, out_file))
+    return_code = self.call(command_line)
+    if return_code != 0:
+      raise ConversionError(" ".join(command_line) + \
+                              " returned " + str(return_code))
+    self.check_output(in_file, out_file)
+
+  def tokens(self, in_file, out_file):
+    """Get values for ``FORMAT``, ``INPUT`` and ``OUTPUT`` tokens.
+    If the output format is ``provx`` then ``xml`` is used as
+    ``FORMAT``.
+
+    :param in_file: Input file
+    :type in_file: str or unicode
+    :param out_file: Output file
+    :type out_file: str or unicode
+    :return: token values keyed by token
+    :rtype: dict
+    :raises ConversionError: if the input or output format is not
+      supported
+    """
     in_format = os.path.splitext(in_file)[1][1:]
     out_format = os.path.splitext(out_file)[1][1:]
     super(ProvPyConverter, self).check_formats(in_format, out_format)
     local_format = out_format
     if (out_format in ProvPyConverter.LOCAL_FORMATS):
       local_format = ProvPyConverter.LOCAL_FORMATS[out_format]
-    command_line = list(self._executable)
-    command_line.extend(self._arguments)
-    command_line = [local_format if x==ProvPyConverter.FORMAT else x 
-                    for x in command_line]
-    command_line = [in_file if x==ProvPyConverter.INPUT else x 
-                    for x in command_line]
-    command_line = [out_file if x==ProvPyConverter.OUTPUT else x 
-                    for x in command_line]
-    print((" ".join(command_line)))
-    return_code = subprocess.call(command_line)
-    if return_code != 0:
-      raise ConversionError(" ".join(command_line) + \
-                              " returned " + str(return_code))
-    if not os.path.isfile(out_file):
-      raise ConversionError("Output file not found: " + out_file)
+    return {ProvPyConverter.FORMAT: local_format,
+            ProvPyConverter.INPUT: in_file,
+            ProvPyConverter.OUTPUT: out_file}
+
+  def convert_batch(self, files):
+    """Convert many input files into output files. If batch invocation
+    is configured (see
+    :class:`prov_interop.component.CommandLineComponent`) then files
+    are converted in batches, otherwise :meth:`convert` is called for
+    each pair of files in turn.
+
+    :param files: Input and output file pairs
+    :type files: list of tuple of (str or unicode, str or unicode)
+    :return: for each pair, ``None`` if the conversion succeeded or
+      the exception raised if it failed
+    :rtype: list of ``None`` or :class:`Exception`
+    """
+    return self.invoke_batch(files, self.convert, self.check_output)
@@ -0,0 +1,331 @@
+"""Manages invocation of the ProvPy ``prov`` library within the
+harness process, for conversion and comparison.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import io
+import os.path
+
+from prov.model import ProvDocument
+
+from prov_interop import standards
+from prov_interop.cache import LRUCache
+from prov_interop.comparator import ComparisonError
+from prov_interop.comparator import Comparator
+from prov_interop.component import ConfigError
+from prov_interop.converter import ConversionError
+from prov_interop.converter import Converter
+from prov_interop.provpy.converter import ProvPyConverter
+
+RDF_FORMATS = {
+  standards.TTL: "turtle",
+  standards.TRIG: "trig"
+}
+"""dict: mapping from RDF formats in :mod:`prov_interop.standards` to
+``rdflib`` format names, used with the ``prov`` library's ``rdf``
+format
+"""
+
+CACHE_SIZE = "cache-size"
+"""str or unicode: configuration key for the maximum number of parsed
+documents to cache"""
+
+DEFAULT_CACHE_SIZE = 32
+"""int: default maximum number of parsed documents to cache"""
+
+
+def serializer_arguments(format):
+  """Get the ``prov`` library format name and any additional arguments
+  for serializing or deserializing a format. Formats are mapped using
+  :data:`prov_interop.provpy.converter.ProvPyConverter.LOCAL_FORMATS`,
+  and ``ttl`` and ``trig`` use the ``rdf`` format.
+
+  :param format: Format from :mod:`prov_interop.standards`
+  :type format: str or unicode
+  :return: arguments for ``ProvDocument.serialize`` or
+    ``ProvDocument.deserialize``
+  :rtype: dict
+  """
+  if format in RDF_FORMATS:
+    return {"format": "rdf", "rdf_format": RDF_FORMATS[format]}
+  return {"format": ProvPyConverter.LOCAL_FORMATS.get(format, format)}
+
+
+def parse(file_name):
+  """Parse a document, its format being derived from its file
+  extension.
+
+  :param file_name: File name
+  :type file_name: str or unicode
+  :return: document
+  :rtype: :class:`prov.model.ProvDocument`
+  :raises Exception: if the document cannot be parsed
+  """
+  format = os.path.splitext(file_name)[1][1:]
+  return ProvDocument.deserialize(source=file_name,
+                                  **serializer_arguments(format))
+
+
+def cache_key(file_name):
+  """Get key for caching a parsed document.
+
+  :param file_name: File name
+  :type file_name: str or unicode
+  :return: absolute file name and modification time
+  :rtype: tuple of (str or unicode, float)
+  """
+  return (os.path.abspath(file_name), os.path.getmtime(file_name))
+
+
+def get_cache_size(config):
+  """Get the cache size from a configuration.
+
+  :param config: Configuration
+  :type config: dict
+  :return: cache size
+  :rtype: int
+  :raises ConfigError: if the cache size is not a positive integer
+  """
+  size = config.get(CACHE_SIZE, DEFAULT_CACHE_SIZE)
+  if type(size) is not int or size < 1:
+    raise ConfigError(CACHE_SIZE + " must be a positive integer")
+  return size
+
+
+class ProvPyLibraryConverter(Converter):
+  """Converts documents using the ProvPy ``prov`` library's
+  deserialize and serialize API in the harness process, rather than
+  by invoking ``prov-convert``.
+
+  Parsed input documents are kept in a bounded least-recently-used
+  cache keyed by file name and modification time, so an input file
+  converted into many output formats is parsed once.
+  """
+
+  RUNTIME_KEYS = Converter.RUNTIME_KEYS + [CACHE_SIZE]
+  """list of str or unicode: configuration keys excluded from
+  :meth:`fingerprint`"""
+
+  def __init__(self):
+    """Create converter.
+    """
+    super(ProvPyLibraryConverter, self).__init__()
+    self._cache = LRUCache(DEFAULT_CACHE_SIZE)
+
+  @property
+  def cache(self):
+    """Get cache of parsed input documents.
+
+    :return: cache
+    :rtype: :class:`prov_interop.cache.LRUCache`
+    """
+    return self._cache
+
+  def configure(self, config):
+    """Configure converter. The configuration must hold:
+
+    - :class:`prov_interop.converter.Converter` configuration
+
+    It may also hold:
+
+    - ``cache-size``: maximum number of parsed input documents to
+      cache (optional, default 32).
+
+    A valid configuration is::
+
+      {
+        "input-formats": ["json"],
+        "output-formats": ["provn", "provx", "json"],
+        "cache-size": 64
+      }
+
+    :param config: Configuration
+    :type config: dict
+    :raises ConfigError: if `config` does not hold the above entries
+    """
+    super(ProvPyLibraryConverter, self).configure(config)
+    self._cache = LRUCache(get_cache_size(config))
+
+  def load(self, in_file):
+    """Load a document, using the cache if it has been parsed before
+    and not modified since.
+
+    :param in_file: Input file
+    :type in_file: str or unicode
+    :return: document
+    :rtype: :class:`prov.model.ProvDocument`
+    :raises Exception: if the document cannot be parsed
+    """
+    key = cache_key(in_file)
+    document = self._cache.get(key)
+    if document is None:
+      document = parse(in_file)
+      self._cache.put(key, document)
+    return document
+
+  def statistics(self):
+    """Get cache counters, prefixed by ``cache-``.
+
+    :return: counter values keyed by counter name
+    :rtype: dict from str or unicode to int
+    """
+    return dict([("cache-" + key, value)
+                 for (key, value) in self._cache.statistics().items()])
+
+  def convert(self, in_file, out_file):
+    """Convert input file into output file.
+
+    - Input and output formats are derived from `in_file` and
+      `out_file` file extensions.
+    - A check is done to see that `in_file` exists and that the input
+      and output format are in ``input-formats`` and
+      ``output-formats`` respectively.
+    - The input document is parsed, or got from the cache, and
+      serialized in the output format. As for ``prov-convert``,
+      ``provn`` is written using ``ProvDocument.get_provn``.
+
+    :param in_file: Input file
+    :type in_file: str or unicode
+    :param out_file: Output file
+    :type out_file: str or unicode
+    :raises ConversionError: if the input file cannot be found, or
+      the ``prov`` library cannot parse or serialize the document
+    """
+    super(ProvPyLibraryConverter, self).convert(in_file, out_file)
+    in_format = os.path.splitext(in_file)[1][1:]
+    out_format = os.path.splitext(out_file)[1][1:]
+    super(ProvPyLibraryConverter, self).check_formats(in_format, out_format)
+    try:
+      document = self.load(in_file)
+      if out_format == standards.PROVN:
+        with io.open(out_file, "w", encoding="utf-8") as f:
+          f.write(document.get_provn())
+      else:
+        document.serialize(out_file, **serializer_arguments(out_format))
+    except Exception as e:
+      if os.path.isfile(out_file):
+        os.remove(out_file)
+      raise ConversionError("Cannot convert " + in_file + " to " +
+                            out_file + ": " + e.__class__.__name__ +
+                            ": " + str(e))
+
+
+class ProvPyLibraryComparator(Comparator):
+  """Compares documents using the ProvPy ``prov`` library in the
+  harness process, rather than by invoking ``prov-compare``. As for
+  ``prov-compare``, documents are equivalent if the parsed
+  ``ProvDocument`` objects are equal.
+
+  The test procedure compares each expected document, `file1`, with
+  many converted documents, `file2`. Parsed `file1` documents are kept
+  in a bounded least-recently-used cache keyed by file name and
+  modification time, so only `file2` is parsed on each call.
+  """
+
+  RUNTIME_KEYS = Comparator.RUNTIME_KEYS + [CACHE_SIZE]
+  """list of str or unicode: configuration keys excluded from
+  :meth:`fingerprint`"""
+
+  def __init__(self):
+    """Create comparator.
+    """
+    super(ProvPyLibraryComparator, self).__init__()
+    self._cache = LRUCache(DEFAULT_CACHE_SIZE)
+
+  @property
+  def cache(self):
+    """Get cache of parsed `file1` documents.
+
+    :return: cache
+    :rtype: :class:`prov_interop.cache.LRUCache`
+    """
+    return self._cache
+
+  def configure(self, config):
+    """Configure comparator. The configuration must hold:
+
+    - :class:`prov_interop.comparator.Comparator` configuration
+
+    It may also hold:
+
+    - ``cache-size``: maximum number of parsed documents to cache
+      (optional, default 32).
+
+    A valid configuration is::
+
+      {
+        "formats": ["provn", "json"],
+        "cache-size": 256
+      }
+
+    :param config: Configuration
+    :type config: dict
+    :raises ConfigError: if `config` does not hold the above entries
+    """
+    super(ProvPyLibraryComparator, self).configure(config)
+    self._cache = LRUCache(get_cache_size(config))
+
+  def compare(self, file1, file2):
+    """Compare files.
+
+    - File formats are derived from `file1` and `file2` file
+      extensions.
+    - A check is done to see that `file1` and `file2` exist and that
+      their formats are in ``formats``.
+    - `file1` is parsed, or got from the cache, and `file2` is parsed.
+
+    :param file1: File, usually an expected document
+    :type file1: str or unicode
+    :param file2: File, usually a converted document
+    :type file2: str or unicode
+    :return: ``True`` or ``False``
+    :rtype: bool
+    :raises ComparisonError: if either of the files cannot be found
+      or parsed, or their formats are not supported
+    """
+    super(ProvPyLibraryComparator, self).compare(file1, file2)
+    for file_name in [file1, file2]:
+      self.check_format(os.path.splitext(file_name)[1][1:])
+    try:
+      key = cache_key(file1)
+      document1 = self._cache.get(key)
+      if document1 is None:
+        document1 = parse(file1)
+        self._cache.put(key, document1)
+      document2 = parse(file2)
+    except Exception as e:
+      raise ComparisonError("Cannot compare " + file1 + " with " + file2 +
+                            ": " + e.__class__.__name__ + ": " + str(e))
+    return document1 == document2
+
+  def statistics(self):
+    """Get cache counters, prefixed by ``cache-``.
+
+    :return: counter values keyed by counter name
+    :rtype: dict from str or unicode to int
+    """
+    return dict([("cache-" + key, value)
+                 for (key, value) in self._cache.statistics().items()])
@@ -25,18 +25,69 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import io
 import json
-import os
 import os.path
 import requests
+import threading
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
 
 from prov_interop import http
 from prov_interop import standards
+from prov_interop.cache import file_digest
 from prov_interop.component import ConfigError
 from prov_interop.component import RestComponent
 from prov_interop.converter import ConversionError
 from prov_interop.converter import Converter
 
+class StoreRequestBody(object):
+  """Body of a ProvStore request to store a document, a JSON object
+  holding the document's content. The body is produced, and its length
+  computed, by reading the document ``RestComponent.CHUNK_SIZE``
+  characters at a time, so the document is not held in memory. The
+  body can be iterated over many times, so a request can be retried.
+  """
+
+  def __init__(self, in_file, fields):
+    """Create body.
+
+    :param in_file: Input file, holding UTF-8 text
+    :type in_file: str or unicode
+    :param fields: Values of the object's other keys
+    :type fields: dict
+    :raises IOError: if the file cannot be read
+    :raises UnicodeDecodeError: if the file is not valid UTF-8
+    """
+    self._in_file = in_file
+    # The document is the value of the last key, so the other values
+    # are serialized as the prefix.
+    fields = json.dumps(fields, sort_keys=True)
+    self._prefix = (fields[:-1] + (", " if len(fields) > 2 else "") +
+                    json.dumps(ProvStoreConverter.CONTENT) +
+                    ": \"").encode("utf-8")
+    self._suffix = "\"}".encode("utf-8")
+    self._length = len(self._prefix) + len(self._suffix) + \
+        sum([len(chunk) for chunk in self._content()])
+
+  def _content(self):
+    with io.open(self._in_file, "r", encoding="utf-8") as f:
+      while True:
+        chunk = f.read(RestComponent.CHUNK_SIZE)
+        if not chunk:
+          break
+        yield json.dumps(chunk)[1:-1].encode("utf-8")
+
+  def __len__(self):
+    return self._length
+
+  def __iter__(self):
+    yield self._prefix
+    for chunk in self._content():
+      yield chunk
+    yield self._suffix
+
+
 class ProvStoreConverter(Converter, RestComponent):
   """Manages invocation of ProvStore service."""
 
@@ -64,12 +115,25 @@ class ProvStoreConverter(Converter, RestComponent):
   """str or unicode: configuration key for ProvStore Authorization 
   HTTP header value
   """
+  UPLOAD_ONCE = "upload-once"
+  """str or unicode: configuration key for whether each input document
+  is stored once, for all output formats
+  """
+  RUNTIME_KEYS = RestComponent.RUNTIME_KEYS + [UPLOAD_ONCE]
+  """list of str or unicode: configuration keys excluded from
+  :meth:`fingerprint`"""
 
   def __init__(self):
     """Create converter.
     """
     super(ProvStoreConverter, self).__init__()
     self._authorization = ""
+    self._upload_once = False
+    # Futures of the URLs of documents stored in upload-once mode, keyed
+    # by document_key, guarded by _lock.
+    self._documents = {}
+    self._lock = threading.Lock()
+    self._uploads = 0
 
   @property
   def authorization(self):
@@ -80,6 +144,40 @@ class ProvStoreConverter(Converter, RestComponent):
     """
     return self._authorization
 
+  @property
+  def upload_once(self):
+    """Get whether each input document is stored once, for all output
+    formats.
+
+    :return: upload once flag
+    :rtype: bool
+    """
+    return self._upload_once
+
+  @property
+  def group_by_input(self):
+    """Get whether test case tuples with the same input file are
+    converted together. This is so if ``upload-once`` is set.
+
+    :return: upload once flag
+    :rtype: bool
+    """
+    return self._upload_once
+
+  @property
+  def batch_size(self):
+    """Get the maximum number of conversions handled by
+    :meth:`convert_batch`. If ``upload-once`` is set, this is enough
+    for ``pool-size`` input documents, each converted into every output
+    format, else 1.
+
+    :return: batch size
+    :rtype: int
+    """
+    if not self._upload_once:
+      return 1
+    return self._pool_size * max(1, len(self._output_formats))
+
   def configure(self, config):
     """Configure converter. The configuration must hold:
 
@@ -99,13 +197,150 @@ class ProvStoreConverter(Converter, RestComponent):
         "output-formats": ["provn", "ttl", "trig", "provx", "json"]
       }
 
+    The configuration may also hold:
+
+    - ``upload-once``: if ``true`` then each input document is stored
+      once, and fetched in every output format, rather than being
+      stored, fetched and deleted for each output format (optional,
+      default ``false``). Stored documents are deleted when the
+      converter is closed.
+
     :param config: Configuration
     :type config: dict
     :raises ConfigError: if `config` does not hold the above entries
     """
     super(ProvStoreConverter, self).configure(config)
     self.check_configuration([ProvStoreConverter.AUTHORIZATION])
+    upload_once = config.get(ProvStoreConverter.UPLOAD_ONCE, False)
+    if not isinstance(upload_once, bool):
+      raise ConfigError(ProvStoreConverter.UPLOAD_ONCE +
+                        " must be true or false")
     self._authorization = config[ProvStoreConverter.AUTHORIZATION]
+    self._upload_once = upload_once
+
+  def store(self, in_file):
+    """Store a document in ProvStore, streaming its contents.
+
+    :param in_file: Input file
+    :type in_file: str or unicode
+    :return: URL of the stored document
+    :rtype: str or unicode
+    :raises ConversionError: if the HTTP response is not 201
+    :raises requests.exceptions.ConnectionError: if there are
+      problems executing the request e.g. the URL cannot be found
+    """
+    in_format = os.path.splitext(in_file)[1][1:]
+    content_type = ProvStoreConverter.CONTENT_TYPES[in_format]
+    accept_type = ProvStoreConverter.CONTENT_TYPES[standards.JSON]
+    headers = {http.CONTENT_TYPE: content_type, 
+               http.ACCEPT: accept_type,
+               http.AUTHORIZATION: self._authorization}
+    store_request = StoreRequestBody(
+      in_file,
+      {ProvStoreConverter.PUBLIC: False,
+       ProvStoreConverter.REC_ID: os.path.basename(in_file)})
+    response = self.request("POST", self._url,
+                            headers=headers,
+                            data=store_request)
+    if (response.status_code != requests.codes.created): # 201 CREATED
+      raise ConversionError(self._url + " POST returned " + 
+                            str(response.status_code))
+    response_json = json.loads(response.text)
+    document_id = response_json[ProvStoreConverter.ID]
+    return self._url + str(document_id)
+
+  def fetch(self, doc_url, out_file):
+    """Get a stored document in the format of `out_file` and stream it
+    to `out_file`.
+
+    :param doc_url: URL of the stored document
+    :type doc_url: str or unicode
+    :param out_file: Output file
+    :type out_file: str or unicode
+    :raises ConversionError: if the HTTP response is not 200
+    :raises requests.exceptions.ConnectionError: if there are
+      problems executing the request e.g. the URL cannot be found
+    """
+    out_format = os.path.splitext(out_file)[1][1:]
+    accept_type = ProvStoreConverter.CONTENT_TYPES[out_format]
+    headers = {http.ACCEPT: accept_type,
+               http.AUTHORIZATION: self._authorization}
+    response = self.request("GET", doc_url + "." + out_format,
+                            headers=headers,
+                            allow_redirects=True,
+                            stream=True)
+    if (response.status_code != requests.codes.ok): # 200 OK
+      response.close()
+      raise ConversionError(doc_url + " GET returned " + 
+                            str(response.status_code))
+    self.download(response, out_file)
+
+  def delete(self, doc_url):
+    """Delete a stored document.
+
+    :param doc_url: URL of the stored document
+    :type doc_url: str or unicode
+    :raises ConversionError: if the HTTP response is not 204
+    :raises requests.exceptions.ConnectionError: if there are
+      problems executing the request e.g. the URL cannot be found
+    """
+    headers = {http.AUTHORIZATION: self._authorization}
+    response = self.request("DELETE", doc_url, headers=headers)
+    if (response.status_code != requests.codes.no_content): # 204 NO CONTENT
+      raise ConversionError(doc_url + " DELETE returned " + 
+                            str(response.status_code))
+
+  def document_key(self, in_file):
+    """Get the key under which a document stored in ``upload-once``
+    mode is recorded. This is the input format and a digest of the
+    file's contents, so input files with the same contents are stored
+    once.
+
+    :param in_file: Input file
+    :type in_file: str or unicode
+    :return: key
+    :rtype: tuple of (str or unicode, str or unicode)
+    :raises IOError: if the file cannot be read
+    """
+    return (os.path.splitext(in_file)[1][1:], file_digest(in_file))
+
+  def stored_document(self, key, in_file):
+    """Get the URL of the document stored in ``upload-once`` mode
+    under `key`. If no document is stored, or being stored, under
+    `key`, then `in_file` is stored. Otherwise, the URL of the
+    document is awaited, so concurrent conversions of the same input
+    store it once. If storing the document fails then each conversion
+    awaiting it raises the same exception, and a later conversion
+    tries to store it again.
+
+    :param key: Key, as returned by :meth:`document_key`
+    :type key: tuple of (str or unicode, str or unicode)
+    :param in_file: Input file
+    :type in_file: str or unicode
+    :return: URL of the stored document
+    :rtype: str or unicode
+    :raises ConversionError: if the HTTP response is not 201
+    :raises requests.exceptions.ConnectionError: if there are
+      problems executing the request e.g. the URL cannot be found
+    """
+    with self._lock:
+      future = self._documents.get(key)
+      store = future is None
+      if store:
+        future = Future()
+        self._documents[key] = future
+    if store:
+      try:
+        doc_url = self.store(in_file)
+      except Exception as e:
+        with self._lock:
+          del self._documents[key]
+        future.set_exception(e)
+        raise
+      with self._lock:
+        self._uploads += 1
+      future.set_result(doc_url)
+    return future.result()
 
   def convert(self, in_file, out_file):
     """Convert input file into output file. 
@@ -118,9 +353,9 @@ class ProvStoreConverter(Converter, RestComponent):
     - The input and output formats and ``authorization`` are used to
       set HTTP ``Content-type``, ``Accept`` and ``Authorization``
       header values, respectively.  
-    - The contents of `in_file` are loaded and used to create a
-      ProvStore compliant HTTP POST request which is submitted to
-      ``url``, to store the document. 
+    - The contents of `in_file` are streamed, within a JSON object, as
+      the body of a ProvStore compliant HTTP POST request which is
+      submitted to ``url``, to store the document. 
     - The HTTP status is checked to be 201 CREATED.
     - The HTTP response is parsed to get the URL of the newly-stored
       document. 
@@ -129,12 +364,15 @@ class ProvStoreConverter(Converter, RestComponent):
     - An HTTP GET request is submitted to the URL of the new document
       to get it in the desired output format. 
     - The HTTP status is checked to to be 200 OK.
-    - The HTTP response is parsed to get the converted document, and
-      this is saved to `out_file`. 
+    - The converted document, the HTTP response body, is streamed to
+      `out_file`. 
     - An HTTP DELETE request is submitted to the URL of the
       newly-stored document to remove it. 
     - The HTTP status is checked to to be 204 NO CONTENT.
 
+    If ``upload-once`` is set then a document already stored for a
+    file with the same format and contents as `in_file` is used, and
+    the document is deleted by :meth:`close`, rather than here.
 
     :param in_file: Input file
     :type in_file: str or unicode
@@ -149,42 +387,90 @@ class ProvStoreConverter(Converter, RestComponent):
     in_format = os.path.splitext(in_file)[1][1:]
     out_format = os.path.splitext(out_file)[1][1:]
     super(ProvStoreConverter, self).check_formats(in_format, out_format)
-    # Store document
-    with open(in_file, "r") as f:
-      doc = f.read()
-    content_type = ProvStoreConverter.CONTENT_TYPES[in_format]
-    accept_type = ProvStoreConverter.CONTENT_TYPES[standards.JSON]
-    headers = {http.CONTENT_TYPE: content_type, 
-               http.ACCEPT: accept_type,
-               http.AUTHORIZATION: self._authorization}
-    store_request = {ProvStoreConverter.CONTENT: doc, 
-                     ProvStoreConverter.PUBLIC: False,
-                     ProvStoreConverter.REC_ID: str(os.getpid()) + "." + in_format}
-    response = requests.post(self._url, 
-                             headers=headers, 
-                             data=json.dumps(store_request))
-    if (response.status_code != requests.codes.created): # 201 CREATED
-      raise ConversionError(self._url + " POST returned " + 
-                            str(response.status_code))
-    # Get document in desired format
-    response_json = json.loads(response.text)
-    document_id = response_json[ProvStoreConverter.ID]
-    doc_url = self._url + str(document_id)
-    accept_type = ProvStoreConverter.CONTENT_TYPES[out_format]
-    headers = {http.ACCEPT: accept_type,
-               http.AUTHORIZATION: self._authorization}
-    response = requests.get(doc_url + "." + out_format, 
-                            headers=headers, 
-                            allow_redirects=True)
-    if (response.status_code != requests.codes.ok): # 200 OK
-      raise ConversionError(doc_url + " GET returned " + 
-                            str(response.status_code))
-    with open(out_file, "w") as f:
-      f.write(response.text)
-    # Delete document
-    headers = {http.AUTHORIZATION: self._authorization}
-    response = requests.delete(doc_url, headers=headers)
-    if (response.status_code != requests.codes.no_content): # 204 NO CONTENT
-      raise ConversionError(doc_url + " DELETE returned " + 
-                            str(response.status_code))
+    if not self._upload_once:
+      doc_url = self.store(in_file)
+      self._uploads += 1
+      self.fetch(doc_url, out_file)
+      self.delete(doc_url)
+      return
+    doc_url = self.stored_document(self.document_key(in_file), in_file)
+    self.fetch(doc_url, out_file)
+
+  def convert_batch(self, files, executor=None):
+    """Convert many input files into output files. If ``upload-once``
+    is not set, each conversion is done in turn, as for
+    :meth:`convert`. Otherwise, each input document not already stored
+    is stored once, then the stored documents are fetched in every
+    requested output format. Up to ``pool-size`` documents are stored,
+    or fetched, at once, unless a thread pool is given.
 
+    :param files: Input and output file pairs
+    :type files: list of tuple of (str or unicode, str or unicode)
+    :param executor: Thread pool in which to store and fetch documents
+      (optional, default a pool of ``pool-size`` threads)
+    :type executor: :class:`concurrent.futures.ThreadPoolExecutor`
+    :return: for each pair, ``None`` if the conversion succeeded or
+      the exception raised if it failed
+    :rtype: list of ``None`` or :class:`Exception`
+    """
+    if not self._upload_once:
+      return super(ProvStoreConverter, self).convert_batch(files)
+    if executor is None:
+      with ThreadPoolExecutor(max_workers=self._pool_size) as executor:
+        return ProvStoreConverter.convert_batch(self, files, executor)
+    results = [None] * len(files)
+    keys = {}
+    for (index, (in_file, out_file)) in enumerate(files):
+      try:
+        Converter.convert(self, in_file, out_file)
+        self.check_formats(os.path.splitext(in_file)[1][1:],
+                           os.path.splitext(out_file)[1][1:])
+        keys[index] = self.document_key(in_file)
+      except Exception as e:
+        results[index] = e
+    # The session is created here, not by the threads that share it.
+    self.session
+    stored = {}
+    for (index, key) in sorted(keys.items()):
+      if key not in stored:
+        stored[key] = executor.submit(self.stored_document, key,
+                                      files[index][0])
+    fetched = {}
+    for (index, key) in keys.items():
+      if stored[key].exception() is not None:
+        results[index] = stored[key].exception()
+      else:
+        fetched[index] = executor.submit(self.fetch, stored[key].result(),
+                                         files[index][1])
+    for (index, future) in fetched.items():
+      results[index] = future.exception()
+    return results
+
+  def statistics(self):
+    """Get counters of HTTP requests and connections, see
+    :meth:`prov_interop.component.RestComponent.statistics`, and of
+    documents stored.
+
+    :return: counter values keyed by counter name
+    :rtype: dict from str or unicode to int
+    """
+    statistics = super(ProvStoreConverter, self).statistics()
+    statistics["provstore-uploads"] = self._uploads
+    return statistics
+
+  def close(self):
+    """Delete the documents stored in ``upload-once`` mode, up to
+    ``pool-size`` at once, then close the HTTP session. Failed
+    deletions are ignored, as the conversions that used the documents
+    have completed, and the documents are not public.
+    """
+    with self._lock:
+      documents = [future.result() for future in self._documents.values()
+                   if future.done()]
+      self._documents = {}
+    if documents:
+      with ThreadPoolExecutor(max_workers=self._pool_size) as executor:
+        for future in [executor.submit(self.delete, doc_url)
+                       for doc_url in documents]:
+          future.exception()
+    super(ProvStoreConverter, self).close()
@@ -27,7 +27,6 @@ from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
 import os.path
-import subprocess
 
 from prov_interop.component import CommandLineComponent
 from prov_interop.component import ConfigError
@@ -114,23 +113,8 @@ class ProvToolboxComparator(Comparator, CommandLineComponent):
           e.g. the script is not found
         """
         super(ProvToolboxComparator, self).compare(file1, file2)
-        format1 = os.path.splitext(file1)[1][1:]
-        format2 = os.path.splitext(file2)[1][1:]
-        self.check_format(format1)
-        self.check_format(format2)
-
-        command_line = list(self._executable)
-        command_line.extend(self._arguments)
-        command_line = [format1 if x == ProvToolboxComparator.FORMAT1 else x
-                        for x in command_line]
-        command_line = [format2 if x == ProvToolboxComparator.FORMAT2 else x
-                        for x in command_line]
-        command_line = [file1 if x == ProvToolboxComparator.FILE1 else x
-                        for x in command_line]
-        command_line = [file2 if x == ProvToolboxComparator.FILE2 else x
-                        for x in command_line]
-        print((" ".join(command_line)))
-        return_code = subprocess.call(command_line)
+        command_line = self.command_line(self.tokens(file1, file2))
+        return_code = self.call(command_line)
         if return_code == 0:
             return True
         elif return_code == 1:
@@ -138,3 +122,40 @@ class ProvToolboxComparator(Comparator, CommandLineComponent):
         else:
             raise ComparisonError(" ".join(command_line) +
                                   " returned " + str(return_code))
+
+    def tokens(self, file1, file2):
+        """Get values for ``FORMAT1``, ``FORMAT2``, ``FILE1`` and
+        ``FILE2`` tokens.
+
+        :param file1: File
+        :type file1: str or unicode
+        :param file2: File
+        :type file2: str or unicode
+        :return: token values keyed by token
+        :rtype: dict
+        :raises ComparisonError: if either format is not supported
+        """
+        format1 = os.path.splitext(file1)[1][1:]
+        format2 = os.path.splitext(file2)[1][1:]
+        self.check_format(format1)
+        self.check_format(format2)
+        return {ProvToolboxComparator.FORMAT1: format1,
+                ProvToolboxComparator.FORMAT2: format2,
+                ProvToolboxComparator.FILE1: file1,
+                ProvToolboxComparator.FILE2: file2}
+
+    def compare_batch(self, files):
+        """Compare many pairs of files. If batch invocation is
+        configured (see
+        :class:`prov_interop.component.CommandLineComponent`) then files
+        are compared in batches, otherwise :meth:`compare` is called for
+        each pair of files in turn. A batch invocation's exit code of 0
+        means that every pair in the batch is equivalent.
+
+        :param files: File pairs
+        :type files: list of tuple of (str or unicode, str or unicode)
+        :return: for each pair, ``True`` or ``False`` or the exception
+          raised if the comparison failed
+        :rtype: list of bool or :class:`Exception`
+        """
+        return self.invoke_batch(files, self.compare, lambda f1, f2: True)
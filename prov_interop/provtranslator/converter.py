@@ -34,6 +34,7 @@ from prov_interop.component import ConfigError
 from prov_interop.component import RestComponent
 from prov_interop.converter import ConversionError
 from prov_interop.converter import Converter
+from prov_interop.httpcache import ResponseCache
 
 class ProvTranslatorConverter(Converter, RestComponent):
   """Manages invocation of ProvTranslator service."""
@@ -49,10 +50,26 @@ class ProvTranslatorConverter(Converter, RestComponent):
   content types understood by ProvTranslator
   """
 
+  RESPONSE_CACHE = "response-cache"
+  """str or unicode: configuration key for cache of translations"""
+  RUNTIME_KEYS = RestComponent.RUNTIME_KEYS + [RESPONSE_CACHE]
+  """list of str or unicode: configuration keys excluded from
+  :meth:`fingerprint`"""
+
   def __init__(self):
     """Create converter.
     """
     super(ProvTranslatorConverter, self).__init__()
+    self._response_cache = None
+
+  @property
+  def response_cache(self):
+    """Get cache of translations.
+
+    :return: cache, or ``None`` if translations are not cached
+    :rtype: :class:`prov_interop.httpcache.ResponseCache`
+    """
+    return self._response_cache
 
   def configure(self, config):
     """Configure converter. The configuration must hold:
@@ -68,11 +85,32 @@ class ProvTranslatorConverter(Converter, RestComponent):
         "output-formats": ["provn", "ttl", "trig", "provx", "json"]
       }
 
+    The configuration may also hold:
+
+    - ``response-cache``: cache of translations, keyed by the
+      document's content, ``Content-type`` and ``Accept``, as
+      described in
+      :meth:`prov_interop.httpcache.ResponseCache.from_config`
+      (optional, default translations are not cached). For example::
+
+        "response-cache": {"directory": "/tmp/provtranslator-cache",
+                           "max-size": 268435456,
+                           "ttl": 86400}
+
     :param config: Configuration
     :type config: dict
     :raises ConfigError: if `config` does not hold the above entries
     """
     super(ProvTranslatorConverter, self).configure(config)
+    response_cache = None
+    if config.get(ProvTranslatorConverter.RESPONSE_CACHE) is not None:
+      try:
+        response_cache = ResponseCache.from_config(
+          config[ProvTranslatorConverter.RESPONSE_CACHE])
+      except ValueError as e:
+        raise ConfigError(ProvTranslatorConverter.RESPONSE_CACHE + ": " +
+                          str(e))
+    self._response_cache = response_cache
 
   def convert(self, in_file, out_file):
     """Convert input file into output file. 
@@ -84,12 +122,18 @@ class ProvTranslatorConverter(Converter, RestComponent):
       respectively. 
     - The input and output formats are used to set HTTP ``Content-type``
       and ``Accept`` header values, respectively  
-    - The contents of `in_file` are loaded and used to create a
+    - The contents of `in_file` are streamed as the body of a
       ProvTranslator-compliant HTTP POST request which is submitted to
       ``url``, to convert the document. 
     - The HTTP status is checked to to be 200 OK.
-    - The HTTP response is parsed to get the converted document, and
-      this is saved to `out_file`.
+    - The converted document, the HTTP response body, is streamed to
+      `out_file`.
+    - If ``response-cache`` is configured, a cached translation within
+      its lifetime is copied to `out_file` with no request. A stale
+      translation with an ``ETag`` is revalidated by adding an
+      ``If-None-Match`` header to the request, and is copied to
+      `out_file` if the HTTP status is 304 Not Modified. Otherwise the
+      converted document is cached.
 
     :param in_file: Input file
     :type in_file: str or unicode
@@ -104,17 +148,70 @@ class ProvTranslatorConverter(Converter, RestComponent):
     in_format = os.path.splitext(in_file)[1][1:]
     out_format = os.path.splitext(out_file)[1][1:]
     super(ProvTranslatorConverter, self).check_formats(in_format, out_format)
-    with open(in_file, "r") as f:
-      doc_str = f.read()
     content_type = ProvTranslatorConverter.CONTENT_TYPES[in_format]
     accept_type = ProvTranslatorConverter.CONTENT_TYPES[out_format]
     headers = {http.CONTENT_TYPE: content_type, 
                http.ACCEPT: accept_type}
-    response = requests.post(self._url, 
-                             headers=headers, 
-                             data=doc_str)
+    cache = self._response_cache
+    metadata = None
+    if cache is not None:
+      key = cache.key(self._url, in_file, content_type, accept_type)
+      metadata = cache.lookup(key)
+      if metadata is not None:
+        if cache.is_fresh(metadata) and cache.get(key, out_file, metadata):
+          return
+        if metadata.get("etag"):
+          headers[http.IF_NONE_MATCH] = metadata["etag"]
+    response = self.post(in_file, headers)
+    if (response.status_code == requests.codes.not_modified and
+        metadata is not None): # 304 Not Modified
+      response.close()
+      cache.refresh(key, response.headers, metadata)
+      if cache.get(key, out_file, metadata):
+        return
+      # The translation was evicted since it was looked up.
+      del headers[http.IF_NONE_MATCH]
+      response = self.post(in_file, headers)
     if (response.status_code != requests.codes.ok): # 200 OK
+      response.close()
       raise ConversionError(self._url + " POST returned " + 
                             str(response.status_code))
-    with open(out_file, "w") as f:
-      f.write(response.text)
+    self.download(response, out_file)
+    if cache is not None:
+      cache.put(key, response.headers, out_file)
+
+  def post(self, in_file, headers):
+    """Submit an HTTP POST request to ``url`` whose body is streamed
+    from a file.
+
+    :param in_file: Input file
+    :type in_file: str or unicode
+    :param headers: Request headers
+    :type headers: dict
+    :return: response, whose body has not been read
+    :rtype: :class:`requests.Response`
+    :raises requests.exceptions.ConnectionError: if there are
+      problems executing the request e.g. the URL cannot be found
+    """
+    with open(in_file, "rb") as f:
+      return self.request("POST", self._url,
+                          headers=headers,
+                          data=f,
+                          stream=True)
+
+  def statistics(self):
+    """Get counters of HTTP requests and connections, see
+    :meth:`prov_interop.component.RestComponent.statistics`, and of
+    the cache of translations, if any, prefixed by
+    ``response-cache-``, see
+    :meth:`prov_interop.httpcache.ResponseCache.statistics`.
+
+    :return: counter values keyed by counter name
+    :rtype: dict from str or unicode to int
+    """
+    statistics = super(ProvTranslatorConverter, self).statistics()
+    if self._response_cache is not None:
+      statistics.update([("response-cache-" + name, value) for
+                         (name, value) in
+                         self._response_cache.statistics().items()])
+    return statistics
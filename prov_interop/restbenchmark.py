@@ -0,0 +1,253 @@
+"""Benchmarks of per-request latency of REST-ful conversions over each
+transport.
+
+Times conversions by a
+:class:`prov_interop.aio.AsyncProvTranslatorConverter`, with up to a
+given number in progress at once, against a local stand-in
+ProvTranslator (see :mod:`prov_interop.standin`) reached over:
+
+- ``tcp``: HTTP/1.1 over TCP, with a pooled connection per conversion
+  in progress.
+- ``unix``: HTTP/1.1 over a Unix domain socket (see
+  :mod:`prov_interop.unixsocket`).
+- ``http2``: HTTP/2 over TCP, with the conversions in progress
+  multiplexed over one connection (see :mod:`prov_interop.http2`).
+  This is only benchmarked if ``httpx`` and ``h2`` are installed.
+
+The stand-in's start-up, and a first batch of conversions over each
+transport, which opens its connections, are not included in the
+times.
+
+Usage::
+
+    usage: restbenchmark.py [-h] [-n N] [-c CONCURRENCY] [-l LATENCY]
+                            [-b {prov,passthrough}] [file]
+
+    Benchmark per-request latency of REST-ful conversions over each
+    transport.
+
+    positional arguments:
+      file                  Document to convert, whose format is given
+                            by its extension (default a small PROV-JSON
+                            document)
+
+    optional arguments:
+      -h, --help            show this help message and exit
+      -n N                  Number of conversions (default 200)
+      -c CONCURRENCY        Number of conversions in progress at once
+                            (default 1)
+      -l LATENCY            Latency added by the stand-in to each
+                            request, in seconds (default 0)
+      -b {prov,passthrough} Stand-in backend (default passthrough)
+
+For example::
+
+    $ python -m prov_interop.restbenchmark -n 2000
+    tcp                2.05 ms/call
+    unix               2.13 ms/call
+    http2              3.14 ms/call
+    $ python -m prov_interop.restbenchmark -n 2000 -c 16
+    tcp                2.66 ms/call
+    unix               2.07 ms/call
+    http2              2.69 ms/call
+
+For small documents, most of each request's time is spent in the
+harness and the stand-in, rather than in the transport, and as both
+run in one process, concurrency gives little speed-up. HTTP/2's
+framing, done in Python by ``h2`` on both sides, costs more than
+HTTP/1.1's when requests are made one at a time.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import os
+import os.path
+import shutil
+import tempfile
+import time
+
+from prov_interop import aio
+from prov_interop import http2
+from prov_interop import standards
+from prov_interop import standin
+from prov_interop.aio import AsyncProvTranslatorConverter
+from prov_interop.benchmark import print_timings
+from prov_interop.standin import H2StandInServer
+from prov_interop.standin import StandInServer
+from prov_interop.standin import UnixStandInServer
+
+DEFAULT_COUNT = 200
+"""int: default number of conversions"""
+
+DOCUMENT = "{\"prefix\": {\"ex\": \"http://example.org/\"}, " + \
+    "\"entity\": {\"ex:e1\": {}}}"
+"""str or unicode: default document to convert, in PROV-JSON"""
+
+
+def benchmark_url(url, in_file, count, concurrency=1, use_http2=False):
+  """Time conversions by a ProvTranslator converter. A batch of
+  `concurrency` conversions is done before timing begins.
+
+  :param url: ProvTranslator URL
+  :type url: str or unicode
+  :param in_file: Document to convert
+  :type in_file: str or unicode
+  :param count: Number of conversions
+  :type count: int
+  :param concurrency: Number of conversions in progress at once
+  :type concurrency: int
+  :param use_http2: Whether to make requests over HTTP/2
+  :type use_http2: bool
+  :return: mean time per conversion, in seconds
+  :rtype: float
+  :raises ConversionError: if a conversion fails
+  """
+  converter = AsyncProvTranslatorConverter()
+  converter.configure({AsyncProvTranslatorConverter.URL: url,
+                       AsyncProvTranslatorConverter.INPUT_FORMATS:
+                         standards.FORMATS,
+                       AsyncProvTranslatorConverter.OUTPUT_FORMATS:
+                         standards.FORMATS,
+                       AsyncProvTranslatorConverter.HTTP2: use_http2,
+                       aio.CONCURRENCY: concurrency})
+  directory = tempfile.mkdtemp()
+  try:
+    extension = os.path.splitext(in_file)[1]
+    files = [(in_file, os.path.join(directory, str(index) + extension))
+             for index in range(count)]
+    convert_batch(converter, files[:concurrency])
+    start = time.time()
+    convert_batch(converter, files)
+    return (time.time() - start) / count
+  finally:
+    converter.close()
+    shutil.rmtree(directory)
+
+
+def convert_batch(converter, files):
+  """Convert a batch of files.
+
+  :param converter: Converter
+  :type converter: :class:`prov_interop.aio.AsyncConverter`
+  :param files: Input and output file pairs
+  :type files: list of tuple of (str or unicode, str or unicode)
+  :raises ConversionError: if a conversion fails
+  """
+  for error in converter.convert_batch(files):
+    if error is not None:
+      raise error
+
+
+def benchmark(in_file=None, count=DEFAULT_COUNT,
+              backend=standin.PASSTHROUGH, concurrency=1, latency=0):
+  """Time conversions over each transport, by a local stand-in
+  ProvTranslator. ``http2`` is only timed if
+  :func:`prov_interop.http2.is_available`.
+
+  :param in_file: Document to convert (default :data:`DOCUMENT`)
+  :type in_file: str or unicode
+  :param count: Number of conversions
+  :type count: int
+  :param backend: Stand-in backend
+  :type backend: str or unicode
+  :param concurrency: Number of conversions in progress at once
+  :type concurrency: int
+  :param latency: Latency added by the stand-in to each request, in
+    seconds
+  :type latency: int or float
+  :return: list of (transport, mean time per conversion in seconds)
+  :rtype: list of (str or unicode, float)
+  :raises ConversionError: if a conversion fails
+  """
+  directory = tempfile.mkdtemp()
+  servers = []
+  try:
+    if in_file is None:
+      in_file = os.path.join(directory, "document." + standards.JSON)
+      with open(in_file, "w") as f:
+        f.write(DOCUMENT)
+    kwargs = {"backend": backend, "latency": latency}
+    servers.append(("tcp", StandInServer(("127.0.0.1", 0), **kwargs)))
+    servers.append(("unix", UnixStandInServer(
+      os.path.join(directory, "standin.sock"), **kwargs)))
+    if http2.is_available():
+      servers.append(("http2", H2StandInServer(("127.0.0.1", 0),
+                                               **kwargs)))
+    timings = []
+    for (transport, server) in servers:
+      server.start()
+      timings.append((transport, benchmark_url(
+        server.translator_url, in_file, count, concurrency,
+        transport == "http2")))
+    return timings
+  finally:
+    for (_, server) in servers:
+      server.stop()
+    shutil.rmtree(directory)
+
+
+def main(argv=None):
+  """Parse command-line arguments and run benchmarks.
+
+  :param argv: Command-line arguments (default ``sys.argv[1:]``)
+  :type argv: list of str or unicode
+  """
+  parser = argparse.ArgumentParser(
+    description="Benchmark per-request latency of REST-ful conversions " +
+    "over each transport.")
+  parser.add_argument("-n", metavar="N", type=int, default=DEFAULT_COUNT,
+                      help="Number of conversions (default " +
+                      str(DEFAULT_COUNT) + ")")
+  parser.add_argument("-c", metavar="CONCURRENCY", dest="concurrency",
+                      type=int, default=1,
+                      help="Number of conversions in progress at once " +
+                      "(default 1)")
+  parser.add_argument("-l", metavar="LATENCY", dest="latency",
+                      type=float, default=0,
+                      help="Latency added by the stand-in to each " +
+                      "request, in seconds (default 0)")
+  parser.add_argument("-b", dest="backend", choices=standin.BACKENDS,
+                      default=standin.PASSTHROUGH,
+                      help="Stand-in backend (default passthrough)")
+  parser.add_argument("file", nargs="?", default=None,
+                      help="Document to convert, whose format is given " +
+                      "by its extension (default a small PROV-JSON " +
+                      "document)")
+  args = parser.parse_args(argv)
+  if args.n < 1:
+    parser.error("N must be at least 1")
+  if args.concurrency < 1:
+    parser.error("CONCURRENCY must be at least 1")
+  if args.latency < 0:
+    parser.error("LATENCY must be non-negative")
+  if args.file is not None and not os.path.isfile(args.file):
+    parser.error("No such file: " + args.file)
+  print_timings(benchmark(args.file, args.n, args.backend,
+                          args.concurrency, args.latency))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,1262 @@
+"""Parallel runner for converter interoperability tests.
+
+This runner is an alternative to running
+:mod:`prov_interop.interop_tests` under nose. The harness and
+converter configuration files are loaded once, the test case tuples
+are expanded once, and ``(converter, test case)`` jobs are distributed
+to a pool of worker processes, each of which holds its own
+already-configured converters and comparators. Results are written as
+xUnit-compliant XML, using the same class and test names as nose.
+
+Usage::
+
+    usage: python -m prov_interop.run [-h] [-c FILE] [-p N]
+                                      [--xunit-file FILE] [--state FILE]
+                                      [--metrics-file FILE]
+                                      [--metrics-interval SECONDS]
+                                      [converter [converter ...]]
+
+    Run converter interoperability tests in parallel.
+
+    positional arguments:
+      converter             Converters to test (default: all those
+                            ProvPy, ProvToolbox, ProvMan, ProvStore,
+                            ProvTranslator whose configuration files
+                            are found)
+
+    optional arguments:
+      -h, --help            show this help message and exit
+      -c FILE, --config FILE
+                            Harness configuration file
+      -p N, --processes N   Number of worker processes
+      --xunit-file FILE     xUnit XML results file
+      --state FILE          File recording test outcomes. Test cases
+                            whose files, converter and comparator are
+                            unchanged since their outcomes were
+                            recorded are not re-run
+      --metrics-file FILE   File to which metrics are written, in the
+                            Prometheus text format, during and at the
+                            end of the run
+      --metrics-interval SECONDS
+                            Interval between writes of the metrics
+                            file
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+from xml.etree import ElementTree
+try:
+  import queue
+except ImportError:
+  import Queue as queue
+
+from prov_interop import events
+from prov_interop import factory
+from prov_interop import metrics
+from prov_interop import trace
+from prov_interop.cache import digest
+from prov_interop.component import ConfigError
+from prov_interop.converter import Converter
+from prov_interop.events import EventStream
+from prov_interop.files import load_yaml
+from prov_interop.harness import HarnessResources
+from prov_interop.metrics import COUNTER
+from prov_interop.metrics import Metrics
+from prov_interop.metrics import metric_name
+from prov_interop.state import RunState
+from prov_interop.trace import Tracer
+
+CONFIGURATION_FILE_ENV = "PROV_HARNESS_CONFIGURATION"
+"""str or unicode: environment variable holding interoperability test
+harness configuration file name
+"""
+
+DEFAULT_CONFIGURATION_FILE = "localconfig/harness.yaml"
+"""str or unicode: default interoperability test harness configuration
+file name
+"""
+
+CLASS = "class"
+"""str or unicode: configuration key for converter class names"""
+
+SKIP_TESTS = "skip-tests"
+"""str or unicode: configuration key for tests to skip"""
+
+POLL_INTERVAL = 1.0
+"""float: seconds to wait for a worker process's results, or
+counters, before checking whether the worker processes are alive"""
+
+CONVERTERS = {
+  "ProvPy": (
+    "prov_interop.provpy.converter.ProvPyConverter",
+    "PROVPY_TEST_CONFIGURATION",
+    "localconfig/provpy.yaml",
+    "prov_interop.interop_tests.test_provpy.ProvPyTestCase"),
+  "ProvToolbox": (
+    "prov_interop.provtoolbox.converter.ProvToolboxConverter",
+    "PROVTOOLBOX_TEST_CONFIGURATION",
+    "localconfig/provtoolbox.yaml",
+    "prov_interop.interop_tests.test_provtoolbox.ProvToolboxTestCase"),
+  "ProvMan": (
+    "prov_interop.provman.converter.ProvManConverter",
+    "PROVMAN_TEST_CONFIGURATION",
+    "localconfig/provman.yaml",
+    "prov_interop.interop_tests.test_provman.ProvManTestCase"),
+  "ProvStore": (
+    "prov_interop.provstore.converter.ProvStoreConverter",
+    "PROVSTORE_TEST_CONFIGURATION",
+    "localconfig/provstore.yaml",
+    "prov_interop.interop_tests.test_provstore.ProvStoreTestCase"),
+  "ProvTranslator": (
+    "prov_interop.provtranslator.converter.ProvTranslatorConverter",
+    "PROVTRANSLATOR_TEST_CONFIGURATION",
+    "localconfig/provtranslator.yaml",
+    "prov_interop.interop_tests.test_provtranslator.ProvTranslatorTestCase")
+}
+"""dict: mapping from converter configuration keys to tuples of form
+(converter class name, environment variable holding configuration file
+name, default configuration file name, xUnit class name). These
+correspond to the test classes in :mod:`prov_interop.interop_tests`.
+"""
+
+
+class TestResult(object):
+  """Result of running a single test case tuple against a converter."""
+
+  PASS = "pass"
+  """str or unicode: test passed"""
+  FAIL = "fail"
+  """str or unicode: comparator found the documents not equivalent"""
+  ERROR = "error"
+  """str or unicode: conversion or comparison raised an error"""
+  SKIP = "skip"
+  """str or unicode: test was skipped"""
+
+  def __init__(self, converter, classname, test_case):
+    """Create test result.
+
+    :param converter: Converter name
+    :type converter: str or unicode
+    :param classname: xUnit class name
+    :type classname: str or unicode
+    :param test_case: test case tuple
+    :type test_case: tuple of (str or unicode, str or unicode, str or
+      unicode, str or unicode, str or unicode)
+    """
+    self.converter = converter
+    self.classname = classname
+    self.test_case = test_case
+    self.status = TestResult.PASS
+    self.message = ""
+    self.detail = ""
+    self.time = 0.0
+    self.reused = False
+    self.invocations = []
+    self.convert_time = None
+    self.compare_time = None
+
+  @property
+  def name(self):
+    """Get test name. This is the same as the name given to the
+    corresponding test method by
+    :mod:`prov_interop.interop_tests.test_converter` e.g.
+    ``test_case_1_provx_json``.
+
+    :return: name
+    :rtype: str or unicode
+    """
+    (index, ext_in, _, ext_out, _) = self.test_case
+    return "test_case_" + re.sub("[^a-zA-Z0-9_]+", "_",
+                                 str(index) + "_" + ext_in + "_" + ext_out)
+
+
+def xunit_classname(name):
+  """Get the xUnit class name for a converter's results. This is the
+  name of the corresponding test class in
+  :mod:`prov_interop.interop_tests`, if there is one.
+
+  :param name: Converter name
+  :type name: str or unicode
+  :return: class name
+  :rtype: str or unicode
+  """
+  return CONVERTERS[name][3] if name in CONVERTERS else name
+
+
+def skip_message(converter, skip_tests, test_case):
+  """Check whether a test case tuple should be skipped for a
+  converter, because its index is in `skip_tests` or its formats are
+  not supported by the converter.
+
+  :param converter: Converter
+  :type converter: :class:`prov_interop.converter.Converter`
+  :param skip_tests: Indices of test cases to skip
+  :type skip_tests: list
+  :param test_case: test case tuple
+  :type test_case: tuple of (str or unicode, str or unicode, str or
+    unicode, str or unicode, str or unicode)
+  :return: reason for skipping the test, or ``None`` if it is to be
+    run
+  :rtype: str or unicode
+  """
+  (index, ext_in, _, ext_out, _) = test_case
+  converter_name = converter.__class__.__name__
+  if index in skip_tests:
+    return ("Test case " + str(index) + " in " +
+            converter_name + " skip-tests")
+  for (format, formats, format_type) in [
+      (ext_in, converter.input_formats, Converter.INPUT_FORMATS),
+      (ext_out, converter.output_formats, Converter.OUTPUT_FORMATS)]:
+    if format not in formats:
+      return ("Format " + format + " not in " +
+              converter_name + " " + format_type)
+  return None
+
+
+def _set_error(result, error):
+  """Record an exception in a result.
+
+  :param result: result
+  :type result: :class:`TestResult`
+  :param error: exception
+  :type error: :class:`Exception`
+  """
+  result.status = TestResult.ERROR
+  result.message = error.__class__.__name__ + ": " + str(error)
+  result.detail = "".join(traceback.format_exception(
+    error.__class__, error, getattr(error, "__traceback__", None)))
+
+
+def _add_invocations(pending, invocations):
+  """Record processes in the results of the tuples they were run
+  for. A process is recorded in the result of each tuple whose
+  converted file is in its command-line or, if there are none, e.g.
+  for a batch invocation using a manifest file, in the result of each
+  tuple.
+
+  :param pending: results and converted file names
+  :type pending: list of tuple of (:class:`TestResult`, str or unicode)
+  :param invocations: invocation results
+  :type invocations: list of
+    :class:`prov_interop.launcher.InvocationResult`
+  """
+  for invocation in invocations:
+    results = [result for (result, converter_ext_out) in pending
+               if converter_ext_out in invocation.command_line]
+    for result in results or [result for (result, _) in pending]:
+      result.invocations.append(invocation)
+
+
+def _event_fields(converter, result):
+  """Get the information about a test case tuple recorded in its
+  events.
+
+  :param converter: Converter
+  :type converter: :class:`prov_interop.converter.Converter`
+  :param result: result
+  :type result: :class:`TestResult`
+  :return: ``test``, the xUnit class name and test name, ``index``,
+    ``converter``, the converter class name, ``ext-in`` and
+    ``ext-out``
+  :rtype: dict
+  """
+  (index, ext_in, _, ext_out, _) = result.test_case
+  test = result.name
+  if result.classname is not None:
+    test = result.classname + "." + test
+  return {"test": test,
+          "index": index,
+          "converter": converter.__class__.__name__,
+          "ext-in": ext_in,
+          "ext-out": ext_out}
+
+
+def run_test_cases(converter, skip_tests, format_comparators,
+                   test_cases, work_dir, conversion_cache=None,
+                   comparison_cache=None, tracer=None, event_stream=None,
+                   name=None):
+  """Run the test procedure for many test case tuples. This follows
+  :meth:`prov_interop.interop_tests.test_converter.ConverterTestCase.test_case`
+  but records the outcome of each tuple in a :class:`TestResult`
+  rather than raising exceptions.
+
+  Tuples which are not skipped are converted together via
+  :meth:`prov_interop.converter.Converter.convert_batch`, and their
+  outputs are compared together via
+  :meth:`prov_interop.comparator.Comparator.compare_batch`, so that
+  converters and comparators configured for batch invocation are
+  invoked once for many tuples. If a conversion cache or comparison
+  cache is given then cached outputs or results are used where
+  available. The time taken is shared equally between the tuples that
+  were run, as are the times taken by conversion and, for each output
+  format, by comparison. The processes run by the converter and
+  comparators are recorded in the results of the tuples they were run
+  for (see :func:`_add_invocations`). If a tracer is given then the
+  time taken by each phase (``skip evaluation``, ``convert``,
+  ``comparator lookup``, ``compare`` and ``cleanup``) is recorded as a
+  span. If an event stream is given then an event is recorded for
+  each phase of each tuple as the phase completes, with the tuple's
+  outcome, if the phase decided it. The times of the ``convert``,
+  ``compare`` and ``cleanup`` events of a tuple are those of the
+  phase for all the tuples run together.
+
+  :param converter: Converter
+  :type converter: :class:`prov_interop.converter.Converter`
+  :param skip_tests: Indices of test cases to skip
+  :type skip_tests: list
+  :param format_comparators: Comparators keyed by format
+  :type format_comparators: dict from str or unicode to
+    :class:`prov_interop.comparator.Comparator`
+  :param test_cases: test case tuples
+  :type test_cases: list of tuple of (str or unicode, str or unicode,
+    str or unicode, str or unicode, str or unicode)
+  :param work_dir: Directory for converted files
+  :type work_dir: str or unicode
+  :param conversion_cache: Conversion cache (optional)
+  :type conversion_cache: :class:`prov_interop.converter.ConversionCache`
+  :param comparison_cache: Comparison cache (optional)
+  :type comparison_cache: :class:`prov_interop.comparator.ComparisonCache`
+  :param tracer: Tracer (optional)
+  :type tracer: :class:`prov_interop.trace.Tracer`
+  :param event_stream: Event stream (optional)
+  :type event_stream: :class:`prov_interop.events.EventStream`
+  :param name: Converter name, recorded in the results, with its
+    xUnit class name (optional)
+  :type name: str or unicode
+  :return: results, in the same order as `test_cases`
+  :rtype: list of :class:`TestResult`
+  """
+  if tracer is None:
+    tracer = Tracer()
+  if event_stream is None:
+    event_stream = EventStream()
+  classname = None if name is None else xunit_classname(name)
+  trace_args = {"converter": converter.__class__.__name__,
+                "test-cases": len(test_cases)}
+  results = []
+  pending = []
+  with tracer.span("skip evaluation", trace_args):
+    for (count, test_case) in enumerate(test_cases):
+      skip_start = time.time()
+      result = TestResult(name, classname, test_case)
+      results.append(result)
+      message = skip_message(converter, skip_tests, test_case)
+      if message is not None:
+        result.status = TestResult.SKIP
+        result.message = message
+      event_stream.emit("skip evaluation", skip_start, time.time(),
+                        _event_fields(converter, result),
+                        result.status if message else events.OK, message)
+      if message is not None:
+        continue
+      (_, _, _, ext_out, _) = test_case
+      converter_ext_out = os.path.join(
+        work_dir,
+        "out." + str(os.getpid()) + "." + str(count) + "." + ext_out)
+      pending.append((result, converter_ext_out))
+  if not pending:
+    return results
+  start = time.time()
+  # Phase in progress, and its start time, for the events recorded if
+  # it raises an exception.
+  (phase, phase_start) = ("convert", start)
+  try:
+    files = [(result.test_case[2], converter_ext_out)
+             for (result, converter_ext_out) in pending]
+    with tracer.span("convert", dict(trace_args, pending=len(files))):
+      if conversion_cache is None:
+        conversions = converter.convert_batch(files)
+      else:
+        conversions = conversion_cache.convert_batch(converter, files)
+    convert_end = time.time()
+    for ((result, _), error) in zip(pending, conversions):
+      result.convert_time = (convert_end - phase_start) / len(pending)
+      if error is not None:
+        _set_error(result, error)
+      event_stream.emit("convert", phase_start, convert_end,
+                        _event_fields(converter, result),
+                        result.status if error else events.OK,
+                        result.message)
+    converted = {}
+    (phase, phase_start) = ("comparator lookup", time.time())
+    with tracer.span("comparator lookup", trace_args):
+      for ((result, converter_ext_out), error) in zip(pending, conversions):
+        if error is not None:
+          continue
+        lookup_start = time.time()
+        (_, _, _, ext_out, _) = result.test_case
+        if ext_out not in format_comparators:
+          _set_error(result, KeyError(ext_out))
+        else:
+          converted.setdefault(ext_out, []).append(
+            (result, converter_ext_out))
+        event_stream.emit("comparator lookup", lookup_start, time.time(),
+                          _event_fields(converter, result),
+                          result.status if ext_out not in format_comparators
+                          else events.OK, result.message)
+    for (ext_out, items) in converted.items():
+      comparator = format_comparators[ext_out]
+      files = [(result.test_case[4], converter_ext_out)
+               for (result, converter_ext_out) in items]
+      (phase, phase_start) = ("compare", time.time())
+      with tracer.span("compare", dict(trace_args, pending=len(files),
+                                       **{"ext-out": ext_out})):
+        if comparison_cache is None:
+          comparisons = comparator.compare_batch(files)
+        else:
+          comparisons = comparison_cache.compare_batch(comparator, files)
+      compare_end = time.time()
+      for ((result, converter_ext_out), are_equivalent) in \
+            zip(items, comparisons):
+        result.compare_time = (compare_end - phase_start) / len(items)
+        (_, _, file_ext_in, _, file_ext_out) = result.test_case
+        if isinstance(are_equivalent, Exception):
+          _set_error(result, are_equivalent)
+        elif not are_equivalent:
+          result.status = TestResult.FAIL
+          result.message = ("Test failed: " + file_ext_out +
+                            " does not match " + converter_ext_out +
+                            " converted from " + file_ext_in)
+        event_stream.emit("compare", phase_start, compare_end,
+                          _event_fields(converter, result), result.status,
+                          result.message)
+  except Exception as e:
+    for (result, _) in pending:
+      _set_error(result, e)
+      event_stream.emit(phase, phase_start, time.time(),
+                        _event_fields(converter, result), result.status,
+                        result.message)
+  finally:
+    elapsed = (time.time() - start) / len(pending)
+    cleanup_start = time.time()
+    with tracer.span("cleanup", trace_args):
+      _add_invocations(pending, converter.pop_invocations())
+      for ext_out in sorted(format_comparators):
+        _add_invocations(pending,
+                         format_comparators[ext_out].pop_invocations())
+      for (result, converter_ext_out) in pending:
+        result.time = elapsed
+        if os.path.isfile(converter_ext_out):
+          os.remove(converter_ext_out)
+    for (result, _) in pending:
+      event_stream.emit("cleanup", cleanup_start, time.time(),
+                        _event_fields(converter, result))
+  return results
+
+
+def run_test_case(converter, skip_tests, format_comparators,
+                  test_case, work_dir):
+  """Run the test procedure for a single test case tuple. See
+  :func:`run_test_cases`.
+
+  :param converter: Converter
+  :type converter: :class:`prov_interop.converter.Converter`
+  :param skip_tests: Indices of test cases to skip
+  :type skip_tests: list
+  :param format_comparators: Comparators keyed by format
+  :type format_comparators: dict from str or unicode to
+    :class:`prov_interop.comparator.Comparator`
+  :param test_case: test case tuple
+  :type test_case: tuple of (str or unicode, str or unicode, str or
+    unicode, str or unicode, str or unicode)
+  :param work_dir: Directory for converted files
+  :type work_dir: str or unicode
+  :return: result, without converter or class name
+  :rtype: :class:`TestResult`
+  """
+  return run_test_cases(converter, skip_tests, format_comparators,
+                        [test_case], work_dir)[0]
+
+
+class Worker(object):
+  """Holds configured comparators and converters for running test
+  case tuples. A worker is created once per worker process, so
+  components are configured once, not once per test.
+  """
+
+  def __init__(self, harness_config, converter_configs):
+    """Create worker.
+
+    :param harness_config: Harness configuration, as required by
+      :class:`prov_interop.harness.HarnessResources`
+    :type harness_config: dict
+    :param converter_configs: Converter configurations keyed by
+      converter name. Each must hold a ``class`` entry, the converter
+      class name, in addition to converter-specific configuration
+    :type converter_configs: dict
+    :raises ConfigError: if there are any problems creating or
+      configuring comparators or converters
+    """
+    start = time.time()
+    self._harness = HarnessResources()
+    self._harness.configure(harness_config)
+    self._converters = {}
+    for (name, config) in converter_configs.items():
+      if CLASS not in config:
+        raise ConfigError("Missing " + CLASS + " for " + name)
+      converter = factory.get_instance(config[CLASS])
+      converter.configure(config)
+      skip_tests = config.get(SKIP_TESTS, None) or []
+      self._converters[name] = (converter, skip_tests)
+    self._work_dir = tempfile.mkdtemp()
+    self._fingerprints = {}
+    self._harness.tracer.add("harness initialisation", start, time.time(),
+                             {"converters": sorted(converter_configs)})
+
+  @property
+  def harness(self):
+    """Get harness resources.
+
+    :return: harness resources
+    :rtype: :class:`prov_interop.harness.HarnessResources`
+    """
+    return self._harness
+
+  def batch_size(self, name, ext_out):
+    """Get the maximum number of test case tuples, with output format
+    `ext_out`, to run together against a converter. This is the larger
+    of the batch sizes of the converter and of the comparator for
+    `ext_out`.
+
+    :param name: Converter name
+    :type name: str or unicode
+    :param ext_out: Output format
+    :type ext_out: str or unicode
+    :return: batch size
+    :rtype: int
+    """
+    (converter, _) = self._converters[name]
+    sizes = [converter.batch_size]
+    if ext_out in self._harness.format_comparators:
+      sizes.append(self._harness.format_comparators[ext_out].batch_size)
+    return max(sizes)
+
+  def group_by_input(self, name):
+    """Check whether test case tuples for a converter are grouped by
+    input file, rather than by input and output format, see
+    :attr:`prov_interop.converter.Converter.group_by_input`.
+
+    :param name: Converter name
+    :type name: str or unicode
+    :return: ``True`` if tuples are grouped by input file
+    :rtype: bool
+    """
+    (converter, _) = self._converters[name]
+    return converter.group_by_input
+
+  def skip_message(self, name, test_case):
+    """Check whether a test case tuple should be skipped for a
+    converter, see :func:`skip_message`.
+
+    :param name: Converter name
+    :type name: str or unicode
+    :param test_case: test case tuple
+    :type test_case: tuple of (str or unicode, str or unicode, str or
+      unicode, str or unicode, str or unicode)
+    :return: reason for skipping the test, or ``None`` if it is to be
+      run
+    :rtype: str or unicode
+    """
+    (converter, skip_tests) = self._converters[name]
+    return skip_message(converter, skip_tests, test_case)
+
+  def fingerprint(self, name, ext_out):
+    """Get a digest of the fingerprints of a converter and of the
+    comparator for `ext_out` (see
+    :meth:`prov_interop.component.ConfigurableComponent.fingerprint`).
+
+    :param name: Converter name
+    :type name: str or unicode
+    :param ext_out: Output format
+    :type ext_out: str or unicode
+    :return: hexadecimal digest
+    :rtype: str or unicode
+    """
+    if (name, ext_out) not in self._fingerprints:
+      (converter, _) = self._converters[name]
+      comparator = self._harness.format_comparators.get(ext_out)
+      self._fingerprints[(name, ext_out)] = digest(
+        converter.fingerprint(),
+        None if comparator is None else comparator.fingerprint())
+    return self._fingerprints[(name, ext_out)]
+
+  def run(self, name, test_cases):
+    """Run test case tuples against a converter.
+
+    :param name: Converter name
+    :type name: str or unicode
+    :param test_cases: test case tuples
+    :type test_cases: list of tuple of (str or unicode, str or
+      unicode, str or unicode, str or unicode, str or unicode)
+    :return: results, in the same order as `test_cases`
+    :rtype: list of :class:`TestResult`
+    """
+    (converter, skip_tests) = self._converters[name]
+    return run_test_cases(converter,
+                          skip_tests,
+                          self._harness.format_comparators,
+                          test_cases,
+                          self._work_dir,
+                          self._harness.conversion_cache,
+                          self._harness.comparison_cache,
+                          self._harness.tracer,
+                          self._harness.events,
+                          name)
+
+  def statistics(self):
+    """Get counters from converters and comparators that provide
+    them.
+
+    :return: counter values keyed by counter name, keyed by converter
+      or comparator name
+    :rtype: dict
+    """
+    statistics = {}
+    for (name, (converter, _)) in self._converters.items():
+      statistics[name] = converter.statistics()
+    for (name, comparator) in self._harness.comparators.items():
+      statistics[name] = comparator.statistics()
+    for (name, cache) in [
+        (HarnessResources.CONVERSION_CACHE, self._harness.conversion_cache),
+        (HarnessResources.COMPARISON_CACHE, self._harness.comparison_cache)]:
+      if cache is not None:
+        statistics[name] = dict([("cache-" + key, value) for (key, value)
+                                 in cache.statistics().items()])
+    return dict([(name, counters) for (name, counters) in statistics.items()
+                 if counters])
+
+  def close(self):
+    """Close converters and comparators and remove working directory.
+    """
+    for (converter, _) in self._converters.values():
+      converter.close()
+    for comparator in self._harness.comparators.values():
+      comparator.close()
+    self._harness.tracer.close()
+    self._harness.events.close()
+    shutil.rmtree(self._work_dir, ignore_errors=True)
+
+
+def _work(harness_config, converter_configs, tasks, results, statistics):
+  """Worker process body. Test case jobs, of form ``(converter name,
+  list of test case tuples)`` are read from `tasks` until ``None`` is
+  read. The result for each test case tuple is put onto `results`.
+  After each job, and once all jobs are done, the worker's counters
+  are put onto `statistics`, as ``(process ID, counters, done)``.
+
+  :param harness_config: Harness configuration
+  :type harness_config: dict
+  :param converter_configs: Converter configurations keyed by name
+  :type converter_configs: dict
+  :param tasks: Queue of jobs
+  :type tasks: :class:`multiprocessing.Queue`
+  :param results: Queue of results
+  :type results: :class:`multiprocessing.Queue`
+  :param statistics: Queue of counters
+  :type statistics: :class:`multiprocessing.Queue`
+  """
+  worker = Worker(harness_config, converter_configs)
+  try:
+    for (name, test_cases) in iter(tasks.get, None):
+      for result in worker.run(name, test_cases):
+        results.put(result)
+      statistics.put((os.getpid(), worker.statistics(), False))
+    statistics.put((os.getpid(), worker.statistics(), True))
+  finally:
+    worker.close()
+
+
+def run(harness_config, converter_configs, processes=1, statistics=None,
+        state=None, metrics=None):
+  """Run all test case tuples against all converters.
+
+  If `state` is given then the outcome of each tuple that is run, and
+  which passes or fails, is recorded in it, and the state is saved.
+  Tuples whose outcomes were recorded by a previous run, and whose
+  input file, expected output file, converter and comparator are
+  unchanged, are not run. Their results are those recorded, marked as
+  reused. Errors are not recorded, as these may be transient, nor are
+  skips, which are cheap to determine.
+
+  If the harness configuration has a ``trace`` file then any existing
+  file is removed, so that the file holds the spans recorded by this
+  run's processes (see :mod:`prov_interop.trace`). Likewise, if it has
+  an ``events`` file then any existing file, other than a FIFO, is
+  removed, so that the file holds the events recorded by this run's
+  processes (see :mod:`prov_interop.events`).
+
+  If `metrics` is given then the outcome and times of each tuple,
+  and the workers' counters, are recorded in it as results arrive
+  (see :func:`record_result` and :func:`record_statistics`).
+
+  :param harness_config: Harness configuration
+  :type harness_config: dict
+  :param converter_configs: Converter configurations keyed by name
+  :type converter_configs: dict
+  :param processes: Number of worker processes. If 1 then tests are
+    run in the current process
+  :type processes: int
+  :param statistics: If provided, the counters of each worker, as
+    returned by :meth:`Worker.statistics`, are appended to this
+  :type statistics: list
+  :param state: Outcomes of previous runs (optional)
+  :type state: :class:`prov_interop.state.RunState`
+  :param metrics: Metrics (optional)
+  :type metrics: :class:`prov_interop.metrics.Metrics`
+  :return: results, in test case order
+  :rtype: list of :class:`TestResult`
+  :raises ConfigError: if there are any problems creating or
+    configuring comparators or converters
+  :raises IOError: if `state` cannot be saved
+  """
+  trace_file = harness_config.get(HarnessResources.TRACE, None)
+  # YAML file names are bytes, not unicode, on Python 2.
+  if isinstance(trace_file, (bytes, type(""))):
+    trace.start(trace_file)
+  events_file = harness_config.get(HarnessResources.EVENTS, None)
+  if isinstance(events_file, (bytes, type(""))):
+    events.start(events_file)
+  # Configure components in this process to validate the configuration
+  # and to expand the test cases once.
+  worker = Worker(harness_config, converter_configs)
+  # Test case tuples for the same converter and formats, or the same
+  # converter and input format if the converter groups by input, are
+  # grouped into jobs of up to the batch size, so they can be
+  # converted and compared together.
+  order = []
+  jobs = []
+  groups = {}
+  received = {}
+  keys = {}
+  for test_case in worker.harness.test_cases_generator():
+    (_, ext_in, _, ext_out, _) = test_case
+    for name in sorted(converter_configs):
+      order.append((name, test_case))
+      if state is not None and worker.skip_message(name, test_case) is None:
+        try:
+          key = state.key(worker.fingerprint(name, ext_out), test_case)
+        except (IOError, OSError):
+          # Run the tuple, so that the problem is reported.
+          key = None
+        outcome = None if key is None else state.get(key)
+        if outcome is not None:
+          received[(name, test_case)] = reused_result(name, test_case,
+                                                      outcome)
+          continue
+        keys[(name, test_case)] = key
+      if worker.group_by_input(name):
+        group = (name, ext_in)
+      else:
+        group = (name, ext_in, ext_out)
+      if group not in groups:
+        groups[group] = (name, [])
+        jobs.append(groups[group])
+      groups[group][1].append(test_case)
+      if len(groups[group][1]) >= worker.batch_size(name, ext_out):
+        del groups[group]
+  if metrics is not None:
+    for result in received.values():
+      record_result(metrics, result)
+  if processes <= 1:
+    try:
+      for (name, test_cases) in jobs:
+        for result in worker.run(name, test_cases):
+          received[(result.converter, result.test_case)] = result
+          if metrics is not None:
+            record_result(metrics, result)
+        if metrics is not None:
+          record_statistics(metrics, [worker.statistics()])
+      if statistics is not None:
+        statistics.append(worker.statistics())
+    finally:
+      worker.close()
+  else:
+    worker.close()
+    _run_processes(harness_config, converter_configs, processes, jobs,
+                   len(order), received, statistics, metrics)
+  if state is not None:
+    for (key, result) in [(key, received[job])
+                          for (job, key) in keys.items()
+                          if key is not None]:
+      if result.status in [TestResult.PASS, TestResult.FAIL]:
+        state.put(key, result.converter, result.status, result.message,
+                  result.detail, result.time)
+    state.prune(sorted(converter_configs))
+    state.save()
+  return [received[key] for key in order]
+
+
+def _run_processes(harness_config, converter_configs, processes, jobs,
+                   count, received, statistics, metrics=None):
+  """Run jobs in worker processes.
+
+  While waiting for results, the workers are checked every
+  :data:`POLL_INTERVAL` seconds. If a worker has failed (see
+  :func:`worker_failure`) then the other workers are terminated, and
+  each test case tuple whose result has not been received is given
+  an error result, rather than waiting forever.
+
+  :param harness_config: Harness configuration
+  :type harness_config: dict
+  :param converter_configs: Converter configurations keyed by name
+  :type converter_configs: dict
+  :param processes: Number of worker processes
+  :type processes: int
+  :param jobs: Jobs, of form ``(converter name, list of test case
+    tuples)``
+  :type jobs: list
+  :param count: Number of results expected in `received` once all
+    jobs are done
+  :type count: int
+  :param received: Results keyed by ``(converter name, test case
+    tuple)``, to which the results of the jobs are added
+  :type received: dict
+  :param statistics: If provided, the counters of each worker are
+    appended to this
+  :type statistics: list
+  :param metrics: If provided, results, and the latest counters of
+    each worker, are recorded in this as they arrive
+  :type metrics: :class:`prov_interop.metrics.Metrics`
+  """
+  tasks = multiprocessing.Queue()
+  results = multiprocessing.Queue()
+  counters = multiprocessing.Queue()
+  workers = [multiprocessing.Process(
+      target=_work,
+      args=(harness_config, converter_configs, tasks, results, counters))
+             for _ in range(processes)]
+  for process in workers:
+    process.start()
+  for job in jobs:
+    tasks.put(job)
+  for _ in workers:
+    tasks.put(None)
+  # Latest counters of each worker, keyed by process ID.
+  latest = {}
+  done = set()
+
+  def receive_counters(timeout):
+    try:
+      (pid, worker_statistics, worker_done) = counters.get(True, timeout)
+    except queue.Empty:
+      return False
+    latest[pid] = worker_statistics
+    if worker_done:
+      done.add(pid)
+    return True
+
+  def receive_result(timeout):
+    try:
+      result = results.get(True, timeout)
+    except queue.Empty:
+      return False
+    received[(result.converter, result.test_case)] = result
+    if metrics is not None:
+      record_result(metrics, result)
+      while not counters.empty():
+        receive_counters(POLL_INTERVAL)
+      record_statistics(metrics, list(latest.values()))
+    return True
+
+  failure = None
+  try:
+    while len(received) < count:
+      if receive_result(POLL_INTERVAL):
+        continue
+      failure = worker_failure(workers)
+      if failure is not None:
+        # Collect results the workers put before the failure.
+        while len(received) < count and receive_result(POLL_INTERVAL):
+          pass
+        break
+    if failure is not None:
+      for process in workers:
+        if process.is_alive():
+          process.terminate()
+      for (name, test_cases) in jobs:
+        for test_case in test_cases:
+          if (name, test_case) not in received:
+            result = TestResult(name, xunit_classname(name), test_case)
+            result.status = TestResult.ERROR
+            result.message = failure
+            received[(name, test_case)] = result
+            if metrics is not None:
+              record_result(metrics, result)
+    # Wait for the final counters of each worker that is still alive,
+    # then collect any put by workers that have exited.
+    while [process for process in workers
+           if process.pid not in done and process.is_alive()]:
+      receive_counters(POLL_INTERVAL)
+    while len(done) < len(workers) and receive_counters(POLL_INTERVAL):
+      pass
+    if metrics is not None:
+      record_statistics(metrics, list(latest.values()))
+    if statistics is not None:
+      statistics.extend(latest.values())
+  finally:
+    for process in workers:
+      if failure is not None and process.is_alive():
+        process.terminate()
+      process.join()
+
+
+def worker_failure(workers):
+  """Check whether any worker processes have failed. A worker has
+  failed if it exited with a non-zero exit code, e.g. if it raised an
+  exception or was killed. If all the workers have exited, then they
+  cannot put any more results, so they are also deemed to have failed.
+
+  :param workers: Worker processes
+  :type workers: list of :class:`multiprocessing.Process`
+  :return: message describing the failure, or ``None`` if no worker
+    has failed
+  :rtype: str or unicode
+  """
+  for process in workers:
+    if process.exitcode not in [None, 0]:
+      return ("Worker process " + str(process.pid) +
+              " exited with code " + str(process.exitcode))
+  if all(process.exitcode is not None for process in workers):
+    return "Worker processes exited before returning all results"
+  return None
+
+
+def reused_result(name, test_case, outcome):
+  """Create a result from an outcome recorded by a previous run.
+
+  :param name: Converter name
+  :type name: str or unicode
+  :param test_case: test case tuple
+  :type test_case: tuple of (str or unicode, str or unicode, str or
+    unicode, str or unicode, str or unicode)
+  :param outcome: Outcome, as returned by
+    :meth:`prov_interop.state.RunState.get`
+  :type outcome: dict
+  :return: result
+  :rtype: :class:`TestResult`
+  """
+  result = TestResult(name, xunit_classname(name), test_case)
+  result.status = outcome["status"]
+  result.message = outcome.get("message", "")
+  result.detail = outcome.get("detail", "")
+  result.time = outcome.get("time", 0.0)
+  result.reused = True
+  return result
+
+
+def write_xunit(results, file_name):
+  """Write results as xUnit-compliant XML, in the same form as that
+  written by nose's ``--with-xunit`` option. The exit code and
+  resource usage of the processes run for each tuple are written as
+  its ``system-out``, as the tests print them under nose.
+
+  :param results: results
+  :type results: list of :class:`TestResult`
+  :param file_name: File name
+  :type file_name: str or unicode
+  """
+  counts = {}
+  for status in [TestResult.PASS, TestResult.FAIL,
+                 TestResult.ERROR, TestResult.SKIP]:
+    counts[status] = len([r for r in results if r.status == status])
+  suite = ElementTree.Element("testsuite", {
+    "name": "nosetests",
+    "tests": str(len(results)),
+    "errors": str(counts[TestResult.ERROR]),
+    "failures": str(counts[TestResult.FAIL]),
+    "skip": str(counts[TestResult.SKIP])})
+  elements = {
+    TestResult.FAIL: "failure",
+    TestResult.ERROR: "error",
+    TestResult.SKIP: "skipped"}
+  for result in results:
+    case = ElementTree.SubElement(suite, "testcase", {
+      "classname": result.classname,
+      "name": result.name,
+      "time": "%.3f" % result.time})
+    if result.status in elements:
+      outcome = ElementTree.SubElement(case, elements[result.status], {
+        "type": result.status,
+        "message": result.message})
+      outcome.text = result.detail or result.message
+    if result.invocations:
+      output = ElementTree.SubElement(case, "system-out")
+      output.text = "".join(["Invocation: " + str(invocation) + "\n"
+                             for invocation in result.invocations])
+  ElementTree.ElementTree(suite).write(file_name, encoding="UTF-8",
+                                       xml_declaration=True)
+
+
+def load_configuration(names=None, file_name=None):
+  """Load harness configuration and converter configurations.
+
+  The harness configuration is loaded as for
+  :func:`prov_interop.interop_tests.harness.initialise_harness_from_file`.
+  Each converter's configuration is loaded as for
+  :meth:`prov_interop.interop_tests.test_converter.ConverterTestCase.configure`,
+  and the name of its converter class is added to it, unless the
+  configuration already names a class under the key ``class`` (e.g.
+  ``prov_interop.provpy.library.ProvPyLibraryConverter``).
+
+  :param names: Names of converters, each of which must be in
+    :data:`CONVERTERS`. If ``None`` then all converters whose
+    configuration files can be found are loaded
+  :type names: list of str or unicode
+  :param file_name: Harness configuration file name (optional)
+  :type file_name: str or unicode
+  :return: harness configuration and converter configurations keyed
+    by name
+  :rtype: tuple of (dict, dict)
+  :raises IOError: if a file is not found
+  :raises ConfigError: if a name is not recognised or a
+    configuration file does not hold the converter's configuration
+  :raises YamlError: if a file is an invalid YAML file
+  """
+  harness_config = load_yaml(CONFIGURATION_FILE_ENV,
+                             DEFAULT_CONFIGURATION_FILE,
+                             file_name)
+  optional = names is None
+  if optional:
+    names = sorted(CONVERTERS)
+  converter_configs = {}
+  for name in names:
+    if name not in CONVERTERS:
+      raise ConfigError("Unrecognised converter " + name)
+    (class_name, env_var, default_file_name, _) = CONVERTERS[name]
+    config_file_name = harness_config.get(name, None)
+    try:
+      config = load_yaml(env_var, default_file_name, config_file_name)
+    except IOError:
+      if optional:
+        continue
+      raise
+    if name not in config:
+      raise ConfigError("Missing configuration for " + name)
+    converter_configs[name] = dict(config[name])
+    converter_configs[name].setdefault(CLASS, class_name)
+  return (harness_config, converter_configs)
+
+
+def merge_statistics(statistics):
+  """Sum the counters of many workers.
+
+  :param statistics: counters of each worker, as returned by
+    :meth:`Worker.statistics`
+  :type statistics: list of dict
+  :return: summed counter values keyed by counter name, keyed by
+    converter or comparator name
+  :rtype: dict
+  """
+  merged = {}
+  for worker_statistics in statistics:
+    for (name, counters) in worker_statistics.items():
+      totals = merged.setdefault(name, {})
+      for (counter, value) in counters.items():
+        totals[counter] = totals.get(counter, 0) + value
+  return merged
+
+
+def record_result(metrics, result):
+  """Record the outcome of a test case tuple, and the times taken to
+  convert and compare it, if it was run, in metrics, labelled by
+  converter and input and output formats:
+
+  - ``prov_interop_tests_total`` counts tuples, also labelled by
+    status.
+  - ``prov_interop_convert_seconds`` and
+    ``prov_interop_compare_seconds`` are histograms of the times
+    taken, as shared between the tuples converted or compared
+    together.
+
+  :param metrics: Metrics
+  :type metrics: :class:`prov_interop.metrics.Metrics`
+  :param result: result
+  :type result: :class:`TestResult`
+  """
+  (_, ext_in, _, ext_out, _) = result.test_case
+  labels = {"converter": result.converter,
+            "ext_in": ext_in,
+            "ext_out": ext_out}
+  metrics.inc(metric_name("tests_total"),
+              dict(labels, status=result.status),
+              help_text="Test case tuples run, skipped or reused")
+  if result.convert_time is not None:
+    metrics.observe(metric_name("convert_seconds"), labels,
+                    result.convert_time,
+                    help_text="Time taken to convert a test case")
+  if result.compare_time is not None:
+    metrics.observe(metric_name("compare_seconds"), labels,
+                    result.compare_time,
+                    help_text="Time taken to compare a test case")
+
+
+def record_statistics(metrics, statistics):
+  """Record the counters of workers in metrics. Each counter, summed
+  across the workers, is recorded as a metric named after it, e.g.
+  ``http-requests`` as ``prov_interop_http_requests_total``, labelled
+  by the converter, comparator or cache it is from. Counts of cache
+  entries are recorded as gauges e.g. ``prov_interop_cache_entries``.
+
+  :param metrics: Metrics
+  :type metrics: :class:`prov_interop.metrics.Metrics`
+  :param statistics: latest counters of each worker, as returned by
+    :meth:`Worker.statistics`
+  :type statistics: list of dict
+  """
+  for (name, counters) in merge_statistics(statistics).items():
+    for (counter, value) in counters.items():
+      if counter.endswith("entries"):
+        metrics.set(metric_name(counter), {"component": name}, value)
+      else:
+        metrics.set(metric_name(counter) + "_total", {"component": name},
+                    value, COUNTER)
+
+
+def format_counters(counters):
+  """Format counters for printing. If there are ``cache-hits`` and
+  ``cache-misses`` counters then the cache hit rate is included. If
+  there are ``bytes-sent`` or ``bytes-received`` counters, and
+  corresponding ``-uncompressed`` counters, then the compression ratios
+  are included.
+
+  :param counters: counter values keyed by counter name
+  :type counters: dict
+  :return: counters
+  :rtype: str or unicode
+  """
+  text = ", ".join([name + " " + str(counters[name])
+                    for name in sorted(counters)])
+  lookups = counters.get("cache-hits", 0) + counters.get("cache-misses", 0)
+  if lookups:
+    text += (", cache hit rate " +
+             "%.1f%%" % (100.0 * counters.get("cache-hits", 0) / lookups))
+  for direction in ["sent", "received"]:
+    size = counters.get("bytes-" + direction, 0)
+    uncompressed = counters.get("bytes-" + direction + "-uncompressed", 0)
+    if size and uncompressed:
+      text += (", " + direction + " compression ratio " +
+               "%.1f" % (float(uncompressed) / size))
+  return text
+
+
+def print_summary(results, elapsed, statistics=None):
+  """Print summary of results.
+
+  :param results: results
+  :type results: list of :class:`TestResult`
+  :param elapsed: Elapsed time in seconds
+  :type elapsed: float
+  :param statistics: counters of each worker, as returned by
+    :meth:`Worker.statistics` (optional)
+  :type statistics: list of dict
+  """
+  for result in results:
+    if result.status in [TestResult.FAIL, TestResult.ERROR]:
+      print(result.status.upper() + ": " + result.classname + "." +
+            result.name + ": " + result.message)
+  counts = ", ".join([
+    str(len([r for r in results if r.status == status])) + " " + status
+    for status in [TestResult.PASS, TestResult.FAIL,
+                   TestResult.ERROR, TestResult.SKIP]])
+  print("Ran " + str(len(results)) + " tests in " +
+        "%.3fs" % elapsed + ": " + counts)
+  reused = len([r for r in results if r.reused])
+  if reused:
+    print("Reused " + str(reused) + " results from previous runs")
+  merged = merge_statistics(statistics or [])
+  for name in sorted(merged):
+    print(name + ": " + format_counters(merged[name]))
+
+
+def main(argv=None):
+  """Parse command-line arguments, run tests, print a summary and
+  write an xUnit results file.
+
+  :param argv: Command-line arguments (optional)
+  :type argv: list of str or unicode
+  :return: 0 if all tests passed or were skipped, 1 otherwise
+  :rtype: int
+  """
+  parser = argparse.ArgumentParser(
+    description="Run converter interoperability tests in parallel.")
+  parser.add_argument("converter", nargs="*",
+                      help="Converters to test (default: all those " +
+                      ", ".join(sorted(CONVERTERS)) +
+                      " whose configuration files are found)")
+  parser.add_argument("-c", "--config", metavar="FILE",
+                      help="Harness configuration file")
+  parser.add_argument("-p", "--processes", metavar="N", type=int,
+                      default=multiprocessing.cpu_count(),
+                      help="Number of worker processes")
+  parser.add_argument("--xunit-file", metavar="FILE",
+                      default="nosetests.xml",
+                      help="xUnit XML results file")
+  parser.add_argument("--state", metavar="FILE",
+                      help="File recording test outcomes. Test cases " +
+                      "whose files, converter and comparator are " +
+                      "unchanged since their outcomes were recorded " +
+                      "are not re-run")
+  parser.add_argument("--metrics-file", metavar="FILE",
+                      help="File to which metrics are written, in the " +
+                      "Prometheus text format, during and at the end " +
+                      "of the run")
+  parser.add_argument("--metrics-interval", metavar="SECONDS", type=float,
+                      default=metrics.DEFAULT_INTERVAL,
+                      help="Interval between writes of the metrics file")
+  args = parser.parse_args(argv)
+  (harness_config, converter_configs) = load_configuration(
+    args.converter or None, args.config)
+  print("Converters: " + ", ".join(sorted(converter_configs)))
+  start = time.time()
+  statistics = []
+  state = None if args.state is None else RunState(args.state)
+  run_metrics = None
+  if args.metrics_file is not None:
+    run_metrics = Metrics()
+    run_metrics.start(args.metrics_file, args.metrics_interval)
+  try:
+    results = run(harness_config, converter_configs, args.processes,
+                  statistics, state, run_metrics)
+  finally:
+    if run_metrics is not None:
+      run_metrics.stop()
+  print_summary(results, time.time() - start, statistics)
+  write_xunit(results, args.xunit_file)
+  failed = [r for r in results
+            if r.status in [TestResult.FAIL, TestResult.ERROR]]
+  return 1 if failed else 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,890 @@
+"""Local stand-in for the parts of the ProvTranslator and ProvStore
+REST APIs used by :mod:`prov_interop.provtranslator.converter` and
+:mod:`prov_interop.provstore.converter`.
+
+The stand-in serves:
+
+- ``POST /validator/provapi/documents/``: ProvTranslator translation
+  of the request body from the format given by ``Content-type`` into
+  that given by ``Accept``.
+- ``POST /store/api/v0/documents/``: ProvStore storage of the document
+  within the request's JSON object, returning its ``id``.
+- ``GET /store/api/v0/documents/ID.FORMAT``: ProvStore retrieval of a
+  stored document in a format.
+- ``DELETE /store/api/v0/documents/ID``: ProvStore deletion of a
+  stored document.
+
+Documents are converted by the ProvPy ``prov`` library (the ``prov``
+backend), or returned unchanged (the ``passthrough`` backend), which
+measures the harness rather than the conversion. Each request can be
+delayed by a fixed latency, and a fraction of requests, chosen by a
+seeded random number generator, answered with 503 Service Unavailable,
+so retries and concurrency control can be exercised reproducibly and
+offline. Connections are kept alive and each is served by its own
+thread. Stored documents are held in memory.
+
+Usage::
+
+    usage: standin.py [-h] [-H HOST] [-p PORT] [-u SOCKET] [-2]
+                      [-b {prov,passthrough}] [-l LATENCY]
+                      [-e ERROR_RATE] [-s SEED]
+
+    Serve a local stand-in for the ProvTranslator and ProvStore APIs.
+
+    optional arguments:
+      -h, --help            show this help message and exit
+      -H HOST               Host name or address (default 127.0.0.1)
+      -p PORT               Port (default 8000)
+      -u SOCKET             Unix domain socket to listen on, instead of
+                            HOST and PORT
+      -2                    Serve HTTP/2, with prior knowledge, instead
+                            of HTTP/1.1
+      -b {prov,passthrough} Backend (default prov)
+      -l LATENCY            Latency added to each request, in seconds
+                            (default 0)
+      -e ERROR_RATE         Fraction of requests answered with 503
+                            Service Unavailable (default 0)
+      -s SEED               Seed for choosing requests to fail
+
+For example::
+
+    $ python -m prov_interop.standin -b passthrough -l 0.05 -e 0.01
+    ProvTranslator: http://127.0.0.1:8000/validator/provapi/documents/
+    ProvStore: http://127.0.0.1:8000/store/api/v0/documents/
+
+The converters' ``url`` can then be set to these URLs. With ``-u``,
+the URLs are ``http+unix`` URLs (see :mod:`prov_interop.unixsocket`).
+With ``-2``, which needs the ``h2`` package, the converters must be
+configured with ``http2: true`` (see :mod:`prov_interop.http2`).
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import json
+import os
+import random
+import socket
+import stat
+import threading
+import time
+import zlib
+
+try:
+  from http.server import BaseHTTPRequestHandler
+  from http.server import HTTPServer
+  from socketserver import BaseRequestHandler
+  from socketserver import TCPServer
+  from socketserver import ThreadingMixIn
+except ImportError:
+  from BaseHTTPServer import BaseHTTPRequestHandler
+  from BaseHTTPServer import HTTPServer
+  from SocketServer import BaseRequestHandler
+  from SocketServer import TCPServer
+  from SocketServer import ThreadingMixIn
+
+import requests
+
+try:
+  import h2.config
+  import h2.connection
+  import h2.events
+  import h2.exceptions
+except ImportError:
+  h2 = None
+
+from prov_interop import http
+from prov_interop import standards
+from prov_interop import unixsocket
+from prov_interop.provstore.converter import ProvStoreConverter
+from prov_interop.provtranslator.converter import ProvTranslatorConverter
+
+TRANSLATOR_PATH = "/validator/provapi/documents/"
+"""str or unicode: path of ProvTranslator documents"""
+
+STORE_PATH = "/store/api/v0/documents/"
+"""str or unicode: path of ProvStore documents"""
+
+PROV = "prov"
+"""str or unicode: backend converting documents with the ``prov``
+library"""
+
+PASSTHROUGH = "passthrough"
+"""str or unicode: backend returning documents unchanged"""
+
+BACKENDS = [PROV, PASSTHROUGH]
+"""list of str or unicode: backends"""
+
+DEFAULT_PORT = 8000
+"""int: default port"""
+
+
+def get_format(content_type, content_types):
+  """Get the format of a content type.
+
+  :param content_type: Content type, possibly with parameters e.g.
+    ``text/turtle; charset=utf-8``
+  :type content_type: str or unicode
+  :param content_types: Mapping from formats to content types
+  :type content_types: dict
+  :return: format from :mod:`prov_interop.standards`, or ``None`` if
+    the content type is not in `content_types`
+  :rtype: str or unicode
+  """
+  content_type = (content_type or "").split(";")[0].strip().lower()
+  for (format, value) in content_types.items():
+    if value == content_type:
+      return format
+  return None
+
+
+class StandInServer(ThreadingMixIn, HTTPServer):
+  """Stand-in ProvTranslator and ProvStore server. It counts the
+  requests served and the errors injected.
+  """
+
+  daemon_threads = True
+
+  def __init__(self, address, backend=PROV, latency=0, error_rate=0,
+               seed=None):
+    """Create server, listening on `address`.
+
+    :param address: Host name or address, and port, or 0 for any
+      free port
+    :type address: tuple of (str or unicode, int)
+    :param backend: ``prov`` or ``passthrough``
+    :type backend: str or unicode
+    :param latency: Latency added to each request, in seconds
+    :type latency: int or float
+    :param error_rate: Fraction of requests answered with 503 Service
+      Unavailable
+    :type error_rate: float
+    :param seed: Seed for choosing requests to fail
+    :type seed: int
+    :raises ValueError: if `backend`, `latency` or `error_rate` are
+      invalid
+    :raises socket.error: if `address` cannot be listened on
+    """
+    if backend not in BACKENDS:
+      raise ValueError("Backend must be one of " + ", ".join(BACKENDS))
+    if latency < 0:
+      raise ValueError("Latency must be non-negative")
+    if not 0 <= error_rate <= 1:
+      raise ValueError("Error rate must be between 0 and 1")
+    HTTPServer.__init__(self, address, StandInHandler)
+    self._backend = backend
+    self._latency = latency
+    self._error_rate = error_rate
+    self._random = random.Random(seed)
+    self._lock = threading.Lock()
+    self._documents = {}
+    self._next_id = 1
+    self._counters = {"requests": 0, "errors": 0}
+    self._thread = None
+
+  @property
+  def base_url(self):
+    """Get the server's URL.
+
+    :return: URL, without a trailing ``/``
+    :rtype: str or unicode
+    """
+    (host, port) = self.server_address[:2]
+    return "http://" + host + ":" + str(port)
+
+  @property
+  def translator_url(self):
+    """Get the URL of ProvTranslator documents.
+
+    :return: URL
+    :rtype: str or unicode
+    """
+    return self.base_url + TRANSLATOR_PATH
+
+  @property
+  def store_url(self):
+    """Get the URL of ProvStore documents.
+
+    :return: URL
+    :rtype: str or unicode
+    """
+    return self.base_url + STORE_PATH
+
+  def start(self):
+    """Serve requests in a background thread.
+    """
+    self._thread = threading.Thread(target=self.serve_forever)
+    self._thread.daemon = True
+    self._thread.start()
+
+  def stop(self):
+    """Stop serving requests started by :meth:`start`, and close the
+    listening socket.
+    """
+    if self._thread is not None:
+      self.shutdown()
+      self._thread.join()
+      self._thread = None
+    self.server_close()
+
+  def admit(self):
+    """Count a request, delay it by the latency and decide whether it
+    fails.
+
+    :return: ``True`` if the request is to be served, ``False`` if it
+      is to fail
+    :rtype: bool
+    """
+    with self._lock:
+      self._counters["requests"] += 1
+      fail = self._random.random() < self._error_rate
+      if fail:
+        self._counters["errors"] += 1
+    if self._latency:
+      time.sleep(self._latency)
+    return not fail
+
+  def convert(self, content, in_format, out_format):
+    """Convert a document.
+
+    :param content: Document
+    :type content: bytes
+    :param in_format: Format of `content`
+    :type in_format: str or unicode
+    :param out_format: Format to convert to
+    :type out_format: str or unicode
+    :return: converted document
+    :rtype: bytes
+    :raises Exception: if the document cannot be converted
+    """
+    if self._backend == PASSTHROUGH or in_format == out_format:
+      return content
+    # Imported here, so the passthrough backend needs no prov library.
+    from prov.model import ProvDocument
+    from prov_interop.provpy.library import serializer_arguments
+    document = ProvDocument.deserialize(content=content.decode("utf-8"),
+                                        **serializer_arguments(in_format))
+    return document.serialize(
+      **serializer_arguments(out_format)).encode("utf-8")
+
+  def store(self, content, format):
+    """Store a document.
+
+    :param content: Document
+    :type content: bytes
+    :param format: Format of `content`
+    :type format: str or unicode
+    :return: document ID
+    :rtype: int
+    """
+    with self._lock:
+      document_id = self._next_id
+      self._next_id += 1
+      self._documents[document_id] = (content, format)
+    return document_id
+
+  def document(self, document_id):
+    """Get a stored document.
+
+    :param document_id: Document ID
+    :type document_id: int
+    :return: document and its format, or ``None`` if there is no such
+      document
+    :rtype: tuple of (bytes, str or unicode)
+    """
+    with self._lock:
+      return self._documents.get(document_id)
+
+  def delete(self, document_id):
+    """Delete a stored document.
+
+    :param document_id: Document ID
+    :type document_id: int
+    :return: ``True`` if the document was deleted, ``False`` if there
+      is no such document
+    :rtype: bool
+    """
+    with self._lock:
+      return self._documents.pop(document_id, None) is not None
+
+  def statistics(self):
+    """Get counters of requests served, errors injected, and documents
+    currently stored.
+
+    :return: ``requests``, ``errors`` and ``documents``
+    :rtype: dict from str or unicode to int
+    """
+    with self._lock:
+      statistics = dict(self._counters)
+      statistics["documents"] = len(self._documents)
+    return statistics
+
+
+class UnixStandInServer(StandInServer):
+  """Stand-in ProvTranslator and ProvStore server listening on a Unix
+  domain socket, whose URLs are ``http+unix`` URLs (see
+  :mod:`prov_interop.unixsocket`).
+  """
+
+  address_family = socket.AF_UNIX
+
+  def __init__(self, socket_path, **kwargs):
+    """Create server, listening on `socket_path`. A socket left by a
+    previous server is removed.
+
+    :param socket_path: Socket file name
+    :type socket_path: str or unicode
+    :param kwargs: Arguments for :class:`StandInServer` e.g.
+      ``backend``
+    :type kwargs: dict
+    :raises ValueError: as for :class:`StandInServer`
+    :raises socket.error: if `socket_path` cannot be listened on
+    """
+    if os.path.exists(socket_path) and \
+        stat.S_ISSOCK(os.stat(socket_path).st_mode):
+      os.remove(socket_path)
+    # StandInServer is an old-style class on Python 2, so super cannot
+    # be used.
+    StandInServer.__init__(self, socket_path, **kwargs)
+    self.RequestHandlerClass = UnixStandInHandler
+
+  def server_bind(self):
+    # HTTPServer.server_bind expects a host and port.
+    TCPServer.server_bind(self)
+
+  @property
+  def base_url(self):
+    """Get the server's URL.
+
+    :return: URL, without a trailing ``/``
+    :rtype: str or unicode
+    """
+    return unixsocket.socket_url(self.server_address, "")
+
+  def server_close(self):
+    """Close the listening socket and remove its file.
+    """
+    StandInServer.server_close(self)
+    if os.path.exists(self.server_address):
+      os.remove(self.server_address)
+
+
+class H2StandInServer(StandInServer):
+  """Stand-in ProvTranslator and ProvStore server speaking HTTP/2, with
+  prior knowledge, over TCP, rather than HTTP/1.1. The requests on
+  each connection are multiplexed, each being served by its own
+  thread. This needs the ``h2`` package.
+  """
+
+  def __init__(self, address, **kwargs):
+    """Create server, listening on `address`.
+
+    :param address: Host name or address, and port, or 0 for any
+      free port
+    :type address: tuple of (str or unicode, int)
+    :param kwargs: Arguments for :class:`StandInServer` e.g.
+      ``backend``
+    :type kwargs: dict
+    :raises ImportError: if ``h2`` is not installed
+    :raises ValueError: as for :class:`StandInServer`
+    :raises socket.error: if `address` cannot be listened on
+    """
+    if h2 is None:
+      raise ImportError("HTTP/2 requires the h2 package")
+    # StandInServer is an old-style class on Python 2, so super cannot
+    # be used.
+    StandInServer.__init__(self, address, **kwargs)
+    self.RequestHandlerClass = H2StandInHandler
+
+
+class StandInRequest(object):
+  """Handling of a request to a :class:`StandInServer`, whatever the
+  HTTP version. Subclasses provide ``server``, ``path`` and
+  ``headers`` attributes, as for
+  :class:`http.server.BaseHTTPRequestHandler`, and implement
+  :meth:`read_raw_body` and :meth:`respond`.
+  """
+
+  def do_POST(self):
+    body = self.read_body()
+    if body is None or not self.admitted():
+      return
+    if self.path == TRANSLATOR_PATH:
+      self.translate(body)
+    elif self.path == STORE_PATH:
+      self.store(body)
+    else:
+      self.respond(404)
+
+  def do_GET(self):
+    if not self.admitted():
+      return
+    (document_id, format) = self.document_path()
+    if document_id is None or format is None:
+      self.respond(404)
+      return
+    document = self.server.document(document_id)
+    if document is None:
+      self.respond(404)
+      return
+    (content, in_format) = document
+    self.converted(content, in_format, format,
+                   ProvStoreConverter.CONTENT_TYPES[format])
+
+  def do_DELETE(self):
+    if not self.admitted():
+      return
+    (document_id, format) = self.document_path()
+    if document_id is None or format is not None or \
+        not self.server.delete(document_id):
+      self.respond(404)
+      return
+    self.respond(204)
+
+  def admitted(self):
+    """Admit a request, as for :meth:`StandInServer.admit`. A 503
+    Service Unavailable response, with a ``Retry-After`` of 0 seconds,
+    is sent to requests chosen to fail.
+
+    :return: ``True`` if the request is to be served
+    :rtype: bool
+    """
+    if self.server.admit():
+      return True
+    self.respond(503, headers={"Retry-After": "0"})
+    return False
+
+  def read_body(self):
+    """Read the request body, decompressing it if it has a
+    ``Content-Encoding``. If the body cannot be read, an error
+    response is sent.
+
+    :return: body, or ``None`` if it cannot be read
+    :rtype: bytes
+    """
+    body = self.read_raw_body()
+    if body is None:
+      return None
+    encoding = self.headers.get(http.CONTENT_ENCODING)
+    try:
+      if encoding == http.GZIP:
+        body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+      elif encoding == http.DEFLATE:
+        body = zlib.decompress(body)
+      elif encoding is not None:
+        self.respond(415)
+        return None
+    except zlib.error:
+      self.respond(400)
+      return None
+    return body
+
+  def document_path(self):
+    """Parse a ProvStore document path, ``ID`` or ``ID.FORMAT``.
+
+    :return: document ID and format, either of which is ``None`` if
+      absent or invalid
+    :rtype: tuple of (int, str or unicode)
+    """
+    if not self.path.startswith(STORE_PATH):
+      return (None, None)
+    (name, _, format) = self.path[len(STORE_PATH):].partition(".")
+    if format and format not in ProvStoreConverter.CONTENT_TYPES:
+      return (None, None)
+    try:
+      return (int(name), format or None)
+    except ValueError:
+      return (None, None)
+
+  def translate(self, body):
+    """Respond to a ProvTranslator translation request.
+
+    :param body: Request body
+    :type body: bytes
+    """
+    in_format = get_format(self.headers.get(http.CONTENT_TYPE),
+                           ProvTranslatorConverter.CONTENT_TYPES)
+    if in_format is None:
+      self.respond(415)
+      return
+    out_format = get_format(self.headers.get(http.ACCEPT),
+                            ProvTranslatorConverter.CONTENT_TYPES)
+    if out_format is None:
+      self.respond(406)
+      return
+    self.converted(body, in_format, out_format,
+                   ProvTranslatorConverter.CONTENT_TYPES[out_format])
+
+  def store(self, body):
+    """Respond to a ProvStore storage request.
+
+    :param body: Request body
+    :type body: bytes
+    """
+    if self.headers.get(http.AUTHORIZATION) is None:
+      self.respond(401)
+      return
+    format = get_format(self.headers.get(http.CONTENT_TYPE),
+                        ProvStoreConverter.CONTENT_TYPES)
+    try:
+      content = json.loads(body.decode("utf-8"))[ProvStoreConverter.CONTENT]
+    except (ValueError, KeyError, TypeError):
+      content = None
+    if format is None or content is None:
+      self.respond(400)
+      return
+    document_id = self.server.store(content.encode("utf-8"), format)
+    self.respond(201, json.dumps({ProvStoreConverter.ID: document_id}),
+                 ProvStoreConverter.CONTENT_TYPES[standards.JSON])
+
+  def converted(self, content, in_format, out_format, content_type):
+    """Respond with a converted document, or with 400 Bad Request if
+    it cannot be converted.
+
+    :param content: Document
+    :type content: bytes
+    :param in_format: Format of `content`
+    :type in_format: str or unicode
+    :param out_format: Format to convert to
+    :type out_format: str or unicode
+    :param content_type: ``Content-type`` header value
+    :type content_type: str or unicode
+    """
+    try:
+      content = self.server.convert(content, in_format, out_format)
+    except Exception:
+      self.respond(400)
+      return
+    self.respond(200, content, content_type)
+
+  def read_raw_body(self):
+    """Read the request body as sent. If the body cannot be read, an
+    error response is sent.
+
+    :return: body, or ``None`` if it cannot be read
+    :rtype: bytes
+    """
+    raise NotImplementedError()
+
+  def respond(self, status, body=b"", content_type=None, headers=None):
+    """Send a response.
+
+    :param status: HTTP status
+    :type status: int
+    :param body: Response body
+    :type body: bytes or str or unicode
+    :param content_type: ``Content-type`` header value
+    :type content_type: str or unicode
+    :param headers: Other headers
+    :type headers: dict
+    """
+    raise NotImplementedError()
+
+
+class StandInHandler(StandInRequest, BaseHTTPRequestHandler):
+  """Request handler for :class:`StandInServer`. Connections are kept
+  alive.
+  """
+
+  protocol_version = "HTTP/1.1"
+  # Headers and body are written separately, so Nagle's algorithm
+  # would delay each response until the previous segment is acked.
+  disable_nagle_algorithm = True
+
+  def read_raw_body(self):
+    length = self.headers.get("Content-Length")
+    if length is None:
+      self.respond(411)
+      return None
+    return self.rfile.read(int(length))
+
+  def respond(self, status, body=b"", content_type=None, headers=None):
+    """Send a response.
+
+    :param status: HTTP status
+    :type status: int
+    :param body: Response body
+    :type body: bytes or str or unicode
+    :param content_type: ``Content-type`` header value
+    :type content_type: str or unicode
+    :param headers: Other headers
+    :type headers: dict
+    """
+    if isinstance(body, type("")):
+      body = body.encode("utf-8")
+    self.send_response(status)
+    if content_type is not None:
+      self.send_header(http.CONTENT_TYPE, content_type)
+    for (name, value) in (headers or {}).items():
+      self.send_header(name, value)
+    self.send_header("Content-Length", str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, format, *args):
+    pass
+
+
+class UnixStandInHandler(StandInHandler):
+  """Request handler for :class:`UnixStandInServer`.
+  """
+
+  # Unix domain sockets have no Nagle's algorithm to disable.
+  disable_nagle_algorithm = False
+
+
+class H2StandInHandler(BaseRequestHandler):
+  """Connection handler for :class:`H2StandInServer`. Each request, or
+  stream, is served by a :class:`H2StandInStream` in its own thread,
+  while this handler reads frames from the connection. Frames are
+  written by whichever thread holds the connection's lock.
+  """
+
+  def setup(self):
+    BaseRequestHandler.setup(self)
+    self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
+    self.connection = h2.connection.H2Connection(
+      config=h2.config.H2Configuration(client_side=False,
+                                       header_encoding="utf-8"))
+    self.condition = threading.Condition()
+    self.streams = {}
+    self.closed = False
+
+  def handle(self):
+    with self.condition:
+      self.connection.initiate_connection()
+      self.flush()
+    try:
+      while not self.closed:
+        data = self.request.recv(65535)
+        if not data:
+          break
+        with self.condition:
+          try:
+            events = self.connection.receive_data(data)
+          except h2.exceptions.ProtocolError:
+            self.flush()
+            break
+          streams = [self.handle_event(event) for event in events]
+          self.flush()
+          # Streams may be waiting for the flow control window.
+          self.condition.notify_all()
+        for stream in streams:
+          if stream is not None:
+            thread = threading.Thread(target=stream.handle)
+            thread.daemon = True
+            thread.start()
+    except (IOError, OSError):
+      pass
+    finally:
+      with self.condition:
+        self.closed = True
+        self.condition.notify_all()
+
+  def handle_event(self, event):
+    """Handle an event on the connection. The caller must hold the
+    connection's lock.
+
+    :param event: Event
+    :type event: :class:`h2.events.Event`
+    :return: stream whose request has been received, to be served, or
+      ``None``
+    :rtype: :class:`H2StandInStream`
+    """
+    if isinstance(event, h2.events.RequestReceived):
+      self.streams[event.stream_id] = H2StandInStream(
+        self, event.stream_id, event.headers)
+    elif isinstance(event, h2.events.DataReceived):
+      stream = self.streams.get(event.stream_id)
+      if stream is not None:
+        stream.body.append(event.data)
+      self.connection.acknowledge_received_data(
+        event.flow_controlled_length, event.stream_id)
+    elif isinstance(event, h2.events.StreamEnded):
+      return self.streams.pop(event.stream_id, None)
+    elif isinstance(event, h2.events.StreamReset):
+      self.streams.pop(event.stream_id, None)
+    elif isinstance(event, h2.events.ConnectionTerminated):
+      self.closed = True
+    return None
+
+  def flush(self):
+    """Write pending frames. The caller must hold the connection's
+    lock.
+    """
+    data = self.connection.data_to_send()
+    if data:
+      try:
+        self.request.sendall(data)
+      except (IOError, OSError):
+        self.closed = True
+
+  def send_response(self, stream_id, headers, body):
+    """Send a response on a stream, waiting for the flow control
+    window as needed. The response is dropped if the stream or
+    connection is closed.
+
+    :param stream_id: Stream ID
+    :type stream_id: int
+    :param headers: Headers, including ``:status``
+    :type headers: list of (str or unicode, str or unicode)
+    :param body: Body
+    :type body: bytes
+    """
+    with self.condition:
+      try:
+        self.connection.send_headers(stream_id, headers,
+                                     end_stream=not body)
+        self.flush()
+        while body and not self.closed:
+          window = self.connection.local_flow_control_window(stream_id)
+          if window < 1:
+            self.condition.wait()
+            continue
+          size = min(len(body), window,
+                     self.connection.max_outbound_frame_size)
+          self.connection.send_data(stream_id, body[:size],
+                                    end_stream=size == len(body))
+          body = body[size:]
+          self.flush()
+      except h2.exceptions.ProtocolError:
+        pass
+
+
+class H2StandInStream(StandInRequest):
+  """Request handler for a stream of a :class:`H2StandInHandler`
+  connection.
+  """
+
+  def __init__(self, handler, stream_id, headers):
+    """Create handler.
+
+    :param handler: Connection handler
+    :type handler: :class:`H2StandInHandler`
+    :param stream_id: Stream ID
+    :type stream_id: int
+    :param headers: Request headers, including pseudo-headers e.g.
+      ``:method``
+    :type headers: list of (str or unicode, str or unicode)
+    """
+    self.handler = handler
+    self.server = handler.server
+    self.stream_id = stream_id
+    headers = dict(headers)
+    self.command = headers.get(":method")
+    self.path = headers.get(":path")
+    self.headers = requests.structures.CaseInsensitiveDict(
+      [(name, value) for (name, value) in headers.items()
+       if not name.startswith(":")])
+    self.body = []
+
+  def handle(self):
+    """Handle the request, once its body has been received.
+    """
+    method = getattr(self, "do_" + (self.command or ""), None)
+    if method is None:
+      self.respond(501)
+    else:
+      method()
+
+  def read_raw_body(self):
+    return b"".join(self.body)
+
+  def respond(self, status, body=b"", content_type=None, headers=None):
+    if isinstance(body, type("")):
+      body = body.encode("utf-8")
+    response_headers = [(":status", str(status))]
+    if content_type is not None:
+      response_headers.append((http.CONTENT_TYPE.lower(), content_type))
+    for (name, value) in (headers or {}).items():
+      response_headers.append((name.lower(), value))
+    response_headers.append(("content-length", str(len(body))))
+    self.handler.send_response(self.stream_id, response_headers, body)
+
+
+def main(argv=None):
+  """Parse command-line arguments and serve the stand-in until
+  interrupted.
+
+  :param argv: Command-line arguments (default ``sys.argv[1:]``)
+  :type argv: list of str or unicode
+  """
+  parser = argparse.ArgumentParser(
+    description="Serve a local stand-in for the ProvTranslator and " +
+    "ProvStore APIs.")
+  parser.add_argument("-H", metavar="HOST", dest="host",
+                      default="127.0.0.1",
+                      help="Host name or address (default 127.0.0.1)")
+  parser.add_argument("-p", metavar="PORT", dest="port", type=int,
+                      default=DEFAULT_PORT,
+                      help="Port (default " + str(DEFAULT_PORT) + ")")
+  parser.add_argument("-u", metavar="SOCKET", dest="socket_path",
+                      default=None,
+                      help="Unix domain socket to listen on, instead of " +
+                      "HOST and PORT")
+  parser.add_argument("-2", dest="http2", action="store_true",
+                      help="Serve HTTP/2, with prior knowledge, instead " +
+                      "of HTTP/1.1")
+  parser.add_argument("-b", dest="backend", choices=BACKENDS,
+                      default=PROV, help="Backend (default prov)")
+  parser.add_argument("-l", metavar="LATENCY", dest="latency",
+                      type=float, default=0,
+                      help="Latency added to each request, in seconds " +
+                      "(default 0)")
+  parser.add_argument("-e", metavar="ERROR_RATE", dest="error_rate",
+                      type=float, default=0,
+                      help="Fraction of requests answered with 503 " +
+                      "Service Unavailable (default 0)")
+  parser.add_argument("-s", metavar="SEED", dest="seed", type=int,
+                      default=None, help="Seed for choosing requests to " +
+                      "fail")
+  args = parser.parse_args(argv)
+  kwargs = {"backend": args.backend, "latency": args.latency,
+            "error_rate": args.error_rate, "seed": args.seed}
+  if args.http2 and args.socket_path is not None:
+    parser.error("-2 cannot be used with -u")
+  try:
+    if args.socket_path is not None:
+      server = UnixStandInServer(args.socket_path, **kwargs)
+    elif args.http2:
+      server = H2StandInServer((args.host, args.port), **kwargs)
+    else:
+      server = StandInServer((args.host, args.port), **kwargs)
+  except (ImportError, ValueError) as e:
+    parser.error(str(e))
+  print("ProvTranslator: " + server.translator_url)
+  print("ProvStore: " + server.store_url)
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()
+    print(", ".join(["%s %d" % item for item in
+                     sorted(server.statistics().items())]))
+
+
+if __name__ == "__main__":
+  main()
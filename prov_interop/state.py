@@ -0,0 +1,181 @@
+"""Persistent outcomes of test case tuples, for incremental re-runs.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import json
+import os
+import tempfile
+
+from prov_interop.cache import digest
+from prov_interop.cache import file_digest
+
+VERSION = 1
+"""int: version of the state file format"""
+
+
+class RunState(object):
+  """Outcomes of test case tuples from previous runs, held in a JSON
+  file. Each outcome is keyed by a digest of the fingerprints of the
+  converter and comparator (see
+  :meth:`prov_interop.component.ConfigurableComponent.fingerprint`)
+  and the formats and SHA-256 digests of the input file and the
+  expected output file. So, an outcome is reused only if none of
+  these have changed since it was recorded.
+  """
+
+  def __init__(self, file_name):
+    """Create state, loading outcomes from `file_name` if it exists.
+    If the file cannot be parsed, or is of a different version, then
+    it is ignored, and overwritten when the state is saved.
+
+    :param file_name: File name
+    :type file_name: str or unicode
+    :raises IOError: if the file exists but cannot be read
+    """
+    self._file_name = file_name
+    self._outcomes = {}
+    self._used = set()
+    self._digests = {}
+    if os.path.isfile(file_name):
+      with open(file_name, "rb") as f:
+        try:
+          state = json.loads(f.read().decode("utf-8"))
+        except ValueError:
+          state = {}
+      if isinstance(state, dict) and state.get("version") == VERSION:
+        self._outcomes = state.get("outcomes", {})
+
+  @property
+  def file_name(self):
+    """Get state file name.
+
+    :return: file name
+    :rtype: str or unicode
+    """
+    return self._file_name
+
+  def __len__(self):
+    return len(self._outcomes)
+
+  def file_digest(self, file_name):
+    """Get SHA-256 digest of a file's contents. Digests are computed
+    once per file, as each file is used by many tuples.
+
+    :param file_name: File name
+    :type file_name: str or unicode
+    :return: hexadecimal digest
+    :rtype: str or unicode
+    :raises IOError: if the file cannot be read
+    """
+    if file_name not in self._digests:
+      self._digests[file_name] = file_digest(file_name)
+    return self._digests[file_name]
+
+  def key(self, fingerprint, test_case):
+    """Get key for the outcome of a test case tuple.
+
+    :param fingerprint: Digest of the converter's and comparator's
+      fingerprints
+    :type fingerprint: str or unicode
+    :param test_case: test case tuple
+    :type test_case: tuple of (str or unicode, str or unicode, str or
+      unicode, str or unicode, str or unicode)
+    :return: hexadecimal digest
+    :rtype: str or unicode
+    :raises IOError: if either file cannot be read
+    """
+    (_, ext_in, file_ext_in, ext_out, file_ext_out) = test_case
+    return digest(fingerprint,
+                  ext_in, self.file_digest(file_ext_in),
+                  ext_out, self.file_digest(file_ext_out))
+
+  def get(self, key):
+    """Get a recorded outcome.
+
+    :param key: Key
+    :type key: str or unicode
+    :return: outcome, with ``converter``, ``status``, ``message``,
+      ``detail`` and ``time`` entries, or ``None`` if there is none
+    :rtype: dict
+    """
+    outcome = self._outcomes.get(key)
+    if outcome is not None:
+      self._used.add(key)
+    return outcome
+
+  def put(self, key, converter, status, message, detail, time):
+    """Record an outcome.
+
+    :param key: Key
+    :type key: str or unicode
+    :param converter: Converter name
+    :type converter: str or unicode
+    :param status: Status
+    :type status: str or unicode
+    :param message: Message
+    :type message: str or unicode
+    :param detail: Detail
+    :type detail: str or unicode
+    :param time: Time taken, in seconds
+    :type time: float
+    """
+    self._outcomes[key] = {"converter": converter,
+                           "status": status,
+                           "message": message,
+                           "detail": detail,
+                           "time": time}
+    self._used.add(key)
+
+  def prune(self, converters):
+    """Remove outcomes, recorded for the given converters, which have
+    been neither got nor put since the state was loaded. This stops
+    outcomes for files or components that have since changed from
+    accumulating.
+
+    :param converters: Converter names
+    :type converters: list of str or unicode
+    :return: number of outcomes removed
+    :rtype: int
+    """
+    stale = [key for (key, outcome) in self._outcomes.items()
+             if key not in self._used and
+             outcome.get("converter") in converters]
+    for key in stale:
+      del self._outcomes[key]
+    return len(stale)
+
+  def save(self):
+    """Save the state. The file is written atomically, so an
+    interrupted save leaves the previous state intact.
+
+    :raises IOError: if the file cannot be written
+    """
+    directory = os.path.dirname(os.path.abspath(self._file_name))
+    (handle, tmp_file_name) = tempfile.mkstemp(prefix=".", dir=directory)
+    with os.fdopen(handle, "wb") as f:
+      f.write(json.dumps({"version": VERSION, "outcomes": self._outcomes},
+                         sort_keys=True).encode("utf-8"))
+    os.rename(tmp_file_name, self._file_name)
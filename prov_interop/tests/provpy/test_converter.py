@@ -36,6 +36,7 @@ import os
 import tempfile
 import unittest
 
+from prov_interop import forkserver
 from prov_interop import standards
 from prov_interop.component import ConfigError
 from prov_interop.converter import ConversionError
@@ -62,9 +63,18 @@ class ProvPyConverterTestCase(unittest.TestCase):
       standards.JSON]
     self.config[ProvPyConverter.OUTPUT_FORMATS] = [
       standards.PROVN, standards.PROVX, standards.JSON]
+    # Forkserver requests hold the arguments that follow the script.
+    self.forkserver_config = dict(self.config)
+    self.forkserver_config[ProvPyConverter.EXECUTABLE] = "python " + script
+    self.forkserver_config[ProvPyConverter.ARGUMENTS] = " ".join(
+      ["-f", ProvPyConverter.FORMAT,
+       ProvPyConverter.INPUT,
+       ProvPyConverter.OUTPUT])
+    self.forkserver_config[ProvPyConverter.FORKSERVER] = True
 
   def tearDown(self):
     super(ProvPyConverterTestCase, self).tearDown()
+    self.provpy.close()
     for tmp in [self.in_file, self.out_file]:
       if tmp != None and os.path.isfile(tmp):
         os.remove(tmp)
@@ -150,3 +160,13 @@ class ProvPyConverterTestCase(unittest.TestCase):
     self.out_file = "convert_invalid_output_format.nosuchformat"
     with self.assertRaises(ConversionError):
       self.provpy.convert(self.in_file, self.out_file)
+
+  @unittest.skipUnless(forkserver.is_available(), "os.fork is not available")
+  def test_convert_forkserver(self):
+    self.provpy.configure(self.forkserver_config)
+    (_, self.in_file) = tempfile.mkstemp(suffix="." + standards.JSON)
+    for format in [standards.PROVX, standards.PROVN]:
+      self.out_file = "convert_forkserver." + format
+      self.provpy.convert(self.in_file, self.out_file)
+      os.remove(self.out_file)
+    self.assertEqual(1, self.provpy.worker.starts)
@@ -0,0 +1,186 @@
+"""Unit tests for :mod:`prov_interop.provpy.library`.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+import tempfile
+import unittest
+
+try:
+  from prov.model import ProvDocument
+  from prov_interop.provpy.library import ProvPyLibraryComparator
+  from prov_interop.provpy.library import ProvPyLibraryConverter
+  HAS_PROV = True
+except ImportError:
+  HAS_PROV = False
+
+from prov_interop import standards
+from prov_interop.comparator import ComparisonError
+from prov_interop.component import ConfigError
+from prov_interop.converter import ConversionError
+
+def create_document(file_name, entity="ex:e1"):
+  """Write a PROV-JSON document holding a single entity.
+
+  :param file_name: File name
+  :type file_name: str or unicode
+  :param entity: Entity identifier
+  :type entity: str or unicode
+  """
+  document = ProvDocument()
+  document.add_namespace("ex", "http://example.org/")
+  document.entity(entity)
+  document.serialize(file_name, format="json")
+
+
+@unittest.skipUnless(HAS_PROV, "prov is not installed")
+class ProvPyLibraryConverterTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(ProvPyLibraryConverterTestCase, self).setUp()
+    self.converter = ProvPyLibraryConverter()
+    (_, self.in_file) = tempfile.mkstemp(suffix="." + standards.JSON)
+    create_document(self.in_file)
+    self.out_file = None
+    self.config = {
+      ProvPyLibraryConverter.INPUT_FORMATS: [standards.JSON],
+      ProvPyLibraryConverter.OUTPUT_FORMATS: [standards.PROVN,
+                                              standards.JSON]
+    }
+
+  def tearDown(self):
+    super(ProvPyLibraryConverterTestCase, self).tearDown()
+    for tmp in [self.in_file, self.out_file]:
+      if tmp != None and os.path.isfile(tmp):
+        os.remove(tmp)
+
+  def test_configure(self):
+    self.config["cache-size"] = 5
+    self.converter.configure(self.config)
+    self.assertEqual(5, self.converter.cache.max_size)
+
+  def test_configure_invalid_cache_size(self):
+    self.config["cache-size"] = 0
+    with self.assertRaises(ConfigError):
+      self.converter.configure(self.config)
+
+  def test_convert(self):
+    self.converter.configure(self.config)
+    for format in [standards.PROVN, standards.JSON]:
+      self.out_file = "convert_library." + format
+      self.converter.convert(self.in_file, self.out_file)
+      with open(self.out_file) as f:
+        self.assertIn("e1", f.read())
+      os.remove(self.out_file)
+    self.assertEqual(1, self.converter.cache.misses)
+    self.assertEqual(1, self.converter.cache.hits)
+
+  def test_convert_modified_input_file(self):
+    self.converter.configure(self.config)
+    self.out_file = "convert_library_modified." + standards.JSON
+    self.converter.convert(self.in_file, self.out_file)
+    mtime = os.path.getmtime(self.in_file)
+    os.utime(self.in_file, (mtime + 10, mtime + 10))
+    self.converter.convert(self.in_file, self.out_file)
+    self.assertEqual(2, self.converter.cache.misses)
+
+  def test_convert_missing_input_file(self):
+    self.converter.configure(self.config)
+    self.out_file = "convert_library_missing_input_file." + standards.JSON
+    with self.assertRaises(ConversionError):
+      self.converter.convert("nosuchfile.json", self.out_file)
+
+  def test_convert_invalid_output_format(self):
+    self.converter.configure(self.config)
+    self.out_file = "convert_library_invalid_output_format." + standards.PROVX
+    with self.assertRaises(ConversionError):
+      self.converter.convert(self.in_file, self.out_file)
+
+  def test_convert_invalid_document(self):
+    self.converter.configure(self.config)
+    with open(self.in_file, "w") as f:
+      f.write("not a document")
+    self.out_file = "convert_library_invalid_document." + standards.JSON
+    with self.assertRaises(ConversionError):
+      self.converter.convert(self.in_file, self.out_file)
+    self.assertFalse(os.path.isfile(self.out_file))
+
+
+@unittest.skipUnless(HAS_PROV, "prov is not installed")
+class ProvPyLibraryComparatorTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(ProvPyLibraryComparatorTestCase, self).setUp()
+    self.comparator = ProvPyLibraryComparator()
+    self.files = []
+    for _ in range(2):
+      (_, file_name) = tempfile.mkstemp(suffix="." + standards.JSON)
+      create_document(file_name)
+      self.files.append(file_name)
+    self.config = {ProvPyLibraryComparator.FORMATS: [standards.PROVN,
+                                                     standards.JSON]}
+
+  def tearDown(self):
+    super(ProvPyLibraryComparatorTestCase, self).tearDown()
+    for tmp in self.files:
+      if os.path.isfile(tmp):
+        os.remove(tmp)
+
+  def test_configure(self):
+    self.config["cache-size"] = 5
+    self.comparator.configure(self.config)
+    self.assertEqual(5, self.comparator.cache.max_size)
+
+  def test_compare(self):
+    self.comparator.configure(self.config)
+    for _ in range(3):
+      self.assertTrue(self.comparator.compare(self.files[0], self.files[1]))
+    self.assertEqual({"cache-hits": 2, "cache-misses": 1, "cache-entries": 1},
+                     self.comparator.statistics())
+
+  def test_compare_different(self):
+    self.comparator.configure(self.config)
+    create_document(self.files[1], "ex:e2")
+    self.assertFalse(self.comparator.compare(self.files[0], self.files[1]))
+
+  def test_compare_invalid_document(self):
+    self.comparator.configure(self.config)
+    with open(self.files[1], "w") as f:
+      f.write("not a document")
+    with self.assertRaises(ComparisonError):
+      self.comparator.compare(self.files[0], self.files[1])
+
+  def test_compare_missing_file(self):
+    self.comparator.configure(self.config)
+    with self.assertRaises(ComparisonError):
+      self.comparator.compare(self.files[0], "nosuchfile.json")
+
+  def test_compare_invalid_format(self):
+    self.comparator.configure(self.config)
+    (_, file_name) = tempfile.mkstemp(suffix="." + standards.PROVX)
+    self.files.append(file_name)
+    with self.assertRaises(ComparisonError):
+      self.comparator.compare(self.files[0], file_name)
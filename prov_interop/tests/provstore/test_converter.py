@@ -26,10 +26,15 @@ from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
 import inspect
+import io
+import json
 import os
 import requests
 import requests_mock
+import shutil
 import tempfile
+import threading
+import time
 import unittest
 from nose_parameterized import parameterized
 
@@ -37,7 +42,41 @@ from prov_interop import http
 from prov_interop import standards
 from prov_interop.component import ConfigError
 from prov_interop.converter import ConversionError
+from prov_interop.component import RestComponent
 from prov_interop.provstore.converter import ProvStoreConverter
+from prov_interop.provstore.converter import StoreRequestBody
+
+class StoreRequestBodyTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(StoreRequestBodyTestCase, self).setUp()
+    (_, self.in_file) = tempfile.mkstemp(suffix="." + standards.JSON)
+
+  def tearDown(self):
+    super(StoreRequestBodyTestCase, self).tearDown()
+    os.remove(self.in_file)
+
+  def test_body(self):
+    # Longer than a chunk, with characters that must be escaped.
+    doc = "{\"a\": \"\\u00e9\\n\"}\n\u00e9\U0001f600\t" * \
+        (RestComponent.CHUNK_SIZE // 10)
+    with io.open(self.in_file, "w", encoding="utf-8") as f:
+      f.write(doc)
+    fields = {ProvStoreConverter.PUBLIC: False,
+              ProvStoreConverter.REC_ID: "1.json"}
+    body = StoreRequestBody(self.in_file, fields)
+    data = b"".join(body)
+    self.assertEqual(len(data), len(body))
+    self.assertEqual(data, b"".join(body))
+    expected = dict(fields)
+    expected[ProvStoreConverter.CONTENT] = doc
+    self.assertEqual(expected, json.loads(data.decode("utf-8")))
+
+  def test_body_empty(self):
+    body = StoreRequestBody(self.in_file, {})
+    self.assertEqual({ProvStoreConverter.CONTENT: ""},
+                     json.loads(b"".join(body).decode("utf-8")))
+
 
 class ProvStoreConverterTestCase(unittest.TestCase):
 
@@ -196,3 +235,183 @@ class ProvStoreConverterTestCase(unittest.TestCase):
                            status_code=requests.codes.internal_server_error)
       with self.assertRaises(ConversionError):
         self.provstore.convert(self.in_file, self.out_file)
+
+  def test_configure_upload_once(self):
+    self.config[ProvStoreConverter.UPLOAD_ONCE] = True
+    self.provstore.configure(self.config)
+    self.assertTrue(self.provstore.upload_once)
+    self.assertTrue(self.provstore.group_by_input)
+    self.assertEqual(ProvStoreConverter.DEFAULT_POOL_SIZE *
+                     len(standards.FORMATS), self.provstore.batch_size)
+
+  def test_configure_upload_once_invalid(self):
+    self.config[ProvStoreConverter.UPLOAD_ONCE] = "yes"
+    with self.assertRaises(ConfigError):
+      self.provstore.configure(self.config)
+
+  def test_fingerprint_upload_once(self):
+    self.provstore.configure(self.config)
+    fingerprint = self.provstore.fingerprint()
+    self.config[ProvStoreConverter.UPLOAD_ONCE] = True
+    self.provstore.configure(self.config)
+    self.assertEqual(fingerprint, self.provstore.fingerprint())
+
+  def test_convert_upload_once(self):
+    self.config[ProvStoreConverter.UPLOAD_ONCE] = True
+    self.provstore.configure(self.config)
+    (_, self.in_file) = tempfile.mkstemp(suffix="." + standards.JSON)
+    doc_id = 123
+    out_files = [tempfile.mkstemp(suffix="." + format)[1]
+                 for format in standards.FORMATS]
+    try:
+      with requests_mock.Mocker(real_http=False) as mocker:
+        self.register_post(mocker,
+                           ProvStoreConverter.CONTENT_TYPES[standards.JSON],
+                           doc_id)
+        for format in standards.FORMATS:
+          self.register_get(mocker,
+                            ProvStoreConverter.CONTENT_TYPES[format],
+                            doc_id, format, format)
+        self.register_delete(mocker, doc_id)
+        for out_file in out_files:
+          self.provstore.convert(self.in_file, out_file)
+        methods = [request.method for request in mocker.request_history]
+        self.assertEqual(["POST"] + ["GET"] * len(out_files), methods)
+        self.provstore.close()
+        methods = [request.method for request in mocker.request_history]
+        self.assertEqual("DELETE", methods[-1])
+        self.assertEqual(len(out_files) + 2, len(methods))
+      for (format, out_file) in zip(standards.FORMATS, out_files):
+        with open(out_file, "r") as f:
+          self.assertEqual(format, f.read())
+    finally:
+      for out_file in out_files:
+        os.remove(out_file)
+
+  def test_convert_upload_once_concurrent(self):
+    self.config[ProvStoreConverter.UPLOAD_ONCE] = True
+    self.provstore.configure(self.config)
+    (_, self.in_file) = tempfile.mkstemp(suffix="." + standards.JSON)
+    doc_id = 123
+    out_files = [tempfile.mkstemp(suffix="." + format)[1]
+                 for format in standards.FORMATS * 4]
+    errors = []
+    def convert(out_file):
+      try:
+        self.provstore.convert(self.in_file, out_file)
+      except Exception as e:
+        errors.append(e)
+    try:
+      with requests_mock.Mocker(real_http=False) as mocker:
+        def post(request, context):
+          # Slow enough that the other threads ask for the document
+          # while it is being stored.
+          time.sleep(0.2)
+          context.status_code = requests.codes.created
+          return {"id": doc_id}
+        mocker.register_uri("POST", self.config[ProvStoreConverter.URL],
+                            json=post)
+        for format in standards.FORMATS:
+          self.register_get(mocker,
+                            ProvStoreConverter.CONTENT_TYPES[format],
+                            doc_id, format, format)
+        self.register_delete(mocker, doc_id)
+        # The session is shared by the threads.
+        self.provstore.session
+        threads = [threading.Thread(target=convert, args=(out_file,))
+                   for out_file in out_files]
+        for thread in threads:
+          thread.start()
+        for thread in threads:
+          thread.join()
+        self.assertEqual([], errors)
+        methods = [request.method for request in mocker.request_history]
+        self.assertEqual(1, methods.count("POST"))
+        self.assertEqual(len(out_files), methods.count("GET"))
+        self.assertEqual(1, self.provstore.statistics()["provstore-uploads"])
+        self.provstore.close()
+        methods = [request.method for request in mocker.request_history]
+        self.assertEqual(1, methods.count("DELETE"))
+    finally:
+      for out_file in out_files:
+        os.remove(out_file)
+
+  def test_convert_upload_once_post_server_error_retried(self):
+    self.config[ProvStoreConverter.UPLOAD_ONCE] = True
+    self.provstore.configure(self.config)
+    (_, self.in_file) = tempfile.mkstemp(suffix="." + standards.JSON)
+    (_, self.out_file) = tempfile.mkstemp(suffix="." + standards.PROVN)
+    with requests_mock.Mocker(real_http=False) as mocker:
+      self.register_post(mocker,
+                         ProvStoreConverter.CONTENT_TYPES[standards.JSON],
+                         123,
+                         status_code=requests.codes.internal_server_error)
+      for _ in range(2):
+        with self.assertRaises(ConversionError):
+          self.provstore.convert(self.in_file, self.out_file)
+      methods = [request.method for request in mocker.request_history]
+      self.assertEqual(["POST", "POST"], methods)
+      self.assertEqual(0, self.provstore.statistics()["provstore-uploads"])
+
+  def test_convert_batch_upload_once(self):
+    self.config[ProvStoreConverter.UPLOAD_ONCE] = True
+    self.provstore.configure(self.config)
+    directory = tempfile.mkdtemp()
+    try:
+      files = []
+      for (doc_id, in_format) in [(1, standards.JSON),
+                                  (2, standards.PROVX)]:
+        in_file = os.path.join(directory, str(doc_id) + "." + in_format)
+        with open(in_file, "w") as f:
+          f.write(in_format)
+        for out_format in [standards.JSON, standards.PROVN]:
+          files.append((in_file, os.path.join(
+            directory, str(doc_id) + ".out." + out_format)))
+      files.append(("nosuchfile.json",
+                    os.path.join(directory, "out.json")))
+      with requests_mock.Mocker(real_http=False) as mocker:
+        url = self.config[ProvStoreConverter.URL]
+        mocker.register_uri(
+          "POST", url,
+          [{"json": {"id": 1}, "status_code": requests.codes.created},
+           {"json": {"id": 2}, "status_code": requests.codes.created}])
+        for doc_id in [1, 2]:
+          for format in [standards.JSON, standards.PROVN]:
+            mocker.register_uri("GET",
+                                url + str(doc_id) + "." + format,
+                                text=format)
+          self.register_delete(mocker, doc_id)
+        results = self.provstore.convert_batch(files)
+        self.assertEqual([None] * 4, results[:4])
+        self.assertIsInstance(results[4], ConversionError)
+        methods = [request.method for request in mocker.request_history]
+        self.assertEqual(2, methods.count("POST"))
+        self.assertEqual(4, methods.count("GET"))
+        self.assertEqual(2, self.provstore.statistics()["provstore-uploads"])
+        self.provstore.close()
+        methods = [request.method for request in mocker.request_history]
+        self.assertEqual(2, methods.count("DELETE"))
+      for (_, out_file) in files[:4]:
+        with open(out_file, "r") as f:
+          self.assertEqual(os.path.splitext(out_file)[1][1:], f.read())
+    finally:
+      shutil.rmtree(directory)
+
+  def test_convert_batch_upload_once_post_server_error(self):
+    self.config[ProvStoreConverter.UPLOAD_ONCE] = True
+    self.provstore.configure(self.config)
+    (_, self.in_file) = tempfile.mkstemp(suffix="." + standards.JSON)
+    (_, self.out_file) = tempfile.mkstemp(suffix="." + standards.PROVN)
+    with requests_mock.Mocker(real_http=False) as mocker:
+      self.register_post(mocker,
+                         ProvStoreConverter.CONTENT_TYPES[standards.JSON],
+                         123,
+                         status_code=requests.codes.internal_server_error)
+      results = self.provstore.convert_batch([(self.in_file, self.out_file),
+                                              (self.in_file, self.in_file)])
+      self.assertEqual(2, len(results))
+      for result in results:
+        self.assertIsInstance(result, ConversionError)
+      self.provstore.close()
+      methods = [request.method for request in mocker.request_history]
+      self.assertEqual(["POST"], methods)
@@ -25,9 +25,20 @@ This script behaves similarly (though it does no PROV validation).
 
 If the inputs are valid it just copies the input file to the output file. 
 
+If run with ``-manifest`` it converts each pair of input and output
+files listed in the manifest, one tab-separated pair per line.
+
+If run with ``--worker`` it acts as a persistent worker (see
+:mod:`prov_interop.worker`), reading line-delimited JSON requests, each
+holding the arguments of a single invocation, from standard input, and
+writing line-delimited JSON responses, each holding the exit code of
+that invocation, to standard output.
+
 Usage::
 
     usage: provconvert_dummy.py -infile infile -outfile outfile
+           provconvert_dummy.py -manifest manifest
+           provconvert_dummy.py --worker
 
     Dummy ProvToolbox provconvert.
 
@@ -37,6 +48,8 @@ Usage::
 
     optional arguments:
       -h, --help   show this help message and exit
+      -manifest    Manifest of input and output files
+      --worker     Run as a persistent worker
 """
 # Copyright (c) 2015 University of Southampton
 #
@@ -64,6 +77,7 @@ from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
 import argparse
+import json
 import os
 import os.path
 import shutil
@@ -92,7 +106,13 @@ def convert(in_file, out_file):
     sys.exit(0)
   shutil.copyfile(in_file, out_file)
 
-if __name__ == "__main__":
+def main(argv):
+  """
+  Parse command-line arguments and convert.
+
+  :param argv: Command-line arguments
+  :type argv: list of str or unicode
+  """
   parser = argparse.ArgumentParser(description="Dummy ProvToolbox provconvert.")
   parser.add_argument('-infile', metavar="file", 
                       help="Input file",
@@ -102,6 +122,36 @@ if __name__ == "__main__":
                       help="Output file",
                       nargs='?', 
                       required=True)
-  args = parser.parse_args()
+  if argv[:1] == ["-manifest"]:
+    with open(argv[1]) as manifest:
+      for line in manifest:
+        (in_file, out_file) = line.rstrip("\n").split("\t")
+        convert(in_file, out_file)
+    sys.exit(0)
+  args = parser.parse_args(argv)
   convert(args.infile, args.outfile)
   sys.exit(0)
+
+def serve():
+  """
+  Act as a persistent worker, invoking :func:`main` for each request
+  read from standard input until standard input is closed. If the
+  request holds the argument ``-crash`` then the worker exits without
+  responding.
+  """
+  for line in iter(sys.stdin.readline, ""):
+    arguments = json.loads(line)["arguments"]
+    if "-crash" in arguments:
+      sys.exit(3)
+    try:
+      main(arguments)
+    except SystemExit as e:
+      return_code = e.code
+    sys.stdout.write(json.dumps({"returncode": return_code}) + "\n")
+    sys.stdout.flush()
+
+if __name__ == "__main__":
+  if sys.argv[1:] == ["--worker"]:
+    serve()
+  else:
+    main(sys.argv[1:])
@@ -33,6 +33,7 @@ from __future__ import (absolute_import, division, print_function,
 
 import inspect
 import os
+import signal
 import tempfile
 import unittest
 
@@ -59,10 +60,26 @@ class ProvToolboxConverterTestCase(unittest.TestCase):
        "-outfile", ProvToolboxConverter.OUTPUT])
     self.config[ProvToolboxConverter.INPUT_FORMATS] = standards.FORMATS
     self.config[ProvToolboxConverter.OUTPUT_FORMATS] = standards.FORMATS
+    self.worker = " ".join(["python", script, "--worker"])
+    # Worker requests hold the arguments that follow the executable.
+    self.worker_config = dict(self.config)
+    self.worker_config[ProvToolboxConverter.EXECUTABLE] = "python " + script
+    self.worker_config[ProvToolboxConverter.ARGUMENTS] = " ".join(
+      ["-infile", ProvToolboxConverter.INPUT,
+       "-outfile", ProvToolboxConverter.OUTPUT])
+    self.worker_config[ProvToolboxConverter.WORKER] = self.worker
+    self.batch_config = dict(self.config)
+    self.batch_config[ProvToolboxConverter.BATCH_ARGUMENTS] = " ".join(
+      [script, "-manifest", ProvToolboxConverter.MANIFEST])
+    self.batch_config[ProvToolboxConverter.BATCH_ITEM] = " ".join(
+      [ProvToolboxConverter.INPUT, ProvToolboxConverter.OUTPUT])
+    self.batch_config[ProvToolboxConverter.BATCH_SIZE] = 2
+    self.batch_files = []
 
   def tearDown(self):
     super(ProvToolboxConverterTestCase, self).tearDown()
-    for tmp in [self.in_file, self.out_file]:
+    self.provtoolbox.close()
+    for tmp in [self.in_file, self.out_file] + self.batch_files:
       if tmp != None and os.path.isfile(tmp):
         os.remove(tmp)
 
@@ -129,3 +146,94 @@ class ProvToolboxConverterTestCase(unittest.TestCase):
     self.out_file = "convert_invalid_input_format.nosuchformat"
     with self.assertRaises(ConversionError):
       self.provtoolbox.convert(self.in_file, self.out_file)
+
+  def test_configure_worker(self):
+    self.provtoolbox.configure(self.worker_config)
+    self.assertEqual(self.worker.split(),
+                     self.provtoolbox.worker.command_line)
+
+  def test_convert_worker(self):
+    self.provtoolbox.configure(self.worker_config)
+    (_, self.in_file) = tempfile.mkstemp(suffix="." + standards.JSON)
+    for format in [standards.PROVX, standards.PROVN]:
+      self.out_file = "convert_worker." + format
+      self.provtoolbox.convert(self.in_file, self.out_file)
+      os.remove(self.out_file)
+    self.assertEqual(1, self.provtoolbox.worker.starts)
+
+  def test_convert_worker_restart(self):
+    self.provtoolbox.configure(self.worker_config)
+    (_, self.in_file) = tempfile.mkstemp(suffix="." + standards.JSON)
+    self.out_file = "convert_worker_restart." + standards.PROVX
+    self.provtoolbox.convert(self.in_file, self.out_file)
+    os.kill(self.provtoolbox.worker.pid, signal.SIGKILL)
+    self.provtoolbox.convert(self.in_file, self.out_file)
+    self.assertEqual(2, self.provtoolbox.worker.starts)
+
+  def test_convert_worker_crash(self):
+    self.worker_config[ProvToolboxConverter.ARGUMENTS] += " -crash"
+    self.provtoolbox.configure(self.worker_config)
+    (_, self.in_file) = tempfile.mkstemp(suffix="." + standards.JSON)
+    self.out_file = "convert_worker_crash." + standards.PROVX
+    with self.assertRaises(OSError):
+      self.provtoolbox.convert(self.in_file, self.out_file)
+    self.assertEqual(2, self.provtoolbox.worker.starts)
+
+  def test_convert_worker_oserror(self):
+    self.worker_config[ProvToolboxConverter.WORKER] = "/nosuchexecutable"
+    self.provtoolbox.configure(self.worker_config)
+    (_, self.in_file) = tempfile.mkstemp(suffix="." + standards.JSON)
+    self.out_file = "convert_worker_oserror." + standards.PROVX
+    with self.assertRaises(OSError):
+      self.provtoolbox.convert(self.in_file, self.out_file)
+
+  def count_calls(self):
+    calls = []
+    call = self.provtoolbox.call
+    def counting_call(command_line):
+      calls.append(command_line)
+      return call(command_line)
+    self.provtoolbox.call = counting_call
+    return calls
+
+  def test_convert_batch(self):
+    self.provtoolbox.configure(self.batch_config)
+    calls = self.count_calls()
+    files = []
+    for _ in range(3):
+      (_, in_file) = tempfile.mkstemp(suffix="." + standards.JSON)
+      (_, out_file) = tempfile.mkstemp(suffix="." + standards.PROVX)
+      os.remove(out_file)
+      self.batch_files.extend([in_file, out_file])
+      files.append((in_file, out_file))
+    self.assertEqual([None, None, None],
+                     self.provtoolbox.convert_batch(files))
+    for (_, out_file) in files:
+      self.assertTrue(os.path.isfile(out_file))
+    # One batch of 2 then a single invocation.
+    self.assertEqual(2, len(calls))
+    self.assertIn("-manifest", calls[0])
+    self.assertNotIn("-manifest", calls[1])
+
+  def test_convert_batch_missing_input_file(self):
+    self.provtoolbox.configure(self.batch_config)
+    calls = self.count_calls()
+    (_, self.in_file) = tempfile.mkstemp(suffix="." + standards.JSON)
+    self.out_file = "convert_batch_missing_input_file." + standards.PROVX
+    files = [("nosuchfile." + standards.JSON, self.out_file),
+             (self.in_file, self.out_file)]
+    results = self.provtoolbox.convert_batch(files)
+    self.assertIsInstance(results[0], ConversionError)
+    self.assertIsNone(results[1])
+    # Failed batch then the second item on its own.
+    self.assertEqual(2, len(calls))
+
+  def test_convert_batch_invalid_output_format(self):
+    self.provtoolbox.configure(self.batch_config)
+    (_, self.in_file) = tempfile.mkstemp(suffix="." + standards.JSON)
+    self.out_file = "convert_batch_invalid_output_format." + standards.PROVX
+    files = [(self.in_file, "convert_batch.nosuchformat"),
+             (self.in_file, self.out_file)]
+    results = self.provtoolbox.convert_batch(files)
+    self.assertIsInstance(results[0], ConversionError)
+    self.assertIsNone(results[1])
@@ -29,10 +29,12 @@ import inspect
 import os
 import requests
 import requests_mock
+import shutil
 import tempfile
 import unittest
 from nose_parameterized import parameterized
 
+from prov_interop import cache
 from prov_interop import http
 from prov_interop import standards
 from prov_interop.component import ConfigError
@@ -123,3 +125,70 @@ class ProvTranslatorConverterTestCase(unittest.TestCase):
                           status_code=requests.codes.internal_server_error)
       with self.assertRaises(ConversionError):
         self.provtranslator.convert(self.in_file, self.out_file)
+
+  def configure_response_cache(self):
+    directory = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, directory)
+    self.config[ProvTranslatorConverter.RESPONSE_CACHE] = {
+      cache.DIRECTORY: directory}
+    self.provtranslator.configure(self.config)
+    (_, self.in_file) = tempfile.mkstemp(suffix="." + standards.JSON)
+    (_, self.out_file) = tempfile.mkstemp(suffix="." + standards.PROVN)
+
+  def test_configure_invalid_response_cache(self):
+    self.config[ProvTranslatorConverter.RESPONSE_CACHE] = {"ttl": 10}
+    with self.assertRaises(ConfigError):
+      self.provtranslator.configure(self.config)
+
+  def test_fingerprint_excludes_response_cache(self):
+    self.provtranslator.configure(self.config)
+    fingerprint = self.provtranslator.fingerprint()
+    self.configure_response_cache()
+    self.assertEqual(fingerprint, self.provtranslator.fingerprint())
+
+  def test_convert_response_cache(self):
+    self.configure_response_cache()
+    with requests_mock.Mocker(real_http=False) as mocker:
+      mocker.register_uri("POST", 
+                          self.config[ProvTranslatorConverter.URL],
+                          text="mockDocument")
+      self.provtranslator.convert(self.in_file, self.out_file)
+      os.remove(self.out_file)
+      self.provtranslator.convert(self.in_file, self.out_file)
+      self.assertEqual(1, mocker.call_count)
+    with open(self.out_file, "r") as f:
+      self.assertEqual("mockDocument", f.read())
+    statistics = self.provtranslator.statistics()
+    self.assertEqual(1, statistics["response-cache-hits"])
+    self.assertEqual(1, statistics["response-cache-misses"])
+
+  def test_convert_response_cache_no_store(self):
+    self.configure_response_cache()
+    with requests_mock.Mocker(real_http=False) as mocker:
+      mocker.register_uri("POST", 
+                          self.config[ProvTranslatorConverter.URL],
+                          headers={http.CACHE_CONTROL: "no-store"},
+                          text="mockDocument")
+      self.provtranslator.convert(self.in_file, self.out_file)
+      self.provtranslator.convert(self.in_file, self.out_file)
+      self.assertEqual(2, mocker.call_count)
+
+  def test_convert_response_cache_revalidate(self):
+    self.configure_response_cache()
+    with requests_mock.Mocker(real_http=False) as mocker:
+      mocker.register_uri("POST", 
+                          self.config[ProvTranslatorConverter.URL],
+                          [{"text": "mockDocument",
+                            "headers": {http.CACHE_CONTROL: "no-cache",
+                                        http.ETAG: "\"v1\""}},
+                           {"status_code": requests.codes.not_modified}])
+      self.provtranslator.convert(self.in_file, self.out_file)
+      os.remove(self.out_file)
+      self.provtranslator.convert(self.in_file, self.out_file)
+      self.assertEqual(2, mocker.call_count)
+      self.assertEqual("\"v1\"",
+                       mocker.last_request.headers[http.IF_NONE_MATCH])
+    with open(self.out_file, "r") as f:
+      self.assertEqual("mockDocument", f.read())
+    statistics = self.provtranslator.statistics()
+    self.assertEqual(1, statistics["response-cache-revalidated"])
@@ -0,0 +1,231 @@
+"""Unit tests for :mod:`prov_interop.aio`.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+import requests_mock
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from prov_interop import aio
+from prov_interop import standards
+from prov_interop.aio import AsyncConverter
+from prov_interop.aio import AsyncProvStoreConverter
+from prov_interop.aio import AsyncProvTranslatorConverter
+from prov_interop.component import ConfigError
+from prov_interop.component import RestComponent
+from prov_interop.converter import ConversionError
+from prov_interop.converter import Converter
+from prov_interop.provstore.converter import ProvStoreConverter
+
+class SlowConverter(Converter, RestComponent):
+  """Converter which copies files slowly and records the largest
+  number of conversions in progress at once."""
+
+  def __init__(self):
+    super(SlowConverter, self).__init__()
+    self._lock = threading.Lock()
+    self.in_progress = 0
+    self.max_in_progress = 0
+
+  def convert(self, in_file, out_file):
+    super(SlowConverter, self).convert(in_file, out_file)
+    with self._lock:
+      self.in_progress += 1
+      self.max_in_progress = max(self.max_in_progress, self.in_progress)
+    time.sleep(0.05)
+    shutil.copyfile(in_file, out_file)
+    with self._lock:
+      self.in_progress -= 1
+
+
+class AsyncSlowConverter(AsyncConverter, SlowConverter):
+  pass
+
+
+class AsyncConverterTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(AsyncConverterTestCase, self).setUp()
+    self.directory = tempfile.mkdtemp()
+    self.converter = AsyncSlowConverter()
+    self.config = {RestComponent.URL: "http://localhost/",
+                   Converter.INPUT_FORMATS: [standards.JSON],
+                   Converter.OUTPUT_FORMATS: [standards.JSON],
+                   aio.CONCURRENCY: 3}
+    self.files = []
+    for index in range(9):
+      in_file = os.path.join(self.directory, str(index) + ".json")
+      with open(in_file, "w") as f:
+        f.write(str(index))
+      self.files.append(
+        (in_file, os.path.join(self.directory, str(index) + ".out.json")))
+
+  def tearDown(self):
+    super(AsyncConverterTestCase, self).tearDown()
+    self.converter.close()
+    shutil.rmtree(self.directory)
+
+  def test_configure(self):
+    self.converter.configure(self.config)
+    self.assertEqual(3, self.converter.concurrency)
+    self.assertEqual(aio.DEFAULT_BATCH_SIZE, self.converter.batch_size)
+    self.config[aio.CONCURRENCY] = 20
+    self.config[aio.BATCH_SIZE] = 40
+    self.converter.configure(self.config)
+    self.assertEqual(40, self.converter.batch_size)
+    self.assertEqual(20, self.converter.pool_size)
+
+  def test_configure_invalid(self):
+    for key in [aio.CONCURRENCY, aio.BATCH_SIZE]:
+      config = dict(self.config)
+      config[key] = 0
+      with self.assertRaises(ConfigError):
+        self.converter.configure(config)
+
+  def test_convert_batch(self):
+    self.converter.configure(self.config)
+    files = self.files + [("nosuchfile.json", "out.json")]
+    results = self.converter.convert_batch(files)
+    self.assertEqual([None] * 9, results[:9])
+    self.assertIsInstance(results[9], ConversionError)
+    self.assertEqual(3, self.converter.max_in_progress)
+    for (in_file, out_file) in self.files:
+      with open(in_file) as f1, open(out_file) as f2:
+        self.assertEqual(f1.read(), f2.read())
+
+  def test_convert_batch_concurrency(self):
+    self.config[aio.CONCURRENCY] = 1
+    self.converter.configure(self.config)
+    self.converter.convert_batch(self.files[:3])
+    self.assertEqual(1, self.converter.max_in_progress)
+
+  def test_configure_concurrency_after_convert_batch(self):
+    self.config[aio.CONCURRENCY] = 1
+    self.converter.configure(self.config)
+    self.converter.convert_batch(self.files[:3])
+    self.config[aio.CONCURRENCY] = 3
+    self.converter.configure(self.config)
+    self.converter.convert_batch(self.files)
+    self.assertEqual(3, self.converter.max_in_progress)
+
+
+class AsyncProvTranslatorConverterTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(AsyncProvTranslatorConverterTestCase, self).setUp()
+    self.directory = tempfile.mkdtemp()
+    self.converter = AsyncProvTranslatorConverter()
+    self.url = "https://" + self.__class__.__name__
+    self.converter.configure({
+      RestComponent.URL: self.url,
+      Converter.INPUT_FORMATS: standards.FORMATS,
+      Converter.OUTPUT_FORMATS: standards.FORMATS})
+
+  def tearDown(self):
+    super(AsyncProvTranslatorConverterTestCase, self).tearDown()
+    self.converter.close()
+    shutil.rmtree(self.directory)
+
+  def test_convert_batch(self):
+    files = []
+    for format in standards.FORMATS:
+      in_file = os.path.join(self.directory, "in." + format)
+      with open(in_file, "w") as f:
+        f.write(format)
+      files.append((in_file, os.path.join(self.directory, "out.json")
+                    if format == standards.JSON else
+                    os.path.join(self.directory, "out." + format + ".json")))
+    with requests_mock.Mocker(real_http=False) as mocker:
+      mocker.register_uri("POST", self.url, text="converted")
+      results = self.converter.convert_batch(files)
+      self.assertEqual(len(files), mocker.call_count)
+    self.assertEqual([None] * len(files), results)
+    for (_, out_file) in files:
+      with open(out_file) as f:
+        self.assertEqual("converted", f.read())
+
+  def test_fingerprint_runtime_keys(self):
+    fingerprint = self.converter.fingerprint()
+    config = dict(self.converter.configuration)
+    config[aio.CONCURRENCY] = 4
+    self.converter.configure(config)
+    self.assertEqual(fingerprint, self.converter.fingerprint())
+
+
+class AsyncProvStoreConverterTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(AsyncProvStoreConverterTestCase, self).setUp()
+    self.directory = tempfile.mkdtemp()
+    self.converter = AsyncProvStoreConverter()
+    self.url = "https://" + self.__class__.__name__ + "/"
+    self.converter.configure({
+      RestComponent.URL: self.url,
+      ProvStoreConverter.AUTHORIZATION: "ApiKey user:12345",
+      Converter.INPUT_FORMATS: standards.FORMATS,
+      Converter.OUTPUT_FORMATS: standards.FORMATS,
+      ProvStoreConverter.UPLOAD_ONCE: True,
+      aio.CONCURRENCY: 1})
+
+  def tearDown(self):
+    super(AsyncProvStoreConverterTestCase, self).tearDown()
+    self.converter.close()
+    shutil.rmtree(self.directory)
+
+  def test_convert_batch_upload_once(self):
+    files = []
+    for (doc_id, in_format) in [(1, standards.JSON), (2, standards.PROVX)]:
+      in_file = os.path.join(self.directory, str(doc_id) + "." + in_format)
+      with open(in_file, "w") as f:
+        f.write(in_format)
+      for out_format in [standards.JSON, standards.PROVN]:
+        files.append((in_file, os.path.join(
+          self.directory, str(doc_id) + ".out." + out_format)))
+    with requests_mock.Mocker(real_http=False) as mocker:
+      mocker.register_uri(
+        "POST", self.url,
+        [{"json": {"id": 1}, "status_code": 201},
+         {"json": {"id": 2}, "status_code": 201}])
+      for doc_id in [1, 2]:
+        for format in [standards.JSON, standards.PROVN]:
+          mocker.register_uri("GET", self.url + str(doc_id) + "." + format,
+                              text=format)
+        mocker.register_uri("DELETE", self.url + str(doc_id),
+                            status_code=204)
+      results = self.converter.convert_batch(files)
+      self.assertEqual([None] * len(files), results)
+      # Documents are all stored, then all fetched, as for
+      # ProvStoreConverter.convert_batch.
+      methods = [request.method for request in mocker.request_history]
+      self.assertEqual(["POST"] * 2 + ["GET"] * 4, methods)
+      self.converter.close()
+    for (_, out_file) in files:
+      with open(out_file) as f:
+        self.assertEqual(os.path.splitext(out_file)[1][1:], f.read())
@@ -0,0 +1,285 @@
+"""Unit tests for :mod:`prov_interop.cache`.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from prov_interop import cache
+from prov_interop.cache import DiskCache
+from prov_interop.cache import LRUCache
+
+class LRUCacheTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(LRUCacheTestCase, self).setUp()
+    self.cache = LRUCache(2)
+
+  def test_init(self):
+    self.assertEqual(2, self.cache.max_size)
+    self.assertEqual(0, len(self.cache))
+    self.assertEqual(0, self.cache.hits)
+    self.assertEqual(0, self.cache.misses)
+
+  def test_init_invalid_size(self):
+    with self.assertRaises(ValueError):
+      LRUCache(0)
+
+  def test_get_put(self):
+    self.assertEqual(None, self.cache.get("a"))
+    self.assertEqual("x", self.cache.get("a", "x"))
+    self.cache.put("a", 1)
+    self.assertEqual(1, self.cache.get("a"))
+    self.assertEqual(1, self.cache.hits)
+    self.assertEqual(2, self.cache.misses)
+
+  def test_evict_least_recently_used(self):
+    self.cache.put("a", 1)
+    self.cache.put("b", 2)
+    self.cache.get("a")
+    self.cache.put("c", 3)
+    self.assertIn("a", self.cache)
+    self.assertNotIn("b", self.cache)
+    self.assertIn("c", self.cache)
+    self.assertEqual(2, len(self.cache))
+
+  def test_put_replace(self):
+    self.cache.put("a", 1)
+    self.cache.put("b", 2)
+    self.cache.put("a", 3)
+    self.assertEqual(2, len(self.cache))
+    self.assertEqual(3, self.cache.get("a"))
+
+  def test_clear(self):
+    self.cache.put("a", 1)
+    self.cache.get("a")
+    self.cache.clear()
+    self.assertEqual(0, len(self.cache))
+    self.assertEqual(1, self.cache.hits)
+
+
+class DiskCacheTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(DiskCacheTestCase, self).setUp()
+    self.directory = tempfile.mkdtemp()
+    self.cache = DiskCache(os.path.join(self.directory, "cache"), 10)
+
+  def tearDown(self):
+    super(DiskCacheTestCase, self).tearDown()
+    shutil.rmtree(self.directory)
+
+  def age(self, key, seconds):
+    file_name = self.cache.path(key)
+    mtime = os.stat(file_name).st_mtime - seconds
+    os.utime(file_name, (mtime, mtime))
+
+  def test_init(self):
+    self.assertTrue(os.path.isdir(self.cache.directory))
+    self.assertEqual(10, self.cache.max_size)
+    self.assertEqual(0, self.cache.size())
+
+  def test_init_invalid_size(self):
+    with self.assertRaises(ValueError):
+      DiskCache(self.directory, 0)
+
+  def test_from_config(self):
+    disk_cache = DiskCache.from_config({cache.DIRECTORY: self.directory,
+                                        cache.MAX_SIZE: 100})
+    self.assertEqual(self.directory, disk_cache.directory)
+    self.assertEqual(100, disk_cache.max_size)
+
+  def test_from_config_default_size(self):
+    disk_cache = DiskCache.from_config({cache.DIRECTORY: self.directory})
+    self.assertEqual(cache.DEFAULT_MAX_SIZE, disk_cache.max_size)
+
+  def test_from_config_missing_directory(self):
+    with self.assertRaises(ValueError):
+      DiskCache.from_config({cache.MAX_SIZE: 100})
+
+  def test_from_config_invalid_size(self):
+    with self.assertRaises(ValueError):
+      DiskCache.from_config({cache.DIRECTORY: self.directory,
+                             cache.MAX_SIZE: "100"})
+
+  def test_get_put(self):
+    self.assertEqual(None, self.cache.get("abcd"))
+    self.cache.put("abcd", b"1234")
+    self.assertEqual(b"1234", self.cache.get("abcd"))
+    self.assertEqual({"hits": 1, "misses": 1}, self.cache.statistics())
+    self.assertEqual(4, self.cache.size())
+
+  def test_get_file_put_file(self):
+    in_file = os.path.join(self.directory, "in")
+    out_file = os.path.join(self.directory, "out")
+    with open(in_file, "wb") as f:
+      f.write(b"1234")
+    self.assertFalse(self.cache.get_file("abcd", out_file))
+    self.assertFalse(os.path.exists(out_file))
+    self.cache.put_file("abcd", in_file)
+    self.assertTrue(self.cache.get_file("abcd", out_file))
+    with open(out_file, "rb") as f:
+      self.assertEqual(b"1234", f.read())
+    self.assertEqual(b"1234", self.cache.get("abcd"))
+    self.assertEqual({"hits": 2, "misses": 1}, self.cache.statistics())
+    self.assertEqual(4, self.cache.size())
+
+  def test_evict_least_recently_used(self):
+    self.cache.put("aa", b"1234")
+    self.cache.put("bb", b"1234")
+    self.age("aa", 20)
+    self.age("bb", 10)
+    self.cache.get("aa")
+    self.cache.put("cc", b"1234")
+    self.assertEqual(b"1234", self.cache.get("aa"))
+    self.assertEqual(None, self.cache.get("bb"))
+    self.assertEqual(b"1234", self.cache.get("cc"))
+    self.assertEqual(8, self.cache.size())
+
+  def test_evict_to_trim_ratio(self):
+    disk_cache = DiskCache(os.path.join(self.directory, "trim"), 100)
+    for index in range(11):
+      key = "%02d" % index
+      disk_cache.put(key, b"0123456789")
+      file_name = disk_cache.path(key)
+      mtime = os.stat(file_name).st_mtime - 100 + index
+      os.utime(file_name, (mtime, mtime))
+    # 110 bytes is over 100 bytes, so is trimmed to 90% of 100 bytes.
+    self.assertEqual(90, disk_cache.size())
+    self.assertEqual(None, disk_cache.get("00"))
+    self.assertEqual(None, disk_cache.get("01"))
+    self.assertEqual(b"0123456789", disk_cache.get("02"))
+
+  def test_put_replace(self):
+    self.cache.put("aa", b"1234")
+    self.cache.put("bb", b"1234")
+    def trim(max_size=None):
+      self.fail("Replacing an entry should not exceed the maximum size")
+    self.cache.trim = trim
+    self.cache.put("aa", b"5678")
+    self.cache.put("aa", b"9012")
+    self.assertEqual(b"9012", self.cache.get("aa"))
+    self.assertEqual(b"1234", self.cache.get("bb"))
+    self.assertEqual(8, self.cache.size())
+
+  def test_trim(self):
+    self.cache.put("aa", b"1234")
+    self.cache.put("bb", b"1234")
+    self.age("aa", 10)
+    self.assertEqual(1, self.cache.trim(5))
+    self.assertEqual(None, self.cache.get("aa"))
+    self.assertEqual(b"1234", self.cache.get("bb"))
+
+  def test_purge(self):
+    self.cache.put("aa", b"1234")
+    self.cache.put("bb", b"1234")
+    self.cache.purge()
+    self.assertEqual(0, self.cache.size())
+    self.assertEqual(None, self.cache.get("aa"))
+    self.assertTrue(os.path.isdir(self.cache.directory))
+
+  def test_purge_ignores_other_files(self):
+    self.cache.put("aa", b"1234")
+    # A file left by an interrupted write.
+    with open(os.path.join(self.cache.directory, "aa", ".tmp1234"), "w") as f:
+      f.write("1234")
+    others = [os.path.join(self.cache.directory, "notes.txt"),
+              os.path.join(self.cache.directory, "bb", "notes.txt"),
+              os.path.join(self.cache.directory, "data", "aa")]
+    for file_name in others:
+      if not os.path.isdir(os.path.dirname(file_name)):
+        os.makedirs(os.path.dirname(file_name))
+      with open(file_name, "w") as f:
+        f.write("keep")
+    self.assertEqual(4, self.cache.size())
+    self.cache.purge()
+    self.assertEqual(0, self.cache.size())
+    self.assertFalse(os.path.exists(os.path.join(self.cache.directory, "aa")))
+    for file_name in others:
+      self.assertTrue(os.path.isfile(file_name))
+
+  def test_trim_ignores_other_files(self):
+    with open(os.path.join(self.cache.directory, "notes.txt"), "w") as f:
+      f.write("123456789012")
+    self.cache.put("aa", b"1234")
+    self.assertEqual(b"1234", self.cache.get("aa"))
+    self.assertTrue(os.path.isfile(
+      os.path.join(self.cache.directory, "notes.txt")))
+
+  def test_digest(self):
+    self.assertEqual(cache.digest({"a": 1, "b": 2}),
+                     cache.digest({"b": 2, "a": 1}))
+    self.assertNotEqual(cache.digest("a"), cache.digest("b"))
+
+
+class MainTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(MainTestCase, self).setUp()
+    self.directory = tempfile.mkdtemp()
+    self.cache = DiskCache(self.directory)
+    for key in ["aa", "bb", "cc"]:
+      self.cache.put(key, b"1234")
+    self.stdout = sys.stdout
+    sys.stdout = io.StringIO() if sys.version_info[0] >= 3 else io.BytesIO()
+
+  def tearDown(self):
+    super(MainTestCase, self).tearDown()
+    sys.stdout = self.stdout
+    shutil.rmtree(self.directory)
+
+  def test_size(self):
+    cache.main(["size", self.directory])
+    self.assertEqual("3 entries, 12 bytes\n", sys.stdout.getvalue())
+
+  def test_trim(self):
+    cache.main(["trim", "-s", "8", self.directory])
+    self.assertEqual(8, self.cache.size())
+    self.assertIn("Evicted 1 entries", sys.stdout.getvalue())
+
+  def test_purge(self):
+    cache.main(["purge", self.directory])
+    self.assertEqual(0, self.cache.size())
+    self.assertEqual("0 entries, 0 bytes\n", sys.stdout.getvalue())
+
+  def test_purge_not_cache(self):
+    notes_file = os.path.join(self.directory, "notes.txt")
+    with open(notes_file, "w") as f:
+      f.write("keep")
+    stderr = sys.stderr
+    sys.stderr = sys.stdout
+    try:
+      with self.assertRaises(SystemExit):
+        cache.main(["purge", self.directory])
+    finally:
+      sys.stderr = stderr
+    self.assertIn("notes.txt", sys.stdout.getvalue())
+    self.assertEqual(12, self.cache.size())
+    self.assertTrue(os.path.isfile(notes_file))
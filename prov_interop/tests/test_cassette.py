@@ -0,0 +1,224 @@
+"""Unit tests for :mod:`prov_interop.cassette`.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import io
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import zlib
+
+try:
+  from http.server import BaseHTTPRequestHandler
+  from http.server import HTTPServer
+except ImportError:
+  from BaseHTTPServer import BaseHTTPRequestHandler
+  from BaseHTTPServer import HTTPServer
+
+from prov_interop import cache
+from prov_interop import cassette
+from prov_interop.cassette import Cassette
+from prov_interop.cassette import CassetteError
+from prov_interop.component import ConfigError
+from prov_interop.component import RestComponent
+
+class ReverseHandler(BaseHTTPRequestHandler):
+  """Request handler which returns the body of a POST request
+  reversed and gzip-compressed, and counts requests. Connections are
+  closed after each response, so the server can be shut down."""
+
+  protocol_version = "HTTP/1.1"
+  requests = 0
+
+  def do_POST(self):
+    ReverseHandler.requests += 1
+    body = self.rfile.read(int(self.headers["Content-Length"]))
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    body = compressor.compress(body[::-1]) + compressor.flush()
+    self.send_response(201)
+    self.send_header("Content-Encoding", "gzip")
+    self.send_header("Content-Length", str(len(body)))
+    self.send_header("Location", "/documents/1")
+    self.send_header("Connection", "close")
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, format, *args):
+    pass
+
+
+class BodyDigestTestCase(unittest.TestCase):
+
+  def test_body_digest(self):
+    expected = cassette.body_digest(b"abcd")
+    self.assertEqual(expected, cassette.body_digest("abcd"))
+    self.assertEqual(expected, cassette.body_digest([b"ab", "cd"]))
+    self.assertNotEqual(expected, cassette.body_digest(None))
+
+  def test_body_digest_file(self):
+    body = io.BytesIO(b"xxabcd")
+    body.seek(2)
+    self.assertEqual(cassette.body_digest(b"abcd"),
+                     cassette.body_digest(body))
+    self.assertEqual(2, body.tell())
+
+
+class CassetteTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(CassetteTestCase, self).setUp()
+    self.directory = tempfile.mkdtemp()
+    self.cassette_config = {cache.DIRECTORY:
+                              os.path.join(self.directory, "cassette"),
+                            cassette.MODE: cassette.RECORD}
+    self.server = HTTPServer(("127.0.0.1", 0), ReverseHandler)
+    thread = threading.Thread(target=self.server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    self.url = "http://127.0.0.1:" + str(self.server.server_address[1]) + \
+        "/documents/"
+    ReverseHandler.requests = 0
+
+  def tearDown(self):
+    super(CassetteTestCase, self).tearDown()
+    self.server.shutdown()
+    self.server.server_close()
+    shutil.rmtree(self.directory)
+
+  def rest_component(self, mode):
+    self.cassette_config[cassette.MODE] = mode
+    rest = RestComponent()
+    rest.configure({RestComponent.URL: self.url,
+                    RestComponent.TIMEOUT: 5,
+                    RestComponent.CASSETTE: self.cassette_config})
+    self.addCleanup(rest.close)
+    return rest
+
+  def post(self, rest, data, accept="text/plain"):
+    response = rest.request("POST", self.url, data=data,
+                            headers={"Accept": accept}, stream=True)
+    out_file = os.path.join(self.directory, "out")
+    rest.download(response, out_file)
+    with open(out_file, "rb") as f:
+      return (response, f.read())
+
+  def test_from_config(self):
+    recorder = Cassette.from_config(self.cassette_config)
+    self.assertEqual(cassette.RECORD, recorder.mode)
+    self.assertEqual(self.cassette_config[cache.DIRECTORY],
+                     recorder.cache.directory)
+
+  def test_from_config_invalid_mode(self):
+    self.cassette_config[cassette.MODE] = "rewind"
+    with self.assertRaises(ValueError):
+      Cassette.from_config(self.cassette_config)
+
+  def test_configure_invalid_cassette(self):
+    with self.assertRaises(ConfigError):
+      self.rest_component("rewind")
+
+  def test_fingerprint_excludes_cassette(self):
+    rest = RestComponent()
+    rest.configure({RestComponent.URL: self.url})
+    self.assertEqual(rest.fingerprint(),
+                     self.rest_component(cassette.RECORD).fingerprint())
+
+  def test_record_replay(self):
+    recorder = self.rest_component(cassette.RECORD)
+    (_, body) = self.post(recorder, b"abcd")
+    self.assertEqual(b"dcba", body)
+    in_file = os.path.join(self.directory, "in")
+    with open(in_file, "wb") as f:
+      f.write(b"1234")
+    with open(in_file, "rb") as f:
+      (_, body) = self.post(recorder, f)
+    self.assertEqual(b"4321", body)
+    self.assertEqual(2, ReverseHandler.requests)
+    self.assertEqual(2, recorder.statistics()["cassette-recorded"])
+    player = self.rest_component(cassette.REPLAY)
+    (response, body) = self.post(player, b"abcd")
+    self.assertEqual(201, response.status_code)
+    self.assertEqual("/documents/1", response.headers["Location"])
+    self.assertFalse("Content-Encoding" in response.headers)
+    self.assertEqual(b"dcba", body)
+    with open(in_file, "rb") as f:
+      (_, body) = self.post(player, f)
+    self.assertEqual(b"4321", body)
+    self.assertEqual(2, ReverseHandler.requests)
+    self.assertEqual(2, player.statistics()["cassette-replayed"])
+
+  def test_record_streams_body(self):
+    recorder = self.rest_component(cassette.RECORD)
+    # Bodies are only recorded from files, not held in memory.
+    put = recorder.cassette.cache.put
+    def put_small(key, data):
+      self.assertTrue(len(data) < cassette.CHUNK_SIZE)
+      put(key, data)
+    recorder.cassette.cache.put = put_small
+    data = os.urandom(cassette.CHUNK_SIZE * 3 + 1)
+    (response, body) = self.post(recorder, data)
+    self.assertEqual(201, response.status_code)
+    self.assertEqual(data[::-1], body)
+    player = self.rest_component(cassette.REPLAY)
+    (_, body) = self.post(player, data)
+    self.assertEqual(data[::-1], body)
+    self.assertEqual(1, ReverseHandler.requests)
+
+  def test_record_evicted(self):
+    self.cassette_config[cache.MAX_SIZE] = 2
+    recorder = self.rest_component(cassette.RECORD)
+    with self.assertRaises(CassetteError):
+      self.post(recorder, b"abcd")
+
+  def test_replay_concurrent(self):
+    recorder = self.rest_component(cassette.RECORD)
+    self.post(recorder, b"abcd")
+    player = self.rest_component(cassette.REPLAY)
+    def replay():
+      for _ in range(25):
+        response = player.request("POST", self.url, data=b"abcd",
+                                  headers={"Accept": "text/plain"})
+        self.assertEqual(b"dcba", response.content)
+        response.close()
+    threads = [threading.Thread(target=replay) for _ in range(4)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(100, player.statistics()["cassette-replayed"])
+
+  def test_replay_missing(self):
+    recorder = self.rest_component(cassette.RECORD)
+    self.post(recorder, b"abcd")
+    player = self.rest_component(cassette.REPLAY)
+    for (data, accept) in [(b"abce", "text/plain"),
+                           (b"abcd", "text/turtle")]:
+      with self.assertRaises(CassetteError):
+        self.post(player, data, accept)
+    self.assertEqual(1, ReverseHandler.requests)
+    self.assertEqual(2, player.statistics()["cassette-missing"])
@@ -0,0 +1,187 @@
+"""Unit tests for :mod:`prov_interop.chain`.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+import shutil
+import tempfile
+import unittest
+from xml.etree import ElementTree
+
+from prov_interop import standards
+from prov_interop.chain import ComparatorChain
+from prov_interop.chain import same_bytes
+from prov_interop.comparator import Comparator
+from prov_interop.comparator import ComparisonError
+from prov_interop.component import ConfigError
+
+class FalseComparator(Comparator):
+  """Comparator which counts its comparisons and always returns
+  ``False``."""
+
+  def __init__(self):
+    super(FalseComparator, self).__init__()
+    self.comparisons = 0
+
+  def compare(self, file1, file2):
+    super(FalseComparator, self).compare(file1, file2)
+    self.comparisons += 1
+    return False
+
+
+class ComparatorChainTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(ComparatorChainTestCase, self).setUp()
+    self.directory = tempfile.mkdtemp()
+    self.chain = ComparatorChain()
+    self.config = {
+      ComparatorChain.COMPARATOR: {
+        ComparatorChain.CLASS:
+          FalseComparator.__module__ + "." + FalseComparator.__name__,
+        Comparator.FORMATS: [standards.JSON, standards.PROVX,
+                             standards.PROVN, standards.TTL]
+      }
+    }
+    self.chain.configure(self.config)
+
+  def tearDown(self):
+    super(ComparatorChainTestCase, self).tearDown()
+    shutil.rmtree(self.directory)
+
+  def write_file(self, name, content):
+    file_name = os.path.join(self.directory, name)
+    with open(file_name, "w") as f:
+      f.write(content)
+    return file_name
+
+  def test_configure(self):
+    self.assertIsInstance(self.chain.comparator, FalseComparator)
+    self.assertEqual(self.config[ComparatorChain.COMPARATOR][
+      Comparator.FORMATS], self.chain.formats)
+
+  def test_configure_no_comparator(self):
+    with self.assertRaises(ConfigError):
+      self.chain.configure({})
+
+  def test_configure_no_class(self):
+    del self.config[ComparatorChain.COMPARATOR][ComparatorChain.CLASS]
+    with self.assertRaises(ConfigError):
+      self.chain.configure(self.config)
+
+  def test_configure_invalid_class(self):
+    self.config[ComparatorChain.COMPARATOR][ComparatorChain.CLASS] = \
+        "prov_interop.nosuchmodule.NoSuchComparator"
+    with self.assertRaises(ConfigError):
+      self.chain.configure(self.config)
+
+  def test_same_bytes(self):
+    file1 = self.write_file("a.json", "x" * 10)
+    file2 = self.write_file("b.json", "x" * 10)
+    file3 = self.write_file("c.json", "x" * 9 + "y")
+    empty1 = self.write_file("d.json", "")
+    empty2 = self.write_file("e.json", "")
+    self.assertTrue(same_bytes(file1, file2))
+    self.assertFalse(same_bytes(file1, file3))
+    self.assertTrue(same_bytes(empty1, empty2))
+    self.assertFalse(same_bytes(file1, empty1))
+
+  def test_compare_same_bytes(self):
+    file1 = self.write_file("a.ttl", "@prefix ex: <http://example.org/> .")
+    file2 = self.write_file("b.ttl", "@prefix ex: <http://example.org/> .")
+    self.assertTrue(self.chain.compare(file1, file2))
+    self.assertEqual(0, self.chain.comparator.comparisons)
+    self.assertEqual(1, self.chain.statistics()["byte-equal"])
+
+  def test_compare_canonical_json(self):
+    file1 = self.write_file("a.json", '{"entity": {}, "prefix": {}}')
+    file2 = self.write_file("b.json", '{ "prefix": {},\n "entity": {} }')
+    self.assertTrue(self.chain.compare(file1, file2))
+    self.assertEqual(0, self.chain.comparator.comparisons)
+    self.assertEqual(1, self.chain.statistics()["canonical-equal"])
+
+  def test_compare_canonical_provn(self):
+    file1 = self.write_file("a.provn", "document\n  entity(e)\nendDocument")
+    file2 = self.write_file("b.provn",
+                            "document\n\nentity(e)   \nendDocument\n")
+    self.assertTrue(self.chain.compare(file1, file2))
+    self.assertEqual(0, self.chain.comparator.comparisons)
+
+  @unittest.skipUnless(hasattr(ElementTree, "canonicalize"),
+                       "Canonical XML is not available")
+  def test_compare_canonical_xml(self):
+    file1 = self.write_file("a.provx", '<document a="1" b="2"/>')
+    file2 = self.write_file("b.provx", '<document b="2"\n a="1"></document>')
+    self.assertTrue(self.chain.compare(file1, file2))
+    self.assertEqual(0, self.chain.comparator.comparisons)
+
+  def test_compare_malformed(self):
+    file1 = self.write_file("a.json", '{"entity": {}}')
+    for (name, content) in [("b.json", '{"entity": '),
+                            ("b.provx", "<document>"),
+                            ("b.provn", "entity(e)")]:
+      file2 = self.write_file(name, content)
+      with self.assertRaises(ComparisonError):
+        self.chain.compare(file1, file2)
+    self.assertEqual(0, self.chain.comparator.comparisons)
+    self.assertEqual(3, self.chain.statistics()["malformed"])
+
+  def test_compare_delegated(self):
+    file1 = self.write_file("a.json", '{"entity": {"e1": {}}}')
+    file2 = self.write_file("b.json", '{"entity": {"e2": {}}}')
+    file3 = self.write_file("c.provx", "<document/>")
+    self.assertFalse(self.chain.compare(file1, file2))
+    self.assertFalse(self.chain.compare(file1, file3))
+    self.assertEqual(2, self.chain.comparator.comparisons)
+    self.assertEqual(2, self.chain.statistics()["delegated"])
+
+  def test_compare_missing_file(self):
+    file1 = self.write_file("a.json", "{}")
+    with self.assertRaises(ComparisonError):
+      self.chain.compare(file1, "nosuchfile.json")
+
+  def test_compare_batch(self):
+    file1 = self.write_file("a.json", '{"entity": {}}')
+    file2 = self.write_file("b.json", '{"entity": {}}')
+    file3 = self.write_file("c.json", '{"agent": {}}')
+    file4 = self.write_file("d.json", "[")
+    results = self.chain.compare_batch([(file1, file2), (file1, file3),
+                                        (file1, file4)])
+    self.assertEqual([True, False], results[:2])
+    self.assertIsInstance(results[2], ComparisonError)
+    self.assertEqual(1, self.chain.comparator.comparisons)
+
+  def test_pop_invocations(self):
+    self.assertEqual([], self.chain.pop_invocations())
+    self.chain.comparator.pop_invocations = lambda: ["invocation"]
+    self.assertEqual(["invocation"], self.chain.pop_invocations())
+
+  def test_fingerprint(self):
+    fingerprint = self.chain.fingerprint()
+    self.config[ComparatorChain.COMPARATOR][Comparator.FORMATS] = \
+        [standards.JSON]
+    self.chain.configure(self.config)
+    self.assertNotEqual(fingerprint, self.chain.fingerprint())
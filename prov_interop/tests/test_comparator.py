@@ -25,13 +25,17 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import filecmp
 import os
+import shutil
 import tempfile
 import unittest
 
 from prov_interop import standards
+from prov_interop.cache import DiskCache
 from prov_interop.component import ConfigError
 from prov_interop.comparator import Comparator
+from prov_interop.comparator import ComparisonCache
 from prov_interop.comparator import ComparisonError
 
 class ComparatorTestCase(unittest.TestCase):
@@ -86,3 +90,95 @@ class ComparatorTestCase(unittest.TestCase):
     self.comparator.configure(self.config)
     with self.assertRaises(ComparisonError):
       self.comparator.check_format("nosuchformat")
+
+
+class CountingComparator(Comparator):
+  """Comparator which compares files byte-by-byte and counts its
+  comparisons."""
+
+  def __init__(self):
+    super(CountingComparator, self).__init__()
+    self.comparisons = 0
+
+  def compare(self, file1, file2):
+    super(CountingComparator, self).compare(file1, file2)
+    self.comparisons += 1
+    return filecmp.cmp(file1, file2, shallow=False)
+
+
+class ComparisonCacheTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(ComparisonCacheTestCase, self).setUp()
+    self.directory = tempfile.mkdtemp()
+    self.cache = ComparisonCache(
+      DiskCache(os.path.join(self.directory, "cache")))
+    self.comparator = CountingComparator()
+    self.config = {Comparator.FORMATS: [standards.JSON, standards.PROVN]}
+    self.comparator.configure(self.config)
+    self.file1 = self.write_file("file1." + standards.JSON, "document")
+    self.file2 = self.write_file("file2." + standards.JSON, "document")
+
+  def tearDown(self):
+    super(ComparisonCacheTestCase, self).tearDown()
+    shutil.rmtree(self.directory)
+
+  def write_file(self, name, content):
+    file_name = os.path.join(self.directory, name)
+    with open(file_name, "w") as f:
+      f.write(content)
+    return file_name
+
+  def test_compare(self):
+    self.assertTrue(self.cache.compare(self.comparator,
+                                       self.file1, self.file2))
+    # Same content in a different file.
+    file3 = self.write_file("file3." + standards.JSON, "document")
+    self.assertTrue(self.cache.compare(self.comparator, self.file1, file3))
+    self.assertEqual(1, self.comparator.comparisons)
+    self.assertEqual({"hits": 1, "misses": 1}, self.cache.statistics())
+
+  def test_compare_not_equivalent(self):
+    self.write_file("file2." + standards.JSON, "different")
+    self.assertFalse(self.cache.compare(self.comparator,
+                                        self.file1, self.file2))
+    self.assertFalse(self.cache.compare(self.comparator,
+                                        self.file1, self.file2))
+    self.assertEqual(1, self.comparator.comparisons)
+
+  def test_compare_different_content(self):
+    self.cache.compare(self.comparator, self.file1, self.file2)
+    self.write_file("file2." + standards.JSON, "different")
+    self.assertFalse(self.cache.compare(self.comparator,
+                                        self.file1, self.file2))
+    self.assertEqual(2, self.comparator.comparisons)
+
+  def test_compare_different_format(self):
+    self.cache.compare(self.comparator, self.file1, self.file2)
+    file3 = self.write_file("file3." + standards.PROVN, "document")
+    self.cache.compare(self.comparator, self.file1, file3)
+    self.assertEqual(2, self.comparator.comparisons)
+
+  def test_compare_different_configuration(self):
+    self.cache.compare(self.comparator, self.file1, self.file2)
+    self.config[Comparator.FORMATS] = [standards.JSON]
+    self.comparator.configure(self.config)
+    self.cache.compare(self.comparator, self.file1, self.file2)
+    self.assertEqual(2, self.comparator.comparisons)
+
+  def test_compare_unsupported_format(self):
+    self.cache.compare(self.comparator, self.file1, self.file2)
+    self.config[Comparator.FORMATS] = [standards.PROVN]
+    self.comparator.configure(self.config)
+    with self.assertRaises(ComparisonError):
+      self.cache.compare(self.comparator, self.file1, self.file2)
+
+  def test_compare_batch(self):
+    files = [(self.file1, self.file2),
+             (self.file1, "nosuchfile." + standards.JSON)]
+    results = self.cache.compare_batch(self.comparator, files)
+    self.assertEqual(True, results[0])
+    self.assertIsInstance(results[1], ComparisonError)
+    self.assertEqual([True], self.cache.compare_batch(self.comparator,
+                                                      files[:1]))
+    self.assertEqual(1, self.comparator.comparisons)
@@ -25,7 +25,21 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
 import unittest
+import zlib
+
+try:
+  from http.server import BaseHTTPRequestHandler
+  from http.server import HTTPServer
+except ImportError:
+  from BaseHTTPServer import BaseHTTPRequestHandler
+  from BaseHTTPServer import HTTPServer
 
 from prov_interop.component import CommandLineComponent
 from prov_interop.component import ConfigurableComponent
@@ -61,6 +75,22 @@ class ConfigurableComponentTestCase(unittest.TestCase):
     with self.assertRaises(ConfigError):
       self.component.check_configuration(["a", "c", "expectfail"])
 
+  def test_fingerprint(self):
+    self.component.configure(self.config)
+    fingerprint = self.component.fingerprint()
+    other = ConfigurableComponent()
+    other.configure(dict(self.config))
+    self.assertEqual(fingerprint, other.fingerprint())
+    other.configure({"a":"b"})
+    self.assertNotEqual(fingerprint, other.fingerprint())
+
+  def test_fingerprint_runtime_keys(self):
+    self.component.configure(self.config)
+    fingerprint = self.component.fingerprint()
+    self.config["skip-tests"] = ["1"]
+    self.component.configure(self.config)
+    self.assertEqual(fingerprint, self.component.fingerprint())
+
 
 class CommandLineComponentTestCase(unittest.TestCase):
 
@@ -117,6 +147,219 @@ class CommandLineComponentTestCase(unittest.TestCase):
     with self.assertRaises(ConfigError):
       self.command_line.configure({CommandLineComponent.EXECUTABLE: "a"})
 
+  def test_fingerprint_executable(self):
+    (handle, script) = tempfile.mkstemp(suffix=".py")
+    try:
+      with os.fdopen(handle, "w") as f:
+        f.write("print(1)")
+      config = {CommandLineComponent.EXECUTABLE: "python " + script,
+                CommandLineComponent.ARGUMENTS: "b"}
+      self.command_line.configure(config)
+      fingerprint = self.command_line.fingerprint()
+      with open(script, "w") as f:
+        f.write("print(2)")
+      self.command_line.configure(config)
+      self.assertNotEqual(fingerprint, self.command_line.fingerprint())
+      config[CommandLineComponent.BATCH_SIZE] = 5
+      fingerprint = self.command_line.fingerprint()
+      self.command_line.configure(config)
+      self.assertEqual(fingerprint, self.command_line.fingerprint())
+    finally:
+      os.remove(script)
+
+  def test_version(self):
+    config = {CommandLineComponent.EXECUTABLE: "echo",
+              CommandLineComponent.ARGUMENTS: "b"}
+    self.command_line.configure(config)
+    self.assertEqual(None, self.command_line.version())
+    fingerprint = self.command_line.fingerprint()
+    config[CommandLineComponent.VERSION_ARGUMENTS] = "1.0"
+    self.command_line.configure(config)
+    self.assertEqual("1.0", self.command_line.version())
+    self.assertNotEqual(fingerprint, self.command_line.fingerprint())
+
+  def test_version_no_executable(self):
+    self.command_line.configure({
+      CommandLineComponent.EXECUTABLE: "nosuchexecutable",
+      CommandLineComponent.ARGUMENTS: "b",
+      CommandLineComponent.VERSION_ARGUMENTS: "--version"})
+    self.assertIn("failed", self.command_line.version())
+
+  def test_invoke(self):
+    self.command_line.configure({
+      CommandLineComponent.EXECUTABLE: sys.executable,
+      CommandLineComponent.ARGUMENTS: "-c pass"})
+    command_line = self.command_line.command_line({})
+    result = self.command_line.invoke(command_line)
+    self.assertEqual(0, result.return_code)
+    self.assertEqual(command_line, result.command_line)
+    self.assertEqual(0, self.command_line.call(command_line))
+    self.assertEqual([result.command_line, command_line],
+                     [invocation.command_line for invocation in
+                      self.command_line.pop_invocations()])
+    self.assertEqual([], self.command_line.pop_invocations())
+    statistics = self.command_line.statistics()
+    self.assertEqual(2, statistics["processes-spawned"])
+    self.assertEqual(0, statistics["worker-calls"])
+
+  def test_invoke_forkserver(self):
+    (handle, script) = tempfile.mkstemp(suffix=".py")
+    with os.fdopen(handle, "w") as f:
+      f.write("import sys\nif __name__ == \"__main__\":\n" +
+              "  sys.exit(int(sys.argv[1]))\n")
+    try:
+      self.command_line.configure({
+        CommandLineComponent.EXECUTABLE: sys.executable + " " + script,
+        CommandLineComponent.ARGUMENTS: "2",
+        CommandLineComponent.FORKSERVER: True})
+      self.command_line.call(self.command_line.command_line({}))
+      [invocation] = self.command_line.pop_invocations()
+      self.assertEqual(2, invocation.return_code)
+      self.assertEqual(None, invocation.user_time)
+      self.assertEqual({"processes-spawned": 0, "process-cpu-ms": 0,
+                        "worker-calls": 1},
+                       self.command_line.statistics())
+    finally:
+      self.command_line.close()
+      os.remove(script)
+
+  def test_configure_forkserver(self):
+    config = {CommandLineComponent.EXECUTABLE: "python a.py",
+              CommandLineComponent.ARGUMENTS: "b",
+              CommandLineComponent.FORKSERVER: True,
+              CommandLineComponent.FORKSERVER_MODULES: ["c"]}
+    self.command_line.configure(config)
+    self.assertEqual(
+      ["python", "-m", "prov_interop.forkserver", "a.py", "c"],
+      self.command_line.worker.command_line)
+
+  def test_configure_forkserver_and_worker(self):
+    with self.assertRaises(ConfigError):
+      self.command_line.configure({
+        CommandLineComponent.EXECUTABLE: "python a.py",
+        CommandLineComponent.ARGUMENTS: "b",
+        CommandLineComponent.WORKER: "c",
+        CommandLineComponent.FORKSERVER: True})
+
+  def test_configure_forkserver_no_script(self):
+    with self.assertRaises(ConfigError):
+      self.command_line.configure({
+        CommandLineComponent.EXECUTABLE: "nosuchscript",
+        CommandLineComponent.ARGUMENTS: "b",
+        CommandLineComponent.FORKSERVER: True})
+
+  def test_configure_batch(self):
+    config = {CommandLineComponent.EXECUTABLE: "a",
+              CommandLineComponent.ARGUMENTS: "-i X -o Y",
+              CommandLineComponent.BATCH_ARGUMENTS: "-b ITEMS",
+              CommandLineComponent.BATCH_ITEM: "-i X -o Y",
+              CommandLineComponent.BATCH_SIZE: 5}
+    self.command_line.configure(config)
+    self.assertEqual(["-b", "ITEMS"], self.command_line.batch_arguments)
+    self.assertEqual(["-i", "X", "-o", "Y"], self.command_line.batch_item)
+    self.assertEqual(5, self.command_line.batch_size)
+    items = [{"X": "1", "Y": "2"}, {"X": "3", "Y": "4"}]
+    self.assertEqual(["a", "-b", "-i", "1", "-o", "2", "-i", "3", "-o", "4"],
+                     self.command_line.batch_command_line(items))
+
+  def test_configure_batch_default_size(self):
+    config = {CommandLineComponent.EXECUTABLE: "a",
+              CommandLineComponent.ARGUMENTS: "b",
+              CommandLineComponent.BATCH_ARGUMENTS: "MANIFEST",
+              CommandLineComponent.BATCH_ITEM: "b"}
+    self.command_line.configure(config)
+    self.assertEqual(CommandLineComponent.DEFAULT_BATCH_SIZE,
+                     self.command_line.batch_size)
+
+  def test_configure_batch_no_item(self):
+    with self.assertRaises(ConfigError):
+      self.command_line.configure({
+        CommandLineComponent.EXECUTABLE: "a",
+        CommandLineComponent.ARGUMENTS: "b",
+        CommandLineComponent.BATCH_ARGUMENTS: "ITEMS"})
+
+  def test_configure_batch_no_items_token(self):
+    with self.assertRaises(ConfigError):
+      self.command_line.configure({
+        CommandLineComponent.EXECUTABLE: "a",
+        CommandLineComponent.ARGUMENTS: "b",
+        CommandLineComponent.BATCH_ARGUMENTS: "c",
+        CommandLineComponent.BATCH_ITEM: "b"})
+
+  def test_configure_batch_invalid_size(self):
+    with self.assertRaises(ConfigError):
+      self.command_line.configure({
+        CommandLineComponent.EXECUTABLE: "a",
+        CommandLineComponent.ARGUMENTS: "b",
+        CommandLineComponent.BATCH_ARGUMENTS: "ITEMS",
+        CommandLineComponent.BATCH_ITEM: "b",
+        CommandLineComponent.BATCH_SIZE: 0})
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+  """Request handler which keeps connections alive and returns an
+  empty 200 OK response to any GET request."""
+
+  protocol_version = "HTTP/1.1"
+
+  def do_GET(self):
+    self.send_response(200)
+    self.send_header("Content-Length", "0")
+    self.end_headers()
+
+  def log_message(self, format, *args):
+    pass
+
+
+class EchoHandler(KeepAliveHandler):
+  """Request handler which returns the body of a POST request, after
+  first returning 503 Service Unavailable to as many requests as given
+  by ``unavailable``. Connections are closed after each response, so
+  the server can be shut down."""
+
+  unavailable = 0
+  chunked = []
+
+  def do_POST(self):
+    EchoHandler.chunked.append("Content-Length" not in self.headers)
+    body = self.rfile.read(int(self.headers["Content-Length"]))
+    if EchoHandler.unavailable > 0:
+      EchoHandler.unavailable -= 1
+      self.send_response(503)
+      body = b""
+    else:
+      self.send_response(200)
+    self.send_header("Content-Length", str(len(body)))
+    self.send_header("Connection", "close")
+    self.end_headers()
+    self.wfile.write(body)
+
+
+class CompressingHandler(KeepAliveHandler):
+  """Request handler which decompresses the body of a POST request and
+  returns it, compressed if the request accepts gzip. Connections are
+  closed after each response, so the server can be shut down."""
+
+  encodings = []
+
+  def do_POST(self):
+    body = self.rfile.read(int(self.headers["Content-Length"]))
+    encoding = self.headers.get("Content-Encoding")
+    CompressingHandler.encodings.append(encoding)
+    if encoding == "gzip":
+      body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    elif encoding == "deflate":
+      body = zlib.decompress(body)
+    self.send_response(200)
+    if "gzip" in self.headers.get("Accept-Encoding", ""):
+      compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+      body = compressor.compress(body) + compressor.flush()
+      self.send_header("Content-Encoding", "gzip")
+    self.send_header("Content-Length", str(len(body)))
+    self.send_header("Connection", "close")
+    self.end_headers()
+    self.wfile.write(body)
+
 
 class RestComponentTestCase(unittest.TestCase):
 
@@ -124,9 +367,202 @@ class RestComponentTestCase(unittest.TestCase):
     super(RestComponentTestCase, self).setUp()
     self.rest = RestComponent()
 
+  def tearDown(self):
+    super(RestComponentTestCase, self).tearDown()
+    self.rest.close()
+
   def test_init(self):
     self.assertEqual("", self.rest.url)
     self.assertEqual({}, self.rest.configuration)
+    self.assertEqual(RestComponent.DEFAULT_POOL_SIZE, self.rest.pool_size)
+    self.assertEqual(None, self.rest.timeout)
+    self.assertEqual({}, self.rest.statistics())
+
+  def test_configure_pool_size_timeout(self):
+    self.rest.configure({RestComponent.URL: "a",
+                         RestComponent.POOL_SIZE: 2,
+                         RestComponent.TIMEOUT: [1, 2.5]})
+    self.assertEqual(2, self.rest.pool_size)
+    self.assertEqual((1, 2.5), self.rest.timeout)
+    self.rest.configure({RestComponent.URL: "a",
+                         RestComponent.TIMEOUT: 3})
+    self.assertEqual(3, self.rest.timeout)
+
+  def test_configure_invalid_pool_size(self):
+    for pool_size in [0, "1", True]:
+      with self.assertRaises(ConfigError):
+        self.rest.configure({RestComponent.URL: "a",
+                             RestComponent.POOL_SIZE: pool_size})
+
+  def test_configure_invalid_timeout(self):
+    for timeout in [0, "1", [1], [1, 2, 3], [1, -1]]:
+      with self.assertRaises(ConfigError):
+        self.rest.configure({RestComponent.URL: "a",
+                             RestComponent.TIMEOUT: timeout})
+
+  def test_fingerprint_runtime_keys(self):
+    self.rest.configure({RestComponent.URL: "a"})
+    fingerprint = self.rest.fingerprint()
+    self.rest.configure({RestComponent.URL: "a",
+                         RestComponent.POOL_SIZE: 2,
+                         RestComponent.TIMEOUT: 5})
+    self.assertEqual(fingerprint, self.rest.fingerprint())
+    self.rest.configure({RestComponent.URL: "b"})
+    self.assertNotEqual(fingerprint, self.rest.fingerprint())
+
+  def test_configure_throttle(self):
+    (_, state_file) = tempfile.mkstemp()
+    try:
+      self.rest.configure({RestComponent.URL: "a",
+                           RestComponent.THROTTLE: {"state-file": state_file,
+                                                    "rate": 10}})
+      self.assertEqual(state_file, self.rest.throttle.file_name)
+      self.rest.configure({RestComponent.URL: "a"})
+      self.assertEqual(None, self.rest.throttle)
+    finally:
+      os.remove(state_file)
+
+  def test_configure_invalid_throttle(self):
+    for throttle in [1, {"rate": 0}, {"concurrency": 100}]:
+      with self.assertRaises(ConfigError):
+        self.rest.configure({RestComponent.URL: "a",
+                             RestComponent.THROTTLE: throttle})
+
+  def test_session(self):
+    session = self.rest.session
+    self.assertIs(session, self.rest.session)
+    self.rest.close()
+    self.assertIsNot(session, self.rest.session)
+
+  def test_request_reuses_connection(self):
+    server = HTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+      url = "http://127.0.0.1:" + str(server.server_address[1]) + "/"
+      self.rest.configure({RestComponent.URL: url,
+                           RestComponent.TIMEOUT: 5})
+      for _ in range(3):
+        self.assertEqual(200, self.rest.request("GET", url).status_code)
+      self.assertEqual({"http-requests": 3,
+                        "http-connections": 1,
+                        "http-connections-reused": 2},
+                       self.rest.statistics())
+    finally:
+      self.rest.close()
+      server.shutdown()
+      server.server_close()
+
+  def test_request_stream_file(self):
+    server = HTTPServer(("127.0.0.1", 0), EchoHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    directory = tempfile.mkdtemp()
+    try:
+      url = "http://127.0.0.1:" + str(server.server_address[1]) + "/"
+      self.rest.configure({RestComponent.URL: url,
+                           RestComponent.TIMEOUT: 5,
+                           RestComponent.THROTTLE: {
+                             "state-file": os.path.join(directory, "state"),
+                             "backoff": 0.001}})
+      in_file = os.path.join(directory, "in")
+      out_file = os.path.join(directory, "out")
+      content = os.urandom(3 * RestComponent.CHUNK_SIZE + 1)
+      with open(in_file, "wb") as f:
+        f.write(content)
+      EchoHandler.unavailable = 1
+      EchoHandler.chunked = []
+      with open(in_file, "rb") as f:
+        response = self.rest.request("POST", url, data=f, stream=True)
+      self.assertEqual(200, response.status_code)
+      self.rest.download(response, out_file)
+      with open(out_file, "rb") as f:
+        self.assertEqual(content, f.read())
+      # The file is sent with its length, and sent again in full when
+      # the request is retried.
+      self.assertEqual([False, False], EchoHandler.chunked)
+      self.assertEqual(1, self.rest.statistics()["throttle-retries"])
+    finally:
+      self.rest.close()
+      server.shutdown()
+      server.server_close()
+      shutil.rmtree(directory)
+
+  def test_configure_compression(self):
+    self.rest.configure({RestComponent.URL: "a",
+                         RestComponent.COMPRESSION: "gzip"})
+    self.assertEqual("gzip", self.rest.compression)
+    self.rest.configure({RestComponent.URL: "a"})
+    self.assertEqual(None, self.rest.compression)
+    for compression in ["br", True]:
+      with self.assertRaises(ConfigError):
+        self.rest.configure({RestComponent.URL: "a",
+                             RestComponent.COMPRESSION: compression})
+
+  def test_compress(self):
+    content = b"<prov:document/>\n" * 1000
+    (handle, in_file) = tempfile.mkstemp()
+    try:
+      with os.fdopen(handle, "wb") as f:
+        f.write(content)
+      for (compression, wbits) in [("gzip", 16 + zlib.MAX_WBITS),
+                                   ("deflate", zlib.MAX_WBITS)]:
+        self.rest.configure({RestComponent.URL: "a",
+                             RestComponent.COMPRESSION: compression})
+        with open(in_file, "rb") as f:
+          bodies = [content, content.decode("utf-8"), f,
+                    [content[:100], content[100:]]]
+          for data in bodies:
+            compressed = self.rest.compress(data).read()
+            self.assertTrue(len(compressed) < len(content) / 10)
+            self.assertEqual(content, zlib.decompress(compressed, wbits))
+    finally:
+      os.remove(in_file)
+
+  def test_compress_spooled(self):
+    self.rest.configure({RestComponent.URL: "a",
+                         RestComponent.COMPRESSION: "gzip"})
+    content = os.urandom(RestComponent.SPOOL_SIZE + 1)
+    compressed = self.rest.compress(content)
+    try:
+      self.assertFalse(isinstance(compressed, io.BytesIO))
+      self.assertEqual(content, zlib.decompress(compressed.read(),
+                                                16 + zlib.MAX_WBITS))
+    finally:
+      compressed.close()
+
+  def test_request_compression(self):
+    server = HTTPServer(("127.0.0.1", 0), CompressingHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    directory = tempfile.mkdtemp()
+    try:
+      url = "http://127.0.0.1:" + str(server.server_address[1]) + "/"
+      self.rest.configure({RestComponent.URL: url,
+                           RestComponent.TIMEOUT: 5,
+                           RestComponent.COMPRESSION: "gzip"})
+      content = b"@prefix prov: <http://www.w3.org/ns/prov#> .\n" * 1000
+      CompressingHandler.encodings = []
+      response = self.rest.request("POST", url, data=content, stream=True)
+      self.assertEqual(200, response.status_code)
+      out_file = os.path.join(directory, "out")
+      self.rest.download(response, out_file)
+      with open(out_file, "rb") as f:
+        self.assertEqual(content, f.read())
+      self.assertEqual(["gzip"], CompressingHandler.encodings)
+      statistics = self.rest.statistics()
+      for direction in ["sent", "received"]:
+        self.assertEqual(len(content),
+                         statistics["bytes-" + direction + "-uncompressed"])
+        self.assertTrue(statistics["bytes-" + direction] < len(content) / 10)
+    finally:
+      self.rest.close()
+      server.shutdown()
+      server.server_close()
+      shutil.rmtree(directory)
 
   def test_configure(self):
     config = {RestComponent.URL: "a"}
@@ -25,10 +25,15 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import os
+import shutil
+import tempfile
 import unittest
 
 from prov_interop import standards
+from prov_interop.cache import DiskCache
 from prov_interop.component import ConfigError
+from prov_interop.converter import ConversionCache
 from prov_interop.converter import ConversionError
 from prov_interop.converter import Converter
 
@@ -95,3 +100,108 @@ class ConverterTestCase(unittest.TestCase):
     self.converter.configure(self.config)
     with self.assertRaises(ConversionError):
       self.converter.check_formats("nosuchformat", standards.PROVX)
+
+
+class CountingConverter(Converter):
+  """Converter which copies the input file to the output file and
+  counts its conversions."""
+
+  def __init__(self):
+    super(CountingConverter, self).__init__()
+    self.conversions = 0
+
+  def convert(self, in_file, out_file):
+    super(CountingConverter, self).convert(in_file, out_file)
+    self.conversions += 1
+    shutil.copyfile(in_file, out_file)
+
+
+class ConversionCacheTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(ConversionCacheTestCase, self).setUp()
+    self.directory = tempfile.mkdtemp()
+    self.cache = ConversionCache(
+      DiskCache(os.path.join(self.directory, "cache")))
+    self.converter = CountingConverter()
+    self.config = {Converter.INPUT_FORMATS: [standards.JSON],
+                   Converter.OUTPUT_FORMATS: [standards.PROVX, standards.TTL]}
+    self.converter.configure(self.config)
+    self.in_file = os.path.join(self.directory, "in." + standards.JSON)
+    with open(self.in_file, "w") as f:
+      f.write("document")
+
+  def tearDown(self):
+    super(ConversionCacheTestCase, self).tearDown()
+    shutil.rmtree(self.directory)
+
+  def out_file(self, name, format):
+    return os.path.join(self.directory, name + "." + format)
+
+  def test_convert(self):
+    out_file = self.out_file("out1", standards.PROVX)
+    self.cache.convert(self.converter, self.in_file, out_file)
+    out_file = self.out_file("out2", standards.PROVX)
+    self.cache.convert(self.converter, self.in_file, out_file)
+    self.assertEqual(1, self.converter.conversions)
+    with open(out_file) as f:
+      self.assertEqual("document", f.read())
+    self.assertEqual({"hits": 1, "misses": 1}, self.cache.statistics())
+
+  def test_convert_streams_outputs(self):
+    # Outputs are copied to and from the cache, not read into memory.
+    def fail(*args):
+      self.fail("Outputs should be copied to and from the cache")
+    self.cache.cache.get = fail
+    self.cache.cache.put = fail
+    for name in ["out1", "out2"]:
+      out_file = self.out_file(name, standards.PROVX)
+      self.cache.convert(self.converter, self.in_file, out_file)
+      with open(out_file) as f:
+        self.assertEqual("document", f.read())
+    self.assertEqual(1, self.converter.conversions)
+
+  def test_convert_different_format(self):
+    self.cache.convert(self.converter, self.in_file,
+                       self.out_file("out1", standards.PROVX))
+    self.cache.convert(self.converter, self.in_file,
+                       self.out_file("out2", standards.TTL))
+    self.assertEqual(2, self.converter.conversions)
+
+  def test_convert_different_input(self):
+    out_file = self.out_file("out", standards.PROVX)
+    self.cache.convert(self.converter, self.in_file, out_file)
+    with open(self.in_file, "w") as f:
+      f.write("changed")
+    self.cache.convert(self.converter, self.in_file, out_file)
+    self.assertEqual(2, self.converter.conversions)
+    with open(out_file) as f:
+      self.assertEqual("changed", f.read())
+
+  def test_convert_different_configuration(self):
+    out_file = self.out_file("out", standards.PROVX)
+    self.cache.convert(self.converter, self.in_file, out_file)
+    self.config[Converter.OUTPUT_FORMATS] = [standards.PROVX]
+    self.converter.configure(self.config)
+    self.cache.convert(self.converter, self.in_file, out_file)
+    self.assertEqual(2, self.converter.conversions)
+
+  def test_convert_unsupported_format(self):
+    self.cache.convert(self.converter, self.in_file,
+                       self.out_file("out", standards.PROVX))
+    self.config[Converter.OUTPUT_FORMATS] = [standards.TTL]
+    self.converter.configure(self.config)
+    with self.assertRaises(ConversionError):
+      self.cache.convert(self.converter, self.in_file,
+                         self.out_file("out", standards.PROVX))
+
+  def test_convert_batch(self):
+    files = [(self.in_file, self.out_file("out1", standards.PROVX)),
+             (self.in_file, self.out_file("out2", standards.TTL)),
+             ("nosuchfile.json", self.out_file("out3", standards.TTL))]
+    errors = self.cache.convert_batch(self.converter, files)
+    self.assertEqual([None, None], errors[:2])
+    self.assertIsInstance(errors[2], ConversionError)
+    errors = self.cache.convert_batch(self.converter, files[:2])
+    self.assertEqual([None, None], errors)
+    self.assertEqual(2, self.converter.conversions)
@@ -0,0 +1,141 @@
+"""Unit tests for :mod:`prov_interop.events`.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from prov_interop import events
+from prov_interop.events import EventStream
+
+def record_events(file_name, count):
+  stream = EventStream(file_name)
+  for index in range(count):
+    stream.emit("convert", 1, 2, {"index": index})
+  stream.close()
+
+
+def read_fifo(file_name, lines):
+  with open(file_name, "r") as f:
+    lines.extend(f.readlines())
+
+
+class EventStreamTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(EventStreamTestCase, self).setUp()
+    self.directory = tempfile.mkdtemp()
+    self.file_name = os.path.join(self.directory, "events.ndjson")
+    self.fields = {"test": "Test.test_case_1_json_provx",
+                   "index": "1",
+                   "converter": "ProvPyConverter",
+                   "ext-in": "json",
+                   "ext-out": "provx"}
+
+  def tearDown(self):
+    super(EventStreamTestCase, self).tearDown()
+    shutil.rmtree(self.directory)
+
+  def test_disabled(self):
+    stream = EventStream()
+    self.assertFalse(stream.enabled)
+    event = stream.emit("convert", 1, 2, self.fields)
+    self.assertEqual(events.OK, event["outcome"])
+    stream.close()
+    self.assertEqual([], os.listdir(self.directory))
+
+  def test_emit(self):
+    stream = EventStream(self.file_name)
+    self.assertTrue(stream.enabled)
+    stream.emit("compare", 1.5, 1.75, self.fields, events.FAIL, "differ")
+    stream.close()
+    [event] = events.read_events(self.file_name)
+    self.assertEqual(dict(self.fields,
+                          phase="compare",
+                          start=1.5,
+                          duration=0.25,
+                          outcome=events.FAIL,
+                          message="differ",
+                          pid=os.getpid()), event)
+
+  def test_phase(self):
+    stream = EventStream(self.file_name)
+    with stream.phase("compare", self.fields) as event:
+      event["outcome"] = events.PASS
+    self.assertEqual(events.PASS, event["outcome"])
+    self.assertEqual("compare", event["phase"])
+    with self.assertRaises(ValueError):
+      with stream.phase("convert", self.fields):
+        raise ValueError("no output")
+    stream.close()
+    [compare, convert] = events.read_events(self.file_name)
+    self.assertEqual(events.PASS, compare["outcome"])
+    self.assertNotIn("message", compare)
+    self.assertEqual(events.ERROR, convert["outcome"])
+    self.assertEqual("no output", convert["message"])
+
+  def test_format_event(self):
+    event = EventStream().emit("convert", 1, 1.5, self.fields,
+                               events.ERROR, "no output")
+    self.assertEqual("Test.test_case_1_json_provx: convert error in " +
+                     "0.500s: no output", events.format_event(event))
+
+  def test_start(self):
+    record_events(self.file_name, 1)
+    record_events(self.file_name, 1)
+    self.assertEqual(2, len(events.read_events(self.file_name)))
+    events.start(self.file_name)
+    self.assertFalse(os.path.exists(self.file_name))
+    events.start(self.file_name)
+
+  @unittest.skipUnless(hasattr(os, "mkfifo"), "FIFOs are not supported")
+  def test_fifo(self):
+    os.mkfifo(self.file_name)
+    events.start(self.file_name)
+    lines = []
+    reader = threading.Thread(target=read_fifo,
+                              args=(self.file_name, lines))
+    reader.start()
+    record_events(self.file_name, 3)
+    reader.join()
+    self.assertEqual(3, len(lines))
+
+  def test_processes(self):
+    processes = [multiprocessing.Process(target=record_events,
+                                         args=(self.file_name, 50))
+                 for _ in range(4)]
+    for process in processes:
+      process.start()
+    for process in processes:
+      process.join()
+    read = events.read_events(self.file_name)
+    self.assertEqual(200, len(read))
+    self.assertEqual(sorted([process.pid for process in processes]),
+                     sorted(set([event["pid"] for event in read])))
@@ -0,0 +1,105 @@
+"""Unit tests for :mod:`prov_interop.forkserver`.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import inspect
+import os
+import sys
+import tempfile
+import unittest
+
+from prov_interop import forkserver
+from prov_interop import standards
+from prov_interop.worker import WorkerProcess
+
+class CommandLineTestCase(unittest.TestCase):
+
+  def test_command_line(self):
+    self.assertEqual(
+      ["python", "-m", "prov_interop.forkserver", "script.py"],
+      forkserver.command_line(["python", "script.py"]))
+
+  def test_command_line_modules(self):
+    self.assertEqual(
+      ["python", "-m", "prov_interop.forkserver", "script.py", "a", "b.c"],
+      forkserver.command_line(["python", "script.py"], ["a", "b.c"]))
+
+  def test_command_line_script(self):
+    (_, script) = tempfile.mkstemp(suffix=".py")
+    try:
+      self.assertEqual(
+        [sys.executable, "-m", "prov_interop.forkserver", script],
+        forkserver.command_line([script]))
+    finally:
+      os.remove(script)
+
+  def test_command_line_no_script(self):
+    with self.assertRaises(OSError):
+      forkserver.command_line(["nosuchscript"])
+
+
+@unittest.skipUnless(forkserver.is_available(), "os.fork is not available")
+class ForkserverTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(ForkserverTestCase, self).setUp()
+    self.script = os.path.join(
+      os.path.dirname(os.path.abspath(inspect.getfile(
+            inspect.currentframe()))), "provpy", "prov_convert_dummy.py")
+    self.worker = WorkerProcess(
+      forkserver.command_line(["python", self.script]),
+      forkserver.environment())
+    (_, self.in_file) = tempfile.mkstemp(suffix="." + standards.JSON)
+    self.out_file = "forkserver." + standards.JSON
+
+  def tearDown(self):
+    super(ForkserverTestCase, self).tearDown()
+    self.worker.stop()
+    for tmp in [self.in_file, self.out_file]:
+      if os.path.isfile(tmp):
+        os.remove(tmp)
+
+  def test_call(self):
+    for _ in range(2):
+      self.assertEqual(0, self.worker.call(
+        ["-f", "json", self.in_file, self.out_file]))
+      self.assertTrue(os.path.isfile(self.out_file))
+      os.remove(self.out_file)
+    self.assertEqual(1, self.worker.starts)
+
+  def test_call_error(self):
+    self.assertEqual(2, self.worker.call(
+      ["-f", "json", "nosuchfile.json", self.out_file]))
+    self.assertEqual(0, self.worker.call(
+      ["-f", "json", self.in_file, self.out_file]))
+    self.assertEqual(1, self.worker.starts)
+
+  def test_call_missing_module(self):
+    self.worker = WorkerProcess(
+      forkserver.command_line(["python", self.script], ["nosuchmodule"]),
+      forkserver.environment())
+    self.assertEqual(0, self.worker.call(
+      ["-f", "json", self.in_file, self.out_file]))
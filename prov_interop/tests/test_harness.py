@@ -30,10 +30,13 @@ import shutil
 import tempfile
 import unittest
 
+from prov_interop import cache
 from prov_interop import standards
 from prov_interop.comparator import Comparator
+from prov_interop.comparator import ComparisonCache
 from prov_interop.component import ConfigurableComponent
 from prov_interop.component import ConfigError
+from prov_interop.converter import ConversionCache
 from prov_interop.harness import HarnessResources
 
 class DummyComparator(Comparator):
@@ -101,6 +104,8 @@ class HarnessResourcesTestCase(unittest.TestCase):
     self.assertEqual("", self.harness.test_cases_dir)
     self.assertEqual({}, self.harness.comparators)
     self.assertEqual({}, self.harness.format_comparators)
+    self.assertEqual(None, self.harness.conversion_cache)
+    self.assertEqual(None, self.harness.comparison_cache)
 
   def test_configure(self):
     self.harness.configure(self.config)
@@ -122,6 +127,76 @@ class HarnessResourcesTestCase(unittest.TestCase):
       self.assertIsInstance(format_comparator, DummyComparator)
       self.assertEqual(comparator, format_comparator)
 
+  def test_configure_conversion_cache(self):
+    cache_dir = os.path.join(self.test_cases_dir, "cache")
+    self.config[HarnessResources.CONVERSION_CACHE] = {
+      cache.DIRECTORY: cache_dir, cache.MAX_SIZE: 1024}
+    self.harness.configure(self.config)
+    conversion_cache = self.harness.conversion_cache
+    self.assertIsInstance(conversion_cache, ConversionCache)
+    self.assertEqual(cache_dir, conversion_cache.cache.directory)
+    self.assertEqual(1024, conversion_cache.cache.max_size)
+
+  def test_configure_conversion_cache_invalid(self):
+    self.config[HarnessResources.CONVERSION_CACHE] = {cache.MAX_SIZE: 1024}
+    with self.assertRaises(ConfigError):
+      self.harness.configure(self.config)
+
+  def test_configure_comparison_cache(self):
+    cache_dir = os.path.join(self.test_cases_dir, "cache")
+    self.config[HarnessResources.COMPARISON_CACHE] = {
+      cache.DIRECTORY: cache_dir}
+    self.harness.configure(self.config)
+    comparison_cache = self.harness.comparison_cache
+    self.assertIsInstance(comparison_cache, ComparisonCache)
+    self.assertEqual(cache_dir, comparison_cache.cache.directory)
+    self.assertEqual(None, self.harness.conversion_cache)
+
+  def test_configure_comparison_cache_invalid(self):
+    self.config[HarnessResources.COMPARISON_CACHE] = "cache"
+    with self.assertRaises(ConfigError):
+      self.harness.configure(self.config)
+
+  def test_configure_trace(self):
+    self.assertFalse(self.harness.tracer.enabled)
+    trace_file = os.path.join(self.test_cases_dir, "trace.json")
+    self.config[HarnessResources.TRACE] = trace_file
+    self.harness.configure(self.config)
+    self.assertEqual(trace_file, self.harness.tracer.file_name)
+
+  def test_configure_trace_bytes(self):
+    # PyYAML returns ASCII strings as bytes on Python 2.
+    trace_file = os.path.join(self.test_cases_dir,
+                              "trace.json").encode("utf-8")
+    self.config[HarnessResources.TRACE] = trace_file
+    self.harness.configure(self.config)
+    self.assertEqual(trace_file, self.harness.tracer.file_name)
+
+  def test_configure_trace_invalid(self):
+    self.config[HarnessResources.TRACE] = {"file": "trace.json"}
+    with self.assertRaises(ConfigError):
+      self.harness.configure(self.config)
+
+  def test_configure_events(self):
+    self.assertFalse(self.harness.events.enabled)
+    events_file = os.path.join(self.test_cases_dir, "events.ndjson")
+    self.config[HarnessResources.EVENTS] = events_file
+    self.harness.configure(self.config)
+    self.assertEqual(events_file, self.harness.events.file_name)
+
+  def test_configure_events_bytes(self):
+    # PyYAML returns ASCII strings as bytes on Python 2.
+    events_file = os.path.join(self.test_cases_dir,
+                               "events.ndjson").encode("utf-8")
+    self.config[HarnessResources.EVENTS] = events_file
+    self.harness.configure(self.config)
+    self.assertEqual(events_file, self.harness.events.file_name)
+
+  def test_configure_events_invalid(self):
+    self.config[HarnessResources.EVENTS] = ["events.ndjson"]
+    with self.assertRaises(ConfigError):
+      self.harness.configure(self.config)
+
   def test_configure_no_test_cases(self):
     del self.config[HarnessResources.TEST_CASES_DIR]
     with self.assertRaises(ConfigError):
@@ -0,0 +1,194 @@
+"""Unit tests for :mod:`prov_interop.http2`.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+import requests
+
+from prov_interop import cache
+from prov_interop import cassette
+from prov_interop import http2
+from prov_interop import standards
+from prov_interop import standin
+from prov_interop.component import ConfigError
+from prov_interop.component import RestComponent
+from prov_interop.provstore.converter import ProvStoreConverter
+from prov_interop.provtranslator.converter import ProvTranslatorConverter
+from prov_interop.standin import H2StandInServer
+
+DOCUMENT = "{\"prefix\": {\"ex\": \"http://example.org/\"}, " + \
+    "\"entity\": {\"ex:e1\": {}}}"
+
+class Http2ConfigTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(Http2ConfigTestCase, self).setUp()
+    self.rest = RestComponent()
+    self.config = {RestComponent.URL: "http://127.0.0.1:8000/documents/"}
+
+  def test_configure_default(self):
+    self.rest.configure(self.config)
+    self.assertFalse(self.rest.http2)
+
+  def test_configure_invalid(self):
+    self.config[RestComponent.HTTP2] = "yes"
+    with self.assertRaises(ConfigError):
+      self.rest.configure(self.config)
+
+  def test_configure_cassette(self):
+    self.config[RestComponent.HTTP2] = True
+    self.config[RestComponent.CASSETTE] = {
+      cache.DIRECTORY: tempfile.gettempdir(), cassette.MODE: cassette.REPLAY}
+    with self.assertRaises(ConfigError):
+      self.rest.configure(self.config)
+
+  @unittest.skipIf(http2.is_available(), "httpx and h2 are installed")
+  def test_configure_unavailable(self):
+    self.config[RestComponent.HTTP2] = True
+    with self.assertRaises(ConfigError):
+      self.rest.configure(self.config)
+
+  @unittest.skipUnless(http2.is_available(),
+                       "httpx and h2 are not installed")
+  def test_fingerprint_excludes_http2(self):
+    self.rest.configure(self.config)
+    fingerprint = self.rest.fingerprint()
+    self.config[RestComponent.HTTP2] = True
+    self.rest.configure(self.config)
+    self.assertTrue(self.rest.http2)
+    self.assertEqual(fingerprint, self.rest.fingerprint())
+
+
+@unittest.skipUnless(http2.is_available(), "httpx and h2 are not installed")
+class Http2AdapterTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(Http2AdapterTestCase, self).setUp()
+    self.directory = tempfile.mkdtemp()
+    self.in_file = os.path.join(self.directory, "in." + standards.JSON)
+    with open(self.in_file, "w") as f:
+      f.write(DOCUMENT)
+    self.server = None
+
+  def tearDown(self):
+    super(Http2AdapterTestCase, self).tearDown()
+    if self.server is not None:
+      self.server.stop()
+    shutil.rmtree(self.directory)
+
+  def start(self, **kwargs):
+    self.server = H2StandInServer(("127.0.0.1", 0), **kwargs)
+    self.server.start()
+
+  def converter(self, cls, url, **config):
+    converter = cls()
+    config.update({cls.URL: url,
+                   cls.TIMEOUT: 5,
+                   cls.HTTP2: True,
+                   cls.INPUT_FORMATS: standards.FORMATS,
+                   cls.OUTPUT_FORMATS: standards.FORMATS})
+    converter.configure(config)
+    self.addCleanup(converter.close)
+    return converter
+
+  def read(self, file_name):
+    with open(file_name, "r") as f:
+      return f.read()
+
+  def test_translate_concurrent(self):
+    self.start(backend=standin.PASSTHROUGH, latency=0.1)
+    converter = self.converter(ProvTranslatorConverter,
+                               self.server.translator_url)
+    out_files = [os.path.join(self.directory, str(index) + "." +
+                              standards.JSON) for index in range(8)]
+    threads = [threading.Thread(target=converter.convert,
+                                args=(self.in_file, out_file))
+               for out_file in out_files]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    for out_file in out_files:
+      self.assertEqual(DOCUMENT, self.read(out_file))
+    statistics = converter.statistics()
+    self.assertEqual(8, statistics["http-requests"])
+    self.assertEqual(1, statistics["http-connections"])
+    self.assertEqual(7, statistics["http-connections-reused"])
+
+  def test_translate_large_compressed(self):
+    # Larger than the initial flow control windows.
+    document = DOCUMENT * 20000
+    with open(self.in_file, "w") as f:
+      f.write(document)
+    self.start(backend=standin.PASSTHROUGH)
+    converter = self.converter(ProvTranslatorConverter,
+                               self.server.translator_url,
+                               compression="gzip")
+    out_file = os.path.join(self.directory, "out." + standards.JSON)
+    converter.convert(self.in_file, out_file)
+    self.assertEqual(document, self.read(out_file))
+    statistics = converter.statistics()
+    self.assertEqual(len(document),
+                     statistics["bytes-received-uncompressed"])
+    self.assertTrue(statistics["bytes-sent"] < len(document))
+
+  def test_store(self):
+    self.start()
+    converter = self.converter(ProvStoreConverter, self.server.store_url,
+                               authorization="ApiKey user:12345")
+    out_file = os.path.join(self.directory, "out." + standards.PROVN)
+    converter.convert(self.in_file, out_file)
+    self.assertTrue("entity(ex:e1)" in self.read(out_file))
+    self.assertEqual(0, self.server.statistics()["documents"])
+
+  def test_timeout(self):
+    self.start(backend=standin.PASSTHROUGH, latency=1)
+    converter = self.converter(ProvTranslatorConverter,
+                               self.server.translator_url)
+    converter.configure(dict(converter.configuration,
+                             **{ProvTranslatorConverter.TIMEOUT: 0.1}))
+    with self.assertRaises(requests.exceptions.ReadTimeout):
+      converter.convert(self.in_file,
+                        os.path.join(self.directory, "out." +
+                                     standards.JSON))
+
+  def test_connection_refused(self):
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    url = "http://127.0.0.1:" + str(sock.getsockname()[1]) + \
+        standin.TRANSLATOR_PATH
+    sock.close()
+    converter = self.converter(ProvTranslatorConverter, url)
+    with self.assertRaises(requests.exceptions.ConnectionError):
+      converter.convert(self.in_file,
+                        os.path.join(self.directory, "out." +
+                                     standards.JSON))
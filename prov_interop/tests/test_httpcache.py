@@ -0,0 +1,160 @@
+"""Unit tests for :mod:`prov_interop.httpcache`.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from prov_interop import cache
+from prov_interop import http
+from prov_interop import httpcache
+from prov_interop.httpcache import ResponseCache
+
+class LifetimeTestCase(unittest.TestCase):
+
+  def test_default(self):
+    self.assertEqual(60, httpcache.lifetime({}, 60))
+
+  def test_max_age(self):
+    self.assertEqual(10, httpcache.lifetime(
+      {http.CACHE_CONTROL: "public, max-age=10"}, 60))
+
+  def test_invalid_max_age(self):
+    self.assertEqual(60, httpcache.lifetime(
+      {http.CACHE_CONTROL: "max-age=soon"}, 60))
+
+  def test_no_cache(self):
+    self.assertEqual(0, httpcache.lifetime(
+      {http.CACHE_CONTROL: "No-Cache, max-age=10"}, 60))
+
+  def test_no_store(self):
+    self.assertEqual(None, httpcache.lifetime(
+      {http.CACHE_CONTROL: "no-store"}, 60))
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(ResponseCacheTestCase, self).setUp()
+    self.directory = tempfile.mkdtemp()
+    self.config = {cache.DIRECTORY: os.path.join(self.directory, "cache")}
+    self.cache = ResponseCache.from_config(self.config)
+    self.in_file = os.path.join(self.directory, "in.json")
+    self.out_file = os.path.join(self.directory, "out.provn")
+    self.copy_file = os.path.join(self.directory, "copy.provn")
+    for (file_name, content) in [(self.in_file, b"{}"),
+                                 (self.out_file, b"document")]:
+      with open(file_name, "wb") as f:
+        f.write(content)
+    self.key = self.cache.key("http://service", self.in_file,
+                              "application/json",
+                              "text/provenance-notation")
+
+  def tearDown(self):
+    super(ResponseCacheTestCase, self).tearDown()
+    shutil.rmtree(self.directory)
+
+  def read(self, file_name):
+    with open(file_name, "rb") as f:
+      return f.read()
+
+  def test_from_config(self):
+    self.assertEqual(httpcache.DEFAULT_TTL, self.cache.ttl)
+    self.assertEqual(self.config[cache.DIRECTORY],
+                     self.cache.cache.directory)
+    self.config[httpcache.TTL] = 10
+    self.assertEqual(10, ResponseCache.from_config(self.config).ttl)
+
+  def test_from_config_invalid_ttl(self):
+    for ttl in [-1, "10", True]:
+      self.config[httpcache.TTL] = ttl
+      with self.assertRaises(ValueError):
+        ResponseCache.from_config(self.config)
+
+  def test_from_config_missing_directory(self):
+    with self.assertRaises(ValueError):
+      ResponseCache.from_config({httpcache.TTL: 10})
+
+  def test_key(self):
+    self.assertNotEqual(self.key, self.cache.key(
+      "http://service", self.in_file, "application/json", "text/turtle"))
+    with open(self.in_file, "wb") as f:
+      f.write(b"[]")
+    self.assertNotEqual(self.key, self.cache.key(
+      "http://service", self.in_file, "application/json",
+      "text/provenance-notation"))
+
+  def test_put_get(self):
+    self.assertEqual(None, self.cache.lookup(self.key))
+    self.assertTrue(self.cache.put(self.key, {http.ETAG: "\"v1\""},
+                                   self.out_file))
+    metadata = self.cache.lookup(self.key)
+    self.assertEqual("\"v1\"", metadata["etag"])
+    self.assertEqual(httpcache.DEFAULT_TTL, metadata["lifetime"])
+    self.assertTrue(self.cache.is_fresh(metadata))
+    self.assertTrue(self.cache.get(self.key, self.copy_file, metadata))
+    self.assertEqual(b"document", self.read(self.copy_file))
+    self.assertEqual({"hits": 1, "misses": 1, "revalidated": 0,
+                      "stored": 1}, self.cache.statistics())
+
+  def test_put_no_store(self):
+    self.assertFalse(self.cache.put(
+      self.key, {http.CACHE_CONTROL: "no-store"}, self.out_file))
+    self.assertEqual(None, self.cache.lookup(self.key))
+    self.assertEqual({"hits": 0, "misses": 1, "revalidated": 0,
+                      "stored": 0}, self.cache.statistics())
+
+  def test_stale(self):
+    self.cache.put(self.key, {http.CACHE_CONTROL: "max-age=0"},
+                   self.out_file)
+    self.assertFalse(self.cache.is_fresh(self.cache.lookup(self.key)))
+
+  def test_refresh(self):
+    self.cache.put(self.key, {http.CACHE_CONTROL: "no-cache",
+                              http.ETAG: "\"v1\""}, self.out_file)
+    metadata = self.cache.lookup(self.key)
+    self.assertFalse(self.cache.is_fresh(metadata))
+    self.cache.refresh(self.key, {http.CACHE_CONTROL: "max-age=60"},
+                       metadata)
+    refreshed = self.cache.lookup(self.key)
+    self.assertTrue(self.cache.is_fresh(refreshed))
+    self.assertEqual("\"v1\"", refreshed["etag"])
+    self.assertTrue(self.cache.get(self.key, self.copy_file, metadata))
+    self.assertEqual({"hits": 0, "misses": 1, "revalidated": 1,
+                      "stored": 1}, self.cache.statistics())
+
+  def test_get_evicted(self):
+    self.cache.put(self.key, {}, self.out_file)
+    metadata = self.cache.lookup(self.key)
+    os.remove(self.cache.cache.path(self.key))
+    self.assertFalse(self.cache.get(self.key, self.copy_file, metadata))
+    self.assertEqual(0, self.cache.statistics()["hits"])
+
+  def test_lookup_invalid_metadata(self):
+    self.cache.cache.put(cache.digest(self.key, "metadata"), b"[]")
+    self.assertEqual(None, self.cache.lookup(self.key))
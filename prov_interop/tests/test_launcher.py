@@ -0,0 +1,115 @@
+"""Unit tests for :mod:`prov_interop.launcher`.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from prov_interop import launcher
+from prov_interop.launcher import InvocationResult
+
+class LauncherTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(LauncherTestCase, self).setUp()
+    self.directory = tempfile.mkdtemp()
+
+  def tearDown(self):
+    super(LauncherTestCase, self).tearDown()
+    shutil.rmtree(self.directory)
+
+  def python(self, code):
+    return [sys.executable, "-c", code]
+
+  def test_launch(self):
+    result = launcher.launch(self.python("pass"))
+    self.assertEqual(0, result.return_code)
+    self.assertEqual(self.python("pass"), result.command_line)
+    self.assertTrue(result.wall_time > 0)
+
+  def test_launch_return_code(self):
+    result = launcher.launch(self.python("import sys; sys.exit(3)"))
+    self.assertEqual(3, result.return_code)
+
+  @unittest.skipUnless(hasattr(os, "kill"), "signals are not supported")
+  def test_launch_signal(self):
+    result = launcher.launch(self.python(
+      "import os, signal; os.kill(os.getpid(), signal.SIGTERM)"))
+    self.assertTrue(result.return_code < 0)
+
+  def test_launch_no_executable(self):
+    with self.assertRaises(OSError):
+      launcher.launch(["nosuchexecutable"])
+
+  @unittest.skipUnless(hasattr(os, "wait4"), "wait4 is not supported")
+  def test_launch_resource_usage(self):
+    result = launcher.launch(self.python(
+      "data = bytearray(64 * 1024 * 1024)\n" +
+      "for i in range(0, len(data), 4096): data[i] = 1\n" +
+      "sum(range(1000000))"))
+    self.assertEqual(0, result.return_code)
+    self.assertTrue(result.user_time + result.system_time > 0)
+    self.assertTrue(result.user_time + result.system_time <=
+                    result.wall_time * 2)
+    self.assertTrue(result.max_rss >= 64 * 1024 * 1024)
+
+  @unittest.skipUnless(os.path.isfile("/proc/self/io"),
+                       "/proc/<pid>/io is not supported")
+  def test_launch_io(self):
+    file_name = os.path.join(self.directory, "out.bin")
+    result = launcher.launch(self.python(
+      "with open(" + repr(file_name) + ", 'wb') as f: " +
+      "f.write(b'x' * 1000000)"))
+    self.assertEqual(0, result.return_code)
+    self.assertTrue(result.io["wchar"] >= 1000000)
+    self.assertEqual(sorted(launcher.IO_COUNTERS), sorted(result.io))
+
+  def test_read_io_no_process(self):
+    self.assertEqual(None, launcher.read_io(-1))
+
+  def test_str(self):
+    result = InvocationResult(["a", "b"], 0, 1.5, 1.25, 0.125, 2048,
+                              {"rchar": 10, "wchar": 20})
+    self.assertEqual("a b: exit 0, 1.500s wall, 1.250s user, " +
+                     "0.125s sys, 2048 bytes peak RSS, " +
+                     "10 bytes read, 20 bytes written", str(result))
+
+  def test_str_wall_time_only(self):
+    result = InvocationResult(["a"], 1, 0.25)
+    self.assertEqual("a: exit 1, 0.250s wall", str(result))
+
+  def test_to_dict(self):
+    result = InvocationResult(["a"], 0, 0.5, 0.25, 0.125, 1024)
+    self.assertEqual({"command-line": ["a"],
+                      "return-code": 0,
+                      "wall-time": 0.5,
+                      "user-time": 0.25,
+                      "system-time": 0.125,
+                      "max-rss": 1024,
+                      "io": None}, result.to_dict())
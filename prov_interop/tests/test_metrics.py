@@ -0,0 +1,114 @@
+"""Unit tests for :mod:`prov_interop.metrics`.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from prov_interop import metrics
+from prov_interop.metrics import Metrics
+
+class MetricsTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(MetricsTestCase, self).setUp()
+    self.directory = tempfile.mkdtemp()
+    self.file_name = os.path.join(self.directory, "prov_interop.prom")
+    self.metrics = Metrics(buckets=[0.1, 1])
+
+  def tearDown(self):
+    super(MetricsTestCase, self).tearDown()
+    self.metrics.stop()
+    shutil.rmtree(self.directory)
+
+  def test_metric_name(self):
+    self.assertEqual("prov_interop_http_requests",
+                     metrics.metric_name("http-requests"))
+
+  def test_format_value(self):
+    self.assertEqual("3", metrics.format_value(3))
+    self.assertEqual("3", metrics.format_value(3.0))
+    self.assertEqual("0.25", metrics.format_value(0.25))
+    self.assertEqual("+Inf", metrics.format_value(float("inf")))
+
+  def test_format_labels(self):
+    self.assertEqual("", metrics.format_labels(()))
+    self.assertEqual("{a=\"1\",b=\"x\\\"y\\\\z\\n\"}",
+                     metrics.format_labels((("a", 1), ("b", "x\"y\\z\n"))))
+
+  def test_counter(self):
+    self.metrics.inc("requests", {"server": "a"}, help_text="Requests")
+    self.metrics.inc("requests", {"server": "a"}, 2)
+    self.metrics.inc("requests", {"server": "b"})
+    self.assertEqual("# HELP requests Requests\n" +
+                     "# TYPE requests counter\n" +
+                     "requests{server=\"a\"} 3\n" +
+                     "requests{server=\"b\"} 1\n",
+                     self.metrics.render())
+
+  def test_gauge(self):
+    self.metrics.set("entries", value=4)
+    self.metrics.set("entries", value=2)
+    self.assertEqual("# TYPE entries gauge\nentries 2\n",
+                     self.metrics.render())
+
+  def test_histogram(self):
+    for value in [0.05, 0.5, 5]:
+      self.metrics.observe("seconds", {"op": "convert"}, value)
+    self.assertEqual("# TYPE seconds histogram\n" +
+                     "seconds_bucket{op=\"convert\",le=\"0.1\"} 1\n" +
+                     "seconds_bucket{op=\"convert\",le=\"1\"} 2\n" +
+                     "seconds_bucket{op=\"convert\",le=\"+Inf\"} 3\n" +
+                     "seconds_sum{op=\"convert\"} 5.55\n" +
+                     "seconds_count{op=\"convert\"} 3\n",
+                     self.metrics.render())
+
+  def test_type_mismatch(self):
+    self.metrics.inc("requests")
+    with self.assertRaises(ValueError):
+      self.metrics.observe("requests", value=1)
+
+  def test_write(self):
+    self.metrics.inc("requests")
+    self.metrics.write(self.file_name)
+    with open(self.file_name, "r") as f:
+      self.assertEqual(self.metrics.render(), f.read())
+    self.assertEqual(["prov_interop.prom"], os.listdir(self.directory))
+
+  def test_start_stop(self):
+    self.metrics.start(self.file_name, 0.05)
+    self.metrics.inc("requests")
+    deadline = time.time() + 10
+    while not os.path.exists(self.file_name) and time.time() < deadline:
+      time.sleep(0.05)
+    self.assertTrue(os.path.exists(self.file_name))
+    self.metrics.inc("requests")
+    self.metrics.stop()
+    with open(self.file_name, "r") as f:
+      self.assertIn("requests 2\n", f.read())
@@ -0,0 +1,51 @@
+"""Unit tests for :mod:`prov_interop.restbenchmark`.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import unittest
+
+from prov_interop import http2
+from prov_interop import restbenchmark
+
+class RestBenchmarkTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(RestBenchmarkTestCase, self).setUp()
+    self.transports = ["tcp", "unix"]
+    if http2.is_available():
+      self.transports.append("http2")
+
+  def test_benchmark(self):
+    timings = restbenchmark.benchmark(count=2)
+    self.assertEqual(self.transports, [name for (name, _) in timings])
+    for (_, seconds) in timings:
+      self.assertTrue(seconds > 0)
+
+  def test_benchmark_concurrent(self):
+    timings = restbenchmark.benchmark(count=8, concurrency=4, latency=0.01)
+    self.assertEqual(self.transports, [name for (name, _) in timings])
+    for (_, seconds) in timings:
+      self.assertTrue(seconds > 0)
@@ -0,0 +1,588 @@
+"""Unit tests for :mod:`prov_interop.run`.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import filecmp
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from xml.etree import ElementTree
+
+from prov_interop import events
+from prov_interop import launcher
+from prov_interop import run
+from prov_interop import standards
+from prov_interop import trace
+from prov_interop.comparator import Comparator
+from prov_interop.component import CommandLineComponent
+from prov_interop.component import ConfigError
+from prov_interop.converter import Converter
+from prov_interop.harness import HarnessResources
+from prov_interop.metrics import Metrics
+from prov_interop.state import RunState
+
+class CopyConverter(Converter):
+  """Converter which copies the input file to the output file."""
+
+  def convert(self, in_file, out_file):
+    """Copy `in_file` to `out_file`.
+
+    :param in_file: Input file
+    :type in_file: str or unicode
+    :param out_file: Output file
+    :type out_file: str or unicode
+    """
+    super(CopyConverter, self).convert(in_file, out_file)
+    shutil.copyfile(in_file, out_file)
+
+
+class CommandCopyConverter(Converter, CommandLineComponent):
+  """Converter which copies the input file to the output file by
+  running a command-line."""
+
+  def convert(self, in_file, out_file):
+    """Copy `in_file` to `out_file`.
+
+    :param in_file: Input file
+    :type in_file: str or unicode
+    :param out_file: Output file
+    :type out_file: str or unicode
+    """
+    super(CommandCopyConverter, self).convert(in_file, out_file)
+    self.call(self.command_line({"INPUT": in_file, "OUTPUT": out_file}))
+
+
+class BatchCopyConverter(CopyConverter):
+  """Converter which copies input files to output files, recording the
+  size of each batch it is given."""
+
+  batches = []
+
+  @property
+  def batch_size(self):
+    return 3
+
+  def convert_batch(self, files):
+    BatchCopyConverter.batches.append(len(files))
+    return super(BatchCopyConverter, self).convert_batch(files)
+
+
+class GroupCopyConverter(BatchCopyConverter):
+  """Converter which copies input files to output files, and is given
+  tuples grouped by input file."""
+
+  @property
+  def group_by_input(self):
+    return True
+
+  @property
+  def batch_size(self):
+    return 4
+
+
+class ExitConverter(Converter):
+  """Converter which exits the process it is run in, as if it had
+  crashed."""
+
+  def convert(self, in_file, out_file):
+    """Exit the process with exit code 3.
+
+    :param in_file: Input file
+    :type in_file: str or unicode
+    :param out_file: Output file
+    :type out_file: str or unicode
+    """
+    os._exit(3)
+
+
+class ContentComparator(Comparator):
+  """Comparator which compares files byte-by-byte and counts its
+  comparisons."""
+
+  def __init__(self):
+    super(ContentComparator, self).__init__()
+    self._comparisons = 0
+
+  def statistics(self):
+    return {"comparisons": self._comparisons}
+
+  def compare(self, file1, file2):
+    """Compare files byte-by-byte.
+
+    :param file1: File
+    :type file1: str or unicode
+    :param file2: File
+    :type file2: str or unicode
+    :return: ``True`` if the files have the same content
+    :rtype: bool
+    """
+    super(ContentComparator, self).compare(file1, file2)
+    self._comparisons += 1
+    return filecmp.cmp(file1, file2, shallow=False)
+
+
+class RunTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(RunTestCase, self).setUp()
+    self.test_cases_dir = tempfile.mkdtemp()
+    (_, self.xunit_file) = tempfile.mkstemp(suffix=".xml")
+    self.formats = [standards.JSON, standards.PROVX]
+    for index in ["1", "2"]:
+      test_case_dir = os.path.join(self.test_cases_dir,
+                                   HarnessResources.TEST_CASE_PREFIX + index)
+      os.mkdir(test_case_dir)
+      for format in self.formats:
+        with open(os.path.join(test_case_dir, "doc." + format), "w") as f:
+          f.write("same")
+    comparator = {
+      HarnessResources.CLASS:
+        ContentComparator.__module__ + "." + ContentComparator.__name__,
+      Comparator.FORMATS: self.formats
+    }
+    self.harness_config = {
+      HarnessResources.TEST_CASES_DIR: self.test_cases_dir,
+      HarnessResources.COMPARATORS: {"ContentComparator": comparator}
+    }
+    self.converter_configs = {
+      "Copy": {
+        run.CLASS: CopyConverter.__module__ + "." + CopyConverter.__name__,
+        Converter.INPUT_FORMATS: self.formats,
+        Converter.OUTPUT_FORMATS: self.formats,
+        run.SKIP_TESTS: ["2"]
+      }
+    }
+
+  def tearDown(self):
+    super(RunTestCase, self).tearDown()
+    shutil.rmtree(self.test_cases_dir)
+    os.remove(self.xunit_file)
+
+  def check_results(self, results):
+    # 2 test cases * 2 formats * 2 formats
+    self.assertEqual(8, len(results))
+    for result in results:
+      (index, _, _, _, _) = result.test_case
+      expected = run.TestResult.SKIP if index == "2" else run.TestResult.PASS
+      self.assertEqual(expected, result.status, result.message)
+      self.assertEqual("Copy", result.converter)
+
+  def test_run(self):
+    self.check_results(run.run(self.harness_config, self.converter_configs))
+
+  def test_run_processes(self):
+    self.check_results(run.run(self.harness_config,
+                               self.converter_configs,
+                               processes=2))
+
+  def test_run_statistics(self):
+    statistics = []
+    run.run(self.harness_config, self.converter_configs,
+            statistics=statistics)
+    self.assertEqual([{"ContentComparator": {"comparisons": 4}}],
+                     statistics)
+
+  def test_run_statistics_processes(self):
+    statistics = []
+    run.run(self.harness_config, self.converter_configs, processes=2,
+            statistics=statistics)
+    self.assertEqual(2, len(statistics))
+    self.assertEqual({"ContentComparator": {"comparisons": 4}},
+                     run.merge_statistics(statistics))
+
+  def check_trace(self, trace_file, processes):
+    events = trace.read_events(trace_file)
+    names = [event["name"] for event in events]
+    self.assertEqual(processes + 1, names.count("harness initialisation"))
+    # 2 test cases * 2 formats * 2 formats, test case 2 being skipped
+    self.assertEqual(8, names.count("skip evaluation"))
+    for name in ["convert", "comparator lookup", "compare", "cleanup"]:
+      self.assertEqual(4, names.count(name), name)
+    return events
+
+  def test_run_trace(self):
+    trace_file = os.path.join(self.test_cases_dir, "trace.json")
+    with open(trace_file, "w") as f:
+      f.write("stale")
+    self.harness_config[HarnessResources.TRACE] = trace_file
+    self.check_results(run.run(self.harness_config, self.converter_configs))
+    self.check_trace(trace_file, 0)
+
+  def test_run_trace_bytes(self):
+    trace_file = os.path.join(self.test_cases_dir, "trace.json")
+    with open(trace_file, "w") as f:
+      f.write("stale")
+    # PyYAML returns ASCII strings as bytes on Python 2.
+    self.harness_config[HarnessResources.TRACE] = trace_file.encode("utf-8")
+    self.check_results(run.run(self.harness_config, self.converter_configs))
+    self.check_trace(trace_file, 0)
+
+  def test_run_trace_processes(self):
+    trace_file = os.path.join(self.test_cases_dir, "trace.json")
+    self.harness_config[HarnessResources.TRACE] = trace_file
+    self.check_results(run.run(self.harness_config, self.converter_configs,
+                               processes=2))
+    events = self.check_trace(trace_file, 2)
+    self.assertEqual(3, len(set([event["pid"] for event in events])))
+
+  def check_metrics(self, metrics):
+    text = metrics.render()
+    for (status, count) in [(run.TestResult.PASS, 1),
+                            (run.TestResult.SKIP, 1)]:
+      self.assertIn("prov_interop_tests_total{converter=\"Copy\"," +
+                    "ext_in=\"json\",ext_out=\"provx\",status=\"" +
+                    status + "\"} " + str(count) + "\n", text)
+    self.assertIn("prov_interop_convert_seconds_count{" +
+                  "converter=\"Copy\",ext_in=\"json\"," +
+                  "ext_out=\"provx\"} 1\n", text)
+    self.assertIn("prov_interop_compare_seconds_count{" +
+                  "converter=\"Copy\",ext_in=\"json\"," +
+                  "ext_out=\"provx\"} 1\n", text)
+    self.assertIn("prov_interop_comparisons_total{" +
+                  "component=\"ContentComparator\"} 4\n", text)
+
+  def test_run_metrics(self):
+    metrics = Metrics()
+    self.check_results(run.run(self.harness_config, self.converter_configs,
+                               metrics=metrics))
+    self.check_metrics(metrics)
+
+  def test_run_metrics_processes(self):
+    metrics = Metrics()
+    self.check_results(run.run(self.harness_config, self.converter_configs,
+                               processes=2, metrics=metrics))
+    self.check_metrics(metrics)
+
+  def test_record_statistics(self):
+    metrics = Metrics()
+    run.record_statistics(metrics, [
+      {"Copy": {"processes-spawned": 2}, "cache": {"cache-entries": 3}},
+      {"Copy": {"processes-spawned": 1}}])
+    text = metrics.render()
+    self.assertIn("# TYPE prov_interop_processes_spawned_total counter\n" +
+                  "prov_interop_processes_spawned_total" +
+                  "{component=\"Copy\"} 3\n", text)
+    self.assertIn("# TYPE prov_interop_cache_entries gauge\n" +
+                  "prov_interop_cache_entries{component=\"cache\"} 3\n",
+                  text)
+
+  def check_events(self, events_file):
+    read = events.read_events(events_file)
+    test = "Copy.test_case_1_json_provx"
+    tuple_events = [event for event in read if event["test"] == test]
+    phases = [(event["phase"], event["outcome"]) for event in tuple_events]
+    self.assertEqual([("skip evaluation", events.OK),
+                      ("convert", events.OK),
+                      ("comparator lookup", events.OK),
+                      ("compare", events.PASS),
+                      ("cleanup", events.OK)], phases)
+    [skip] = [event for event in read
+              if event["test"] == "Copy.test_case_2_json_provx"]
+    self.assertEqual("skip evaluation", skip["phase"])
+    self.assertEqual(events.SKIP, skip["outcome"])
+    self.assertEqual({"test": test,
+                      "index": "1",
+                      "converter": "CopyConverter",
+                      "ext-in": "json",
+                      "ext-out": "provx"},
+                     dict([(key, value) for (key, value)
+                           in tuple_events[0].items()
+                           if key in ["test", "index", "converter",
+                                      "ext-in", "ext-out"]]))
+    # 4 tuples run, each with 5 phases, and 4 skipped
+    self.assertEqual(24, len(read))
+
+  def test_run_events(self):
+    events_file = os.path.join(self.test_cases_dir, "events.ndjson")
+    with open(events_file, "w") as f:
+      f.write("stale\n")
+    self.harness_config[HarnessResources.EVENTS] = events_file
+    self.check_results(run.run(self.harness_config, self.converter_configs))
+    self.check_events(events_file)
+
+  def test_run_events_bytes(self):
+    events_file = os.path.join(self.test_cases_dir, "events.ndjson")
+    with open(events_file, "w") as f:
+      f.write("stale\n")
+    # PyYAML returns ASCII strings as bytes on Python 2.
+    self.harness_config[HarnessResources.EVENTS] = \
+        events_file.encode("utf-8")
+    self.check_results(run.run(self.harness_config, self.converter_configs))
+    self.check_events(events_file)
+
+  def test_run_events_processes(self):
+    events_file = os.path.join(self.test_cases_dir, "events.ndjson")
+    self.harness_config[HarnessResources.EVENTS] = events_file
+    self.check_results(run.run(self.harness_config, self.converter_configs,
+                               processes=2))
+    self.check_events(events_file)
+
+  def test_run_events_error(self):
+    events_file = os.path.join(self.test_cases_dir, "events.ndjson")
+    self.harness_config[HarnessResources.EVENTS] = events_file
+    self.converter_configs["Copy"][run.CLASS] = \
+        Converter.__module__ + "." + Converter.__name__
+    run.run(self.harness_config, self.converter_configs)
+    # The converter writes no output, so the comparison raises an error.
+    [compare] = [event for event in events.read_events(events_file)
+                 if event["test"] == "Copy.test_case_1_json_provx" and
+                 event["phase"] == "compare"]
+    self.assertEqual(events.ERROR, compare["outcome"])
+    self.assertIn("message", compare)
+
+  def test_format_counters(self):
+    self.assertEqual("cache-hits 3, cache-misses 1, cache hit rate 75.0%",
+                     run.format_counters({"cache-hits": 3,
+                                          "cache-misses": 1}))
+    self.assertEqual("comparisons 4",
+                     run.format_counters({"comparisons": 4}))
+    self.assertEqual("bytes-sent 10, bytes-sent-uncompressed 95, " +
+                     "sent compression ratio 9.5",
+                     run.format_counters({"bytes-sent": 10,
+                                          "bytes-sent-uncompressed": 95}))
+
+  def test_run_unsupported_format(self):
+    self.converter_configs["Copy"][Converter.OUTPUT_FORMATS] = \
+        [standards.JSON]
+    results = run.run(self.harness_config, self.converter_configs)
+    skipped = [r for r in results if r.status == run.TestResult.SKIP]
+    self.assertEqual(6, len(skipped))
+
+  def test_run_failure(self):
+    with open(os.path.join(self.test_cases_dir, "test-1", "doc.json"),
+              "w") as f:
+      f.write("different")
+    results = run.run(self.harness_config, self.converter_configs)
+    failed = [r.name for r in results if r.status == run.TestResult.FAIL]
+    self.assertEqual(["test_case_1_json_provx", "test_case_1_provx_json"],
+                     failed)
+
+  def test_run_error(self):
+    self.converter_configs["Copy"][run.CLASS] = \
+        Converter.__module__ + "." + Converter.__name__
+    results = run.run(self.harness_config, self.converter_configs)
+    errors = [r for r in results if r.status == run.TestResult.ERROR]
+    self.assertEqual(4, len(errors))
+
+  def test_run_processes_worker_exits(self):
+    self.converter_configs["Copy"][run.CLASS] = \
+        ExitConverter.__module__ + "." + ExitConverter.__name__
+    results = run.run(self.harness_config, self.converter_configs,
+                      processes=2)
+    self.assertEqual(8, len(results))
+    for result in results:
+      (index, _, _, _, _) = result.test_case
+      if index == "1":
+        self.assertEqual(run.TestResult.ERROR, result.status)
+        self.assertIn("exited with code 3", result.message)
+      else:
+        self.assertIn(result.status,
+                      [run.TestResult.SKIP, run.TestResult.ERROR])
+
+  def test_worker_failure(self):
+    class Process(object):
+      def __init__(self, pid, exitcode):
+        self.pid = pid
+        self.exitcode = exitcode
+    self.assertEqual(None, run.worker_failure([Process(1, None),
+                                               Process(2, 0)]))
+    self.assertEqual("Worker process 2 exited with code -9",
+                     run.worker_failure([Process(1, None),
+                                         Process(2, -9)]))
+    self.assertIn("exited before returning all results",
+                  run.worker_failure([Process(1, 0), Process(2, 0)]))
+
+  def test_run_batch(self):
+    for index in ["3", "4"]:
+      shutil.copytree(os.path.join(self.test_cases_dir, "test-1"),
+                      os.path.join(self.test_cases_dir, "test-" + index))
+    self.converter_configs["Copy"][run.CLASS] = \
+        BatchCopyConverter.__module__ + "." + BatchCopyConverter.__name__
+    BatchCopyConverter.batches = []
+    results = run.run(self.harness_config, self.converter_configs)
+    # 4 test cases * 2 formats * 2 formats, in batches of 3 per format
+    # pair, with test case 2 skipped.
+    self.assertEqual(16, len(results))
+    self.assertEqual([1] * 4 + [2] * 4, sorted(BatchCopyConverter.batches))
+    for result in results:
+      (index, _, _, _, _) = result.test_case
+      expected = run.TestResult.SKIP if index == "2" else run.TestResult.PASS
+      self.assertEqual(expected, result.status, result.message)
+    indices = [result.test_case[0] for result in results]
+    self.assertEqual(sorted(indices), indices)
+
+  def test_run_group_by_input(self):
+    self.converter_configs["Copy"][run.CLASS] = \
+        GroupCopyConverter.__module__ + "." + GroupCopyConverter.__name__
+    BatchCopyConverter.batches = []
+    results = run.run(self.harness_config, self.converter_configs)
+    self.check_results(results)
+    # Each job holds both output formats for both test cases, for one
+    # input format, with test case 2 skipped.
+    self.assertEqual([2, 2], BatchCopyConverter.batches)
+
+  def test_run_conversion_cache(self):
+    self.harness_config[HarnessResources.CONVERSION_CACHE] = {
+      "directory": os.path.join(self.test_cases_dir, "cache")}
+    self.check_results(run.run(self.harness_config, self.converter_configs))
+    statistics = []
+    self.check_results(run.run(self.harness_config, self.converter_configs,
+                               statistics=statistics))
+    counters = run.merge_statistics(statistics)
+    self.assertEqual({"cache-hits": 4, "cache-misses": 0},
+                     counters[HarnessResources.CONVERSION_CACHE])
+
+  def test_run_comparison_cache(self):
+    self.harness_config[HarnessResources.COMPARISON_CACHE] = {
+      "directory": os.path.join(self.test_cases_dir, "cache")}
+    statistics = []
+    self.check_results(run.run(self.harness_config, self.converter_configs,
+                               statistics=statistics))
+    # All outputs are identical so each format pair is compared once.
+    self.assertEqual({"comparisons": 2},
+                     statistics[0]["ContentComparator"])
+    self.assertEqual({"cache-hits": 2, "cache-misses": 2},
+                     statistics[0][HarnessResources.COMPARISON_CACHE])
+
+  def test_run_state(self):
+    state_file = os.path.join(self.test_cases_dir, "state.json")
+    results = run.run(self.harness_config, self.converter_configs,
+                      state=RunState(state_file))
+    self.check_results(results)
+    self.assertEqual([], [r for r in results if r.reused])
+    statistics = []
+    results = run.run(self.harness_config, self.converter_configs,
+                      statistics=statistics, state=RunState(state_file))
+    self.check_results(results)
+    # Only the skipped tuples are not reused, and no comparisons are run.
+    self.assertEqual(4, len([r for r in results if r.reused]))
+    self.assertEqual([{"ContentComparator": {"comparisons": 0}}],
+                     statistics)
+
+  def test_run_state_changed(self):
+    state_file = os.path.join(self.test_cases_dir, "state.json")
+    run.run(self.harness_config, self.converter_configs,
+            state=RunState(state_file))
+    with open(os.path.join(self.test_cases_dir, "test-1", "doc.json"),
+              "w") as f:
+      f.write("different")
+    results = run.run(self.harness_config, self.converter_configs,
+                      processes=2, state=RunState(state_file))
+    # Tuples with doc.json as input or expected output are re-run.
+    reused = [r.name for r in results if r.reused]
+    self.assertEqual(["test_case_1_provx_provx"], reused)
+    failed = [r.name for r in results if r.status == run.TestResult.FAIL]
+    self.assertEqual(["test_case_1_json_provx", "test_case_1_provx_json"],
+                     failed)
+    # Failures are recorded, and reused.
+    results = run.run(self.harness_config, self.converter_configs,
+                      state=RunState(state_file))
+    self.assertEqual(4, len([r for r in results if r.reused]))
+    self.assertEqual(2, len([r for r in results
+                             if r.status == run.TestResult.FAIL]))
+
+  def test_run_state_converter_changed(self):
+    state_file = os.path.join(self.test_cases_dir, "state.json")
+    run.run(self.harness_config, self.converter_configs,
+            state=RunState(state_file))
+    self.converter_configs["Copy"][Converter.INPUT_FORMATS] = \
+        list(reversed(self.formats))
+    results = run.run(self.harness_config, self.converter_configs,
+                      state=RunState(state_file))
+    self.assertEqual([], [r for r in results if r.reused])
+    self.assertEqual(4, len(RunState(state_file)))
+
+  def test_run_missing_class(self):
+    del self.converter_configs["Copy"][run.CLASS]
+    with self.assertRaises(ConfigError):
+      run.run(self.harness_config, self.converter_configs)
+
+  def command_copy_config(self):
+    self.converter_configs["Copy"].update({
+      run.CLASS: CommandCopyConverter.__module__ + "." +
+        CommandCopyConverter.__name__,
+      CommandLineComponent.EXECUTABLE: sys.executable,
+      CommandLineComponent.ARGUMENTS: "-c " +
+        "__import__('shutil').copyfile(*__import__('sys').argv[1:]) " +
+        "INPUT OUTPUT"})
+
+  def test_run_invocations(self):
+    self.command_copy_config()
+    results = run.run(self.harness_config, self.converter_configs)
+    self.check_results(results)
+    for result in results:
+      if result.status == run.TestResult.SKIP:
+        self.assertEqual([], result.invocations)
+        continue
+      [invocation] = result.invocations
+      self.assertEqual(0, invocation.return_code)
+      self.assertIn(result.test_case[2], invocation.command_line)
+
+  def test_run_invocations_statistics(self):
+    self.command_copy_config()
+    statistics = []
+    run.run(self.harness_config, self.converter_configs, processes=2,
+            statistics=statistics)
+    self.assertEqual(4, run.merge_statistics(statistics)["Copy"][
+      "processes-spawned"])
+
+  def test_add_invocations(self):
+    results = [run.TestResult(None, None, None) for _ in range(2)]
+    pending = list(zip(results, ["out.0.json", "out.1.json"]))
+    invocation = launcher.InvocationResult(["a", "out.1.json"], 0, 1.0)
+    batch_invocation = launcher.InvocationResult(["a", "manifest"], 0, 2.0)
+    run._add_invocations(pending, [invocation, batch_invocation])
+    self.assertEqual([batch_invocation], results[0].invocations)
+    self.assertEqual([invocation, batch_invocation], results[1].invocations)
+
+  def test_write_xunit(self):
+    with open(os.path.join(self.test_cases_dir, "test-1", "doc.json"),
+              "w") as f:
+      f.write("different")
+    results = run.run(self.harness_config, self.converter_configs)
+    run.write_xunit(results, self.xunit_file)
+    suite = ElementTree.parse(self.xunit_file).getroot()
+    self.assertEqual("testsuite", suite.tag)
+    self.assertEqual("8", suite.get("tests"))
+    self.assertEqual("2", suite.get("failures"))
+    self.assertEqual("0", suite.get("errors"))
+    self.assertEqual("4", suite.get("skip"))
+    names = [case.get("name") for case in suite.findall("testcase")]
+    self.assertIn("test_case_1_json_provx", names)
+    self.assertEqual(2, len(suite.findall("testcase/failure")))
+
+  def test_write_xunit_invocations(self):
+    self.command_copy_config()
+    results = run.run(self.harness_config, self.converter_configs)
+    run.write_xunit(results, self.xunit_file)
+    suite = ElementTree.parse(self.xunit_file).getroot()
+    outputs = suite.findall("testcase/system-out")
+    self.assertEqual(4, len(outputs))
+    for output in outputs:
+      self.assertTrue(output.text.startswith("Invocation: " +
+                                             sys.executable))
@@ -0,0 +1,178 @@
+"""Unit tests for :mod:`prov_interop.standin`.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import requests
+
+from prov_interop import standards
+from prov_interop import standin
+from prov_interop.converter import ConversionError
+from prov_interop.provstore.converter import ProvStoreConverter
+from prov_interop.provtranslator.converter import ProvTranslatorConverter
+from prov_interop.standin import StandInServer
+
+DOCUMENT = "{\"prefix\": {\"ex\": \"http://example.org/\"}, " + \
+    "\"entity\": {\"ex:e1\": {}}}"
+
+class GetFormatTestCase(unittest.TestCase):
+
+  def test_get_format(self):
+    content_types = ProvTranslatorConverter.CONTENT_TYPES
+    self.assertEqual(standards.TTL, standin.get_format(
+      "Text/Turtle; charset=utf-8", content_types))
+    self.assertEqual(None, standin.get_format("text/plain", content_types))
+    self.assertEqual(None, standin.get_format(None, content_types))
+
+
+class StandInServerTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(StandInServerTestCase, self).setUp()
+    self.directory = tempfile.mkdtemp()
+    self.in_file = os.path.join(self.directory, "in." + standards.JSON)
+    with open(self.in_file, "w") as f:
+      f.write(DOCUMENT)
+    self.server = None
+
+  def tearDown(self):
+    super(StandInServerTestCase, self).tearDown()
+    if self.server is not None:
+      self.server.stop()
+    shutil.rmtree(self.directory)
+
+  def start(self, **kwargs):
+    self.server = StandInServer(("127.0.0.1", 0), **kwargs)
+    self.server.start()
+
+  def converter(self, cls, url, **config):
+    converter = cls()
+    config.update({cls.URL: url,
+                   cls.TIMEOUT: 5,
+                   cls.INPUT_FORMATS: standards.FORMATS,
+                   cls.OUTPUT_FORMATS: standards.FORMATS})
+    converter.configure(config)
+    self.addCleanup(converter.close)
+    return converter
+
+  def read(self, file_name):
+    with open(file_name, "r") as f:
+      return f.read()
+
+  def test_init_invalid(self):
+    for kwargs in [{"backend": "nosuchbackend"}, {"latency": -1},
+                   {"error_rate": 1.5}]:
+      with self.assertRaises(ValueError):
+        StandInServer(("127.0.0.1", 0), **kwargs)
+
+  def test_translate_passthrough(self):
+    self.start(backend=standin.PASSTHROUGH)
+    converter = self.converter(ProvTranslatorConverter,
+                               self.server.translator_url)
+    out_file = os.path.join(self.directory, "out." + standards.PROVN)
+    converter.convert(self.in_file, out_file)
+    self.assertEqual(DOCUMENT, self.read(out_file))
+
+  def test_translate_prov(self):
+    self.start()
+    converter = self.converter(ProvTranslatorConverter,
+                               self.server.translator_url)
+    out_file = os.path.join(self.directory, "out." + standards.PROVN)
+    converter.convert(self.in_file, out_file)
+    self.assertTrue("entity(ex:e1)" in self.read(out_file))
+
+  def test_translate_invalid_document(self):
+    self.start()
+    converter = self.converter(ProvTranslatorConverter,
+                               self.server.translator_url)
+    with open(self.in_file, "w") as f:
+      f.write("not a document")
+    with self.assertRaises(ConversionError):
+      converter.convert(self.in_file,
+                        os.path.join(self.directory, "out." +
+                                     standards.PROVN))
+
+  def test_store(self):
+    self.start()
+    converter = self.converter(ProvStoreConverter, self.server.store_url,
+                               authorization="ApiKey user:12345")
+    out_file = os.path.join(self.directory, "out." + standards.PROVN)
+    converter.convert(self.in_file, out_file)
+    self.assertTrue("entity(ex:e1)" in self.read(out_file))
+    statistics = self.server.statistics()
+    self.assertEqual(3, statistics["requests"])
+    self.assertEqual(0, statistics["documents"])
+
+  def test_store_unauthorized(self):
+    self.start()
+    response = requests.post(self.server.store_url, data="{}",
+                             headers={"Content-type": "application/json"})
+    self.assertEqual(401, response.status_code)
+
+  def test_get_missing_document(self):
+    self.start()
+    for path in ["1.json", "x.json", "1.nosuchformat"]:
+      response = requests.get(self.server.store_url + path)
+      self.assertEqual(404, response.status_code)
+    response = requests.delete(self.server.store_url + "1")
+    self.assertEqual(404, response.status_code)
+
+  def test_errors(self):
+    self.start(backend=standin.PASSTHROUGH, error_rate=0.5, seed=1)
+    statuses = [requests.get(self.server.store_url + "1.json").status_code
+                for _ in range(20)]
+    self.assertEqual(self.server.statistics()["errors"],
+                     statuses.count(503))
+    self.assertTrue(0 < statuses.count(503) < 20)
+    self.server.stop()
+    self.start(backend=standin.PASSTHROUGH, error_rate=0.5, seed=1)
+    self.assertEqual(statuses,
+                     [requests.get(self.server.store_url + "1.json").
+                      status_code for _ in range(20)])
+
+  def test_errors_retried(self):
+    self.start(backend=standin.PASSTHROUGH, error_rate=0.5, seed=1)
+    converter = self.converter(ProvTranslatorConverter,
+                               self.server.translator_url,
+                               throttle={"retries": 10, "backoff": 0.01,
+                                         "state-file": os.path.join(
+                                           self.directory, "throttle")})
+    for _ in range(5):
+      converter.convert(self.in_file,
+                        os.path.join(self.directory, "out." +
+                                     standards.JSON))
+    self.assertTrue(converter.statistics()["throttle-retries"] > 0)
+
+  def test_latency(self):
+    self.start(backend=standin.PASSTHROUGH, latency=0.1)
+    start = time.time()
+    requests.get(self.server.store_url + "1.json")
+    self.assertTrue(time.time() - start >= 0.1)
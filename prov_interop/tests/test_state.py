@@ -0,0 +1,93 @@
+"""Unit tests for :mod:`prov_interop.state`.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from prov_interop.state import RunState
+
+class RunStateTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(RunStateTestCase, self).setUp()
+    self.directory = tempfile.mkdtemp()
+    self.state_file = os.path.join(self.directory, "state.json")
+    self.file_in = os.path.join(self.directory, "in.json")
+    self.file_out = os.path.join(self.directory, "out.provx")
+    for file_name in [self.file_in, self.file_out]:
+      with open(file_name, "w") as f:
+        f.write(file_name)
+    self.test_case = ("1", "json", self.file_in, "provx", self.file_out)
+
+  def tearDown(self):
+    super(RunStateTestCase, self).tearDown()
+    shutil.rmtree(self.directory)
+
+  def test_init_no_file(self):
+    self.assertEqual(0, len(RunState(self.state_file)))
+
+  def test_init_invalid_file(self):
+    with open(self.state_file, "w") as f:
+      f.write("not JSON")
+    self.assertEqual(0, len(RunState(self.state_file)))
+
+  def test_key(self):
+    state = RunState(self.state_file)
+    key = state.key("fingerprint", self.test_case)
+    self.assertEqual(key, state.key("fingerprint", self.test_case))
+    self.assertNotEqual(key, state.key("other", self.test_case))
+    with open(self.file_out, "w") as f:
+      f.write("changed")
+    self.assertNotEqual(key, RunState(self.state_file).key(
+      "fingerprint", self.test_case))
+
+  def test_save_load(self):
+    state = RunState(self.state_file)
+    key = state.key("fingerprint", self.test_case)
+    state.put(key, "Copy", "pass", "", "", 1.5)
+    state.save()
+    state = RunState(self.state_file)
+    self.assertEqual(1, len(state))
+    self.assertEqual({"converter": "Copy", "status": "pass",
+                      "message": "", "detail": "", "time": 1.5},
+                     state.get(key))
+    self.assertEqual(None, state.get("nosuchkey"))
+
+  def test_prune(self):
+    state = RunState(self.state_file)
+    for key in ["a", "b"]:
+      state.put(key, "Copy", "pass", "", "", 0.0)
+    state.put("c", "Other", "pass", "", "", 0.0)
+    state.save()
+    state = RunState(self.state_file)
+    state.get("a")
+    self.assertEqual(1, state.prune(["Copy"]))
+    self.assertEqual(2, len(state))
+    self.assertEqual(None, state.get("b"))
+    self.assertNotEqual(None, state.get("c"))
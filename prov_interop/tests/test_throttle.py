@@ -0,0 +1,274 @@
+"""Unit tests for :mod:`prov_interop.throttle`.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import multiprocessing
+import os
+import requests
+import requests_mock
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from prov_interop import throttle
+from prov_interop.component import RestComponent
+from prov_interop.throttle import ConcurrencyLimit
+from prov_interop.throttle import SharedState
+from prov_interop.throttle import Throttle
+from prov_interop.throttle import TokenBucket
+
+def wait_for_request(file_name, queue):
+  """Start and end a request, limited by a throttle using the given
+  shared state file, and put the time spent waiting onto a queue."""
+  limit = ConcurrencyLimit(concurrency=1, maximum=1)
+  shared = Throttle(file_name, limit)
+  start = time.time()
+  started = shared.start()
+  shared.end(started, False)
+  queue.put(started - start)
+
+
+class SharedStateTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(SharedStateTestCase, self).setUp()
+    (_, self.file_name) = tempfile.mkstemp()
+    self.state = SharedState(self.file_name)
+
+  def tearDown(self):
+    super(SharedStateTestCase, self).tearDown()
+    os.remove(self.file_name)
+
+  def test_update(self):
+    self.assertEqual({}, self.state.update(dict))
+    self.state.update(lambda state: state.update({"a": 1}))
+    self.state.update(lambda state: state.update({"b": 2}))
+    self.assertEqual({"a": 1, "b": 2}, self.state.update(dict))
+
+  def test_update_invalid_file(self):
+    with open(self.file_name, "w") as f:
+      f.write("[1, 2")
+    self.assertEqual({}, self.state.update(dict))
+
+  def test_import_without_fcntl(self):
+    # fcntl is not available on non-POSIX platforms.
+    code = ("import sys; sys.modules['fcntl'] = None; "
+            "import prov_interop.component, prov_interop.throttle")
+    root = os.path.dirname(os.path.dirname(os.path.dirname(
+      os.path.abspath(__file__))))
+    self.assertEqual(0, subprocess.call([sys.executable, "-c", code],
+                                        cwd=root))
+
+
+class ConcurrencyLimitTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(ConcurrencyLimitTestCase, self).setUp()
+    self.limit = ConcurrencyLimit(concurrency=2, minimum=1, maximum=3)
+    self.state = {}
+
+  def test_init_invalid(self):
+    for (concurrency, minimum, maximum) in [(1, 0, 2), (3, 1, 2), (1, 2, 3)]:
+      with self.assertRaises(ValueError):
+        ConcurrencyLimit(concurrency, minimum, maximum)
+
+  def test_start_end(self):
+    self.assertTrue(self.limit.available(self.state))
+    self.limit.start(self.state)
+    self.limit.start(self.state)
+    self.assertEqual(2, self.limit.in_progress(self.state))
+    self.assertFalse(self.limit.available(self.state))
+    self.limit.end(self.state, time.time(), False)
+    self.assertEqual(1, self.limit.in_progress(self.state))
+    self.assertEqual(2.5, self.limit.limit(self.state))
+
+  def test_in_progress_exited_process(self):
+    process = multiprocessing.Process(target=time.sleep, args=(0,))
+    process.start()
+    process.join()
+    self.state["in-progress"] = {str(process.pid): 5}
+    self.assertEqual(0, self.limit.in_progress(self.state))
+    self.assertTrue(self.limit.available(self.state))
+
+  def test_increase(self):
+    for _ in range(10):
+      self.limit.start(self.state)
+      self.limit.end(self.state, time.time(), False)
+    self.assertEqual(3, self.limit.limit(self.state))
+
+  def test_decrease(self):
+    started = time.time()
+    self.limit.start(self.state)
+    self.limit.start(self.state)
+    self.assertTrue(self.limit.end(self.state, started, True))
+    self.assertEqual(1, self.limit.limit(self.state))
+    # Requests started before the decrease do not decrease the limit
+    # again.
+    self.assertFalse(self.limit.end(self.state, started - 1, True))
+    self.assertEqual(1, self.limit.limit(self.state))
+    self.assertEqual(0, self.limit.in_progress(self.state))
+
+
+class TokenBucketTestCase(unittest.TestCase):
+
+  def test_init_invalid(self):
+    for (rate, burst) in [(0, 1), (1, 0.5)]:
+      with self.assertRaises(ValueError):
+        TokenBucket(rate, burst)
+
+  def test_wait(self):
+    bucket = TokenBucket(10, 2)
+    state = {}
+    now = time.time()
+    for _ in range(2):
+      self.assertEqual(0, bucket.wait(state, now))
+      bucket.take(state)
+    self.assertAlmostEqual(0.1, bucket.wait(state, now))
+    self.assertAlmostEqual(0.05, bucket.wait(state, now + 0.05))
+    self.assertEqual(0, bucket.wait(state, now + 1))
+    self.assertEqual(2, state["tokens"])
+
+
+class ThrottleTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(ThrottleTestCase, self).setUp()
+    (_, self.file_name) = tempfile.mkstemp()
+    self.config = {throttle.STATE_FILE: self.file_name,
+                   throttle.BACKOFF: 0.001,
+                   throttle.RETRIES: 2}
+    self.url = "https://" + self.__class__.__name__
+
+  def tearDown(self):
+    super(ThrottleTestCase, self).tearDown()
+    os.remove(self.file_name)
+
+  def test_from_config(self):
+    shared = Throttle.from_config({}, self.url)
+    self.assertEqual(tempfile.gettempdir(),
+                     os.path.dirname(shared.file_name))
+    self.assertEqual(shared.file_name,
+                     Throttle.from_config({}, self.url).file_name)
+    self.assertNotEqual(shared.file_name,
+                        Throttle.from_config({}, "other").file_name)
+
+  def test_from_config_invalid(self):
+    for config in [[], {throttle.RATE: "1"}, {throttle.RETRIES: -1},
+                   {throttle.CONCURRENCY: 1.5}, {throttle.LATENCY: 0},
+                   {throttle.MIN_CONCURRENCY: 0}]:
+      with self.assertRaises(ValueError):
+        Throttle.from_config(config, self.url)
+
+  def test_delay(self):
+    shared = Throttle.from_config({throttle.BACKOFF: 1,
+                                   throttle.MAX_BACKOFF: 3}, self.url)
+    self.assertTrue(0.5 <= shared.delay(0) <= 1)
+    self.assertTrue(1.5 <= shared.delay(2) <= 3)
+    self.assertTrue(1.5 <= shared.delay(10) <= 3)
+    response = requests.Response()
+    response.headers["Retry-After"] = "2"
+    self.assertEqual(2, shared.delay(0, response))
+    response.headers["Retry-After"] = "60"
+    self.assertEqual(3, shared.delay(0, response))
+
+  def test_request_retry(self):
+    shared = Throttle.from_config(self.config, self.url)
+    with requests_mock.Mocker(real_http=False) as mocker:
+      mocker.register_uri("GET", self.url,
+                          [{"status_code": 503},
+                           {"status_code": 429},
+                           {"status_code": 200}])
+      response = shared.request(lambda: requests.get(self.url))
+      self.assertEqual(200, response.status_code)
+      self.assertEqual(3, mocker.call_count)
+    counters = shared.statistics()
+    self.assertEqual(3, counters["throttle-requests"])
+    self.assertEqual(2, counters["throttle-retries"])
+    self.assertEqual(2, counters["throttle-congestion"])
+    # Each retry started after the previous decrease, so the limit is
+    # halved twice, then increased by 1 / limit.
+    self.assertEqual(throttle.DEFAULT_CONCURRENCY / 4 + 1, shared.limit())
+
+  def test_request_retries_exhausted(self):
+    shared = Throttle.from_config(self.config, self.url)
+    with requests_mock.Mocker(real_http=False) as mocker:
+      mocker.register_uri("GET", self.url, status_code=429)
+      response = shared.request(lambda: requests.get(self.url))
+      self.assertEqual(429, response.status_code)
+      self.assertEqual(3, mocker.call_count)
+      mocker.register_uri("GET", self.url,
+                          exc=requests.exceptions.ConnectTimeout)
+      with self.assertRaises(requests.exceptions.ConnectTimeout):
+        shared.request(lambda: requests.get(self.url))
+      self.assertEqual(6, mocker.call_count)
+
+  def test_request_error(self):
+    shared = Throttle.from_config(self.config, self.url)
+    with self.assertRaises(ZeroDivisionError):
+      shared.request(lambda: 1 / 0)
+    self.assertEqual(0, shared.statistics()["throttle-retries"])
+
+  def test_request_latency(self):
+    self.config[throttle.LATENCY] = 0.01
+    shared = Throttle.from_config(self.config, self.url)
+
+    def slow():
+      time.sleep(0.05)
+      response = requests.Response()
+      response.status_code = 200
+      return response
+
+    self.assertEqual(200, shared.request(slow).status_code)
+    self.assertEqual(0, shared.statistics()["throttle-retries"])
+    self.assertEqual(1, shared.statistics()["throttle-decreases"])
+
+  def test_start_shared_across_processes(self):
+    shared = Throttle(self.file_name, ConcurrencyLimit(1, 1, 1))
+    started = shared.start()
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=wait_for_request,
+                                      args=(self.file_name, queue))
+    process.start()
+    time.sleep(0.2)
+    shared.end(started, False)
+    waited = queue.get()
+    process.join()
+    self.assertTrue(waited >= 0.15, waited)
+
+  def test_rest_component(self):
+    rest = RestComponent()
+    rest.configure({RestComponent.URL: self.url,
+                    RestComponent.THROTTLE: self.config})
+    try:
+      with requests_mock.Mocker(real_http=False) as mocker:
+        mocker.register_uri("POST", self.url,
+                            [{"status_code": 503}, {"status_code": 201}])
+        self.assertEqual(201, rest.request("POST", self.url).status_code)
+      self.assertEqual(1, rest.statistics()["throttle-retries"])
+    finally:
+      rest.close()
@@ -0,0 +1,122 @@
+"""Unit tests for :mod:`prov_interop.trace`.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from prov_interop import trace
+from prov_interop.trace import Tracer
+
+def record_spans(file_name, count):
+  tracer = Tracer(file_name)
+  for index in range(count):
+    with tracer.span("span", {"index": index}):
+      pass
+  tracer.close()
+
+
+class TracerTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(TracerTestCase, self).setUp()
+    self.directory = tempfile.mkdtemp()
+    self.file_name = os.path.join(self.directory, "trace.json")
+
+  def tearDown(self):
+    super(TracerTestCase, self).tearDown()
+    shutil.rmtree(self.directory)
+
+  def test_disabled(self):
+    tracer = Tracer()
+    self.assertFalse(tracer.enabled)
+    with tracer.span("span"):
+      pass
+    tracer.close()
+    self.assertEqual([], os.listdir(self.directory))
+
+  def test_add(self):
+    tracer = Tracer(self.file_name)
+    self.assertTrue(tracer.enabled)
+    tracer.add("convert", 1.5, 1.75, {"index": 1})
+    tracer.close()
+    [event] = trace.read_events(self.file_name)
+    self.assertEqual("convert", event["name"])
+    self.assertEqual(trace.PHASE, event["cat"])
+    self.assertEqual("X", event["ph"])
+    self.assertEqual(1500000, event["ts"])
+    self.assertEqual(250000, event["dur"])
+    self.assertEqual(os.getpid(), event["pid"])
+    self.assertEqual(threading.current_thread().ident, event["tid"])
+    self.assertEqual({"index": 1}, event["args"])
+
+  def test_span_exception(self):
+    tracer = Tracer(self.file_name)
+    with self.assertRaises(ValueError):
+      with tracer.span("compare"):
+        raise ValueError()
+    tracer.close()
+    self.assertEqual(["compare"], [event["name"] for event in
+                                   trace.read_events(self.file_name)])
+
+  def test_array_format(self):
+    tracer = Tracer(self.file_name)
+    tracer.add("a", 1, 2)
+    tracer.add("b", 2, 3)
+    tracer.close()
+    with open(self.file_name, "r") as f:
+      content = f.read()
+    self.assertTrue(content.startswith("[\n"))
+    # The closing ] may be omitted, and is added by trace viewers.
+    self.assertEqual(2, len(json.loads(content.rstrip(",\n") + "]")))
+
+  def test_append(self):
+    Tracer(self.file_name).add("a", 1, 2)
+    Tracer(self.file_name).add("b", 2, 3)
+    self.assertEqual(["a", "b"], [event["name"] for event in
+                                  trace.read_events(self.file_name)])
+    trace.start(self.file_name)
+    self.assertFalse(os.path.exists(self.file_name))
+    trace.start(self.file_name)
+
+  def test_processes(self):
+    processes = [multiprocessing.Process(target=record_spans,
+                                         args=(self.file_name, 50))
+                 for _ in range(4)]
+    for process in processes:
+      process.start()
+    for process in processes:
+      process.join()
+    events = trace.read_events(self.file_name)
+    self.assertEqual(200, len(events))
+    self.assertEqual(sorted([process.pid for process in processes]),
+                     sorted(set([event["pid"] for event in events])))
+    self.assertEqual(["trace.json"], os.listdir(self.directory))
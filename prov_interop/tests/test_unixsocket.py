@@ -0,0 +1,122 @@
+"""Unit tests for :mod:`prov_interop.unixsocket`.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+
+from prov_interop import cache
+from prov_interop import cassette
+from prov_interop import standards
+from prov_interop import standin
+from prov_interop import unixsocket
+from prov_interop.provtranslator.converter import ProvTranslatorConverter
+from prov_interop.standin import UnixStandInServer
+
+class SocketUrlTestCase(unittest.TestCase):
+
+  def test_socket_url(self):
+    url = unixsocket.socket_url("/tmp/a b.sock", "/documents/")
+    self.assertEqual("http+unix://%2Ftmp%2Fa%20b.sock/documents/", url)
+    self.assertEqual("/tmp/a b.sock", unixsocket.socket_path(url))
+
+
+class UnixAdapterTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(UnixAdapterTestCase, self).setUp()
+    self.directory = tempfile.mkdtemp()
+    self.socket_path = os.path.join(self.directory, "standin.sock")
+    self.server = UnixStandInServer(self.socket_path,
+                                    backend=standin.PASSTHROUGH)
+    self.server.start()
+    self.in_file = os.path.join(self.directory, "in." + standards.JSON)
+    self.out_file = os.path.join(self.directory, "out." + standards.JSON)
+    with open(self.in_file, "w") as f:
+      f.write("{}")
+
+  def tearDown(self):
+    super(UnixAdapterTestCase, self).tearDown()
+    self.server.stop()
+    shutil.rmtree(self.directory)
+
+  def converter(self, url, **config):
+    converter = ProvTranslatorConverter()
+    config.update({ProvTranslatorConverter.URL: url,
+                   ProvTranslatorConverter.TIMEOUT: 5,
+                   ProvTranslatorConverter.INPUT_FORMATS: standards.FORMATS,
+                   ProvTranslatorConverter.OUTPUT_FORMATS:
+                     standards.FORMATS})
+    converter.configure(config)
+    self.addCleanup(converter.close)
+    return converter
+
+  def test_server_url(self):
+    self.assertEqual(unixsocket.socket_url(self.socket_path,
+                                           standin.TRANSLATOR_PATH),
+                     self.server.translator_url)
+
+  def test_convert(self):
+    converter = self.converter(self.server.translator_url)
+    for _ in range(3):
+      converter.convert(self.in_file, self.out_file)
+      with open(self.out_file, "r") as f:
+        self.assertEqual("{}", f.read())
+    statistics = converter.statistics()
+    self.assertEqual(3, statistics["http-requests"])
+    self.assertEqual(1, statistics["http-connections"])
+    self.assertEqual(2, statistics["http-connections-reused"])
+    self.assertEqual(3, self.server.statistics()["requests"])
+
+  def test_convert_missing_socket(self):
+    converter = self.converter(unixsocket.socket_url(
+      self.socket_path + ".missing", standin.TRANSLATOR_PATH))
+    with self.assertRaises(requests.exceptions.ConnectionError):
+      converter.convert(self.in_file, self.out_file)
+
+  def test_convert_cassette(self):
+    config = {cache.DIRECTORY: os.path.join(self.directory, "cassette"),
+              cassette.MODE: cassette.RECORD}
+    converter = self.converter(self.server.translator_url,
+                               cassette=dict(config))
+    converter.convert(self.in_file, self.out_file)
+    self.assertEqual(1, converter.statistics()["cassette-recorded"])
+    config[cassette.MODE] = cassette.REPLAY
+    converter = self.converter(self.server.translator_url,
+                               cassette=config)
+    converter.convert(self.in_file, self.out_file)
+    self.assertEqual(1, converter.statistics()["cassette-replayed"])
+    self.assertEqual(1, self.server.statistics()["requests"])
+
+  def test_server_close_removes_socket(self):
+    self.server.stop()
+    self.assertFalse(os.path.exists(self.socket_path))
+    self.server = UnixStandInServer(self.socket_path)
+    self.server.start()
@@ -0,0 +1,120 @@
+"""Unit tests for :mod:`prov_interop.worker`.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import inspect
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from prov_interop import standards
+from prov_interop import worker
+from prov_interop.worker import WorkerProcess
+
+class ServeTestCase(unittest.TestCase):
+
+  def serve(self, handler, requests):
+    """Run :func:`prov_interop.worker.serve` over requests.
+
+    :param handler: Request handler
+    :type handler: function
+    :param requests: Arguments for each request
+    :type requests: list of list of str or unicode
+    :return: exit codes from responses
+    :rtype: list of int
+    """
+    lines = [json.dumps({worker.ARGUMENTS: r}) + "\n" for r in requests]
+    stdin = io.BytesIO("".join(lines).encode("utf-8"))
+    stdout = io.BytesIO()
+    worker.serve(handler, stdin, stdout)
+    return [json.loads(line)[worker.RETURNCODE]
+            for line in stdout.getvalue().decode("utf-8").splitlines()]
+
+  def test_serve(self):
+    self.assertEqual([1, 3], self.serve(len, [["a"], ["a", "b", "c"]]))
+
+  def test_serve_system_exit(self):
+    def handler(arguments):
+      raise SystemExit(int(arguments[0]))
+    self.assertEqual([0, 2], self.serve(handler, [["0"], ["2"]]))
+
+  def test_serve_none(self):
+    self.assertEqual([0], self.serve(lambda arguments: None, [[]]))
+
+  def test_serve_exception(self):
+    def handler(arguments):
+      raise ValueError(arguments)
+    self.assertEqual([1], self.serve(handler, [["a"]]))
+
+
+class WorkerProcessTestCase(unittest.TestCase):
+
+  def setUp(self):
+    super(WorkerProcessTestCase, self).setUp()
+    script = os.path.join(
+      os.path.dirname(os.path.abspath(inspect.getfile(
+            inspect.currentframe()))), "provpy", "prov_convert_dummy.py")
+    self.worker = WorkerProcess(
+      ["python", "-m", "prov_interop.worker", script])
+    (_, self.in_file) = tempfile.mkstemp(suffix="." + standards.JSON)
+    self.out_file = "worker." + standards.JSON
+
+  def tearDown(self):
+    super(WorkerProcessTestCase, self).tearDown()
+    self.worker.stop()
+    for tmp in [self.in_file, self.out_file]:
+      if os.path.isfile(tmp):
+        os.remove(tmp)
+
+  def test_init(self):
+    self.assertEqual(0, self.worker.starts)
+    self.assertEqual(None, self.worker.pid)
+
+  def test_call(self):
+    for _ in range(2):
+      self.assertEqual(0, self.worker.call(
+        ["-f", "json", self.in_file, self.out_file]))
+      self.assertTrue(os.path.isfile(self.out_file))
+      os.remove(self.out_file)
+    self.assertEqual(1, self.worker.starts)
+
+  def test_call_error(self):
+    self.assertEqual(2, self.worker.call(
+      ["-f", "json", "nosuchfile.json", self.out_file]))
+
+  def test_stop(self):
+    self.worker.call(["-f", "json", self.in_file, self.out_file])
+    self.worker.stop()
+    self.assertEqual(None, self.worker.pid)
+    self.worker.call(["-f", "json", self.in_file, self.out_file])
+    self.assertEqual(2, self.worker.starts)
+
+  def test_call_oserror(self):
+    self.worker = WorkerProcess(["/nosuchexecutable"])
+    with self.assertRaises(OSError):
+      self.worker.call([])
@@ -0,0 +1,592 @@
+"""Adaptive concurrency control, rate limiting and retries for requests
+to remote services.
+
+A :class:`Throttle` bounds the requests in progress to a service, and
+the rate at which they are made, across all the processes of a run.
+Its state is held in a small file, locked while it is read and
+updated, so worker processes need share nothing but the file's name.
+
+- :class:`ConcurrencyLimit` is an additive-increase,
+  multiplicative-decrease (AIMD) controller. Each request that
+  succeeds raises the limit on requests in progress by ``1 / limit``,
+  so the limit grows by about one per round of requests. Each sign of
+  congestion - a ``429 Too Many Requests`` or ``503 Service
+  Unavailable`` response, a connection error, a timeout, or a
+  response slower than a target latency - halves the limit.
+- :class:`TokenBucket` limits the rate of requests, allowing bursts of
+  up to a given size.
+
+Requests which give a ``429`` or ``503`` response, a connection error
+or a timeout are retried, after an exponentially increasing delay
+with random jitter, or after the delay given by a ``Retry-After``
+header.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import requests
+
+from prov_interop.cache import digest
+
+RATE = "rate"
+"""str or unicode: configuration key for maximum requests per second"""
+
+BURST = "burst"
+"""str or unicode: configuration key for maximum requests made at once
+when under the rate"""
+
+CONCURRENCY = "concurrency"
+"""str or unicode: configuration key for initial limit on requests in
+progress"""
+
+MIN_CONCURRENCY = "min-concurrency"
+"""str or unicode: configuration key for lowest limit on requests in
+progress"""
+
+MAX_CONCURRENCY = "max-concurrency"
+"""str or unicode: configuration key for highest limit on requests in
+progress"""
+
+LATENCY = "latency"
+"""str or unicode: configuration key for target request latency, in
+seconds"""
+
+RETRIES = "retries"
+"""str or unicode: configuration key for number of retries of a
+request"""
+
+BACKOFF = "backoff"
+"""str or unicode: configuration key for delay before the first retry,
+in seconds"""
+
+MAX_BACKOFF = "max-backoff"
+"""str or unicode: configuration key for longest delay before a retry,
+in seconds"""
+
+STATE_FILE = "state-file"
+"""str or unicode: configuration key for the file holding the shared
+state"""
+
+DEFAULT_CONCURRENCY = 4
+"""int: default initial limit on requests in progress"""
+
+DEFAULT_MAX_CONCURRENCY = 32
+"""int: default highest limit on requests in progress"""
+
+DEFAULT_RETRIES = 3
+"""int: default number of retries of a request"""
+
+DEFAULT_BACKOFF = 0.5
+"""float: default delay before the first retry, in seconds"""
+
+DEFAULT_MAX_BACKOFF = 30.0
+"""float: default longest delay before a retry, in seconds"""
+
+RETRY_STATUS_CODES = [requests.codes.too_many_requests,
+                      requests.codes.service_unavailable]
+"""list of int: HTTP status codes for which requests are retried"""
+
+POLL_INTERVAL = 0.01
+"""float: delay before checking again for a free request slot, in
+seconds"""
+
+
+class SharedState(object):
+  """State shared by many processes, held as a JSON object in a file.
+  The file is locked, via :func:`fcntl.flock`, while the state is
+  read and updated. :mod:`fcntl` is imported only when the state is
+  first updated, so this module can be imported on platforms which
+  lack it.
+  """
+
+  def __init__(self, file_name):
+    """Create state.
+
+    :param file_name: File name
+    :type file_name: str or unicode
+    """
+    self._file_name = file_name
+
+  @property
+  def file_name(self):
+    """Get state file name.
+
+    :return: file name
+    :rtype: str or unicode
+    """
+    return self._file_name
+
+  def update(self, function):
+    """Read the state, update it and write it back, holding the lock
+    throughout. If the file cannot be parsed, the state is empty.
+
+    :param function: Function which is given the state, as a dict,
+      which it may change, and whose return value is returned
+    :type function: callable
+    :return: value returned by `function`
+    :rtype: object
+    :raises IOError: if the file cannot be read or written
+    :raises ImportError: if the platform does not support
+      :func:`fcntl.flock`
+    """
+    import fcntl
+    # The file is opened for each update, not once, so that the lock
+    # is not shared with processes forked since.
+    handle = os.open(self._file_name, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+      fcntl.flock(handle, fcntl.LOCK_EX)
+      data = b""
+      while True:
+        block = os.read(handle, 65536)
+        if not block:
+          break
+        data += block
+      try:
+        state = json.loads(data.decode("utf-8")) if data else {}
+      except ValueError:
+        state = {}
+      if not isinstance(state, dict):
+        state = {}
+      value = function(state)
+      os.lseek(handle, 0, os.SEEK_SET)
+      os.ftruncate(handle, 0)
+      os.write(handle, json.dumps(state, sort_keys=True).encode("utf-8"))
+      return value
+    finally:
+      os.close(handle)
+
+
+class ConcurrencyLimit(object):
+  """Additive-increase, multiplicative-decrease limit on requests in
+  progress. The limit, and the requests in progress in each process,
+  are held in a shared state.
+  """
+
+  def __init__(self, concurrency=DEFAULT_CONCURRENCY, minimum=1,
+               maximum=DEFAULT_MAX_CONCURRENCY):
+    """Create limit.
+
+    :param concurrency: Initial limit
+    :type concurrency: int
+    :param minimum: Lowest limit
+    :type minimum: int
+    :param maximum: Highest limit
+    :type maximum: int
+    :raises ValueError: if the limits are not positive or
+      `concurrency` is not between `minimum` and `maximum`
+    """
+    if minimum < 1 or not minimum <= concurrency <= maximum:
+      raise ValueError("Concurrency limits must be positive, with " +
+                       "initial limit between lowest and highest")
+    self._concurrency = concurrency
+    self._minimum = minimum
+    self._maximum = maximum
+
+  def limit(self, state):
+    """Get the current limit.
+
+    :param state: Shared state
+    :type state: dict
+    :return: limit
+    :rtype: float
+    """
+    limit = state.get("limit", self._concurrency)
+    return min(self._maximum, max(self._minimum, limit))
+
+  def in_progress(self, state):
+    """Get the number of requests in progress, in processes that are
+    still running.
+
+    :param state: Shared state
+    :type state: dict
+    :return: number of requests
+    :rtype: int
+    """
+    running = {}
+    for (pid, count) in state.get("in-progress", {}).items():
+      try:
+        os.kill(int(pid), 0)
+      except OSError:
+        # Requests of processes which have exited are not in progress.
+        continue
+      running[pid] = count
+    state["in-progress"] = running
+    return sum(running.values())
+
+  def available(self, state):
+    """Check whether another request may start.
+
+    :param state: Shared state
+    :type state: dict
+    :return: ``True`` if fewer requests than the limit are in
+      progress
+    :rtype: bool
+    """
+    return self.in_progress(state) < max(1, int(self.limit(state)))
+
+  def start(self, state):
+    """Record the start of a request by this process.
+
+    :param state: Shared state
+    :type state: dict
+    """
+    in_progress = state.setdefault("in-progress", {})
+    pid = str(os.getpid())
+    in_progress[pid] = in_progress.get(pid, 0) + 1
+
+  def end(self, state, started, congested):
+    """Record the end of a request by this process, and update the
+    limit. If there was congestion, the limit is halved, unless it was
+    already halved since the request started, as requests in progress
+    at the same time are likely to see the same congestion.
+
+    :param state: Shared state
+    :type state: dict
+    :param started: Time the request started, in seconds since the
+      epoch
+    :type started: float
+    :param congested: Whether the request showed congestion
+    :type congested: bool
+    :return: ``True`` if the limit was decreased
+    :rtype: bool
+    """
+    in_progress = state.setdefault("in-progress", {})
+    pid = str(os.getpid())
+    if in_progress.get(pid, 0) > 1:
+      in_progress[pid] -= 1
+    else:
+      in_progress.pop(pid, None)
+    limit = self.limit(state)
+    if not congested:
+      state["limit"] = min(self._maximum, limit + 1.0 / limit)
+      return False
+    if started < state.get("decreased", 0):
+      return False
+    state["limit"] = max(self._minimum, limit / 2.0)
+    state["decreased"] = time.time()
+    return True
+
+
+class TokenBucket(object):
+  """Token bucket rate limiter. Tokens are added at a fixed rate, up to
+  a maximum, and each request takes one. The tokens are held in a
+  shared state.
+  """
+
+  def __init__(self, rate, burst=None):
+    """Create rate limiter.
+
+    :param rate: Maximum requests per second
+    :type rate: float
+    :param burst: Maximum number of tokens, which bounds the requests
+      that can be made at once (optional, default the larger of `rate`
+      and 1)
+    :type burst: float
+    :raises ValueError: if `rate` or `burst` is not positive
+    """
+    if burst is None:
+      burst = max(1.0, rate)
+    if rate <= 0 or burst < 1:
+      raise ValueError("Rate must be positive and burst at least 1")
+    self._rate = rate
+    self._burst = burst
+
+  def wait(self, state, now):
+    """Add the tokens due since the state was last updated, then get
+    the time until a token is available.
+
+    :param state: Shared state
+    :type state: dict
+    :param now: Current time, in seconds since the epoch
+    :type now: float
+    :return: time to wait, in seconds, 0 if a token is available
+    :rtype: float
+    """
+    tokens = state.get("tokens", self._burst)
+    elapsed = max(0, now - state.get("updated", now))
+    tokens = min(self._burst, tokens + elapsed * self._rate)
+    state["tokens"] = tokens
+    state["updated"] = now
+    if tokens >= 1:
+      return 0
+    return (1 - tokens) / self._rate
+
+  def take(self, state):
+    """Take a token, which must be available.
+
+    :param state: Shared state
+    :type state: dict
+    """
+    state["tokens"] -= 1
+
+
+class Throttle(object):
+  """Concurrency control, rate limiting and retries for requests to a
+  service, shared by all processes using the same state file.
+  """
+
+  def __init__(self, file_name, concurrency_limit, token_bucket=None,
+               latency=None, retries=DEFAULT_RETRIES,
+               backoff=DEFAULT_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF):
+    """Create throttle.
+
+    :param file_name: Shared state file name
+    :type file_name: str or unicode
+    :param concurrency_limit: Limit on requests in progress
+    :type concurrency_limit: :class:`ConcurrencyLimit`
+    :param token_bucket: Rate limiter (optional)
+    :type token_bucket: :class:`TokenBucket`
+    :param latency: Target latency, in seconds. Slower responses are
+      treated as congestion (optional)
+    :type latency: float
+    :param retries: Number of retries of a request
+    :type retries: int
+    :param backoff: Delay before the first retry, in seconds
+    :type backoff: float
+    :param max_backoff: Longest delay before a retry, in seconds
+    :type max_backoff: float
+    """
+    self._state = SharedState(file_name)
+    self._concurrency_limit = concurrency_limit
+    self._token_bucket = token_bucket
+    self._latency = latency
+    self._retries = retries
+    self._backoff = backoff
+    self._max_backoff = max_backoff
+    self._lock = threading.Lock()
+    self._counters = dict([(name, 0) for name in
+                           ["throttle-requests", "throttle-retries",
+                            "throttle-waits", "throttle-congestion",
+                            "throttle-decreases"]])
+
+  @classmethod
+  def from_config(cls, config, name):
+    """Create throttle from a configuration, which may hold:
+
+    - ``rate``: maximum requests per second, across all processes
+      (optional, default no limit).
+    - ``burst``: maximum requests made at once when under the rate
+      (optional, default the larger of ``rate`` and 1).
+    - ``concurrency``: initial limit on requests in progress, across
+      all processes (optional, default 4).
+    - ``min-concurrency``: lowest limit (optional, default 1).
+    - ``max-concurrency``: highest limit (optional, default 32).
+    - ``latency``: target latency, in seconds (optional, default
+      none).
+    - ``retries``: number of retries of a request (optional, default
+      3).
+    - ``backoff``: delay before the first retry, in seconds, which is
+      doubled for each further retry (optional, default 0.5).
+    - ``max-backoff``: longest delay before a retry, in seconds
+      (optional, default 30).
+    - ``state-file``: file holding the shared state (optional, default
+      a file in the temporary directory named after `name`).
+
+    :param config: Configuration
+    :type config: dict
+    :param name: Name of the service e.g. its URL
+    :type name: str or unicode
+    :return: throttle
+    :rtype: :class:`Throttle`
+    :raises ValueError: if `config` holds invalid values
+    """
+    if not isinstance(config, dict):
+      raise ValueError("Throttle configuration must be a dictionary")
+    for key in [CONCURRENCY, MIN_CONCURRENCY, MAX_CONCURRENCY, RETRIES]:
+      if key in config and type(config[key]) is not int:
+        raise ValueError(key + " must be an integer")
+    for key in [RATE, BURST, LATENCY, BACKOFF, MAX_BACKOFF]:
+      if key in config and (isinstance(config[key], bool) or
+                            not isinstance(config[key], (int, float)) or
+                            config[key] <= 0):
+        raise ValueError(key + " must be a positive number")
+    if config.get(RETRIES, DEFAULT_RETRIES) < 0:
+      raise ValueError(RETRIES + " must not be negative")
+    concurrency_limit = ConcurrencyLimit(
+      config.get(CONCURRENCY, DEFAULT_CONCURRENCY),
+      config.get(MIN_CONCURRENCY, 1),
+      config.get(MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY))
+    token_bucket = None
+    if RATE in config:
+      token_bucket = TokenBucket(config[RATE], config.get(BURST))
+    file_name = config.get(STATE_FILE)
+    if file_name is None:
+      file_name = os.path.join(tempfile.gettempdir(),
+                               "prov_interop-throttle-" +
+                               digest(name)[:16] + ".json")
+    return cls(file_name, concurrency_limit, token_bucket,
+               config.get(LATENCY),
+               config.get(RETRIES, DEFAULT_RETRIES),
+               config.get(BACKOFF, DEFAULT_BACKOFF),
+               config.get(MAX_BACKOFF, DEFAULT_MAX_BACKOFF))
+
+  @property
+  def file_name(self):
+    """Get shared state file name.
+
+    :return: file name
+    :rtype: str or unicode
+    """
+    return self._state.file_name
+
+  def limit(self):
+    """Get the current limit on requests in progress.
+
+    :return: limit
+    :rtype: float
+    """
+    return self._state.update(self._concurrency_limit.limit)
+
+  def _count(self, name, value=1):
+    with self._lock:
+      self._counters[name] += value
+
+  def _try_start(self, state):
+    now = time.time()
+    if not self._concurrency_limit.available(state):
+      return POLL_INTERVAL
+    if self._token_bucket is not None:
+      wait = self._token_bucket.wait(state, now)
+      if wait > 0:
+        return wait
+      self._token_bucket.take(state)
+    self._concurrency_limit.start(state)
+    return 0
+
+  def start(self):
+    """Wait until a request may start, then record its start.
+
+    :return: time the request started, in seconds since the epoch
+    :rtype: float
+    """
+    waited = False
+    while True:
+      wait = self._state.update(self._try_start)
+      if wait == 0:
+        break
+      waited = True
+      time.sleep(wait)
+    if waited:
+      self._count("throttle-waits")
+    return time.time()
+
+  def end(self, started, congested):
+    """Record the end of a request, and update the limit on requests
+    in progress.
+
+    :param started: Time the request started, as returned by
+      :meth:`start`
+    :type started: float
+    :param congested: Whether the request showed congestion
+    :type congested: bool
+    """
+    decreased = self._state.update(
+      lambda state: self._concurrency_limit.end(state, started, congested))
+    if congested:
+      self._count("throttle-congestion")
+    if decreased:
+      self._count("throttle-decreases")
+
+  def delay(self, attempt, response=None):
+    """Get the delay before retrying a request. This is the delay
+    given by the response's ``Retry-After`` header, if it gives a
+    number of seconds, else an exponentially increasing delay with
+    random jitter. In either case it is at most ``max-backoff``.
+
+    :param attempt: Number of retries already made
+    :type attempt: int
+    :param response: Response, if one was received
+    :type response: :class:`requests.Response`
+    :return: delay in seconds
+    :rtype: float
+    """
+    if response is not None:
+      try:
+        return min(self._max_backoff,
+                   max(0, float(response.headers["Retry-After"])))
+      except (KeyError, ValueError):
+        pass
+    delay = min(self._max_backoff, self._backoff * (2 ** attempt))
+    return random.uniform(delay / 2, delay)
+
+  def request(self, send):
+    """Make a request, waiting until it may start, and retrying it
+    if it gives a ``429`` or ``503`` response, a connection error or a
+    timeout.
+
+    :param send: Function which makes the request and returns the
+      response
+    :type send: callable
+    :return: response. If all retries fail with a ``429`` or ``503``
+      response then the last response is returned
+    :rtype: :class:`requests.Response`
+    :raises requests.exceptions.RequestException: if the last retry
+      fails with a connection error or timeout, or the request fails
+      with any other error
+    """
+    attempt = 0
+    while True:
+      started = self.start()
+      self._count("throttle-requests")
+      response = None
+      try:
+        response = send()
+      except (requests.exceptions.ConnectionError,
+              requests.exceptions.Timeout):
+        self.end(started, True)
+        if attempt >= self._retries:
+          raise
+      except Exception:
+        self.end(started, False)
+        raise
+      else:
+        retry = response.status_code in RETRY_STATUS_CODES
+        slow = self._latency is not None and \
+            time.time() - started > self._latency
+        self.end(started, retry or slow)
+        if not retry or attempt >= self._retries:
+          return response
+        # Release the connection of a streamed response.
+        response.close()
+      time.sleep(self.delay(attempt, response))
+      attempt += 1
+      self._count("throttle-retries")
+
+  def statistics(self):
+    """Get counters of requests made, retries, requests which waited
+    for the limits, requests which showed congestion, and decreases of
+    the limit on requests in progress.
+
+    :return: counter values keyed by counter name
+    :rtype: dict from str or unicode to int
+    """
+    with self._lock:
+      return dict(self._counters)
@@ -0,0 +1,202 @@
+"""Timelines of test harness phases, as Chrome trace events.
+
+A :class:`Tracer` records timed spans, e.g. of each phase of a test,
+as complete (``"ph": "X"``) events in the Chrome trace event format,
+which can be opened in a trace viewer such as ``chrome://tracing`` or
+Perfetto to see how processes and threads interleave and where the
+time goes. Events are appended to the trace file as they are
+recorded, using the JSON Array Format, in which the closing ``]`` may
+be omitted, so that many processes (e.g. nose's multiprocess workers,
+or those of :mod:`prov_interop.run`) can append to the same file. The
+file's opening ``[`` is written by whichever process creates the
+file. Timestamps are wall-clock times, in microseconds, so events from
+different processes are on the same timeline.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import contextlib
+import errno
+import json
+import os
+import tempfile
+import threading
+import time
+
+PHASE = "phase"
+"""str or unicode: category of test harness phase events"""
+
+
+def start(file_name):
+  """Start a new trace, removing any existing trace file, so that it
+  is created afresh by the first event recorded.
+
+  :param file_name: Trace file name
+  :type file_name: str or unicode
+  :raises OSError: if the file exists but cannot be removed
+  """
+  if os.path.exists(file_name):
+    os.remove(file_name)
+
+
+def read_events(file_name):
+  """Read the events in a trace file.
+
+  :param file_name: Trace file name
+  :type file_name: str or unicode
+  :return: events
+  :rtype: list of dict
+  :raises IOError: if the file cannot be read
+  :raises ValueError: if the file is not a valid trace file
+  """
+  with open(file_name, "r") as f:
+    content = f.read().strip()
+  if not content.endswith("]"):
+    content = content.rstrip(",") + "]"
+  return json.loads(content)
+
+
+class Tracer(object):
+  """Records timed spans as Chrome trace events, appending them to a
+  trace file. A tracer without a file records nothing, so code can
+  record spans whether or not tracing is enabled.
+  """
+
+  def __init__(self, file_name=None):
+    """Create tracer. The file is opened when the first event is
+    recorded.
+
+    :param file_name: Trace file name, or ``None`` to record nothing
+    :type file_name: str or unicode
+    """
+    self._file_name = file_name
+    self._fd = None
+    self._lock = threading.Lock()
+
+  @property
+  def file_name(self):
+    """Get trace file name.
+
+    :return: file name, or ``None`` if nothing is recorded
+    :rtype: str or unicode
+    """
+    return self._file_name
+
+  @property
+  def enabled(self):
+    """Check whether events are recorded.
+
+    :return: ``True`` if there is a trace file
+    :rtype: bool
+    """
+    return self._file_name is not None
+
+  def open(self):
+    """Open the trace file for appending. If it does not exist then it
+    is created holding its opening ``[``, by linking a file already
+    holding it, so that no process can append to the file before the
+    ``[`` is written. The lock must be held.
+
+    :raises OSError: if the file cannot be created or opened
+    """
+    directory = os.path.dirname(os.path.abspath(self._file_name))
+    (handle, temp_file) = tempfile.mkstemp(dir=directory)
+    try:
+      try:
+        os.write(handle, b"[\n")
+      finally:
+        os.close(handle)
+      try:
+        os.link(temp_file, self._file_name)
+      except OSError as e:
+        if e.errno != errno.EEXIST:
+          raise
+    finally:
+      os.remove(temp_file)
+    self._fd = os.open(self._file_name, os.O_WRONLY | os.O_APPEND)
+
+  def add(self, name, start, end, args=None, category=PHASE):
+    """Record a span as a complete event. Each event is appended by a
+    single write, so events from concurrent processes are not
+    interleaved.
+
+    :param name: Span name e.g. ``convert``
+    :type name: str or unicode
+    :param start: Start time, in seconds since the epoch
+    :type start: float
+    :param end: End time, in seconds since the epoch
+    :type end: float
+    :param args: Information about the span, shown by trace viewers
+      (optional)
+    :type args: dict
+    :param category: Event category
+    :type category: str or unicode
+    :raises OSError: if the event cannot be written
+    """
+    if not self.enabled:
+      return
+    event = {"name": name,
+             "cat": category,
+             "ph": "X",
+             "ts": int(round(start * 1000000)),
+             "dur": int(round((end - start) * 1000000)),
+             "pid": os.getpid(),
+             "tid": threading.current_thread().ident,
+             "args": args or {}}
+    line = (json.dumps(event, sort_keys=True) + ",\n").encode("utf-8")
+    with self._lock:
+      if self._fd is None:
+        self.open()
+      os.write(self._fd, line)
+
+  @contextlib.contextmanager
+  def span(self, name, args=None, category=PHASE):
+    """Record a span for the execution of a ``with`` block, whether it
+    completes or raises an exception e.g.::
+
+      with tracer.span("convert", {"converter": "ProvPyConverter"}):
+        converter.convert(in_file, out_file)
+
+    :param name: Span name
+    :type name: str or unicode
+    :param args: Information about the span (optional)
+    :type args: dict
+    :param category: Event category
+    :type category: str or unicode
+    """
+    start_time = time.time()
+    try:
+      yield
+    finally:
+      self.add(name, start_time, time.time(), args, category)
+
+  def close(self):
+    """Close the trace file, if it is open. Events recorded after
+    this reopen it.
+    """
+    with self._lock:
+      if self._fd is not None:
+        os.close(self._fd)
+        self._fd = None
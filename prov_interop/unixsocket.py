@@ -0,0 +1,184 @@
+"""HTTP requests over Unix domain sockets.
+
+A URL with the scheme ``http+unix`` names a Unix domain socket,
+percent-encoded, as its host, for example::
+
+    http+unix://%2Fvar%2Frun%2Fprovtranslator.sock/validator/provapi/documents/
+
+for the socket ``/var/run/provtranslator.sock``. Requests to such URLs
+are made over the socket, rather than over TCP, which avoids the
+overheads of the TCP loopback for locally deployed services. Connections
+are pooled per socket, as they are per host for TCP.
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import socket
+
+import requests
+import urllib3
+
+try:
+  from urllib.parse import quote
+  from urllib.parse import unquote
+  from urllib.parse import urlparse
+except ImportError:
+  from urllib import quote
+  from urllib import unquote
+  from urlparse import urlparse
+
+SCHEME = "http+unix"
+"""str or unicode: URL scheme for HTTP over Unix domain sockets"""
+
+
+def socket_url(socket_path, path="/"):
+  """Get the URL of a path served over a Unix domain socket.
+
+  :param socket_path: Socket file name
+  :type socket_path: str or unicode
+  :param path: Path
+  :type path: str or unicode
+  :return: URL
+  :rtype: str or unicode
+  """
+  return SCHEME + "://" + quote(socket_path, safe="") + path
+
+
+def socket_path(url):
+  """Get the Unix domain socket named by a URL.
+
+  :param url: URL
+  :type url: str or unicode
+  :return: socket file name
+  :rtype: str or unicode
+  """
+  return unquote(urlparse(url).netloc)
+
+
+class UnixHTTPConnection(urllib3.connection.HTTPConnection):
+  """HTTP connection over a Unix domain socket."""
+
+  def __init__(self, host, port=None, socket_path=None, **kwargs):
+    """Create connection.
+
+    :param host: Host name sent in the ``Host`` header
+    :type host: str or unicode
+    :param port: Ignored
+    :type port: int
+    :param socket_path: Socket file name
+    :type socket_path: str or unicode
+    :param kwargs: Arguments for
+      :class:`urllib3.connection.HTTPConnection` e.g. ``timeout``
+    :type kwargs: dict
+    """
+    kwargs.pop("socket_options", None)
+    super(UnixHTTPConnection, self).__init__(host, port, **kwargs)
+    self._socket_path = socket_path
+
+  def _new_conn(self):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    if isinstance(self.timeout, (int, float)):
+      sock.settimeout(self.timeout)
+    try:
+      sock.connect(self._socket_path)
+    except socket.timeout:
+      sock.close()
+      raise urllib3.exceptions.ConnectTimeoutError(
+        self, "Connection to " + self._socket_path + " timed out")
+    except (IOError, OSError) as e:
+      sock.close()
+      raise urllib3.exceptions.NewConnectionError(
+        self, "Failed to connect to " + self._socket_path + ": " + str(e))
+    return sock
+
+
+class UnixHTTPConnectionPool(urllib3.connectionpool.HTTPConnectionPool):
+  """Pool of HTTP connections over a Unix domain socket."""
+
+  ConnectionCls = UnixHTTPConnection
+
+  def __init__(self, socket_path, **kwargs):
+    """Create pool.
+
+    :param socket_path: Socket file name
+    :type socket_path: str or unicode
+    :param kwargs: Arguments for
+      :class:`urllib3.connectionpool.HTTPConnectionPool` e.g.
+      ``maxsize``
+    :type kwargs: dict
+    """
+    super(UnixHTTPConnectionPool, self).__init__("localhost", **kwargs)
+    self.conn_kw["socket_path"] = socket_path
+
+
+class UnixAdapter(requests.adapters.HTTPAdapter):
+  """Transport adapter for ``http+unix`` URLs. Its pools are held with
+  those of TCP hosts, in its pool manager, so they are counted by
+  :meth:`prov_interop.component.RestComponent.statistics` and closed
+  when the adapter is closed.
+  """
+
+  def get_connection(self, url, proxies=None):
+    """Get the connection pool for the socket named by a URL, creating
+    it if necessary. Proxies are not used.
+
+    :param url: URL
+    :type url: str or unicode
+    :param proxies: Ignored
+    :type proxies: dict
+    :return: pool
+    :rtype: :class:`UnixHTTPConnectionPool`
+    """
+    path = socket_path(url)
+    pools = self.poolmanager.pools
+    with pools.lock:
+      pool = pools.get(path)
+      if pool is None:
+        pool = UnixHTTPConnectionPool(path, maxsize=self._pool_maxsize,
+                                      block=self._pool_block)
+        pools[path] = pool
+    return pool
+
+  def get_connection_with_tls_context(self, request, verify, proxies=None,
+                                      cert=None):
+    """Get the connection pool for a request, see
+    :meth:`get_connection`.
+
+    :param request: Request
+    :type request: :class:`requests.PreparedRequest`
+    :return: pool
+    :rtype: :class:`UnixHTTPConnectionPool`
+    """
+    return self.get_connection(request.url, proxies)
+
+  def request_url(self, request, proxies):
+    """Get the URL to send in the request line: the request's path.
+
+    :param request: Request
+    :type request: :class:`requests.PreparedRequest`
+    :return: path and query
+    :rtype: str or unicode
+    """
+    return request.path_url
@@ -0,0 +1,270 @@
+"""Persistent worker processes for command-line components.
+
+A worker is a long-lived process which accepts a stream of
+invocations, so the cost of starting a converter or comparator (e.g. a
+JVM for ProvToolbox ``provconvert``) is paid once rather than once per
+test. Requests and responses are exchanged as line-delimited JSON over
+the worker's standard input and standard output. Each request holds
+the arguments that would otherwise have followed the executable on the
+command-line::
+
+  {"arguments": ["-infile", "testcase1.json", "-outfile", "out.provx"]}
+
+Each response holds the exit code that the executable would otherwise
+have returned::
+
+  {"returncode": 0}
+
+This module also provides a reference worker shim that hosts a Python
+script, running the script once per request with ``sys.argv`` set to
+the request's arguments. There is no shim for other executables, whose
+workers must speak this protocol themselves. Usage::
+
+    usage: python -m prov_interop.worker script
+
+For example::
+
+    python -m prov_interop.worker /home/user/ProvPy/scripts/prov-convert
+"""
+# Copyright (c) 2015 University of Southampton
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions: 
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software. 
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.  
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import json
+import os
+import runpy
+import subprocess
+import sys
+import time
+
+ARGUMENTS = "arguments"
+"""str or unicode: key for request arguments"""
+
+RETURNCODE = "returncode"
+"""str or unicode: key for response exit code"""
+
+
+class WorkerProcess(object):
+  """Client for a persistent worker process."""
+
+  def __init__(self, command_line, env=None):
+    """Create worker client. The worker process is not started until
+    the first request is made.
+
+    :param command_line: Command-line to start the worker
+    :type command_line: list of str or unicode
+    :param env: Environment for the worker (default the current
+      process's environment)
+    :type env: dict
+    """
+    self._command_line = command_line
+    self._env = env
+    self._process = None
+    self._starts = 0
+
+  @property
+  def command_line(self):
+    """Get command-line used to start the worker.
+
+    :return: command-line
+    :rtype: list of str or unicode
+    """
+    return self._command_line
+
+  @property
+  def starts(self):
+    """Get number of times the worker has been started.
+
+    :return: number of starts
+    :rtype: int
+    """
+    return self._starts
+
+  @property
+  def pid(self):
+    """Get process ID of the worker.
+
+    :return: process ID or ``None`` if the worker is not running
+    :rtype: int
+    """
+    if self._process is None:
+      return None
+    return self._process.pid
+
+  def start(self):
+    """Start worker, if it is not already running.
+
+    :raises OSError: if the worker cannot be started e.g. the
+      executable is not found
+    """
+    if self._process is not None and self._process.poll() is None:
+      return
+    self._process = subprocess.Popen(self._command_line,
+                                     stdin=subprocess.PIPE,
+                                     stdout=subprocess.PIPE,
+                                     env=self._env)
+    self._starts += 1
+
+  def stop(self):
+    """Stop worker, if it is running. The worker is asked to exit by
+    closing its standard input and is killed if it has not exited
+    within a second.
+    """
+    if self._process is None:
+      return
+    process = self._process
+    self._process = None
+    try:
+      process.stdin.close()
+    except (IOError, OSError):
+      pass
+    for _ in range(20):
+      if process.poll() is not None:
+        break
+      time.sleep(0.05)
+    if process.poll() is None:
+      process.kill()
+      process.wait()
+    process.stdout.close()
+
+  def call(self, arguments):
+    """Send a request to the worker and wait for its response. The
+    worker is started if it is not running. If the worker exits or
+    its response cannot be read then it is restarted and the request
+    retried once.
+
+    :param arguments: Arguments
+    :type arguments: list of str or unicode
+    :return: exit code
+    :rtype: int
+    :raises OSError: if the worker cannot be started, or it fails
+      to respond after being restarted
+    """
+    request = json.dumps({ARGUMENTS: list(arguments)}) + "\n"
+    for attempt in range(2):
+      self.start()
+      try:
+        self._process.stdin.write(request.encode("utf-8"))
+        self._process.stdin.flush()
+        line = self._process.stdout.readline()
+        if not line:
+          raise IOError("Worker exited")
+        return int(json.loads(line.decode("utf-8"))[RETURNCODE])
+      except (IOError, OSError, ValueError, KeyError) as e:
+        error = e
+        self.stop()
+    raise OSError(" ".join(self._command_line) + " failed: " + str(error))
+
+
+def serve(handler, stdin=None, stdout=None, initializer=None):
+  """Serve requests until standard input is closed. This implements
+  the worker side of the protocol and can be used by Python tools to
+  act as a worker.
+
+  `handler` is invoked with each request's arguments and must return
+  an exit code. If it raises :class:`SystemExit` then the exit code
+  is taken from that. If it raises any other exception then the exit
+  code is 1.
+
+  While `handler` runs, file descriptor 1 is redirected to standard
+  error, so output printed by the tool does not corrupt the
+  responses.
+
+  :param handler: Request handler
+  :type handler: function from list of str or unicode to int
+  :param stdin: Input stream for requests (default standard input)
+  :type stdin: file
+  :param stdout: Output stream for responses (default standard output)
+  :type stdout: file
+  :param initializer: Function called, with no arguments, before
+    requests are read (optional). Output it prints is also redirected
+    to standard error
+  :type initializer: function
+  """
+  if stdin is None:
+    stdin = getattr(sys.stdin, "buffer", sys.stdin)
+  if stdout is None:
+    sys.stdout.flush()
+    stdout = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+  if initializer is not None:
+    initializer()
+  for line in iter(stdin.readline, b""):
+    arguments = json.loads(line.decode("utf-8"))[ARGUMENTS]
+    try:
+      return_code = exit_code(handler(arguments))
+    except SystemExit as e:
+      return_code = exit_code(e.code)
+    except Exception as e:
+      print(e.__class__.__name__ + ": " + str(e), file=sys.stderr)
+      return_code = 1
+    sys.stdout.flush()
+    response = json.dumps({RETURNCODE: return_code}) + "\n"
+    stdout.write(response.encode("utf-8"))
+    stdout.flush()
+
+
+def exit_code(code):
+  """Convert a value returned by a handler, or given to
+  :class:`SystemExit`, to an exit code, as the Python interpreter
+  does. ``None`` is 0, an int is itself, and any other value is printed
+  to standard error and is 1.
+
+  :param code: Value
+  :type code: object
+  :return: exit code
+  :rtype: int
+  """
+  if code is None:
+    return 0
+  if not isinstance(code, int):
+    print(code, file=sys.stderr)
+    return 1
+  return code
+
+
+def run_script(script, arguments):
+  """Run a Python script as ``__main__`` with the given arguments.
+
+  :param script: Script file name
+  :type script: str or unicode
+  :param arguments: Arguments
+  :type arguments: list of str or unicode
+  :return: exit code
+  :rtype: int
+  """
+  argv = sys.argv
+  sys.argv = [script] + list(arguments)
+  try:
+    runpy.run_path(script, run_name="__main__")
+  finally:
+    sys.argv = argv
+  return 0
+
+
+if __name__ == "__main__":
+  if len(sys.argv) != 2:
+    print("usage: python -m prov_interop.worker script", file=sys.stderr)
+    sys.exit(2)
+  serve(lambda arguments: run_script(sys.argv[1], arguments))